@@ -1,12 +1,19 @@
 # pi_a_sender_filtered.py
 
 import socket
-import sounddevice as sd
 import numpy as np
 from collections import deque
-import math
 import threading
-from pyrnnoise import RNNoise  # 라즈베리파이에 rnnoise 라이브러리 설치되어 있어야 함
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.capture import CallbackCapture
+from common.codec import ALL_FORMATS
+from common.hpf import HighPassFilter
+from common.pipeline import FilterPipeline
+from common.protocol import NO_PROB, StreamWriter
+from common.rnnoise_stream import RNNoiseStream
 
 # ===== 수신측(Pi_B) IP / PORT 설정 =====
 RECEIVER_IP = "192.168.0.3" 
@@ -18,6 +25,8 @@ SAMPLE_RATE = 48000
 CHANNELS = 1
 CHUNK = 480          # 10ms @ 48kHz
 DTYPE = "int16"
+# 송신 형식: 2 = v2 (seq / 캡처 타임스탬프 / 길이 헤더), 1 = 예전 형식 (구버전 수신부와 붙일 때)
+WIRE_VERSION = 2
 # =======================
 
 # 0: raw, 1: HPF, 2: RNN, 3: HPF+RNN
@@ -32,43 +41,15 @@ RNN_MIX = 0.7
 # =====================================
 
 
-class HighPassFilter:
-    def __init__(self, fs: float, fc: float):
-        self.fs = fs
-        self.fc = fc
-        self.prev_x = 0.0
-        self.prev_y = 0.0
-        self._update_alpha()
-
-    def _update_alpha(self):
-        dt = 1.0 / self.fs
-        rc = 1.0 / (2.0 * math.pi * self.fc)
-        self.alpha = rc / (rc + dt)
-
-    def process(self, x: np.ndarray) -> np.ndarray:
-        # x: float32 1D
-        y = np.empty_like(x, dtype=np.float32)
-        prev_x = self.prev_x
-        prev_y = self.prev_y
-        a = self.alpha
-
-        for i, sample in enumerate(x):
-            v = a * (prev_y + sample - prev_x)
-            y[i] = v
-            prev_y = v
-            prev_x = sample
-
-        self.prev_x = prev_x
-        self.prev_y = prev_y
-        return y
-
-
 # HPF 설정 (100Hz)
 hpf = HighPassFilter(fs=SAMPLE_RATE, fc=100.0)
 
-# RNNoise 인스턴스 (48kHz 기준)
-# ⚠ channels 인자 쓰지 말 것. sample_rate 만 넘김.
-denoiser = RNNoise(sample_rate=SAMPLE_RATE)
+# RNNoise 스트림 (48kHz, 480샘플 프레임, 스트림당 한 번 생성)
+# RNNoise 백엔드: None 이면 시작할 때 설치된 것 중 가장 빠른 것을 자동 선택
+# ("ctypes" / "pyrnnoise" / "rnnoise_wrapper" 로 강제 가능, 환경변수 RNNOISE_BACKEND 도 가능)
+RNN_BACKEND = None
+denoiser = RNNoiseStream(block_size=CHUNK, backend=RNN_BACKEND, tag="Pi_A")
+pipeline = FilterPipeline(CHUNK, hpf=hpf, denoise=denoiser)
 
 
 def mode_input_thread():
@@ -120,57 +101,11 @@ def apply_filter(frames: np.ndarray) -> np.ndarray:
     """
     frames: int16, 길이 CHUNK(480)
     RNNoise 프레임 사이즈도 480이라, 호출당 1프레임 처리.
+    MODE=3에서는 HPF 결과를 dry로 사용 (HPF-only vs HPF+RNN 믹스).
+    반환값은 pipeline 내부 버퍼(view) → 보관하려면 복사할 것.
     """
-    assert frames.shape[0] == CHUNK
-
-    # 항상 int16 기준으로 처리
-    x = frames.astype(np.int16)
-
-    # RAW 기준 신호(dry) 보관
-    dry = x.copy()
-
-    # RAW
-    if MODE == 0:
-        return x
-
-    # HPF
-    if MODE in (1, 3):
-        xf = hpf.process(x.astype(np.float32))  # HPF는 float32에서
-        x = np.clip(xf, -32768, 32767).astype(np.int16)
-
-        # MODE=3에서는 HPF 결과를 dry로 사용 (HPF-only vs HPF+RNN 믹스)
-        if MODE == 3:
-            dry = x.copy()
-
-    # RNNoise
-    if MODE in (2, 3):
-        # pyrnnoise 권장 방식: [num_channels, num_samples]로 chunk 처리
-        mono = x.reshape(1, -1)  # (1, 480)
-
-        denoised_int16 = x  # fallback
-        # denoise_chunk는 frame마다 (speech_prob, denoised_audio) yield
-        for _, denoised in denoiser.denoise_chunk(mono):
-            # mono 1채널이니까 [0]만 사용
-            denoised_int16 = denoised[0].astype(np.int16)
-            break  # 이번 프레임(480 샘플)만 쓰면 되니까 바로 탈출
-
-        # === RNNoise 강도 믹스 ===
-        mix = max(0.0, min(1.0, RNN_MIX))  # 혹시 실수로 범위 벗어나도 클램프
-
-        if mix >= 1.0:
-            # RNNoise 100%
-            x = denoised_int16
-        elif mix <= 0.0:
-            # RNNoise 0% (dry만 사용)
-            x = dry
-        else:
-            dry_f = dry.astype(np.float32)
-            wet_f = denoised_int16.astype(np.float32)
-            mixed_f = (1.0 - mix) * dry_f + mix * wet_f
-            x = np.clip(mixed_f, -32768, 32767).astype(np.int16)
-        # ========================
-
-    return x
+    mix = max(0.0, min(1.0, RNN_MIX))  # 혹시 실수로 범위 벗어나도 클램프
+    return pipeline.process(frames, use_hpf=MODE in (1, 3), use_rnn=MODE in (2, 3), mix=mix)
 
 
 def main():
@@ -183,36 +118,31 @@ def main():
     print(f"[Pi_A] receiver {RECEIVER_IP}:{RECEIVER_PORT} 에 연결 시도...")
     sock.connect((RECEIVER_IP, RECEIVER_PORT))
     print("[Pi_A] 연결 성공. 마이크 + 필터 스트리밍 시작.")
+    writer = StreamWriter(sock, version=WIRE_VERSION, tag="Pi_A")
+    # 수신부와 샘플레이트 / 블록 / 코덱을 맞춤. 필터가 SAMPLE_RATE / CHUNK 기준이라 그대로만 제안
+    # (수신부가 다른 블록을 원하면 수신부가 다시 자름, 샘플레이트가 안 맞으면 여기서 ValueError)
+    writer.negotiate((SAMPLE_RATE,), CHANNELS, CHUNK, codecs=ALL_FORMATS)
 
     # 마이크 입력 스트림 열기
-    with sd.InputStream(
-        samplerate=SAMPLE_RATE,
-        channels=CHANNELS,
-        dtype=DTYPE,
-        blocksize=CHUNK,
-    ) as stream:
+    # 마이크는 오디오 콜백이 링버퍼에 계속 쌓고, 아래 루프는 자기 속도로 꺼내감
+    # (sendall 이 잠깐 막혀도 입력 버퍼가 넘치지 않음)
+    capture = CallbackCapture(SAMPLE_RATE, channels=CHANNELS, blocksize=CHUNK, tag="Pi_A")
+    with capture:
         try:
             while True:
-                frames, overflowed = stream.read(CHUNK)
-                if overflowed:
-                    print("[Pi_A] Warning: input overflow", flush=True)
-
-                # frames shape: (CHUNK, CHANNELS)
-                if frames.ndim == 2 and frames.shape[1] == 1:
-                    frames_mono = frames[:, 0]
-                else:
-                    frames_mono = frames.reshape(-1)
+                frames_mono, ts = capture.read()
 
                 # 필터 적용
                 filtered = apply_filter(frames_mono)
 
-                # int16 → bytes 로 변환해서 전송
-                data = filtered.astype(np.int16).tobytes()
-                sock.sendall(data)
+                # v2 헤더(seq / 캡처 시각 / 메타) + int16 버퍼를 그대로 전송 (bytes 변환 없이)
+                writer.send(filtered, ts=ts, mode=MODE, prob=denoiser.prob if MODE in (2, 3) else NO_PROB)
 
         except KeyboardInterrupt:
             print("\n[Pi_A] Ctrl+C로 종료.")
         finally:
+            print(capture.format_stats())
+            print(writer.format_stats())
             sock.close()
             print("[Pi_A] 소켓 닫힘.")
 
@@ -1,11 +1,17 @@
 import socket
-import sounddevice as sd
 import numpy as np
-import math
 import threading
 import time
 import RPi.GPIO as GPIO
-from rnnoise_wrapper import RNNoise 
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.capture import CallbackCapture
+from common.codec import ALL_FORMATS
+from common.hpf import HighPassFilter
+from common.protocol import NO_PROB, StreamWriter
+from common.rnnoise_stream import RNNoiseStream
 
 # ===== 수신측(Pi_B) IP / PORT 설정 =====
 RECEIVER_IP = "172.30.1.93"
@@ -17,6 +23,8 @@ SAMPLE_RATE = 48000
 CHANNELS = 1
 CHUNK = 480          # 10ms @ 48kHz, RNNoise 프레임과 동일
 DTYPE = "int16"
+# 송신 형식: 2 = v2 (seq / 캡처 타임스탬프 / 길이 헤더), 1 = 예전 형식 (구버전 수신부와 붙일 때)
+WIRE_VERSION = 2
 # =======================
 
 # ===== 모드 정의 =====
@@ -40,36 +48,6 @@ MODE_RNN_MIX = {
 }
 # =======================
 
-class HighPassFilter:
-    def __init__(self, fs: float, fc: float):
-        self.fs = fs
-        self.fc = fc
-        self.prev_x = 0.0
-        self.prev_y = 0.0
-        self._update_alpha()
-
-    def _update_alpha(self):
-        dt = 1.0 / self.fs
-        rc = 1.0 / (2.0 * math.pi * self.fc)
-        self.alpha = rc / (rc + dt)
-
-    def process(self, x: np.ndarray) -> np.ndarray:
-        # x: float32 1D
-        y = np.empty_like(x, dtype=np.float32)
-        prev_x = self.prev_x
-        prev_y = self.prev_y
-        a = self.alpha
-
-        for i, sample in enumerate(x):
-            v = a * (prev_y + sample - prev_x)
-            y[i] = v
-            prev_y = v
-            prev_x = sample
-
-        self.prev_x = prev_x
-        self.prev_y = prev_y
-        return y
-
 # ===== HPF 설정 =====
 # 컷오프 150Hz, 1차 HPF 2개 직렬 → 2차(12 dB/oct) 정도 효과
 HPF_FC = 150.0
@@ -77,8 +55,11 @@ HPF_ORDER = 2
 hpf_list = [HighPassFilter(fs=SAMPLE_RATE, fc=HPF_FC) for _ in range(HPF_ORDER)]
 # =====================
 
-# RNNoise 인스턴스 
-denoiser = RNNoise()
+# RNNoise 스트림 (CHUNK 를 480샘플 프레임으로 나눠 처리, 스트림당 한 번 생성)
+# RNNoise 백엔드: None 이면 시작할 때 설치된 것 중 가장 빠른 것을 자동 선택
+# ("ctypes" / "pyrnnoise" / "rnnoise_wrapper" 로 강제 가능, 환경변수 RNNOISE_BACKEND 도 가능)
+RNN_BACKEND = None
+denoiser = RNNoiseStream(block_size=CHUNK, backend=RNN_BACKEND, tag="Pi_A")
 
 # ===== GPIO 핀 매핑 (BCM 번호) =====
 # 4-버튼 모듈 (한쪽 GND, 한쪽 GPIO, 풀업 사용)
@@ -203,7 +184,7 @@ def apply_filter(frames: np.ndarray) -> np.ndarray:
     hpf_out = np.clip(xf, -32768, 32767).astype(np.int16)
 
     # ----- 2) RNNoise 처리 -----
-    denoised_int16 = denoiser.process_int16(hpf_out)
+    denoised_int16, _ = denoiser.process(hpf_out)
 
     # ----- 3) 모드별 RNNoise 믹스 -----
     mix = MODE_RNN_MIX.get(MODE, 0.0)  # default: 0.0
@@ -236,42 +217,37 @@ def main():
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     print(f"[Pi_A] receiver {RECEIVER_IP}:{RECEIVER_PORT} 에 연결 시도...")
     sock.connect((RECEIVER_IP, RECEIVER_PORT))
+    writer = StreamWriter(sock, version=WIRE_VERSION, tag="Pi_A")
+    # 수신부와 샘플레이트 / 블록 / 코덱을 맞춤. 필터가 SAMPLE_RATE / CHUNK 기준이라 그대로만 제안
+    # (수신부가 다른 블록을 원하면 수신부가 다시 자름, 샘플레이트가 안 맞으면 여기서 ValueError)
+    writer.negotiate((SAMPLE_RATE,), CHANNELS, CHUNK, codecs=ALL_FORMATS)
     print("[Pi_A] 연결 성공. 마이크 + 필터 스트리밍 준비.")
 
     # 마이크 입력 스트림 열기
-    with sd.InputStream(
-        samplerate=SAMPLE_RATE,
-        channels=CHANNELS,
-        dtype=DTYPE,
-        blocksize=CHUNK,
-    ) as stream:
+    # 마이크는 오디오 콜백이 링버퍼에 계속 쌓고, 아래 루프는 자기 속도로 꺼내감
+    # (sendall 이 잠깐 막혀도 입력 버퍼가 넘치지 않음)
+    capture = CallbackCapture(SAMPLE_RATE, channels=CHANNELS, blocksize=CHUNK, tag="Pi_A")
+    with capture:
         try:
             while True:
-                frames, overflowed = stream.read(CHUNK)
-                if overflowed:
-                    print("[Pi_A] Warning: input overflow", flush=True)
+                frames_mono, ts = capture.read()
 
                 # 사람 없으면 읽기만 하고 버림 (송신/필터 X)
                 if not person_present:
                     continue
 
-                # frames shape: (CHUNK, CHANNELS)
-                if frames.ndim == 2 and frames.shape[1] == 1:
-                    frames_mono = frames[:, 0]
-                else:
-                    frames_mono = frames.reshape(-1)
-
                 # 필터 적용 (HPF + RNNoise mix)
                 filtered = apply_filter(frames_mono)
 
-                # int16 → bytes 로 변환해서 전송
-                data = filtered.astype(np.int16).tobytes()
-                sock.sendall(data)
+                # v2 헤더(seq / 캡처 시각 / 메타) + int16 배열을 복사 없이 전송
+                writer.send(filtered, ts=ts, mode=MODE, prob=denoiser.prob if MODE in (2, 3) else NO_PROB)
 
         except KeyboardInterrupt:
             print("\n[Pi_A] Ctrl+C로 종료.")
         finally:
             running = False
+            print(capture.format_stats())
+            print(writer.format_stats())
             sock.close()
             GPIO.cleanup()
             print("[Pi_A] 소켓 닫힘, GPIO 정리 완료.")
@@ -3,13 +3,25 @@
 # 최종본 
 
 import socket
-import sounddevice as sd
 import numpy as np
-import math
 import threading
 import time
 import RPi.GPIO as GPIO
-from rnnoise_wrapper import RNNoise  
+import os
+import sys
+from collections import deque
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.capture import CallbackCapture
+from common.codec import ALL_FORMATS, FORMAT_ZLIB
+from common.dtx import DtxGate
+from common.hpf import ButterworthHPF
+from common.pipeline import FilterPipeline
+from common.protocol import NO_PROB, StreamWriter
+from common.resample import PolyphaseResampler
+from common.rnnoise_stream import RNNoiseStream
+from common.stages import StagedSender
+from common.udp import DatagramWriter, select_transport
 
 # ===== 수신측(Pi_B) IP / PORT 설정 =====
 RECEIVER_IP = "172.30.1.93"
@@ -19,10 +31,30 @@ RECEIVER_PORT = 54321
 # ===== 오디오 설정 =====
 SAMPLE_RATE = 48000
 CHANNELS = 1
-CHUNK = 3840          # 10ms @ 48kHz, RNNoise 프레임과 동일
+CHUNK = 3840          # 80ms @ 48kHz, 아무 값이나 가능 (FrameAdapter 가 480샘플 프레임으로 재구성)
 DTYPE = "int16"
+# 마이크를 여는 샘플레이트. 48 kHz 를 못 내는 USB 마이크면 44100 등으로 (캡처 스레드에서 SAMPLE_RATE 로 변환)
+# CHUNK 가 캡처 블록 길이로 딱 나눠떨어지는 값이어야 함 (3840 @ 48k = 3528 @ 44.1k)
+CAPTURE_RATE = SAMPLE_RATE
+# 보내는 샘플레이트. HPF + RNNoise 뒤에는 말소리가 8 kHz 아래라 16000 (음성 대역) 이면 대역폭 / 수신부 처리량이 1/3
+# (apply_filter 뒤에 anti-alias 폴리페이즈로 줄여 보내고, 수신부가 헤더의 rate 를 보고 장치 레이트로 되돌림, 합쳐서 +2 ms)
+# SAMPLE_RATE 면 그대로. CHUNK 가 TX_RATE 기준으로도 딱 나눠떨어져야 함 (3840 @ 48k = 1280 @ 16k)
+TX_RATE = SAMPLE_RATE
+# 송신 형식: 2 = v2 (seq / 캡처 타임스탬프 / 길이 헤더), 1 = 예전 형식 (구버전 수신부와 붙일 때)
+WIRE_VERSION = 2
+# 전송: "tcp" (핸드셰이크 + 스트림) / "udp" (480 샘플마다 데이터그램 하나, 늦은 블록만 빠지고 뒤 블록은 안 막힘)
+# None 이면 환경변수 AUDIO_TRANSPORT, 그것도 없으면 tcp. 수신부도 같은 값으로
+TRANSPORT = None
+# UDP 는 핸드셰이크가 없어서 코덱을 여기서 정함 (TCP 는 수신부 WIRE_CODECS 중 하나로 정해짐)
+# FORMAT_PCM16 / FORMAT_ULAW / FORMAT_ADPCM / FORMAT_ZLIB (common.codec)
+UDP_CODEC = FORMAT_ZLIB
 # =======================
 
+# ===== 송신 파이프라인 (capture / DSP / network 스레드) =====
+QUEUE_DEPTH = 4          # 단계 사이 큐 크기 (블록 수)
+STATS_INTERVAL = 10.0    # 큐 깊이 / 대기 시간 출력 주기(초)
+# ===========================================================
+
 # ===== 모드 정의 =====
 # 항상 HPF + RNNoise
 # 0: RNN 0.0 (HPF only)
@@ -44,45 +76,45 @@ MODE_RNN_MIX = {
 }
 # =======================
 
-class HighPassFilter:
-    def __init__(self, fs: float, fc: float):
-        self.fs = fs
-        self.fc = fc
-        self.prev_x = 0.0
-        self.prev_y = 0.0
-        self._update_alpha()
-
-    def _update_alpha(self):
-        dt = 1.0 / self.fs
-        rc = 1.0 / (2.0 * math.pi * self.fc)
-        self.alpha = rc / (rc + dt)
-
-    def process(self, x: np.ndarray) -> np.ndarray:
-        # x: float32 1D
-        y = np.empty_like(x, dtype=np.float32)
-        prev_x = self.prev_x
-        prev_y = self.prev_y
-        a = self.alpha
-
-        for i, sample in enumerate(x):
-            v = a * (prev_y + sample - prev_x)
-            y[i] = v
-            prev_y = v
-            prev_x = sample
-
-        self.prev_x = prev_x
-        self.prev_y = prev_y
-        return y
-
 # ===== HPF 설정 =====
-# 컷오프 150Hz, 1차 HPF 2개 직렬 → 2차(12 dB/oct) 정도 효과
+# 컷오프 150Hz, 2차 Butterworth (12 dB/oct)
+# HPF_ORDER 를 올리면 SOS 섹션만 늘어나고 청크당 호출은 한 번 그대로
 HPF_FC = 150.0
 HPF_ORDER = 2
-hpf_list = [HighPassFilter(fs=SAMPLE_RATE, fc=HPF_FC) for _ in range(HPF_ORDER)]
+hpf = ButterworthHPF(fs=SAMPLE_RATE, fc=HPF_FC, order=HPF_ORDER)
 # =====================
 
-# RNNoise 인스턴스 (우리 래퍼, 480샘플 고정)
-denoiser = RNNoise()
+# RNNoise 스트림: CHUNK(캡처 blocksize) ↔ 480샘플 프레임 변환 (carry-over 버퍼) 포함
+# RNNoise 백엔드: None 이면 시작할 때 설치된 것 중 가장 빠른 것을 자동 선택
+# ("ctypes" / "pyrnnoise" / "rnnoise_wrapper" 로 강제 가능, 환경변수 RNNOISE_BACKEND 도 가능)
+RNN_BACKEND = None
+denoiser = RNNoiseStream(block_size=CHUNK, backend=RNN_BACKEND, tag="Pi_A")
+print(
+    f"[Pi_A] RNNoise frame adapter: CHUNK={CHUNK}, "
+    f"latency={denoiser.latency} samples ({denoiser.latency_ms(SAMPLE_RATE):.2f} ms)"
+)
+
+# HPF / 믹스 작업 버퍼를 CHUNK 크기로 미리 잡아두는 파이프라인
+pipeline = FilterPipeline(CHUNK, hpf=hpf, denoise=denoiser)
+
+# ===== DTX (무음 구간 불연속 송신) =====
+# RNNoise 말소리 확률 (블록 안 최대) 이 DTX_THRESHOLD 아래로 DTX_HANGOVER_MS 넘게 이어지면 오디오 대신
+# comfort noise 설명 (대역별 잡음 세기 7 B, 안 바뀌면 헤더만) 만 보냄 → 수신부가 같은 세기의 배경 잡음을 만들어 채움
+# RNNoise 를 돌리는 모드 (1 ~ 3) 에서만. 모드 0 / 확률 없는 백엔드 / DTX 를 모르는 수신부 (TCP) 면 그대로 오디오
+# UDP 는 핸드셰이크가 없어서 수신부가 fmt cn 을 아는 버전이어야 함
+DTX = False
+DTX_THRESHOLD = 0.5
+DTX_HANGOVER_MS = 240
+gate = None
+if DTX:
+    if denoiser.has_prob:
+        gate = DtxGate(SAMPLE_RATE, threshold=DTX_THRESHOLD, hangover_ms=DTX_HANGOVER_MS, tag="Pi_A")
+    else:
+        print(f"[Pi_A] DTX off: RNNoise backend {denoiser.backend.name} gives no speech probability")
+# DSP 단계가 블록마다 정한 (말소리 여부, META prob, 모드) → 전송 단계가 같은 순서로 꺼냄
+# (DSP 스레드는 전송보다 앞서 다음 블록을 처리하므로 전송 단계에서 denoiser.prob / MODE 를 읽으면 다른 블록 값)
+decisions = deque()
+# =====================================
 
 # ===== GPIO 핀 매핑 (BCM 번호) =====
 # 4-버튼 모듈 (한쪽 GND, 한쪽 GPIO, 풀업 사용)
@@ -227,38 +259,23 @@ def ultrasonic_thread():
 
 def apply_filter(frames: np.ndarray) -> np.ndarray:
     """
-    frames: int16, 길이 CHUNK(480)
+    frames: int16, 길이 CHUNK
     파이프라인:
-        mic(int16) → HPF(2차) → RNNoise → 모드별 믹스
+        mic(int16) → HPF(Butterworth, HPF_ORDER차) → RNNoise → 모드별 믹스
+    반환값은 pipeline 내부 버퍼 → 다음 apply_filter 호출 전에 전송을 끝낼 것
     """
-    assert frames.shape[0] == CHUNK
-
-    # ----- 1) HPF (항상 적용) -----
-    xf = frames.astype(np.float32)
-    for hpf in hpf_list:
-        xf = hpf.process(xf)
-    hpf_out = np.clip(xf, -32768, 32767).astype(np.int16)
-
-    # ----- 2) RNNoise 처리 -----
-    denoised_int16 = denoiser.process_int16(hpf_out)
-
-    # ----- 3) 모드별 RNNoise 믹스 -----
-    mix = MODE_RNN_MIX.get(MODE, 0.0)  # default: 0.0
-
-    if mix <= 0.0:
-        # RNNoise 0% → HPF만
-        return hpf_out
-    elif mix >= 1.0:
-        # RNNoise 100%
-        return denoised_int16
-    else:
-        dry_f = hpf_out.astype(np.float32)
-        wet_f = denoised_int16.astype(np.float32)
-        mixed_f = (1.0 - mix) * dry_f + mix * wet_f
-        return np.clip(mixed_f, -32768, 32767).astype(np.int16)
+    # HPF 는 항상 적용, RNNoise 믹스는 모드별 (0.0 이면 RNNoise 호출 자체를 건너뜀)
+    mode = MODE  # 버튼 스레드가 바꿔도 이 블록은 같은 모드로 처리 / 표시
+    mix = MODE_RNN_MIX.get(mode, 0.0)  # default: 0.0
+    out = pipeline.process(frames, use_hpf=True, use_rnn=mix > 0.0, mix=mix)
+    # DTX: RNNoise 를 돌린 블록만 확률로 판단 (모드 0 은 항상 오디오)
+    speech = gate is None or mix == 0.0 or gate.update(denoiser.peak_prob, frames.shape[0])
+    # RNNoise 를 안 돌렸으면 확률 없음 (NO_PROB → 수신부는 RMS 로 판단)
+    decisions.append((speech, denoiser.prob if mix > 0.0 else NO_PROB, mode))
+    return out
 
 def main():
-    global running
+    global running, gate
     gpio_setup()
 
     # 초음파 스레드 시작 (사람 감지용)
@@ -269,46 +286,98 @@ def main():
     th_btn = threading.Thread(target=button_poll_thread, daemon=True)
     th_btn.start()
 
-    # 소켓 생성 및 Pi_B로 연결
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    print(f"[Pi_A] receiver {RECEIVER_IP}:{RECEIVER_PORT} 에 연결 시도...")
-    sock.connect((RECEIVER_IP, RECEIVER_PORT))
-    print("[Pi_A] 연결 성공. 마이크 + 필터 스트리밍 준비.")
+    transport = select_transport(TRANSPORT, tag="Pi_A")
+    if transport == "udp":
+        # 연결 과정 없음 (connect 는 목적지만 정해둠). 수신부가 늦게 떠도 그동안 보낸 것만 버려짐
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.connect((RECEIVER_IP, RECEIVER_PORT))
+        print(f"[Pi_A] UDP → {RECEIVER_IP}:{RECEIVER_PORT}. 마이크 + 필터 스트리밍 준비.")
+        writer = DatagramWriter(sock, TX_RATE, fmt=UDP_CODEC, tag="Pi_A")
+    else:
+        # 소켓 생성 및 Pi_B로 연결
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        print(f"[Pi_A] receiver {RECEIVER_IP}:{RECEIVER_PORT} 에 연결 시도...")
+        sock.connect((RECEIVER_IP, RECEIVER_PORT))
+        print("[Pi_A] 연결 성공. 마이크 + 필터 스트리밍 준비.")
+        writer = StreamWriter(sock, version=WIRE_VERSION, tag="Pi_A")
+        # 수신부와 샘플레이트 / 블록 / 코덱을 맞춤. 필터가 SAMPLE_RATE / CHUNK 기준이라 (TX_RATE 로 환산해서) 그대로만 제안
+        # (수신부가 다른 블록을 원하면 수신부가 다시 자름, 샘플레이트가 안 맞으면 여기서 ValueError)
+        # 코덱은 전부 제안하고 수신부가 고른 것으로 send() 가 압축 (apply_filter 뒤, 네트워크 스레드에서)
+        session = writer.negotiate(
+            (TX_RATE,), CHANNELS, CHUNK * TX_RATE // SAMPLE_RATE, codecs=ALL_FORMATS, dtx=gate is not None
+        )
+        if gate is not None and not session.dtx:
+            print("[Pi_A] DTX off: receiver does not accept comfort noise frames")
+            gate = None
 
     # 마이크 입력 스트림 열기
-    with sd.InputStream(
-        samplerate=SAMPLE_RATE,
-        channels=CHANNELS,
-        dtype=DTYPE,
-        blocksize=CHUNK,
-    ) as stream:
+    # 마이크는 오디오 콜백이 링버퍼에 계속 쌓고, 아래 루프는 자기 속도로 꺼내감
+    # (sendall 이 잠깐 막혀도 입력 버퍼가 넘치지 않음)
+    for rate in (CAPTURE_RATE, TX_RATE):
+        if CHUNK * rate % SAMPLE_RATE:
+            raise ValueError(f"CHUNK {CHUNK} @ {SAMPLE_RATE} Hz is not a whole number of samples @ {rate} Hz")
+    converter = None
+    if CAPTURE_RATE != SAMPLE_RATE:
+        # 필터 / RNNoise 는 SAMPLE_RATE 기준이라 캡처 직후에 변환 (블록마다 정확히 CHUNK 샘플이 나옴)
+        converter = PolyphaseResampler(CAPTURE_RATE, SAMPLE_RATE, max_frames=CHUNK * CAPTURE_RATE // SAMPLE_RATE)
+        print(f"[Pi_A] capture {CAPTURE_RATE} Hz -> {SAMPLE_RATE} Hz (+{converter.delay_ms:.1f} ms)")
+    band = None
+    if TX_RATE != SAMPLE_RATE:
+        # 음성 대역 송신: 필터 뒤에 줄임 (네트워크 스레드, 80 ms 블록당 수십 us). 수신부 되돌리는 필터 지연도 같이 출력
+        band = PolyphaseResampler(SAMPLE_RATE, TX_RATE, max_frames=CHUNK)
+        back = PolyphaseResampler(TX_RATE, SAMPLE_RATE, max_frames=CHUNK * TX_RATE // SAMPLE_RATE)
+        print(
+            f"[Pi_A] voice band {SAMPLE_RATE} -> {TX_RATE} Hz: +{band.delay_ms:.2f} ms here, "
+            f"+{back.delay_ms:.2f} ms on receiver (x{SAMPLE_RATE / TX_RATE:.0f} less data)"
+        )
+    capture = CallbackCapture(
+        CAPTURE_RATE, channels=CHANNELS, blocksize=CHUNK * CAPTURE_RATE // SAMPLE_RATE, tag="Pi_A"
+    )
+    with capture:
+        def read_block():
+            # 멈출 때 빠져나올 수 있게 timeout 을 둠
+            got = capture.read(timeout=0.5)
+
+            # 사람 없으면 읽기만 하고 버림 (송신/필터 X)
+            if got is None or not person_present:
+                return None
+
+            # read() / process() 는 내부 버퍼 view 라서 큐에 넣기 전에 복사
+            # 캡처 시각은 블록과 같이 큐를 지나 send_block 까지 감 (StagedSender timestamps=True)
+            block, ts = got
+            if converter is not None:
+                return converter.process(block).copy(), ts
+            return block.copy(), ts
+
+        def send_block(buf, ts):
+            # 무음 (DTX) 블록은 comfort noise 설명으로 (writer 가 인코딩)
+            speech, prob, mode = decisions.popleft()
+            if band is not None:
+                buf = band.process(buf)
+            writer.send(buf, ts=ts, mode=mode, prob=prob, silence=not speech)
+
+        # read_block → apply_filter(HPF + RNNoise mix) → send_block 을 각각 다른 스레드에서
+        # (int16 배열을 bytes 로 복사하지 않고 그대로 전송, 버퍼 프로토콜)
+        sender = StagedSender(
+            read_block, apply_filter, send_block, chunk=CHUNK, depth=QUEUE_DEPTH, timestamps=True, tag="Pi_A"
+        )
+        sender.start()
         try:
-            while True:
-                frames, overflowed = stream.read(CHUNK)
-                if overflowed:
-                    print("[Pi_A] Warning: input overflow", flush=True)
-
-                # 사람 없으면 읽기만 하고 버림 (송신/필터 X)
-                if not person_present:
-                    continue
-
-                # frames shape: (CHUNK, CHANNELS)
-                if frames.ndim == 2 and frames.shape[1] == 1:
-                    frames_mono = frames[:, 0]
-                else:
-                    frames_mono = frames.reshape(-1)
-
-                # 필터 적용 (HPF + RNNoise mix)
-                filtered = apply_filter(frames_mono)
-
-                # int16 → bytes 로 변환해서 전송
-                data = filtered.astype(np.int16).tobytes()
-                sock.sendall(data)
+            while sender.wait(STATS_INTERVAL):
+                print(sender.format_stats(), flush=True)
+            if sender.error is not None:
+                print(f"[Pi_A] 파이프라인 중단: {sender.error}")
 
         except KeyboardInterrupt:
             print("\n[Pi_A] Ctrl+C로 종료.")
         finally:
             running = False
+            sender.stop()
+            print(sender.format_stats())
+            print(capture.format_stats())
+            print(writer.format_stats())
+            if gate is not None:
+                print(gate.format_stats())
             sock.close()
             GPIO.cleanup()
             print("[Pi_A] 소켓 닫힘, GPIO 정리 완료.")
@@ -1,11 +1,20 @@
 import socket
-import sounddevice as sd
 import numpy as np
-from collections import deque
-import ctypes
-import atexit
-import math
 import threading
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.hpf import HighPassFilter
+from common.catchup import CatchUp
+from common.drift import DriftEstimator
+from common.jitter import AdaptiveJitter
+from common.playback import CallbackPlayer
+from common.codec import FORMAT_PCM16, FORMAT_ZLIB
+from common.protocol import StreamReader
+from common.pipeline import FilterPipeline
+from common.rnnoise_stream import RNNoiseStream
+from common.stages import StagedReceiver
 
 LISTEN_IP = "0.0.0.0"
 LISTEN_PORT = 54321
@@ -15,90 +24,40 @@ CHANNELS = 1
 CHUNK = 480
 DTYPE = "int16"
 BYTES_PER_CHUNK = CHUNK * CHANNELS * 2
-
-DELAY_SEC = 0.5
-DELAY_FRAMES = int(np.ceil(DELAY_SEC * SAMPLE_RATE / CHUNK))
-print(f"[Pi_B] delay: {DELAY_SEC}s ≒ {DELAY_FRAMES} frames")
+# 송신부에 요청할 코덱 (앞쪽 우선, 송신부가 못 하면 다음 것). zlib = 무손실 (말소리면 3/4 정도),
+# Wi-Fi 가 붐비면 FORMAT_ULAW (1/2, 37 dB) / FORMAT_ADPCM (1/4, 30 dB) 를 앞에
+WIRE_CODECS = (FORMAT_ZLIB, FORMAT_PCM16)
+
+# 지터 버퍼 (예전 고정 DELAY_SEC = 0.5 s 대신)
+# 도착 간격이 흔들리는 정도를 재서, 늦은 블록 때문에 끊기는 비율이 UNDERRUN_TARGET 이하인
+# 가장 작은 깊이만큼만 쌓아두고 재생 (직결 LAN 이면 JITTER_MIN_MS 근처까지 내려감)
+JITTER_MIN_MS = 20.0
+JITTER_MAX_MS = 500.0
+UNDERRUN_TARGET = 0.005
+# 밀린 블록이 한꺼번에 오면 (Wi-Fi 멈춤 뒤 TCP 버스트) 목표 지연으로 다시 줄이는 방법
+# "silence": 무음 블록만 버림 (말이 안 끊기면 결국 그냥 버림) / "wsola": 말하는 중에도 블록을 살짝 짧게 / None: 끔
+CATCHUP_METHOD = "wsola"
+# 송신 마이크 / 재생 장치 클럭 차이(ppm)를 버퍼 깊이로 추정해서 리샘플로 보정 (몇 시간 돌아도 지연 유지)
+DRIFT_COMP = True
+
+# recv / DSP / playback 스레드 사이 큐 크기 (블록 수)
+QUEUE_DEPTH = 8
+STATS_INTERVAL = 10.0    # 큐 깊이 / stall 출력 주기(초)
 
 # 0: raw, 1: HPF, 2: RNN, 3: HPF+RNN
 MODE = 0
 MODE_NAME = {0: "RAW", 1: "HPF", 2: "RNN", 3: "BOTH"}
 
 
-def load_rnnoise():
-    libnames = ["librnnoise.so.0", "librnnoise.so"]
-    last_err = None
-    for name in libnames:
-        try:
-            lib = ctypes.CDLL(name)
-            print(f"[Pi_B] RNNoise: {name}")
-            return lib
-        except OSError as e:
-            last_err = e
-    raise OSError(f"RNNoise load failed: {last_err}")
-
-
-rn = load_rnnoise()
-
-rn.rnnoise_create.argtypes = [ctypes.c_void_p]
-rn.rnnoise_create.restype = ctypes.c_void_p
-
-rn.rnnoise_process_frame.argtypes = [
-    ctypes.c_void_p,
-    ctypes.POINTER(ctypes.c_float),
-    ctypes.POINTER(ctypes.c_float),
-]
-rn.rnnoise_process_frame.restype = ctypes.c_float
-
-rn.rnnoise_destroy.argtypes = [ctypes.c_void_p]
-rn.rnnoise_destroy.restype = None
-
-_rn_state = rn.rnnoise_create(None)
-if not _rn_state:
-    raise RuntimeError("rnnoise_create(NULL) failed")
-
-
-def _cleanup_rnnoise():
-    global _rn_state
-    if _rn_state:
-        rn.rnnoise_destroy(_rn_state)
-        _rn_state = None
-
-
-atexit.register(_cleanup_rnnoise)
-
-
-class HighPassFilter:
-    def __init__(self, fs: float, fc: float):
-        self.fs = fs
-        self.fc = fc
-        self.prev_x = 0.0
-        self.prev_y = 0.0
-        self._update_alpha()
-
-    def _update_alpha(self):
-        dt = 1.0 / self.fs
-        rc = 1.0 / (2.0 * math.pi * self.fc)
-        self.alpha = rc / (rc + dt)
-
-    def process(self, x: np.ndarray) -> np.ndarray:
-        y = np.empty_like(x, dtype=np.float32)
-        prev_x = self.prev_x
-        prev_y = self.prev_y
-        a = self.alpha
-
-        for i, sample in enumerate(x):
-            v = a * (prev_y + sample - prev_x)
-            y[i] = v
-            prev_y = v
-            prev_x = sample
-
-        self.prev_x = prev_x
-        self.prev_y = prev_y
-        return y
+hpf = HighPassFilter(fs=SAMPLE_RATE, fc=100.0) #hpf 설정 
 
+# RNNoise 백엔드: None 이면 시작할 때 설치된 것 중 가장 빠른 것을 자동 선택
+# ("ctypes" / "pyrnnoise" / "rnnoise_wrapper" 로 강제 가능, 환경변수 RNNOISE_BACKEND 도 가능)
+RNN_BACKEND = None
+rnn = RNNoiseStream(block_size=CHUNK, backend=RNN_BACKEND, tag="Pi_B")
 
-hpf = HighPassFilter(fs=SAMPLE_RATE, fc=100.0) #hpf 설정 
+# apply_filter 작업 버퍼를 미리 잡아두는 파이프라인
+pipeline = FilterPipeline(CHUNK, hpf=hpf, denoise=rnn)
 
 
 def mode_input_thread():
@@ -120,25 +79,16 @@ def mode_input_thread():
 
 
 def apply_filter(frames: np.ndarray) -> np.ndarray:
-    assert frames.shape[0] == CHUNK
+    # 반환값은 pipeline 내부 버퍼 (MODE 0 이면 frames 그대로)
+    return pipeline.process(frames, use_hpf=MODE in (1, 3), use_rnn=MODE in (2, 3))
 
-    if MODE == 0:
-        return frames
 
-    x = frames.astype(np.float32)
-
-    if MODE in (1, 3):
-        x = hpf.process(x)
-
-    if MODE in (2, 3):
-        in_buf = x.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
-        out = np.empty_like(x, dtype=np.float32)
-        out_buf = out.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
-        rn.rnnoise_process_frame(_rn_state, out_buf, in_buf)
-        x = out
-
-    y = np.clip(x, -32768.0, 32767.0).astype(np.int16)
-    return y
+def recv_blocks(reader):
+    # 소켓에서 CHUNK 단위 int16 블록을 하나씩 꺼냄 (연결이 끊기면 끝)
+    for frame in reader:
+        # reader 버퍼 view 는 다음 recv_into 에서 덮어써지므로 큐에 넣기 전에 복사
+        yield frame.pcm.copy()
+    print("[Pi_B] recv end")
 
 
 def main():
@@ -152,43 +102,53 @@ def main():
 
     conn, addr = sock.accept()
     print(f"[Pi_B] Pi_A connected: {addr}")
-
-    buffer = b""
-    delay_buffer = deque()
-
-    with sd.OutputStream(
-        samplerate=SAMPLE_RATE,
-        channels=CHANNELS,
-        dtype=DTYPE,
-        blocksize=CHUNK,
-    ) as stream:
+    reader = StreamReader(conn, BYTES_PER_CHUNK, tag="Pi_B")
+    # 송신부와 샘플레이트 / 블록을 맞춤. RNNoise 는 SAMPLE_RATE + CHUNK 단위로만 처리하므로
+    # 샘플레이트가 안 맞으면 거절 (ValueError), 블록을 못 맞추는 송신부면 CHUNK 씩 다시 잘라서 받음
+    reader.accept(
+        sample_rates=(SAMPLE_RATE,), channels=CHANNELS, block=CHUNK, exact_block=True, resample=False,
+        codecs=WIRE_CODECS,
+    )
+
+    # 스피커 출력: 콜백 재생 + 적응형 지터 버퍼 (예전 재생 큐 prefill 0.5 s 대신)
+    jitter = AdaptiveJitter(
+        SAMPLE_RATE, CHUNK, min_ms=JITTER_MIN_MS, max_ms=JITTER_MAX_MS, underrun_target=UNDERRUN_TARGET, tag="Pi_B"
+    )
+    # 목표보다 많이 쌓이면 무음 블록을 버리거나 WSOLA 로 줄여서 지연을 되돌림
+    catchup = CatchUp(SAMPLE_RATE, CHUNK, method=CATCHUP_METHOD, tag="Pi_B") if CATCHUP_METHOD else None
+    drift = DriftEstimator(SAMPLE_RATE, CHUNK, tag="Pi_B") if DRIFT_COMP else None
+    # 늦거나 빠진 블록 자리는 직전 파형으로 이어서 채움 (conceal="plc")
+    player = CallbackPlayer(
+        SAMPLE_RATE, channels=CHANNELS, blocksize=CHUNK, jitter=jitter, catchup=catchup, drift=drift, conceal="plc",
+        tag="Pi_B"
+    )
+    with player:
+        # recv → apply_filter → player.write 를 각각 다른 스레드에서
+        # 지연은 player 의 지터 버퍼가 맡고, 제때 블록이 없으면 player 가 채우므로 play 단계는 무음을 안 넣음
+        rx = StagedReceiver(
+            recv_blocks(reader),
+            apply_filter,
+            player.write,
+            chunk=CHUNK,
+            sample_rate=SAMPLE_RATE,
+            depth=QUEUE_DEPTH,
+            pad_silence=False,
+            tag="Pi_B",
+        )
+        rx.start()
         try:
-            while True:
-                data = conn.recv(4096)
-                if not data:
-                    print("[Pi_B] recv end")
-                    break
-
-                buffer += data
-
-                while len(buffer) >= BYTES_PER_CHUNK:
-                    frame_bytes = buffer[:BYTES_PER_CHUNK]
-                    buffer = buffer[BYTES_PER_CHUNK:]
-
-                    frames = np.frombuffer(frame_bytes, dtype=np.int16)
-                    filtered = apply_filter(frames)
-
-                    delay_buffer.append(filtered)
-
-                    if len(delay_buffer) < DELAY_FRAMES:
-                        continue
-
-                    delayed_frames = delay_buffer.popleft()
-                    stream.write(delayed_frames)
+            while rx.wait(STATS_INTERVAL):
+                print(rx.format_stats(), flush=True)
+            if rx.error is not None:
+                print(f"[Pi_B] 파이프라인 중단: {rx.error}")
 
         except KeyboardInterrupt:
             print("\n[Pi_B] interrupted")
         finally:
+            rx.stop()
+            print(rx.format_stats())
+            print(reader.format_stats())
+            print(player.format_stats())
             conn.close()
             sock.close()
             print("[Pi_B] socket closed")
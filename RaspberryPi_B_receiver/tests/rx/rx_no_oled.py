@@ -1,11 +1,16 @@
 import socket
-import struct
-import sounddevice as sd
 import numpy as np
 import time
 import subprocess
 import sys
 import threading
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from common.codec import FORMAT_PCM16, FORMAT_ZLIB
+from common.protocol import StreamReader
+from common.drift import DriftEstimator
+from common.playback import CallbackPlayer
 
 # 라이브러리 임포트 (OLED 관련 라이브러리가 없어도 돌아가도록 처리)
 try:
@@ -38,6 +43,18 @@ CHANNELS = 2         # 하드웨어 출력 (스테레오)
 CHUNK = 3840         # 480 * 8
 DTYPE = "int16"
 PAYLOAD_SIZE = CHUNK * 2
+# 송신부에 요청할 코덱 (앞쪽 우선, 송신부가 못 하면 다음 것). zlib = 무손실 (말소리면 3/4 정도),
+# Wi-Fi 가 붐비면 FORMAT_ULAW (1/2, 37 dB) / FORMAT_ADPCM (1/4, 30 dB) 를 앞에
+WIRE_CODECS = (FORMAT_ZLIB, FORMAT_PCM16)
+
+# 콜백 재생: 수신 루프는 링버퍼에 넣기만 하고, 오디오 콜백이 꺼내서 (모노 → 스테레오 복사) 재생
+# 제때 데이터가 없으면 None → 무음, "repeat" → 직전 블록 반복(점점 작게) 으로 채우고 underrun 으로 셈
+# "plc" → 피치 주기를 이어서 반복하다 서서히 줄이고, 데이터가 다시 오면 crossfade (클릭 없음)
+PLAYBACK_CONCEAL = "plc"
+PLAYBACK_PREFILL = CHUNK  # 블록 하나가 쌓이면 재생 시작
+# 송신 USB 마이크 / 수신 I2S 앰프 클럭 차이(ppm)를 버퍼 깊이로 추정해서 리샘플로 보정
+# (보정이 없으면 몇 시간 뒤 버퍼가 계속 늘어 지연이 커지거나, 계속 줄어 underrun)
+DRIFT_COMP = True
 
 # GPIO
 TOUCH_PIN = 17
@@ -195,37 +212,44 @@ def main():
     print(f"Connected: {addr}")
     conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
+    # v2 (seq/ts/메타 헤더) 와 예전 '!II' + PAYLOAD_SIZE 형식을 첫 4 바이트로 구분
+    reader = StreamReader(conn, PAYLOAD_SIZE, legacy_header='!II', tag="RX")
+    # 송신부와 샘플레이트 / 블록을 맞추고 재생 스트림을 그 값으로 잡음 (예전 송신부면 위 설정 그대로)
+    session = reader.accept(sample_rates=(SAMPLE_RATE,), channels=1, block=CHUNK, codecs=WIRE_CODECS)
+    if session is None:
+        print("Disconnected during handshake")
+        sock.close()
+        return
+
     try:
-        stream = sd.OutputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, dtype=DTYPE, blocksize=CHUNK)
-        stream.start()
-        print(f"Audio Stream Started ({SAMPLE_RATE}Hz, Stereo)")
+        player = CallbackPlayer(
+            session.sample_rate, channels=CHANNELS, blocksize=session.block,
+            prefill=PLAYBACK_PREFILL * session.block // CHUNK, conceal=PLAYBACK_CONCEAL,
+            drift=DriftEstimator(session.sample_rate, session.block, tag="RX") if DRIFT_COMP else None, tag="RX",
+        )
+        player.start()
+        print(f"Audio Stream Started ({session.sample_rate}Hz, Stereo)")
     except Exception as e:
         print(f"❌ Audio Error: {e}")
         return
 
-    data_buffer = b""
-    header_size = struct.calcsize('!II')
-    payload_size = PAYLOAD_SIZE
+    # 패킷은 미리 잡은 버퍼에 recv_into (bytes 이어붙이기/재슬라이스 없음)
+    silence = np.zeros(session.block, dtype=DTYPE)
 
     try:
         while True:
-            while len(data_buffer) < (header_size + payload_size):
-                packet = conn.recv(4096)
-                if not packet: raise ConnectionResetError
-                data_buffer += packet
-            
-            header = data_buffer[:header_size]
-            mode, rms = struct.unpack('!II', header)
-            audio_bytes = data_buffer[header_size : header_size + payload_size]
-            data_buffer = data_buffer[header_size + payload_size:]
+            frame = reader.read()
+            if frame is None: raise ConnectionResetError
+            mode, rms, audio = frame.mode or 0, frame.rms or 0, frame.pcm
 
             CURRENT_RMS = rms
             CURRENT_MODE = mode
 
+            # 링버퍼에 넣고 바로 리턴 (모노 -> 스테레오 복사는 오디오 콜백에서)
             if not MUTE_STATE:
-                audio_np = np.frombuffer(audio_bytes, dtype=DTYPE)
-                stereo_audio = np.column_stack((audio_np, audio_np))
-                stream.write(stereo_audio)
+                player.write(audio)
+            else:
+                player.write(silence)  # Mute 중에도 재생 타이밍 유지
 
     except Exception as e:
         print(f"Disconnected: {e}")
@@ -242,7 +266,9 @@ def main():
             try: oled.fill(0); oled.show()
             except: pass
         
-        try: stream.stop(); stream.close()
+        print(reader.format_stats())
+        print(player.format_stats())
+        try: player.close()
         except: pass
         sock.close()
 
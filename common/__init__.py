@@ -0,0 +1 @@
+# 송신부(Pi A / PC)와 수신부(Pi B / PC)가 같이 쓰는 DSP / 네트워크 공용 모듈
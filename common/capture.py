@@ -0,0 +1,141 @@
+"""
+콜백 방식 캡처 (sounddevice InputStream callback + BlockRing)
+
+예전 송신부는 stream.read(CHUNK) → (필터) → sock.sendall 을 한 루프에서 돌려서
+TCP 가 잠깐만 막혀도 그동안 read 를 못 해서 ALSA 입력 버퍼가 넘쳤다 (input overflow).
+
+CallbackCapture 는
+  - 오디오 콜백 : 블록이 찰 때마다 모노 int16 블록과 타임스탬프(time.monotonic)를 링버퍼에 넣음
+  - 송신 루프   : read() 로 자기 속도에 맞춰 꺼내감
+송신이 밀려도 콜백은 계속 돌고, 링버퍼가 꽉 찼을 때만 가장 새 블록을 버리고 drops 로 센다.
+콜백 안에서는 미리 잡아둔 버퍼에 복사만 한다 (새 배열 할당 없음).
+"""
+
+import time
+
+import numpy as np
+
+from common.ring import BlockRing
+
+# 링버퍼가 비었을 때 다시 확인하는 간격 (초)
+_POLL_SEC = 0.001
+
+
+class CallbackCapture:
+    """
+        capture = CallbackCapture(SAMPLE_RATE, channels=CHANNELS, blocksize=CHUNK, tag="Pi_A")
+        with capture:
+            while True:
+                frames, ts = capture.read()     # frames: 모노 int16 (CHUNK,) 내부 버퍼 view
+
+    channels > 1 이면 첫 번째 채널만 쓴다.
+    read(timeout) 은 timeout 안에 블록이 없으면 None 을 돌려준다 (timeout=None 이면 계속 기다림).
+
+    통계:
+        blocks          : 콜백이 받은 블록 수
+        input_overflows : PortAudio 가 input overflow 로 알려준 횟수
+        ring.drops      : 송신 쪽이 밀려서 링버퍼가 꽉 차 버린 블록 수
+        max_age_ms      : read() 로 꺼낼 때까지 블록이 링버퍼에서 기다린 최대 시간
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: int = 1,
+        blocksize: int = 480,
+        buffer_sec: float = 2.0,
+        device=None,
+        warn: bool = True,
+        tag: str = "Capture",
+    ):
+        if blocksize < 1:
+            raise ValueError(f"blocksize must be >= 1 (got {blocksize})")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.device = device
+        self.warn = warn
+        self.tag = tag
+
+        n_blocks = max(2, int(np.ceil(buffer_sec * sample_rate / blocksize)))
+        self.ring = BlockRing(n_blocks, blocksize)
+        self._out = np.zeros(blocksize, dtype=np.int16)
+
+        self.blocks = 0
+        self.input_overflows = 0
+        self.max_age_ms = 0.0
+        self._reported = 0
+
+        self._stream = None
+
+    # ----- 오디오 콜백 -----
+    def _callback(self, indata, frames, time_info, status):
+        ts = time.monotonic()
+        if status.input_overflow:
+            self.input_overflows += 1
+        self.blocks += 1
+        self.ring.push(indata[:, 0], ts)
+
+    # ----- 송신 쪽 -----
+    @property
+    def lost(self) -> int:
+        # 장치에서 넘친 횟수 + 링버퍼에서 버린 블록 수
+        return self.input_overflows + self.ring.drops
+
+    def read(self, timeout: float = None):
+        ring = self.ring
+        if ring.available == 0:
+            t0 = time.monotonic()
+            while ring.available == 0:
+                if timeout is not None and time.monotonic() - t0 >= timeout:
+                    return None
+                time.sleep(_POLL_SEC)
+
+        ts = ring.pop_into(self._out)
+        age_ms = (time.monotonic() - ts) * 1000.0
+        if age_ms > self.max_age_ms:
+            self.max_age_ms = age_ms
+
+        if self.warn and self.lost != self._reported:
+            self._reported = self.lost
+            print(
+                f"[{self.tag}] Warning: input overflow "
+                f"(device {self.input_overflows}, ring drops {ring.drops})",
+                flush=True,
+            )
+        return self._out, ts
+
+    # ----- 제어 -----
+    def start(self):
+        # sounddevice(PortAudio)는 실제로 녹음할 때만 필요 → 여기서 import
+        import sounddevice as sd
+
+        self._stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            channels=self.channels,
+            dtype="int16",
+            blocksize=self.blocksize,
+            device=self.device,
+            callback=self._callback,
+        )
+        self._stream.start()
+        return self
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def format_stats(self) -> str:
+        return (
+            f"[{self.tag}] capture: {self.blocks} blocks, buffered {self.ring.available}, "
+            f"device overflows {self.input_overflows}, ring drops {self.ring.drops}, "
+            f"max age {self.max_age_ms:.1f} ms"
+        )
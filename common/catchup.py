@@ -0,0 +1,150 @@
+"""
+지연 따라잡기 (catch-up): 재생 버퍼가 목표보다 많이 쌓이면 다시 목표 지연으로 줄인다
+
+Wi-Fi 가 잠깐 멈췄다 풀리면 TCP 는 밀린 블록을 한꺼번에 보내고, 수신부는 그걸 전부 늦게 재생해서
+그 뒤로 세션 내내 지연이 늘어난 채로 남는다 (pi_receiver_main.py 는 while len(data_buffer) < ... 로 받기만 함).
+
+CatchUp.apply() 는 블록을 재생 버퍼에 넣기 전에 (지금 쌓인 양 - 목표) 를 보고
+  - 무음 블록이면 (RMS < silence_rms, 또는 송신부가 보낸 말소리 확률 < prob_threshold) 통째로 버림
+    (확률이 None 이거나 음수 (protocol.NO_PROB, 송신부가 RNNoise 를 안 돌림) 면 RMS 로만)
+  - method="wsola" : 말하는 중이면 블록 안에서 가장 비슷한 파형 위치(lag)를 찾아 겹쳐 이어 붙여서
+                     lag 샘플만큼 짧게 만듦 (한 블록에 한 번, 피치가 안 깨지는 가벼운 WSOLA)
+  - method="silence": 말이 patience_sec 동안 안 끊기면 그때부터는 블록 _FORCE_SPACING 개마다 하나씩 그냥 버림
+줄인 양은 reclaimed_ms 로 센다. 버린 뒤에도 목표 이상이 남도록 (쌓인 양 - 목표) 가 블록보다 클 때만 움직인다.
+"""
+
+import numpy as np
+
+METHODS = ("silence", "wsola")
+# method="silence" 에서 무음을 못 찾았을 때 버리는 블록 사이 간격 (블록 수)
+_FORCE_SPACING = 2
+
+
+class CatchUp:
+    """
+        catchup = CatchUp(SAMPLE_RATE, CHUNK, method="wsola")
+        player = CallbackPlayer(SAMPLE_RATE, blocksize=CHUNK, jitter=jitter, catchup=catchup)
+        player.write(frames, prob=frame.prob)     # 목표보다 많이 쌓여 있으면 버리거나 줄여서 넣음
+        print(catchup.format_stats())             # reclaimed ... ms
+
+    apply(frames, level, target, prob) 은 넣을 블록을 돌려준다: frames 그대로, 짧게 만든 내부 버퍼 view,
+    또는 None (버림). 내부 버퍼는 다음 apply() 에서 다시 쓰므로 바로 링버퍼에 복사할 것.
+
+    통계:
+        reclaimed     : 줄인 샘플 수 (reclaimed_ms)
+        silent_drops  : 무음이라 버린 블록 수
+        forced_drops  : 말이 안 끊겨서 그냥 버린 블록 수 (method="silence")
+        compressed    : WSOLA 로 줄인 블록 수
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        block: int,
+        method: str = "silence",
+        silence_rms: float = 300.0,
+        prob_threshold: float = 0.2,
+        patience_sec: float = 0.5,
+        overlap_ms: float = 2.5,
+        min_lag_ms: float = 2.5,
+        tag: str = "CatchUp",
+    ):
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {METHODS} (got {method!r})")
+        self.sample_rate = sample_rate
+        self.block = block
+        self.method = method
+        self.silence_rms = silence_rms
+        self.prob_threshold = prob_threshold
+        self.patience = int(patience_sec * sample_rate)
+        self.overlap = max(1, int(overlap_ms * sample_rate / 1000.0))
+        self.min_lag = max(1, int(min_lag_ms * sample_rate / 1000.0))
+        self.tag = tag
+
+        # RMS / 상관 계산용 float32 작업 버퍼, 줄인 블록 출력 버퍼 (블록이 더 크면 그때만 다시 잡음)
+        self._x = np.zeros(block, dtype=np.float32)
+        self._out = np.zeros(block, dtype=np.int16)
+        w = self.overlap
+        self._fade_in = (np.arange(w, dtype=np.float32) + 0.5) / w
+        self._fade_out = 1.0 - self._fade_in
+        self._mix = np.zeros(w, dtype=np.float32)
+        self._ones = np.ones(w, dtype=np.float32)
+
+        self._waited = 0  # 목표보다 많은 채로 말이 안 끊긴 샘플 수
+        self.reclaimed = 0
+        self.silent_drops = 0
+        self.forced_drops = 0
+        self.compressed = 0
+
+    @property
+    def reclaimed_ms(self) -> float:
+        return 1000.0 * self.reclaimed / self.sample_rate
+
+    def _load(self, frames: np.ndarray) -> np.ndarray:
+        n = frames.shape[0]
+        if n > self._x.shape[0]:
+            self._x = np.zeros(n, dtype=np.float32)
+            self._out = np.zeros(n, dtype=np.int16)
+        x = self._x[:n]
+        np.copyto(x, frames, casting="unsafe")
+        return x
+
+    def is_silent(self, x: np.ndarray, prob: float = None) -> bool:
+        if prob is not None and 0.0 <= prob < self.prob_threshold:
+            return True
+        rms = float(np.sqrt(np.dot(x, x) / x.shape[0])) if x.shape[0] else 0.0
+        return rms < self.silence_rms
+
+    def apply(self, frames: np.ndarray, level: int, target: int, prob: float = None):
+        n = frames.shape[0]
+        excess = level - target
+        if excess <= n:
+            self._waited = 0
+            return frames
+
+        x = self._load(frames)
+        if self.is_silent(x, prob):
+            self._waited = 0
+            self.silent_drops += 1
+            self.reclaimed += n
+            return None
+
+        if self.method == "wsola":
+            out = self._compress(x, excess - n)
+            return frames if out is None else out
+
+        self._waited += n
+        if self._waited < self.patience:
+            return frames
+        # 말이 한참 안 끊김: 무음을 기다리지 않고 버림 (다음은 _FORCE_SPACING 블록 뒤)
+        self._waited -= _FORCE_SPACING * n
+        self.forced_drops += 1
+        self.reclaimed += n
+        return None
+
+    def _compress(self, x: np.ndarray, room: int):
+        # x[:w] 와 가장 비슷한 x[lag:lag + w] 를 찾아 겹쳐 이어 붙임 → 길이 n - lag
+        n, w = x.shape[0], self.overlap
+        lo, hi = self.min_lag, min(n - w, room)
+        if hi < lo:
+            return None
+
+        seg = x[lo:hi + w]
+        corr = np.correlate(seg, x[:w], "valid")
+        energy = np.convolve(seg * seg, self._ones, "valid")
+        lag = lo + int(np.argmax(corr / np.sqrt(energy + 1.0)))
+
+        out = self._out[:n - lag]
+        np.multiply(x[:w], self._fade_out, out=self._mix)
+        self._mix += x[lag:lag + w] * self._fade_in
+        np.copyto(out[:w], self._mix, casting="unsafe")
+        out[w:] = x[lag + w:]
+        self.compressed += 1
+        self.reclaimed += lag
+        return out
+
+    def format_stats(self) -> str:
+        return (
+            f"[{self.tag}] catch-up ({self.method}): reclaimed {self.reclaimed_ms:.0f} ms "
+            f"(silent drops {self.silent_drops}, forced drops {self.forced_drops}, wsola {self.compressed})"
+        )
@@ -0,0 +1,446 @@
+"""
+오디오 코덱 (v2 프레임 헤더의 fmt 필드): Wi-Fi 로 보내는 양 줄이기
+
+48 kHz mono int16 그대로면 768 kbit/s. 2.4 GHz 가 붐비면 여기서부터 끊기기 시작한다.
+프레임 하나씩 따로 풀 수 있게 만들었다 (UDP 에서 앞 프레임이 빠지거나 순서가 바뀌어도 됨).
+
+  fmt  이름    크기          방식
+  0    pcm16   2 B/샘플      int16 그대로 (기본)
+  1    ulaw    1 B/샘플      G.711 μ-law. 인코딩 65536 항목 / 디코딩 256 항목 표를 np.take 한 번 (vectorized)
+  2    adpcm   0.5 B/샘플    IMA-ADPCM 4 bit + 프레임 앞 상태 4 바이트 (예측값 int16, step index, 예약)
+                             인코딩은 샘플마다 앞 결과에 의존해서 파이썬 루프 (표 조회로 줄임),
+                             디코딩은 step index 만 accumulate 로 따라가고 나머지는 numpy
+  3    zlib    무손실        1차 차분 → 하위 / 상위 바이트 평면으로 나눔 → zlib level 1
+  4    cn      7 B / 0 B     DTX 무음 구간의 comfort noise 설명 (대역별 잡음 세기, 안 바뀌었으면 빈 payload)
+                             오디오 코덱이 아니라서 핸드셰이크로 고르지 않음 (ALL_FORMATS 에 없음, DTX 를 맞춘 세션에서만)
+
+    enc = make_codec(FORMAT_ULAW, max_samples=CHUNK)
+    payload = enc.encode(pcm)                 # uint8 view (다음 encode() 전까지만 유효)
+    dec = make_codec(FORMAT_ULAW, max_samples=CHUNK)
+    pcm = dec.decode(payload, n)              # int16 view (다음 decode() 전까지만 유효)
+
+protocol.StreamWriter / StreamReader 는 핸드셰이크에서 고른 fmt 로, udp.DatagramWriter 는 fmt= 로 쓴다.
+버퍼는 max_samples 기준으로 미리 잡고, 더 큰 프레임이 오면 그때만 다시 잡는다 (zlib 는 압축 결과 bytes 만 새로 생김).
+"""
+
+import struct
+import zlib
+from itertools import accumulate
+
+import numpy as np
+
+FORMAT_PCM16 = 0
+FORMAT_ULAW = 1
+FORMAT_ADPCM = 2
+FORMAT_ZLIB = 3
+FORMAT_CN = 4
+FORMAT_NAMES = {
+    FORMAT_PCM16: "pcm16", FORMAT_ULAW: "ulaw", FORMAT_ADPCM: "adpcm", FORMAT_ZLIB: "zlib", FORMAT_CN: "cn",
+}
+# 송신 쪽이 HELLO 에 넣는 기본값 (오디오 코덱 전부 인코딩 가능, 수신 쪽이 자기 순서대로 고름)
+ALL_FORMATS = (FORMAT_PCM16, FORMAT_ULAW, FORMAT_ADPCM, FORMAT_ZLIB)
+
+# ----- μ-law (G.711) -----
+# ITU 참조 구현 그대로: 14 bit 로 줄이고 (>> 2) 크기를 잘라서 bias 를 더한 뒤 세그먼트 / 가수
+_ULAW_BIAS = 0x21
+_ULAW_CLIP = 8159
+
+
+def _ulaw_tables():
+    # 인코딩: int16 을 uint16 으로 본 값 → 코드, 디코딩: 코드 → int16
+    x = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2
+    mask = np.where(x < 0, 0x7F, 0xFF)
+    mag = np.minimum(np.abs(x), _ULAW_CLIP) + _ULAW_BIAS
+    seg = np.floor(np.log2(mag >> 5)).astype(np.int32)
+    mant = (mag >> (seg + 1)) & 0x0F
+    enc = (np.where(seg >= 8, 0x7F, (seg << 4) | mant) ^ mask).astype(np.uint8)  # 잘린 크기는 세그먼트 8 → 최대 코드
+
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    t = (((u & 0x0F) << 3) + 0x84) << ((u & 0x70) >> 4)
+    dec = np.where(u & 0x80, 0x84 - t, t - 0x84).astype(np.int16)
+    return enc, dec
+
+
+_ULAW_ENC, _ULAW_DEC = _ulaw_tables()
+
+# ----- IMA-ADPCM -----
+_STEP = (
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230, 253, 279, 307,
+    337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963, 1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066,
+    2272, 2499, 2749, 3024, 3327, 3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442, 11487,
+    12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794, 32767,
+)
+_INDEX = (-1, -1, -1, -1, 2, 4, 6, 8)
+_ADPCM_HEADER = struct.Struct("<hBB")
+# (index, 4 bit 코드) → 복원 차분 (부호 포함) / 다음 index. 표준 디코더의 시프트 계산 그대로
+_ADPCM_DIFF = []
+_ADPCM_NEXT = []
+for _i, _s in enumerate(_STEP):
+    for _c in range(16):
+        _d = _s >> 3
+        if _c & 4:
+            _d += _s
+        if _c & 2:
+            _d += _s >> 1
+        if _c & 1:
+            _d += _s >> 2
+        _ADPCM_DIFF.append(-_d if _c & 8 else _d)
+        _ADPCM_NEXT.append(min(88, max(0, _i + _INDEX[_c & 7])))
+_ADPCM_DIFF_NP = np.array(_ADPCM_DIFF, dtype=np.int64)
+_ADPCM_DIFF = tuple(_ADPCM_DIFF)
+_ADPCM_NEXT = tuple(_ADPCM_NEXT)
+
+
+class Codec:
+    """
+    fmt / name   : 헤더에 들어가는 값 / 이름
+    encode(pcm)  : int16 (n,) → uint8 payload view
+    decode(p, n) : payload → int16 (n,) view
+    max_bytes(n) : n 샘플 payload 의 최대 바이트 수 (수신 버퍼 크기용)
+    """
+
+    fmt = FORMAT_PCM16
+
+    def __init__(self, max_samples: int):
+        self._alloc(max_samples)
+
+    @property
+    def name(self) -> str:
+        return FORMAT_NAMES[self.fmt]
+
+    def _alloc(self, n: int):
+        self._max = n
+        self._pcm = np.zeros(n, dtype=np.int16)
+
+    def _fit(self, n: int):
+        if n > self._max:
+            self._alloc(n)
+
+    def max_bytes(self, n: int) -> int:
+        return 2 * n
+
+    def encode(self, pcm: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(pcm, dtype=np.int16).view(np.uint8)
+
+    def decode(self, payload: np.ndarray, n: int) -> np.ndarray:
+        if payload.shape[0] != 2 * n:
+            raise ValueError(f"{self.name}: {payload.shape[0]} B payload for {n} samples")
+        self._fit(n)
+        out = self._pcm[:n]
+        out.view(np.uint8)[:] = payload
+        return out
+
+
+class UlawCodec(Codec):
+    fmt = FORMAT_ULAW
+
+    def _alloc(self, n: int):
+        super()._alloc(n)
+        self._u8 = np.zeros(n, dtype=np.uint8)
+
+    def max_bytes(self, n: int) -> int:
+        return n
+
+    def encode(self, pcm: np.ndarray) -> np.ndarray:
+        n = pcm.shape[0]
+        self._fit(n)
+        out = self._u8[:n]
+        np.take(_ULAW_ENC, np.ascontiguousarray(pcm, dtype=np.int16).view(np.uint16), out=out)
+        return out
+
+    def decode(self, payload: np.ndarray, n: int) -> np.ndarray:
+        if payload.shape[0] != n:
+            raise ValueError(f"ulaw: {payload.shape[0]} B payload for {n} samples")
+        self._fit(n)
+        out = self._pcm[:n]
+        np.take(_ULAW_DEC, payload, out=out)
+        return out
+
+
+class AdpcmCodec(Codec):
+    """
+    인코더 상태 (예측값, step index) 는 프레임을 넘어 이어지고, 프레임 앞에 그 값을 적어서
+    디코더는 프레임마다 거기서 시작한다. 코드는 한 바이트에 두 개 (앞 샘플이 하위 4 bit).
+    코드 크기는 min(7, 4 * |차이| // step) (표준 인코더의 비교 세 번과 같은 값, 표준 디코더로 풀림).
+    """
+
+    fmt = FORMAT_ADPCM
+
+    def __init__(self, max_samples: int):
+        super().__init__(max_samples)
+        self._pred = 0
+        self._index = 0
+
+    def _alloc(self, n: int):
+        super()._alloc(n)
+        self._codes = np.zeros(n + 1, dtype=np.uint8)
+        self._bytes = np.zeros(_ADPCM_HEADER.size + (n + 1) // 2, dtype=np.uint8)
+        self._idx = np.zeros(n, dtype=np.int64)
+        self._diff = np.zeros(n, dtype=np.int64)
+
+    def max_bytes(self, n: int) -> int:
+        return _ADPCM_HEADER.size + (n + 1) // 2
+
+    def encode(self, pcm: np.ndarray) -> np.ndarray:
+        n = pcm.shape[0]
+        self._fit(n)
+        pred, index = self._pred, self._index
+        out = self._bytes[:self.max_bytes(n)]
+        _ADPCM_HEADER.pack_into(out, 0, pred, index, 0)
+
+        codes = self._codes
+        step_t, diff_t, next_t = _STEP, _ADPCM_DIFF, _ADPCM_NEXT
+        for i, s in enumerate(pcm.tolist()):
+            d = s - pred
+            step = step_t[index]
+            if d < 0:
+                c = (-d << 2) // step
+                c = 15 if c > 7 else c | 8
+            else:
+                c = (d << 2) // step
+                if c > 7:
+                    c = 7
+            k = (index << 4) | c
+            pred += diff_t[k]
+            if pred > 32767:
+                pred = 32767
+            elif pred < -32768:
+                pred = -32768
+            index = next_t[k]
+            codes[i] = c
+        self._pred, self._index = pred, index
+
+        # 코드 두 개씩 한 바이트로 (홀수면 마지막 상위 4 bit 는 0)
+        codes[n] = 0
+        m = (n + 1) // 2
+        body = out[_ADPCM_HEADER.size:]
+        np.left_shift(codes[1:2 * m:2], 4, out=body)
+        body |= codes[0:2 * m:2]
+        return out
+
+    def decode(self, payload: np.ndarray, n: int) -> np.ndarray:
+        if payload.shape[0] != self.max_bytes(n):
+            raise ValueError(f"adpcm: {payload.shape[0]} B payload for {n} samples")
+        self._fit(n)
+        out = self._pcm[:n]
+        if n == 0:
+            return out
+        pred, index, _ = _ADPCM_HEADER.unpack_from(payload, 0)
+        body = payload[_ADPCM_HEADER.size:]
+        codes = self._codes[:n]
+        np.bitwise_and(body[:(n + 1) // 2], 0x0F, out=codes[0::2])
+        np.right_shift(body[:n // 2], 4, out=codes[1::2])
+
+        # 샘플마다 쓸 index: index_i 로 코드 i 를 풀고 다음 index 로 (이 부분만 순차)
+        idx = self._idx[:n]
+        nxt = _ADPCM_NEXT
+        idx[:] = list(accumulate(codes[:n - 1].tolist(), lambda i, c: nxt[(i << 4) | c], initial=index))
+        idx <<= 4
+        idx |= codes
+        diff = self._diff[:n]
+        np.take(_ADPCM_DIFF_NP, idx, out=diff)
+        np.cumsum(diff, out=diff)
+        diff += pred
+        if diff.max() > 32767 or diff.min() < -32768:
+            # 예측값이 int16 끝에 걸림: 표준 디코더처럼 샘플마다 잘라가며 다시
+            p = pred
+            for i, k in enumerate(idx.tolist()):
+                p = min(32767, max(-32768, p + _ADPCM_DIFF[k]))
+                diff[i] = p
+        np.copyto(out, diff, casting="unsafe")
+        return out
+
+
+class ZlibCodec(Codec):
+    """
+    무손실. 이웃 샘플 차이는 작아서 상위 바이트 평면이 거의 0 / 0xFF 라 잘 줄어든다 (말소리 / 조용한 방에서 특히).
+    차분은 int16 로 감아서 (wrap) 계산해도 되돌릴 때 같은 방식으로 감겨서 정확히 복원된다.
+    """
+
+    fmt = FORMAT_ZLIB
+
+    def __init__(self, max_samples: int, level: int = 1):
+        super().__init__(max_samples)
+        self.level = level
+
+    def _alloc(self, n: int):
+        super()._alloc(n)
+        self._delta = np.zeros(n, dtype=np.int16)
+        self._planes = np.zeros(2 * n, dtype=np.uint8)
+
+    def max_bytes(self, n: int) -> int:
+        # zlib 최악의 경우 (압축이 안 될 때) 조금 늘어남
+        return max_payload_bytes(n)
+
+    def encode(self, pcm: np.ndarray) -> np.ndarray:
+        n = pcm.shape[0]
+        self._fit(n)
+        if n == 0:
+            return self._planes[:0]
+        d = self._delta[:n]
+        d[0] = pcm[0]
+        np.subtract(pcm[1:], pcm[:-1], out=d[1:])
+        planes = self._planes[:2 * n].reshape(2, n)
+        np.copyto(planes, d.view(np.uint8).reshape(n, 2).T)
+        return np.frombuffer(zlib.compress(planes, self.level), dtype=np.uint8)
+
+    def decode(self, payload: np.ndarray, n: int) -> np.ndarray:
+        self._fit(n)
+        if n == 0:
+            if payload.shape[0]:
+                raise ValueError(f"zlib: {payload.shape[0]} B payload for 0 samples")
+            return self._pcm[:0]
+        # 네트워크에서 온 payload 라 풀리는 양을 헤더의 샘플 수로 제한 (작은 프레임이 수백 MB 로 풀리는 것 방지)
+        z = zlib.decompressobj()
+        try:
+            raw = z.decompress(payload, 2 * n + 1)
+        except zlib.error as e:
+            raise ValueError(f"zlib: {e}") from None
+        if len(raw) != 2 * n or z.unconsumed_tail or not z.eof:
+            raise ValueError(f"zlib: payload does not inflate to {2 * n} B for {n} samples")
+        planes = np.frombuffer(raw, dtype=np.uint8).reshape(2, n)
+        d = self._delta[:n]
+        np.copyto(d.view(np.uint8).reshape(n, 2).T, planes)
+        out = self._pcm[:n]
+        np.cumsum(d, out=out)
+        return out
+
+
+# ----- comfort noise -----
+# 대역 경계 (나이퀴스트 대비). 샘플레이트를 몰라도 되게 비율로: 48 kHz 면 375 / 750 / 1.5k / 3k / 6k / 12k Hz
+_CN_EDGES = (0.0, 1 / 64, 1 / 32, 1 / 16, 1 / 8, 1 / 4, 1 / 2, 1.0)
+_CN_BANDS = len(_CN_EDGES) - 1
+# 대역별 잡음 표 길이 (서로 다른 소수 → 합친 잡음은 사실상 반복되지 않음, 48 kHz 에서 표 하나 1.4 초)
+_CN_TABLE_LEN = (65521, 65519, 65497, 65479, 65449, 65447, 65437)
+_cn_tables = None
+
+
+def _comfort_tables():
+    # 대역마다 그 대역에만 평탄한 스펙트럼을 가진 주기 잡음 (분산 1, float32). 처음 쓸 때 한 번만 만듦
+    global _cn_tables
+    if _cn_tables is None:
+        rng = np.random.default_rng(0x434E)
+        tables = []
+        for b, m in enumerate(_CN_TABLE_LEN):
+            frac = np.arange(m // 2 + 1) / (m / 2)
+            inside = (frac >= _CN_EDGES[b]) & (frac < _CN_EDGES[b + 1]) & (frac > 0)
+            spec = (rng.standard_normal(frac.shape[0]) + 1j * rng.standard_normal(frac.shape[0])) * inside
+            x = np.fft.irfft(spec, m)
+            tables.append((x / x.std()).astype(np.float32))
+        _cn_tables = tables
+    return _cn_tables
+
+
+class ComfortNoise(Codec):
+    """
+    DTX 무음 구간용 (RFC 3389 comfort noise 와 같은 생각): 오디오 대신 배경 잡음의 대역별 세기만 보낸다.
+      encode : Hann 창 rfft 로 대역별 평균 파워 → 0.5 dB 단위 코드 (uint8) 7 개.
+               직전에 보낸 설명과 모든 대역이 update_db 안쪽이고 refresh 번째가 아니면 빈 payload (keep-alive, 앞 설명 그대로)
+      decode : 대역별 주기 잡음 표 (_comfort_tables) 를 이어서 읽으며 대역 세기만큼 곱해 더함 (FFT / 난수 없음).
+               표를 읽는 위치가 블록을 넘어 이어져서 블록 경계에서 튀지 않는다.
+    코드 0 은 소리 없음. 설명을 하나도 못 받았으면 (UDP 에서 빠짐) 무음.
+    """
+
+    fmt = FORMAT_CN
+
+    def __init__(self, max_samples: int, update_db: float = 3.0, refresh: int = 8):
+        super().__init__(max_samples)
+        self.update_db = update_db
+        self.refresh = refresh
+        self._codes = np.zeros(_CN_BANDS, dtype=np.uint8)
+        self._sent = None  # 마지막으로 보낸 (인코더) / 받은 (디코더) 코드
+        self._since = 0
+        self._gain = np.zeros(_CN_BANDS)
+        self._pos = [0] * _CN_BANDS
+        self._bins = {}  # 길이 n → (창, 대역 번호, 대역별 bin 수)
+
+    def _alloc(self, n: int):
+        super()._alloc(n)
+        self._acc = np.zeros(n, dtype=np.float32)
+        self._tmp = np.zeros(n, dtype=np.float32)
+
+    def max_bytes(self, n: int) -> int:
+        return _CN_BANDS
+
+    def _layout(self, n: int):
+        lay = self._bins.get(n)
+        if lay is None:
+            frac = np.arange(n // 2 + 1) / max(1, n // 2)
+            band = np.minimum(np.searchsorted(_CN_EDGES, frac, side="right") - 1, _CN_BANDS - 1)
+            count = np.bincount(band[1:], minlength=_CN_BANDS)  # DC 는 안 셈
+            lay = self._bins[n] = (np.hanning(n), band, count)
+        return lay
+
+    def levels(self, pcm: np.ndarray) -> np.ndarray:
+        # 대역별 평균 파워 (샘플당 분산 밀도, LSB^2) 코드 = 2 * dB. 비어 있는 대역 (아주 짧은 블록) 은 전체 평균
+        n = pcm.shape[0]
+        win, band, count = self._layout(n)
+        spec = np.fft.rfft(pcm * win)
+        power = spec.real ** 2 + spec.imag ** 2
+        power /= max(np.dot(win, win), 1e-9)
+        total = np.bincount(band[1:], weights=power[1:], minlength=_CN_BANDS)
+        mean = total.sum() / max(1, count.sum())
+        p = np.where(count > 0, total / np.maximum(count, 1), mean)
+        db = 10.0 * np.log10(np.maximum(p, 1e-9))
+        np.clip(np.rint(2.0 * db), 0, 255, out=db)
+        np.copyto(self._codes, db, casting="unsafe")
+        return self._codes
+
+    def encode(self, pcm: np.ndarray) -> np.ndarray:
+        codes = self.levels(pcm)
+        self._since += 1
+        if (self._sent is not None and self._since < self.refresh
+                and np.abs(codes.astype(np.int16) - self._sent).max() <= 2.0 * self.update_db):
+            return codes[:0]
+        self._sent = codes.astype(np.int16)
+        self._since = 0
+        return codes
+
+    def decode(self, payload: np.ndarray, n: int) -> np.ndarray:
+        if payload.shape[0] not in (0, _CN_BANDS):
+            raise ValueError(f"cn: {payload.shape[0]} B payload (expected 0 or {_CN_BANDS})")
+        if payload.shape[0]:
+            # 대역 분산 = 밀도 * 대역 폭 (나이퀴스트 대비) → 표 (분산 1) 에 곱할 값
+            self._sent = payload.astype(np.int16)
+            density = np.where(self._sent > 0, 10.0 ** (self._sent / 20.0), 0.0)
+            self._gain = np.sqrt(density * np.diff(_CN_EDGES))
+        self._fit(n)
+        out = self._pcm[:n]
+        if self._sent is None:
+            out[:] = 0
+            return out
+
+        acc, tmp = self._acc[:n], self._tmp
+        for b, table in enumerate(_comfort_tables()):
+            g = self._gain[b]
+            pos, m = self._pos[b], table.shape[0]
+            i = 0
+            while i < n:
+                k = min(n - i, m - pos)
+                if b == 0:
+                    np.multiply(table[pos:pos + k], g, out=acc[i:i + k])
+                else:
+                    part = tmp[:k]
+                    np.multiply(table[pos:pos + k], g, out=part)
+                    acc[i:i + k] += part
+                i += k
+                pos = (pos + k) % m
+            self._pos[b] = pos
+        np.clip(acc, -32768, 32767, out=acc)
+        np.rint(acc, out=out, casting="unsafe")
+        return out
+
+
+_CODECS = {c.fmt: c for c in (Codec, UlawCodec, AdpcmCodec, ZlibCodec, ComfortNoise)}
+
+
+def max_payload_bytes(n: int) -> int:
+    # 어떤 코덱이든 n 샘플 payload 가 넘지 않는 크기 (수신 버퍼용). zlib 가 압축이 안 될 때 조금 늘어나는 것까지
+    return 2 * n + 2 * n // 1000 + 64
+
+
+def make_codec(fmt: int, max_samples: int) -> Codec:
+    if fmt not in _CODECS:
+        raise ValueError(f"unknown codec fmt {fmt} (known: {FORMAT_NAMES})")
+    return _CODECS[fmt](max_samples)
@@ -0,0 +1,111 @@
+"""
+송신 → 수신 클럭 드리프트 추정 (재생 버퍼 깊이 기반)
+
+Pi A 의 USB 마이크와 Pi B 의 I2S 앰프는 따로 도는 48 kHz 발진기라 몇십 ppm 씩 다르다.
+예를 들어 100 ppm 이면 한 시간에 0.36 초: 재생 버퍼가 계속 늘어서 지연이 커지거나,
+반대로 계속 줄어서 결국 underrun 이 난다.
+
+송신 타임스탬프는 송신부 시스템 시계라서 마이크 클럭과 스피커 클럭의 차이를 직접 보지 못한다.
+두 클럭 차이가 그대로 쌓이는 재생 버퍼 깊이(level)를 보고 PI 제어로 ppm 을 추정한다.
+  - level = 링버퍼 샘플 수 + 마지막 콜백 블록 중 아직 재생 안 된 양 (콜백 시각으로 계산)
+    링버퍼 샘플 수만 보면 도착 / 콜백 순서가 바뀔 때만 블록 단위로 계단처럼 변해서 (40 ppm 이면 4 분에 한 번)
+    제어가 그 계단을 쫓아 흔들린다. 콜백 사이에도 줄어드는 양을 넣으면 드리프트가 매끈한 기울기로 보인다.
+  - level 을 smooth_sec 시정수로 평균 (블록 도착 타이밍 흔들림 제거)
+  - err = 평균 level - target (초), 한 블록 이상은 잘라서 씀
+    (지터 버퍼 목표 변경 / catch-up 같은 큰 변화는 그쪽에서 처리, 여기서는 느린 기울기만)
+  - ppm = Kp * err + I,  I += Ki * err * dt   (시정수 time_const_sec 의 임계 감쇠)
+    I 가 두 클럭 차이 추정치 (ppm), Kp * err + I 가 실제로 거는 보정 (correction_ppm)
+  - ratio = 1 + correction_ppm * 1e-6 : 입력 샘플 / 출력 샘플. LinearResampler 에 넘기면
+    송신이 빠르면(버퍼가 늘면) 조금 적게, 느리면 조금 많게 만들어서 깊이를 유지한다.
+"""
+
+import time
+
+
+class DriftEstimator:
+    """
+        drift = DriftEstimator(SAMPLE_RATE, CHUNK)
+        player = CallbackPlayer(SAMPLE_RATE, blocksize=CHUNK, jitter=jitter, drift=drift)
+        ...
+        print(drift.ppm)                  # 추정한 클럭 차이, + 면 송신 클럭이 빠름
+        print(drift.format_stats())
+
+    played(n) 은 오디오 콜백에서 (시각만 기록, 할당 없음),
+    update(level, target, n) 은 블록 n 샘플이 도착할 때마다 (네트워크 스레드) 부르고 ratio 를 돌려준다.
+    clock 은 테스트용 (가상 시계).
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        block: int,
+        time_const_sec: float = 60.0,
+        smooth_sec: float = 5.0,
+        max_ppm: float = 1000.0,
+        clock=time.monotonic,
+        tag: str = "Drift",
+    ):
+        self.sample_rate = sample_rate
+        self.block = block
+        self.smooth_sec = smooth_sec
+        self.max_ppm = max_ppm
+        self.clock = clock
+        self.tag = tag
+        # 임계 감쇠: ω = 1 / τ → Ki = ω², Kp = 2ω  (err 은 초, ppm 은 1e-6 단위)
+        w = 1.0 / time_const_sec
+        self.ki = w * w * 1e6
+        self.kp = 2.0 * w * 1e6
+
+        self.level_avg = None  # 평균 버퍼 깊이 (샘플)
+        self.target = 0
+        self.ppm = 0.0  # 클럭 차이 추정 (적분항)
+        self.correction_ppm = 0.0  # 지금 거는 보정 (비례 + 적분)
+        self.updates = 0
+
+        # 마지막 콜백 시각 / 그때 장치에 넘긴 샘플 수 (콜백만 씀)
+        self._cb_time = None
+        self._cb_frames = 0
+
+    @property
+    def ratio(self) -> float:
+        return 1.0 + self.correction_ppm * 1e-6
+
+    def _clamp(self, ppm: float) -> float:
+        return min(self.max_ppm, max(-self.max_ppm, ppm))
+
+    def reset(self):
+        self.level_avg = None
+        self.ppm = 0.0
+        self.correction_ppm = 0.0
+
+    def played(self, n: int):
+        # 오디오 콜백에서: 장치에 n 샘플을 넘긴 시각 (이 블록은 다음 콜백까지 고르게 재생됨)
+        self._cb_time = self.clock()
+        self._cb_frames = n
+
+    def update(self, level: int, target: int, n: int) -> float:
+        dt = n / self.sample_rate
+        if self._cb_time is not None:
+            left = self._cb_frames - (self.clock() - self._cb_time) * self.sample_rate
+            level += min(self._cb_frames, max(0.0, left))
+        if self.level_avg is None:
+            self.level_avg = float(level)
+        else:
+            a = min(1.0, dt / self.smooth_sec)
+            self.level_avg += a * (level - self.level_avg)
+        self.target = target
+        self.updates += 1
+
+        lim = self.block / self.sample_rate
+        err = min(lim, max(-lim, (self.level_avg - target) / self.sample_rate))
+        self.ppm = self._clamp(self.ppm + self.ki * err * dt)
+        self.correction_ppm = self._clamp(self.kp * err + self.ppm)
+        return self.ratio
+
+    def format_stats(self) -> str:
+        level_ms = 1000.0 * (self.level_avg or 0.0) / self.sample_rate
+        target_ms = 1000.0 * self.target / self.sample_rate
+        return (
+            f"[{self.tag}] clock drift: {self.ppm:+.1f} ppm (correction {self.correction_ppm:+.1f}), "
+            f"level {level_ms:.1f} ms / target {target_ms:.1f} ms"
+        )
@@ -0,0 +1,59 @@
+"""
+말소리 확률 기반 불연속 송신 (DTX: discontinuous transmission)
+
+말소리 사이 쉼, 듣기만 하는 시간처럼 조용한 구간에도 48 kHz PCM 을 그대로 보내고 있었다.
+RNNoise 가 프레임마다 주는 말소리 확률로 무음을 골라서, 그동안은 오디오 대신 comfort noise 설명
+(common.codec.ComfortNoise: 대역별 잡음 세기 7 B, 안 바뀌면 헤더만) 을 보낸다. 수신 쪽은 같은 세기 / 스펙트럼의
+잡음을 만들어 채워서 갑자기 뚝 끊긴 느낌 (완전한 무음) 이 나지 않는다.
+
+  - 블록 안 RNNoise 프레임 중 가장 큰 확률 (RNNoiseStream.peak_prob) 이 threshold 이상이면 말소리
+  - 그 뒤 hangover_ms 동안은 확률이 낮아도 말소리로 (단어 끝 / 음절 사이 짧은 쉼이 잘리지 않게)
+  - 나머지는 무음 → writer.send(..., silence=True)
+"""
+
+
+class DtxGate:
+    """
+        gate = DtxGate(SAMPLE_RATE, threshold=DTX_THRESHOLD, hangover_ms=DTX_HANGOVER_MS, tag="Pi_A")
+        speech = gate.update(denoiser.peak_prob, len(block))    # DSP 단계에서 블록마다
+        writer.send(block, prob=prob, silence=not speech)
+        print(gate.format_stats())                              # 오디오로 보낸 블록 비율
+
+    통계: blocks (판단한 블록 수), speech (오디오로 보낸 블록 수), tx_ratio = speech / blocks
+    """
+
+    def __init__(self, sample_rate: int, threshold: float = 0.5, hangover_ms: float = 240.0, tag: str = "DTX"):
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.hangover_ms = hangover_ms
+        self.tag = tag
+        self._hangover = int(sample_rate * hangover_ms / 1000.0)
+        self._left = 0  # 남은 hangover (샘플)
+
+        self.blocks = 0
+        self.speech = 0
+
+    @property
+    def tx_ratio(self) -> float:
+        return self.speech / self.blocks if self.blocks else 1.0
+
+    def reset(self):
+        self._left = 0
+
+    def update(self, prob: float, n: int) -> bool:
+        # n 샘플 블록의 말소리 확률 → True 면 오디오로 보냄, False 면 무음 (comfort noise)
+        self.blocks += 1
+        if prob >= self.threshold:
+            self._left = self._hangover
+        elif self._left > 0:
+            self._left -= n
+        else:
+            return False
+        self.speech += 1
+        return True
+
+    def format_stats(self) -> str:
+        return (
+            f"[{self.tag}] dtx: audio {self.speech}/{self.blocks} blocks ({100.0 * self.tx_ratio:.1f} % transmitted), "
+            f"threshold {self.threshold:.2f}, hangover {self.hangover_ms:.0f} ms"
+        )
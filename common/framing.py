@@ -0,0 +1,109 @@
+"""
+임의 블록 크기 ↔ RNNoise 480샘플 프레임 변환 (carry-over 버퍼)
+
+sounddevice 의 blocksize 는 처리량에 맞춰 자유롭게 정하고 싶은데,
+RNNoise 는 정확히 480 샘플 프레임만 받는다.
+FrameAdapter 는 입력 블록을 carry-over 버퍼에 이어붙여 완성된 480 프레임만 처리하고,
+결과를 다시 호출한 쪽의 블록 크기로 잘라서 돌려준다.
+
+출력은 입력보다 항상 latency 샘플 늦다 (시작할 때 그만큼 무음을 깔아둠).
+  - block_size 를 정하면      latency = frame_size - gcd(block_size, frame_size)
+    (예: 3840 → 0, 1024 → 448, 512 → 448)
+  - block_size=None (가변)이면 latency = frame_size - 1
+"""
+
+import math
+
+import numpy as np
+
+from common.rnnoise_driver import FRAME_SIZE
+
+
+def max_frames_for_block(block_size: int, frame_size: int = FRAME_SIZE) -> int:
+    # 블록 하나가 들어왔을 때 한 번에 처리될 수 있는 최대 프레임 수 (carry-over 포함)
+    return -(-block_size // frame_size)
+
+
+class FrameAdapter:
+    """
+    process_frames(src, dst) : 길이가 frame_size 배수인 float32 src 를 처리해 dst 에 기록
+                               (예: RNNoiseBatch, max_frames >= max_frames_for_block(block_size))
+
+        adapter = FrameAdapter(rnn, block_size=1024)
+        out = adapter.process(block)      # 길이 1024, adapter.latency 샘플 지연
+
+    FilterPipeline 의 denoise(src, dst) 로도 바로 쓸 수 있다 (adapter(src, dst)).
+    FilterPipeline 은 latency 속성을 보고 dry 신호도 같은 만큼 늦춰서 믹스한다.
+    """
+
+    def __init__(self, process_frames, block_size: int = None, frame_size: int = FRAME_SIZE):
+        self.process_frames = process_frames
+        self.frame_size = frame_size
+        self.block_size = block_size
+        if block_size:
+            self.latency = frame_size - math.gcd(block_size, frame_size)
+        else:
+            self.latency = frame_size - 1
+
+        # 입력 carry-over (완성되지 않은 프레임), 출력 FIFO (시작 시 latency 만큼 무음)
+        self._in = np.zeros(0, dtype=np.float32)
+        self._in_len = 0
+        self._out = np.zeros(self.latency, dtype=np.float32)
+        self._out_len = self.latency
+        self._res = np.zeros(0, dtype=np.float32)
+        self._reserve(block_size or frame_size)
+
+    def latency_ms(self, sample_rate: float) -> float:
+        return 1000.0 * self.latency / sample_rate
+
+    def _reserve(self, n: int):
+        # 블록이 지금까지보다 클 때만 버퍼를 키운다 (내용은 유지)
+        F = self.frame_size
+        if self._in.shape[0] < n + F:
+            buf = np.zeros(n + F, dtype=np.float32)
+            buf[:self._in_len] = self._in[:self._in_len]
+            self._in = buf
+        if self._out.shape[0] < self.latency + n + F:
+            buf = np.zeros(self.latency + n + F, dtype=np.float32)
+            buf[:self._out_len] = self._out[:self._out_len]
+            self._out = buf
+        if self._res.shape[0] < n:
+            self._res = np.zeros(n, dtype=np.float32)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        n = block.shape[0]
+        if self.block_size is not None and n != self.block_size:
+            raise ValueError(f"block size must be {self.block_size} (got {n})")
+        self._reserve(n)
+        F = self.frame_size
+
+        # ----- 1) carry-over 뒤에 이어붙이고 완성된 프레임만 처리 -----
+        end = self._in_len + n
+        np.copyto(self._in[self._in_len:end], block, casting="same_kind")
+        m = (end // F) * F
+        if m:
+            o = self._out_len
+            self.process_frames(self._in[:m], self._out[o:o + m])
+            self._out_len = o + m
+            self._in[:end - m] = self._in[m:end]
+        self._in_len = end - m
+
+        # ----- 2) 출력 FIFO 앞에서 n 샘플 꺼내기 -----
+        res = self._res[:n]
+        np.copyto(res, self._out[:n])
+        left = self._out_len - n
+        self._out[:left] = self._out[n:self._out_len]
+        self._out_len = left
+        return res
+
+    def __call__(self, src: np.ndarray, dst: np.ndarray):
+        np.copyto(dst, self.process(src))
+
+    def reset(self):
+        # 처음 상태로: carry-over 를 버리고 출력 FIFO 를 latency 만큼의 무음으로 (버퍼는 그대로 재사용)
+        self._in_len = 0
+        self._out[:self.latency] = 0.0
+        self._out_len = self.latency
+        reset = getattr(self.process_frames, "reset", None)
+        if reset is not None:
+            reset()
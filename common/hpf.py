@@ -0,0 +1,247 @@
+"""
+공용 HPF (High Pass Filter) 모듈
+
+예전에는 송신/수신 스크립트마다 HighPassFilter 클래스가 복사돼 있었고,
+process() 가 샘플 단위 파이썬 for 루프라서 CHUNK=3840 에서 매우 느렸다.
+여기서는 같은 1차 RC HPF 를 블록(벡터) 연산으로 계산한다.
+prev_x / prev_y 상태는 청크 사이에 그대로 이어진다.
+
+ButterworthHPF 는 N차 Butterworth HPF 를 2차 섹션(SOS, biquad) 직렬로 구현한 것.
+1차 RC 필터 여러 개를 이어붙이는 것보다 컷오프 특성이 정확하다.
+
+두 필터 모두 process(x, out=...) 로 결과 버퍼를 넘기면 내부 작업 버퍼를 재사용하므로
+청크 크기가 같으면 (첫 호출 이후) 새 배열을 할당하지 않는다.
+"""
+
+import math
+
+import numpy as np
+
+# p^-n 이 float64 범위(1e308)를 넘지 않도록 한 번에 계산할 구간 길이를 제한
+_EXP_LIMIT = 600.0
+_MAX_SEG = 4096
+# 이보다 작은 극점은 0 으로 (p * w[n-1] 이 float32 출력 정밀도보다 훨씬 작음)
+_ZERO_POLE = 1e-9
+
+
+def _reserve(buf, n: int, dtype=np.float64) -> np.ndarray:
+    # 작업 버퍼: 모자랄 때만 새로 할당
+    if buf is None or buf.shape[0] < n:
+        return np.empty(n, dtype=dtype)
+    return buf
+
+
+class _OnePole:
+    """
+    w[n] = p * w[n-1] + v[n] 재귀식을 구간 단위로 계산.
+
+    w[n] = p^n * (p * w[-1] + sum_{k<=n} p^-k * v[k])
+    → 곱셈 + 누적합(cumsum) 으로 파이썬 루프 없이 처리.
+    """
+
+    def __init__(self, p):
+        # p: 실수 또는 복소수 극점 (|p| < 1)
+        self.p = p
+        self.w = 0j if isinstance(p, complex) else 0.0
+        if abs(p) < _ZERO_POLE:
+            # 극점이 0 (홀수 차수 Butterworth, fc = fs/4 의 1차 섹션. libm 에 따라 정확히 0 또는 1e-17 정도):
+            # w[n] = v[n] 이라 재귀 없음 (log(0) 도, p^-n 이 터지는 것도 피함)
+            self.seg = 0
+            self.dtype = np.dtype(type(p))
+            return
+        self.seg = max(1, min(_MAX_SEG, int(_EXP_LIMIT / -math.log(abs(p)))))
+        n = np.arange(self.seg, dtype=np.float64)
+        self.pw = p ** n
+        self.ipw = p ** -n
+        # 복소 극점이면 v 도 복소수 배열이어야 한다
+        self.dtype = self.pw.dtype
+
+    def run(self, v: np.ndarray) -> np.ndarray:
+        # v 를 제자리(in-place)에서 w 로 덮어쓴다
+        if self.seg == 0:
+            if v.shape[0]:
+                self.w = v[-1]
+            return v
+        w = self.w
+        for s in range(0, v.shape[0], self.seg):
+            part = v[s:s + self.seg]
+            m = part.shape[0]
+            part *= self.ipw[:m]
+            np.cumsum(part, out=part)
+            part += self.p * w
+            part *= self.pw[:m]
+            w = part[-1]
+        self.w = w
+        return v
+
+
+class HighPassFilter:
+    """
+    1차 RC HPF:  y[n] = a * (y[n-1] + x[n] - x[n-1])
+    기존 샘플 루프 버전과 같은 결과(float32 오차 범위)를 낸다.
+    """
+
+    def __init__(self, fs: float, fc: float):
+        self.fs = fs
+        self.fc = fc
+        self.prev_x = 0.0
+        self._xbuf = None
+        self._vbuf = None
+        self._update_alpha()
+
+    def _update_alpha(self):
+        dt = 1.0 / self.fs
+        rc = 1.0 / (2.0 * math.pi * self.fc)
+        self.alpha = rc / (rc + dt)
+        self._pole = _OnePole(self.alpha)
+
+    @property
+    def prev_y(self) -> float:
+        return float(self._pole.w)
+
+    @prev_y.setter
+    def prev_y(self, value: float):
+        self._pole.w = float(value)
+
+    def process(self, x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        # x: 1D (int16 / float32 모두 가능) → float32 (out 을 주면 거기에 기록)
+        n = x.shape[0]
+        if out is None:
+            out = np.empty(n, dtype=np.float32)
+        if n == 0:
+            return out
+
+        self._xbuf = _reserve(self._xbuf, n)
+        self._vbuf = _reserve(self._vbuf, n)
+        xb = self._xbuf[:n]
+        v = self._vbuf[:n]
+        np.copyto(xb, x)
+
+        # v[n] = a * (x[n] - x[n-1])
+        v[0] = xb[0] - self.prev_x
+        np.subtract(xb[1:], xb[:-1], out=v[1:])
+        v *= self.alpha
+
+        self._pole.run(v)
+        self.prev_x = float(xb[-1])
+        np.copyto(out, v, casting="same_kind")
+        return out
+
+
+def butter_highpass_sos(order: int, fc: float, fs: float) -> np.ndarray:
+    """
+    N차 Butterworth HPF 계수 (bilinear 변환, 주파수 prewarp).
+    반환: (섹션 수, 6) 배열, 각 행 = [b0, b1, b2, 1, a1, a2]  (scipy sos 와 같은 형식)
+    홀수 차수면 마지막 섹션은 1차 (b2 = a2 = 0).
+    """
+    if not 1 <= order <= 8:
+        raise ValueError(f"order must be 1..8 (got {order})")
+    if not 0.0 < fc < fs / 2.0:
+        raise ValueError(f"fc must be in (0, fs/2) (got {fc})")
+
+    w0 = 2.0 * math.pi * fc / fs
+    cos_w0 = math.cos(w0)
+    sos = []
+
+    # 켤레 극점 쌍 → biquad (RBJ cookbook HPF, 섹션별 Q)
+    for k in range(order // 2):
+        q = 1.0 / (2.0 * math.sin((2 * k + 1) * math.pi / (2 * order)))
+        alpha = math.sin(w0) / (2.0 * q)
+        a0 = 1.0 + alpha
+        b0 = (1.0 + cos_w0) / 2.0 / a0
+        sos.append([b0, -2.0 * b0, b0, 1.0, -2.0 * cos_w0 / a0, (1.0 - alpha) / a0])
+
+    # 홀수 차수 → 실수 극점 1개짜리 1차 섹션
+    if order % 2:
+        k = math.tan(w0 / 2.0)
+        b0 = 1.0 / (1.0 + k)
+        sos.append([b0, -b0, 0.0, 1.0, (k - 1.0) / (k + 1.0), 0.0])
+
+    return np.array(sos, dtype=np.float64)
+
+
+class _Section:
+    """
+    SOS 한 섹션: FIR 부분(b0, b1, b2) + 재귀 부분(극점).
+
+    2차 섹션의 분모 1 / ((1 - p z^-1)(1 - p* z^-1)) 를 부분분수로 나누면
+    y = 2 * Re(r * w),  w[n] = p * w[n-1] + v[n],  r = p / (p - p*)
+    이라서 복소수 1극점 재귀 한 번으로 계산된다.
+    """
+
+    def __init__(self, row):
+        b0, b1, b2, _, a1, a2 = row
+        self.b = (b0, b1, b2)
+        self.x1 = 0.0  # x[n-1]
+        self.x2 = 0.0  # x[n-2]
+        self._v = None
+        self._t = None
+        if a2 == 0.0:
+            self.r = None
+            self.pole = _OnePole(-a1)
+        else:
+            p = complex(-a1 / 2.0, math.sqrt(4.0 * a2 - a1 * a1) / 2.0)
+            self.r = p / (p - p.conjugate())
+            self.pole = _OnePole(p)
+
+    def process(self, x: np.ndarray) -> None:
+        # x: float64 1D, 결과로 제자리에서 덮어쓴다
+        b0, b1, b2 = self.b
+        n = x.shape[0]
+        self._v = _reserve(self._v, n, self.pole.dtype)
+        self._t = _reserve(self._t, n)
+        v = self._v[:n]
+        t = self._t[:n]
+
+        # FIR 부분은 실수부(view)에서만 계산 → dtype 변환용 임시 버퍼가 생기지 않음
+        vr = v.real
+        if self.r is not None:
+            v.imag[:] = 0.0
+        np.multiply(x, b0, out=vr)
+        vr[0] += b1 * self.x1 + b2 * self.x2
+        if n > 1:
+            vr[1] += b2 * self.x1
+            np.multiply(x[:-1], b1, out=t[1:])
+            vr[1:] += t[1:]
+            np.multiply(x[:-2], b2, out=t[2:])
+            vr[2:] += t[2:]
+            self.x2, self.x1 = float(x[-2]), float(x[-1])
+        else:
+            self.x2, self.x1 = self.x1, float(x[0])
+
+        self.pole.run(v)
+        if self.r is not None:
+            v *= 2.0 * self.r
+        np.copyto(x, v.real)
+
+
+class ButterworthHPF:
+    """
+    N차 Butterworth HPF (SOS 직렬). 청크 단위로 process() 하면 상태가 이어진다.
+
+        hpf = ButterworthHPF(fs=48000, fc=150.0, order=4)
+        y = hpf.process(frames)   # int16 / float32 → float32
+    """
+
+    def __init__(self, fs: float, fc: float, order: int = 2):
+        self.fs = fs
+        self.fc = fc
+        self.order = order
+        self.sos = butter_highpass_sos(order, fc, fs)
+        self._sections = [_Section(row) for row in self.sos]
+        self._xbuf = None
+
+    def process(self, x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        n = x.shape[0]
+        if out is None:
+            out = np.empty(n, dtype=np.float32)
+        if n == 0:
+            return out
+
+        self._xbuf = _reserve(self._xbuf, n)
+        xb = self._xbuf[:n]
+        np.copyto(xb, x)
+        for sec in self._sections:
+            sec.process(xb)
+        np.copyto(out, xb, casting="same_kind")
+        return out
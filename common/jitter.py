@@ -0,0 +1,198 @@
+"""
+적응형 지터 버퍼 목표 깊이 (예전 고정 DELAY_SEC = 0.5 s 대신)
+
+수신부는 재생 전에 항상 0.5 초를 쌓아두고 시작했다. 직결 LAN 에서는 블록이 거의 정확한 간격으로
+오는데도 0.5 초 지연이 그대로 붙고, Wi-Fi 가 그보다 더 흔들리면 그래도 끊겼다.
+
+AdaptiveJitter 는 블록 도착 시각을 보고 재생 버퍼를 얼마나 쌓아둘지(target) 정한다.
+  - 블록 k 의 늦음 d_k = 도착 시각 - (첫 도착 + 그때까지 받은 샘플 / sample_rate)
+    최근 window_sec 동안의 d 에서 최솟값을 빼면 (두 시계 차이 / 드리프트 상쇄) "그 블록이 얼마나 늦었나"
+  - target = 늦음의 (1 - underrun_target) 분위수 + 블록 하나, [min_ms, max_ms] 로 자름
+    → underrun_target 비율 이하의 블록만 늦어서 끊기는 가장 작은 깊이
+  - 늘릴 때는 바로 (CallbackPlayer 가 그만큼 무음/반복을 끼워서 버퍼를 채움),
+    줄일 때는 update_sec 마다 블록 하나씩만 (버퍼가 목표보다 많이 쌓여 있으면 블록을 버려서 줄임)
+  - 실제로 underrun 이 나면 분위수를 기다리지 않고 블록 하나만큼 바로 늘림
+  - 송신이 한참 멈췄다 다시 오면 (늦음이 max_ms 의 두 배 이상) 기준을 새로 잡음
+
+target_ms / target_samples 가 지금 목표 깊이, history 가 조정 기록 (시각, 이전 ms, 새 ms, 이유).
+"""
+
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+# 조정 기록 최대 개수
+_HISTORY = 256
+# 목표보다 많이 쌓여서 블록을 버릴 때, 버리는 블록 사이 최소 간격 (블록 수)
+_DROP_SPACING = 4
+
+
+class AdaptiveJitter:
+    """
+        jitter = AdaptiveJitter(SAMPLE_RATE, CHUNK, min_ms=20, max_ms=500, underrun_target=0.005)
+        player = CallbackPlayer(SAMPLE_RATE, blocksize=CHUNK, jitter=jitter)
+        ...
+        print(jitter.format_stats())       # 목표 깊이 / 늦음 분위수 / 조정 횟수
+        for t, old, new, why in jitter.history: ...
+
+    arrival() 는 네트워크 스레드(CallbackPlayer.write)에서, underrun() 은 오디오 콜백에서 부른다.
+    underrun() 은 카운터만 올리고 (콜백에서 할당 없음), 목표 조정은 다음 arrival() 에서 한다.
+    clock 은 테스트용 (가상 시계).
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        block: int,
+        min_ms: float = 20.0,
+        max_ms: float = 500.0,
+        underrun_target: float = 0.005,
+        initial_ms: float = 100.0,
+        window_sec: float = 10.0,
+        update_sec: float = 1.0,
+        clock=time.monotonic,
+        tag: str = "Jitter",
+    ):
+        if not 0.0 < underrun_target < 1.0:
+            raise ValueError(f"underrun_target must be in (0, 1) (got {underrun_target})")
+        if min_ms > max_ms:
+            raise ValueError(f"min_ms {min_ms} > max_ms {max_ms}")
+        self.sample_rate = sample_rate
+        self.block = block
+        self.block_ms = 1000.0 * block / sample_rate
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.underrun_target = underrun_target
+        self.update_sec = update_sec
+        self.clock = clock
+        self.tag = tag
+
+        # 최근 늦음 (초) 링 + 분위수 계산용 작업 배열 (미리 잡음)
+        self._window = max(16, int(math.ceil(window_sec * sample_rate / block)))
+        self._delays = np.zeros(self._window)
+        self._scratch = np.empty(self._window)
+        self._count = 0
+        self._samples = 0
+        self._t0 = None
+        self._base = 0.0  # 최근 window 의 최소 늦음 (update 때 다시 계산)
+        self._next_update = None
+
+        self.target_ms = self._clamp(initial_ms)
+        self.delay_ms = 0.0  # 최근 늦음 분위수
+        self.history = deque(maxlen=_HISTORY)
+        self.arrivals = 0
+        self.resets = 0
+
+        # 오디오 콜백이 올리는 underrun 카운터 / 반영한 수
+        self._underrun_req = 0
+        self._underrun_seen = 0
+        # 버퍼를 늘릴 샘플 수 누적 (플레이어 콜백이 stretched 와 비교해서 무음/반복으로 채움)
+        self.grow_req = 0
+        # 목표보다 쌓인 블록 수 / 마지막으로 버린 뒤 지난 블록 수 / 이번 구간 최대 버퍼 깊이
+        self._shrink = 0
+        self._since_drop = _DROP_SPACING
+        self._level_max = 0
+
+    @property
+    def target_samples(self) -> int:
+        return int(round(self.target_ms * self.sample_rate / 1000.0))
+
+    def _clamp(self, ms: float) -> float:
+        return min(self.max_ms, max(self.min_ms, ms))
+
+    def _set_target(self, ms: float, now: float, reason: str):
+        old = self.target_ms
+        ms = float(ms)
+        if ms > old:
+            self.grow_req += int(round((ms - old) * self.sample_rate / 1000.0))
+        self.target_ms = ms
+        t = float(now - self._t0) if self._t0 is not None else 0.0
+        self.history.append((round(t, 3), round(old, 1), round(ms, 1), reason))
+
+    def underrun(self):
+        # 오디오 콜백에서: 카운터만
+        self._underrun_req += 1
+
+    def _reset(self, now: float):
+        self._t0 = now
+        self._samples = 0
+        self._count = 0
+        self._base = 0.0
+        self._next_update = now + self.update_sec
+
+    def arrival(self, n: int, level: int) -> bool:
+        """
+        블록 하나 (n 샘플) 가 도착. level = 지금 재생 버퍼에 쌓인 샘플 수.
+        True 면 이 블록은 버림 (목표보다 많이 쌓여 있어서 줄이는 중).
+        """
+        now = self.clock()
+        self.arrivals += 1
+        if self._t0 is None:
+            self._reset(now)
+
+        d = now - (self._t0 + self._samples / self.sample_rate)
+        if self._count and d - self._base > 2 * self.max_ms / 1000.0:
+            # 송신이 멈췄다 다시 옴: 이 블록부터 기준을 새로 잡음
+            self.resets += 1
+            self._reset(now)
+            d = 0.0
+        if self._count == 0 or d < self._base:
+            self._base = d
+        self._delays[self._count % self._window] = d
+        self._count += 1
+        self._samples += n
+        self._level_max = max(self._level_max, level)
+
+        missed = self._underrun_req - self._underrun_seen
+        if missed:
+            # 실제로 끊겼으면 바로 늘림 (늘어난 만큼은 이미 콜백이 무음/반복으로 채웠으므로 grow 는 안 함)
+            self._underrun_seen += missed
+            new = self._clamp(self.target_ms + missed * self.block_ms)
+            if new != self.target_ms:
+                old_grow = self.grow_req
+                self._set_target(new, now, "underrun")
+                self.grow_req = old_grow
+
+        if now >= self._next_update:
+            self._next_update = now + self.update_sec
+            self._update(now)
+
+        self._since_drop += 1
+        if self._shrink and self._since_drop >= _DROP_SPACING:
+            self._shrink -= 1
+            self._since_drop = 0
+            return True
+        return False
+
+    def _update(self, now: float):
+        k = min(self._count, self._window)
+        if k >= 16:
+            w = self._scratch[:k]
+            np.copyto(w, self._delays[:k])
+            base = w.min()
+            self._base = base
+            qi = min(k - 1, int(math.ceil((1.0 - self.underrun_target) * k)) - 1)
+            w.partition(qi)
+            self.delay_ms = (w[qi] - base) * 1000.0
+            want = self._clamp(self.delay_ms + self.block_ms)
+            if want >= self.target_ms + self.block_ms / 2:
+                self._set_target(want, now, "jitter up")
+            elif want <= self.target_ms - self.block_ms / 2:
+                # 줄일 때는 구간마다 블록 하나씩만
+                self._set_target(max(want, self.target_ms - self.block_ms), now, "jitter down")
+
+        # 이번 구간 최대 버퍼 깊이가 목표 + 블록 하나를 넘은 만큼 블록을 버려서 줄임
+        surplus = self._level_max - (self.target_samples + self.block)
+        self._shrink = max(0, surplus // self.block)
+        self._level_max = 0
+
+    def format_stats(self) -> str:
+        last = self.history[-1] if self.history else None
+        last_s = f", last {last[1]:.0f} -> {last[2]:.0f} ms ({last[3]})" if last else ""
+        return (
+            f"[{self.tag}] jitter buffer: target {self.target_ms:.0f} ms "
+            f"[{self.min_ms:.0f}..{self.max_ms:.0f}], p{100 * (1 - self.underrun_target):g} delay {self.delay_ms:.1f} ms, "
+            f"{len(self.history)} adjustments{last_s}, resets {self.resets}"
+        )
@@ -0,0 +1,265 @@
+"""
+TCP 프레이밍 (수신: recv_into + 미리 잡은 bytearray / 송신: 헤더 + PCM 을 sendall 한 번, 큰 패킷은 sendmsg)
+
+예전 수신부는
+    data = conn.recv(4096); buffer += data
+    frame_bytes = buffer[:BYTES_PER_CHUNK]; buffer = buffer[BYTES_PER_CHUNK:]
+처럼 bytes 를 이어붙이고 잘라냈다. bytes 는 바꿀 수 없는 객체라 += / 슬라이스마다
+남은 데이터 전체가 새로 복사되고, 밀린 데이터가 많을수록 O(n²) 로 느려진다.
+rx_test 처럼 패킷(헤더 8 + 7680 바이트)이 4096 보다 크면 패킷마다 recv 두세 번 + 재슬라이스가 생긴다.
+
+FrameReader 는
+  - bytearray 를 처음에 한 번만 잡고, recv_into 로 빈 자리에 바로 받는다 (한 번에 여러 프레임도 받음)
+  - 다 받은 프레임은 복사 없이 버퍼의 int16 view 로 돌려준다
+  - 버퍼 끝에 프레임 하나 들어갈 자리가 없을 때만 덜 받은 조각(프레임 1개 미만)을 앞으로 옮긴다
+
+송신 쪽은 예전처럼 sock.sendall(struct.pack(...) + audio.tobytes()) 로
+tobytes 한 번 + 헤더 이어붙이기 한 번, 패킷마다 PCM 을 두 번 복사한다.
+sendmsg 로 [헤더, 배열] 을 복사 없이 보내는 것도 재봤는데, 실제 패킷 크기 (968 B / 7688 B) 에서는
+iovec 두 개짜리 sendmsg 가 두 번 복사 + sendall 보다 패킷당 0.3 ~ 0.7 us 더 들어서 오히려 느렸다.
+미리 잡은 패킷 버퍼에 한 번만 복사하는 방법도 이어붙이기보다 빠르지 않았다 (bench_netsend).
+그래서 PacketWriter 는 _SENDMSG_MIN 이상인 큰 패킷만 sendmsg (일부만 보내지면 남은 부분만 다시),
+작은 패킷은 예전 이어붙이기 그대로 보낸다.
+헤더가 없으면 배열을 sendall 에 그대로 넘긴다 (astype / tobytes 없이, 복사 없음).
+"""
+
+import struct
+
+import numpy as np
+
+# 버퍼에 한 번에 받아둘 수 있는 프레임 수 (recv_into 한 번에 최대 이만큼)
+_BUFFER_FRAMES = 8
+# 헤더 + body 가 이 크기 이상이면 sendmsg (복사 없음), 작으면 헤더 + tobytes 를 이어붙여 sendall 한 번
+# (loopback TCP 에서 잰 경계: 7688 B 까지는 이어붙이기가 빠르고 16 KB 에서 비슷, 32 KB 부터 sendmsg 가 빠름)
+_SENDMSG_MIN = 16384
+_INT16 = np.dtype(np.int16)
+_UINT8 = np.dtype(np.uint8)
+
+
+class RecvBuffer:
+    """
+    recv_into 로 채우는 선형 수신 버퍼 (FrameReader / protocol.StreamReader 공용)
+
+        buf = RecvBuffer(conn, capacity)
+        start = buf.take(n)           # n 바이트가 찰 때까지 받고, 꺼낸 것으로 처리. 끊기면 -1
+        x = buf.int16(start, count)   # 그 위치의 int16 view (복사 없음)
+        b = buf.uint8(start, nbytes)  # 바이트 view (압축된 payload 용)
+
+    한 번에 요청하는 n 은 capacity 의 절반 이하여야 한다
+    (앞으로 옮기는 조각(< n)과 원래 자리가 겹치지 않게).
+    """
+
+    def __init__(self, sock, capacity: int):
+        self.sock = sock
+        self.buf = bytearray(capacity)
+        self._mv = memoryview(self.buf)
+        # 미리 만든 int16 배열을 슬라이스만 (짝수 위치일 때, frombuffer 보다 빠름)
+        self._i16 = np.frombuffer(self.buf, dtype=np.int16, count=capacity // 2)
+        self._u8 = np.frombuffer(self.buf, dtype=np.uint8)
+        self._start = 0  # 아직 안 꺼낸 데이터 시작
+        self._end = 0    # 받은 데이터 끝
+
+        self.eof = False
+        self.recv_calls = 0
+        self.bytes = 0
+
+    @property
+    def buffered(self) -> int:
+        # 받아두고 아직 안 꺼낸 바이트 수
+        return self._end - self._start
+
+    def fill(self, n: int) -> bool:
+        # n 바이트가 찰 때까지 recv_into. 연결이 끊기면 False
+        if self._start == self._end:
+            self._start = self._end = 0
+        while self._end - self._start < n:
+            if len(self.buf) - self._start < n:
+                # 버퍼 끝에 n 바이트 자리가 없으면 덜 받은 조각만 앞으로
+                m = self._end - self._start
+                self._mv[:m] = self._mv[self._start:self._end]
+                self._start, self._end = 0, m
+            m = self.sock.recv_into(self._mv[self._end:])
+            if m == 0:
+                self.eof = True
+                return False
+            self.recv_calls += 1
+            self.bytes += m
+            self._end += m
+        return True
+
+    def peek(self, n: int) -> int:
+        # n 바이트를 받아두고 시작 위치를 돌려줌 (꺼내지 않음). 끊기면 -1
+        if self._end - self._start < n and not self.fill(n):
+            return -1
+        return self._start
+
+    def take(self, n: int) -> int:
+        # n 바이트를 꺼낸 것으로 처리하고 시작 위치를 돌려줌. 끊기면 -1
+        if self._end - self._start < n and not self.fill(n):
+            return -1
+        start = self._start
+        self._start = start + n
+        return start
+
+    def int16(self, offset: int, count: int) -> np.ndarray:
+        if offset % 2 == 0:
+            i = offset // 2
+            return self._i16[i:i + count]
+        return np.frombuffer(self.buf, dtype=np.int16, count=count, offset=offset)
+
+    def uint8(self, offset: int, count: int) -> np.ndarray:
+        return self._u8[offset:offset + count]
+
+
+class FrameReader:
+    """
+        reader = FrameReader(conn, BYTES_PER_CHUNK)
+        while True:
+            frames = reader.read()              # int16 view, 연결이 끊기면 None
+
+        reader = FrameReader(conn, PAYLOAD_SIZE, header="!II")
+        (mode, rms), frames = reader.read_packet()
+
+    돌려준 view 는 다음 read() 전까지만 유효하다 (버퍼를 다시 씀). 보관하려면 .copy().
+
+    통계:
+        frames     : 꺼낸 프레임 수
+        recv_calls : recv_into 호출 수
+        bytes      : 받은 바이트 수
+    """
+
+    def __init__(
+        self,
+        sock,
+        payload_bytes: int,
+        header: str = None,
+        buffer_frames: int = _BUFFER_FRAMES,
+        tag: str = "Net",
+    ):
+        if payload_bytes < 2 or payload_bytes % 2:
+            raise ValueError(f"payload_bytes must be a positive multiple of 2 (got {payload_bytes})")
+        self.tag = tag
+        self.header = struct.Struct(header) if header else None
+        self.header_bytes = self.header.size if header else 0
+        self.payload_bytes = payload_bytes
+        self.frame_bytes = self.header_bytes + payload_bytes
+        self._count = payload_bytes // 2
+
+        self.rx = RecvBuffer(sock, max(2, buffer_frames) * self.frame_bytes)
+        self.frames = 0
+
+    @property
+    def eof(self) -> bool:
+        return self.rx.eof
+
+    @property
+    def recv_calls(self) -> int:
+        return self.rx.recv_calls
+
+    @property
+    def bytes(self) -> int:
+        return self.rx.bytes
+
+    @property
+    def buffered(self) -> int:
+        return self.rx.buffered
+
+    def read(self):
+        # payload 만 (헤더가 있으면 건너뜀). 연결이 끊기면 None
+        start = self.rx.take(self.frame_bytes)
+        if start < 0:
+            return None
+        self.frames += 1
+        return self.rx.int16(start + self.header_bytes, self._count)
+
+    def read_packet(self):
+        # (헤더 튜플, payload). 연결이 끊기면 None
+        start = self.rx.take(self.frame_bytes)
+        if start < 0:
+            return None
+        self.frames += 1
+        fields = self.header.unpack_from(self.rx.buf, start) if self.header else ()
+        return fields, self.rx.int16(start + self.header_bytes, self._count)
+
+    def __iter__(self):
+        while True:
+            frames = self.read()
+            if frames is None:
+                return
+            yield frames
+
+    def format_stats(self) -> str:
+        per_recv = self.frames / self.recv_calls if self.recv_calls else 0.0
+        return f"[{self.tag}] recv: {self.frames} frames, {self.recv_calls} recv_into ({per_recv:.2f} frames/call), {self.bytes} bytes"
+
+
+class PacketWriter:
+    """
+        writer = PacketWriter(sock, header="!II", tag="PC")
+        writer.send(audio, CURRENT_MODE, rms)     # [헤더 8 바이트][int16 PCM] 을 sendall 한 번에
+
+        writer = PacketWriter(sock)
+        writer.send(filtered)                     # 헤더 없이 PCM 만
+
+    body 는 int16 배열 (C 연속이 아니거나 dtype 이 다르면 그때만 변환), 코덱으로 압축한 payload 면 uint8 배열.
+    헤더가 있으면 _SENDMSG_MIN 보다 작은 패킷은 헤더 + tobytes 를 이어붙여 sendall (PCM 복사 2 번),
+    큰 패킷은 sendmsg (복사 없음). sendmsg 가 없는 소켓(Windows)은 큰 패킷도 버퍼별로 sendall.
+
+    통계:
+        packets       : 보낸 패킷 수
+        bytes         : 보낸 바이트 수
+        partial_sends : sendmsg 가 일부만 보내서 다시 호출한 횟수
+    """
+
+    sendmsg_min = _SENDMSG_MIN
+
+    def __init__(self, sock, header: str = None, tag: str = "Net"):
+        self.sock = sock
+        self.tag = tag
+        self.header = struct.Struct(header) if header else None
+        self._hdr_size = self.header.size if header else 0
+        self._hdr = memoryview(bytearray(self._hdr_size)) if header else None
+        self._sendmsg = getattr(sock, "sendmsg", None)
+
+        self.packets = 0
+        self.bytes = 0
+        self.partial_sends = 0
+
+    def send(self, body: np.ndarray, *fields):
+        u8 = body.dtype is _UINT8
+        size = self._hdr_size + (body.size if u8 else 2 * body.size)
+        self.packets += 1
+        self.bytes += size
+        if not (u8 or body.dtype is _INT16) or not body.flags.c_contiguous:
+            body = np.ascontiguousarray(body, dtype=np.uint8 if u8 else np.int16)
+        if self.header is None:
+            # 버퍼 하나면 sendall 이 버퍼 프로토콜로 바로 보냄 (일부 전송도 C 안에서 처리)
+            self.sock.sendall(body)
+            return
+        if size < self.sendmsg_min:
+            # 작은 패킷은 예전과 같이 헤더 + tobytes 를 이어붙여 sendall 한 번 (PCM 복사 2 번).
+            # 이 크기에서는 sendmsg 보다 싸다 (모듈 설명 참고)
+            self.sock.sendall(self.header.pack(*fields) + body.tobytes())
+            return
+
+        self.header.pack_into(self._hdr, 0, *fields)
+        if self._sendmsg is None:
+            self.sock.sendall(self._hdr)
+            self.sock.sendall(body)
+            return
+
+        bufs = [self._hdr, body]
+        left = size
+        n = self._sendmsg(bufs)
+        while n < left:
+            # 일부만 보내짐: 보낸 버퍼는 빼고, 걸친 버퍼는 바이트 단위 memoryview 슬라이스로 (복사 없음)
+            self.partial_sends += 1
+            left -= n
+            bufs = [memoryview(b).cast("B") for b in bufs]
+            while n >= len(bufs[0]):
+                n -= len(bufs.pop(0))
+            bufs[0] = bufs[0][n:]
+            n = self._sendmsg(bufs)
+
+    def format_stats(self) -> str:
+        return f"[{self.tag}] send: {self.packets} packets, {self.bytes} bytes, partial sends {self.partial_sends}"
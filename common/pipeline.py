@@ -0,0 +1,97 @@
+"""
+apply_filter 공용 파이프라인
+
+    int16 입력 → (HPF) → (RNNoise) → dry/wet 믹스 → clip → int16 출력
+
+스크립트마다 있던 apply_filter 는 청크마다 astype / clip / copy 로 새 배열을 여러 개 만들었다.
+FilterPipeline 은 CHUNK 크기의 float32 / int16 작업 버퍼를 미리 잡아두고
+모든 변환·클립·믹스를 out= 로 제자리에서 처리한다 → 정상 상태에서 청크당 할당 0.
+"""
+
+import numpy as np
+
+
+class FilterPipeline:
+    """
+    hpf     : process(x, out=float32 버퍼) 를 지원하는 필터 (common.hpf) 또는 None
+    denoise : denoise(src, dst) 콜러블, float32 src(CHUNK) 를 처리해 float32 dst 에 기록.
+              None 이면 RNNoise 단계는 건너뜀.
+
+    denoise 에 latency 속성(샘플 수, 예: common.framing.FrameAdapter)이 있으면
+    dry 도 같은 만큼 늦춰서 믹스한다 (dry/wet 위상 맞춤).
+
+    use_rnn 이 꺼져 있는 동안은 denoise 도 dry 지연선도 진행하지 않으므로, 다시 켜지는 청크에서
+    dry 지연선을 0 으로 비우고 denoise.reset() (있으면) 을 불러서 꺼지기 전 소리가 섞여 나오지 않게 한다.
+
+    process() 의 반환값은 내부 int16 버퍼(view)라서 다음 호출 때 덮어써진다.
+    바로 송신/재생하지 않고 보관해야 하면 호출한 쪽에서 복사할 것.
+    """
+
+    def __init__(self, chunk: int, hpf=None, denoise=None):
+        self.chunk = chunk
+        self.hpf = hpf
+        self.denoise = denoise
+
+        self._dry = np.empty(chunk, dtype=np.float32)
+        self._wet = np.empty(chunk, dtype=np.float32)
+        self._out = np.empty(chunk, dtype=np.int16)
+
+        # dry 지연선: [지난 latency 샘플 | 이번 청크]
+        self._delay = getattr(denoise, "latency", 0) if denoise is not None else 0
+        self._dry_line = np.zeros(self._delay + chunk, dtype=np.float32)
+        # 지난 청크에서 RNNoise 를 돌렸는지 (처음엔 지연선 / denoise 가 비어 있으므로 True 로 시작)
+        self._rnn_on = True
+
+    def process(
+        self,
+        frames: np.ndarray,
+        use_hpf: bool = True,
+        use_rnn: bool = True,
+        mix: float = 1.0,
+    ) -> np.ndarray:
+        assert frames.shape[0] == self.chunk
+
+        use_hpf = use_hpf and self.hpf is not None
+        use_rnn = use_rnn and self.denoise is not None and mix > 0.0
+        if use_rnn and not self._rnn_on:
+            # 꺼져 있다 다시 켜짐: 꺼지기 전에 남은 dry / wet 을 버림
+            self._dry_line.fill(0.0)
+            reset = getattr(self.denoise, "reset", None)
+            if reset is not None:
+                reset()
+        self._rnn_on = use_rnn
+
+        # RAW → 입력 그대로
+        if not use_hpf and not use_rnn:
+            return frames
+
+        # ----- 1) dry = HPF(frames) 또는 frames (float32) -----
+        dry = self._dry
+        if use_hpf:
+            self.hpf.process(frames, out=dry)
+            np.clip(dry, -32768, 32767, out=dry)
+        else:
+            np.copyto(dry, frames)
+
+        # ----- 2) RNNoise + dry/wet 믹스 -----
+        y = dry
+        if use_rnn:
+            wet = self._wet
+            self.denoise(dry, wet)
+            if self._delay:
+                d = self._delay
+                line = self._dry_line
+                np.copyto(line[d:], dry)
+                np.copyto(dry, line[:self.chunk])
+                line[:d] = line[self.chunk:]
+            if mix < 1.0:
+                # wet = dry + mix * (wet - dry)
+                np.subtract(wet, dry, out=wet)
+                wet *= mix
+                wet += dry
+            np.clip(wet, -32768, 32767, out=wet)
+            y = wet
+
+        # ----- 3) float32 → int16 (astype 와 같은 절삭) -----
+        np.copyto(self._out, y, casting="unsafe")
+        return self._out
@@ -0,0 +1,244 @@
+"""
+콜백 방식 재생 (sounddevice OutputStream callback + Int16Ring)
+
+예전 수신부는 네트워크 루프에서 stream.write() 를 직접 불렀다.
+패킷이 조금만 늦어도 장치가 underrun 나고, 반대로 장치가 밀리면 write 가 막혀서
+소켓 읽기까지 같이 멈췄다.
+
+CallbackPlayer 는
+  - 네트워크 스레드: write(frames) 로 링버퍼에 넣고 바로 리턴 (절대 막히지 않음)
+  - 오디오 콜백   : 링버퍼에서 blocksize 만큼 꺼내서 장치에 채움
+콜백 시점에 데이터가 모자라면 그 자리를 무음(또는 직전 블록 반복)으로 채우고 underrun 으로 센다.
+콜백 안에서는 미리 잡아둔 버퍼만 쓴다 (새 배열 할당 없음).
+
+jitter=AdaptiveJitter(...) 를 주면 고정 prefill 대신 지터 버퍼 목표 깊이를 따라간다.
+  - 시작: 목표 깊이만큼 쌓이면 재생
+  - 목표가 늘면 그만큼 콜백이 무음/반복을 끼워 넣어 버퍼를 채우고 (stretched), 줄면 write 가 블록을 버림 (shrunk)
+catchup=CatchUp(...) 을 주면 줄일 때 아무 블록이나 버리지 않고 무음 블록을 버리거나 WSOLA 로 짧게 만든다
+(목표는 jitter.target_samples, jitter 가 없으면 prefill).
+drift=DriftEstimator(...) 를 주면 송신 / 재생 클럭 차이를 버퍼 깊이로 추정해서
+write() 에서 LinearResampler 로 ±수백 ppm 만큼 늘리거나 줄여 넣는다 (몇 시간 돌아도 깊이 유지).
+"""
+
+import numpy as np
+
+from common.plc import Concealer
+from common.resample import LinearResampler
+from common.ring import Int16Ring
+
+# blocksize=0 (장치가 정함) 일 때 콜백 작업 버퍼 기본 크기
+_DEFAULT_MAX_FRAMES = 8192
+# conceal="repeat" 에서 연속 underrun 마다 1비트씩 줄여서(절반) 이만큼까지 내려가면 사실상 무음
+_MAX_REPEAT_SHIFT = 15
+
+
+class CallbackPlayer:
+    """
+        player = CallbackPlayer(SAMPLE_RATE, channels=2, blocksize=CHUNK, prefill=DELAY_FRAMES * CHUNK)
+        player.start()
+        player.write(mono_int16)     # 네트워크 스레드
+        print(player.format_stats())
+        player.close()
+
+    write() 는 모노 int16 (1차원) 을 받는다. channels > 1 이면 콜백에서 모든 채널에 같은 값을 복사.
+    prefill : 재생 시작 전에 링버퍼에 쌓아둘 샘플 수 (예전 delay_buffer 딜레이와 같은 역할)
+    conceal : None → underrun 구간 무음
+              "repeat" → 직전에 재생한 블록을 반복 (연속 underrun 마다 절반씩 줄어듦)
+              "plc" → common.plc.Concealer: 피치 주기를 이어서 반복하다 서서히 줄이고, 데이터가 다시 오면 crossfade
+    jitter  : common.jitter.AdaptiveJitter. 주면 prefill 은 무시하고 jitter.target_samples 를 씀
+    catchup : common.catchup.CatchUp. 쌓인 양이 목표보다 많으면 write() 에서 블록을 버리거나 줄임
+    drift   : common.drift.DriftEstimator. 클럭 차이만큼 write() 에서 리샘플해서 넣음 (drift.ppm 이 추정치)
+
+    통계:
+        underruns        : 데이터가 모자랐던 콜백 수 (재생 시작 이후)
+        underrun_samples : 무음/반복으로 채운 샘플 수
+        xruns            : PortAudio 가 output underflow 로 알려준 횟수
+        plc.concealed    : conceal="plc" 로 채운 블록 수 (plc.recoveries: 다시 진짜 데이터로 돌아온 횟수)
+        ring.overflows   : 링버퍼가 꽉 차서 write 가 버린 횟수
+        stretched        : 지터 버퍼를 늘리려고 끼워 넣은 샘플 수
+        shrunk           : 지터 버퍼를 줄이려고 버린 샘플 수
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: int = 1,
+        blocksize: int = 0,
+        buffer_sec: float = 1.0,
+        prefill: int = 0,
+        conceal: str = None,
+        device=None,
+        jitter=None,
+        catchup=None,
+        drift=None,
+        tag: str = "Player",
+    ):
+        if conceal not in (None, "repeat", "plc"):
+            raise ValueError(f"conceal must be None, 'repeat' or 'plc' (got {conceal!r})")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.jitter = jitter
+        self.catchup = catchup
+        self.drift = drift
+        if jitter is not None:
+            prefill = jitter.target_samples
+            # 목표 깊이가 max_ms 까지 늘어나도 링버퍼에 들어가게
+            buffer_sec = max(buffer_sec, 2 * jitter.max_ms / 1000.0)
+        self.prefill = prefill
+        self.conceal = conceal
+        self.device = device
+        self.tag = tag
+
+        max_frames = blocksize or _DEFAULT_MAX_FRAMES
+        capacity = max(int(buffer_sec * sample_rate), prefill + 4 * max_frames)
+        self.ring = Int16Ring(capacity)
+
+        # 콜백 작업 버퍼 (모노), 직전 출력 (conceal="repeat" 용)
+        self._mono = np.zeros(max_frames, dtype=np.int16)
+        self._last = np.zeros(max_frames, dtype=np.int16)
+        self._shift = 0  # 연속 underrun 횟수 = 반복 블록 감쇠(>> shift)
+        self.plc = Concealer(sample_rate, max_frames) if conceal == "plc" else None
+        self._resampler = LinearResampler(max_frames) if drift is not None else None
+
+        self.started = prefill <= 0
+        self.underruns = 0
+        self.underrun_samples = 0
+        self.xruns = 0
+        self.callbacks = 0
+        self.stretched = 0  # = 반영한 jitter.grow_req (콜백만 씀)
+        self.shrunk = 0
+
+        self._stream = None
+
+    # ----- 네트워크 쪽 -----
+    def write(self, frames: np.ndarray, prob: float = None) -> int:
+        # prob : 송신부가 보낸 말소리 확률 (catchup 이 무음 판단에 씀, 없으면 RMS 만 봄)
+        level = self.ring.available
+        drop = self.jitter is not None and self.jitter.arrival(frames.shape[0], level)
+        if not self.started:
+            return self.ring.write(frames)
+
+        target = self.prefill if self.jitter is None else self.jitter.target_samples
+        if self.catchup is not None:
+            frames = self.catchup.apply(frames, level, target, prob)
+            if frames is None:
+                return 0
+        elif drop:
+            # 목표보다 많이 쌓여 있음: 이 블록은 버려서 지연을 줄임
+            self.shrunk += frames.shape[0]
+            return 0
+
+        if self.drift is not None:
+            # 클럭 차이만큼 조금 늘리거나 줄여서 넣음 (버퍼 깊이가 천천히 새지 않게)
+            frames = self._resampler.process(frames, self.drift.update(level, target, frames.shape[0]))
+        return self.ring.write(frames)
+
+    @property
+    def buffered_ms(self) -> float:
+        return 1000.0 * self.ring.available / self.sample_rate
+
+    # ----- 오디오 콜백 -----
+    def _fill(self, mono: np.ndarray):
+        # mono 를 링버퍼에서 채움. 모자라면 무음 / 반복으로 메우고 underrun 으로 센다
+        frames = mono.shape[0]
+        if not self.started:
+            if self.ring.available < (self.prefill if self.jitter is None else self.jitter.target_samples):
+                mono.fill(0)
+                if self.jitter is not None:
+                    # 재생 전에 늘어난 목표는 그냥 더 쌓아서 맞춤
+                    self.stretched = self.jitter.grow_req
+                return
+            self.started = True
+
+        if self.drift is not None:
+            self.drift.played(frames)
+        if self.jitter is not None and self.stretched < self.jitter.grow_req:
+            # 목표 깊이가 늘었음: 링버퍼는 안 꺼내고 한 블록을 무음/반복으로 채워서 그만큼 쌓이게
+            self.stretched += frames
+            self._conceal(mono, 0, frames)
+            return
+
+        n = self.ring.read_into(mono)
+        if n == frames:
+            self._shift = 0
+            if self.plc is not None:
+                self.plc.push(mono)
+            return
+
+        self.underruns += 1
+        self.underrun_samples += frames - n
+        if self.jitter is not None:
+            self.jitter.underrun()
+        self._conceal(mono, n, frames)
+
+    def _conceal(self, mono: np.ndarray, n: int, frames: int):
+        if self.plc is not None:
+            if n:
+                self.plc.push(mono[:n])
+            self.plc.fill(mono[n:frames])
+        elif self.conceal == "repeat":
+            # 정수 시프트로 감쇠 (float 임시 배열 없이)
+            np.right_shift(self._last[n:frames], self._shift, out=mono[n:frames])
+            self._shift = min(self._shift + 1, _MAX_REPEAT_SHIFT)
+        else:
+            mono[n:frames].fill(0)
+
+    def _callback(self, outdata, frames, time_info, status):
+        if status.output_underflow:
+            self.xruns += 1
+        self.callbacks += 1
+
+        if frames > self._mono.shape[0]:
+            # 장치가 예상보다 큰 블록을 요구한 경우에만 다시 잡음
+            self._mono = np.zeros(frames, dtype=np.int16)
+            self._last = np.zeros(frames, dtype=np.int16)
+        mono = self._mono[:frames]
+        self._fill(mono)
+        np.copyto(self._last[:frames], mono)
+        # (frames,) → (frames, channels) 브로드캐스트 복사
+        np.copyto(outdata, mono[:, None])
+
+    # ----- 제어 -----
+    def start(self):
+        # sounddevice(PortAudio)는 실제로 재생할 때만 필요 → 여기서 import
+        import sounddevice as sd
+
+        self._stream = sd.OutputStream(
+            samplerate=self.sample_rate,
+            channels=self.channels,
+            dtype="int16",
+            blocksize=self.blocksize,
+            device=self.device,
+            callback=self._callback,
+        )
+        self._stream.start()
+        return self
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def format_stats(self) -> str:
+        s = (
+            f"[{self.tag}] playback: buffered {self.buffered_ms:.0f} ms, "
+            f"underruns {self.underruns} ({self.underrun_samples} samples), xruns {self.xruns}, "
+            f"ring overflows {self.ring.overflows} ({self.ring.dropped} samples)"
+        )
+        if self.plc is not None:
+            s += f", concealed {self.plc.concealed} blocks ({self.plc.recoveries} recoveries)"
+        if self.jitter is not None:
+            s += f", stretched {self.stretched} / shrunk {self.shrunk} samples\n{self.jitter.format_stats()}"
+        if self.catchup is not None:
+            s += f"\n{self.catchup.format_stats()}"
+        if self.drift is not None:
+            s += f"\n{self.drift.format_stats()}"
+        return s
@@ -0,0 +1,167 @@
+"""
+패킷 손실 은닉 (PLC): 늦거나 빠진 블록 자리를 직전 파형으로 이어서 채운다
+
+예전에는 블록이 늦으면 재생이 막히거나 (stream.write), 콜백 재생에서는 그 자리가 무음이 되어서
+'딱' 하는 클릭이나 뚝 끊기는 소리가 났다. conceal="repeat" 은 직전 블록을 통째로 반복해서
+블록 경계마다 파형이 어긋났다.
+
+Concealer 는
+  - 정상 경로 push(x) : 재생한 샘플을 원형 history 에 복사만 함 (복구 직후 블록만 crossfade)
+  - 손실 경로 fill(out): 손실 시작 때 history 에서 피치 주기를 찾아 (정규화 자기상관)
+                        마지막 한 주기를 위상이 이어지게 반복. hold_ms 동안은 그대로, 그 뒤 fade_ms 동안 0 까지 줄임
+  - 진짜 데이터가 다시 오면 overlap_ms 동안 이어서 만든 파형 → 진짜 데이터로 crossfade
+버퍼는 전부 처음에 잡는다 (피치 찾기의 상관 계산만 손실이 시작될 때 한 번 임시 배열을 씀).
+"""
+
+import numpy as np
+
+
+class Concealer:
+    """
+        plc = Concealer(SAMPLE_RATE, max_frames=CHUNK)
+        # 오디오 콜백에서
+        n = ring.read_into(mono)
+        if n: plc.push(mono[:n])          # 진짜 데이터 (손실 직후면 mono 앞쪽을 crossfade 해서 고침)
+        if n < frames: plc.fill(mono[n:]) # 모자란 자리 채움
+
+    CallbackPlayer(conceal="plc") 가 이렇게 쓴다.
+
+    통계:
+        concealed         : fill() 로 채운 횟수 (블록 / 콜백 수)
+        concealed_samples : 채운 샘플 수
+        recoveries        : 손실 뒤 진짜 데이터로 돌아온 횟수 (crossfade 한 횟수)
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        max_frames: int,
+        min_pitch_ms: float = 2.5,
+        max_pitch_ms: float = 20.0,
+        overlap_ms: float = 2.5,
+        hold_ms: float = 10.0,
+        fade_ms: float = 50.0,
+    ):
+        ms = sample_rate / 1000.0
+        self.sample_rate = sample_rate
+        self.min_lag = max(1, int(min_pitch_ms * ms))
+        self.max_lag = max(self.min_lag + 1, int(max_pitch_ms * ms))
+        self.overlap = max(1, int(overlap_ms * ms))
+        self.hold = int(hold_ms * ms)
+        self.fade = max(1, int(fade_ms * ms))
+
+        # 원형 history (int16), 피치 찾을 때 펼쳐 놓을 float 버퍼
+        self.hist_len = 2 * self.max_lag + self.overlap
+        self._hist = np.zeros(self.hist_len, dtype=np.int16)
+        self._pos = 0  # 다음에 쓸 위치
+        self._flat = np.zeros(self.hist_len, dtype=np.float32)
+
+        # 반복할 한 주기, 샘플 인덱스 / 이득 / 출력 작업 버퍼
+        self._cycle = np.zeros(self.max_lag, dtype=np.float32)
+        self._period = 1
+        self._phase = 0
+        self._lost = 0  # 이번 손실에서 지금까지 채운 샘플 수 (0 이면 정상)
+        self._alloc(max(max_frames, self.overlap))
+        w = self.overlap
+        self._fade_in = (np.arange(w, dtype=np.float32) + 0.5) / w
+        self._fade_out = 1.0 - self._fade_in
+        self._mix = np.zeros(w, dtype=np.float32)
+
+        self.concealed = 0
+        self.concealed_samples = 0
+        self.recoveries = 0
+
+    def _alloc(self, n: int):
+        self._idx = np.arange(n, dtype=np.int64)
+        self._ibuf = np.zeros(n, dtype=np.int64)
+        self._gain = np.zeros(n, dtype=np.float32)
+        self._work = np.zeros(n, dtype=np.float32)
+
+    @property
+    def concealing(self) -> bool:
+        return self._lost > 0
+
+    # ----- 정상 경로 -----
+    def push(self, x: np.ndarray):
+        n = x.shape[0]
+        if self._lost:
+            # 손실 직후: 이어서 만든 파형에서 진짜 데이터로 넘어감 (x 앞쪽을 그 자리에서 고침)
+            w = min(self.overlap, n)
+            xf = self._synth(w)
+            xf *= self._fade_out[:w]
+            xr = self._mix[:w]
+            np.multiply(x[:w], self._fade_in[:w], out=xr)
+            xr += xf
+            np.copyto(x[:w], xr, casting="unsafe")
+            self._lost = 0
+            self.recoveries += 1
+
+        # history 에 복사 (원형)
+        h, size = self._hist, self.hist_len
+        if n >= size:
+            h[:] = x[n - size:]
+            self._pos = 0
+            return
+        i = self._pos
+        first = min(n, size - i)
+        h[i:i + first] = x[:first]
+        if n > first:
+            h[:n - first] = x[first:]
+        self._pos = (i + n) % size
+
+    # ----- 손실 경로 -----
+    def _start(self):
+        # history 를 시간 순서로 펼쳐서 피치 주기를 찾고, 마지막 한 주기를 반복할 준비
+        h = self._flat
+        i = self._pos
+        size = self.hist_len
+        np.copyto(h[:size - i], self._hist[i:], casting="unsafe")
+        np.copyto(h[size - i:], self._hist[:i], casting="unsafe")
+
+        w = self.max_lag  # 마지막 w 샘플과 lag 만큼 앞 구간을 비교
+        ref = h[size - w:]
+        seg = h[size - w - self.max_lag:size - self.min_lag]
+        energy = float(np.dot(ref, ref))
+        if energy < 1.0:
+            period = self.max_lag  # 거의 무음: 아무 주기나 (어차피 0)
+        else:
+            # corr[j] = ref · h[lag 만큼 앞], lag = max_lag - j
+            corr = np.correlate(seg, ref, "valid")
+            seg2 = np.convolve(seg * seg, np.ones(w, dtype=np.float32), "valid")
+            score = corr / np.sqrt(seg2 * energy + 1.0)
+            period = self.max_lag - int(np.argmax(score))
+        self._period = period
+        np.copyto(self._cycle[:period], h[size - period:])
+        self._phase = 0
+
+    def _synth(self, n: int) -> np.ndarray:
+        # 한 주기를 위상이 이어지게 n 샘플 만들고 (hold 뒤에는 fade) _lost / _phase 를 진행
+        if n > self._idx.shape[0]:
+            self._alloc(n)
+        idx = self._ibuf[:n]
+        np.add(self._idx[:n], self._phase, out=idx)
+        np.remainder(idx, self._period, out=idx)
+        out = self._work[:n]
+        np.take(self._cycle, idx, out=out)
+
+        g = self._gain[:n]
+        # g = 1 - (lost + i - hold) / fade, [0, 1] 로 자름
+        np.add(self._idx[:n], self._lost - self.hold, out=g, casting="unsafe")
+        g *= -1.0 / self.fade
+        g += 1.0
+        np.clip(g, 0.0, 1.0, out=g)
+        out *= g
+
+        self._phase = (self._phase + n) % self._period
+        self._lost += n
+        return out
+
+    def fill(self, out: np.ndarray):
+        n = out.shape[0]
+        if n == 0:
+            return
+        if not self._lost:
+            self._start()
+        np.copyto(out, self._synth(n), casting="unsafe")
+        self.concealed += 1
+        self.concealed_samples += n
@@ -0,0 +1,534 @@
+"""
+오디오 스트림 프로토콜 v2 (매직 / 버전 / 시퀀스 / 캡처 타임스탬프 / 가변 길이 프레임)
+
+예전 형식(v1)은 두 가지였다.
+  - 헤더 없는 int16 PCM (pi_B_receiver_final, pc_receiver_* 등)
+  - struct.pack('!II', mode, rms) + 고정 PAYLOAD_SIZE (rx_test / rx_no_oled)
+둘 다 길이가 약속으로만 정해져서 양쪽 CHUNK 가 다르면 조용히 깨지고, 손실/지연도 잴 수 없었다.
+
+v2 프레임 (네트워크 바이트 순서, 헤더 24 + 메타 8 바이트):
+    magic     4s  b"PAV2"
+    version   B   2
+    flags     B   FLAG_META → 헤더 뒤에 META 가 붙음
+    n_samples H   채널당 샘플 수
+    seq       I   프레임 번호 (2^32 에서 한 바퀴)
+    ts_us     Q   송신 쪽 캡처 시각 (time.monotonic, us)
+    fmt       B   코덱 (common.codec: 0 pcm16 / 1 ulaw / 2 adpcm / 3 zlib)
+    channels  B
+    payload   H   payload 바이트 수 (pcm16 이 아니면 압축된 크기)
+  [META] mode B, rate B (샘플레이트 코드, RATES), rms H, prob f (RNNoise 음성 확률, RNNoise 를 안 돌렸으면 NO_PROB)
+  [payload]
+
+헤더/메타가 고정 길이라 프레임마다 unpack_from 한두 번이면 끝난다.
+rate 는 이 프레임 PCM 의 샘플레이트 (송신부가 음성 대역 16 kHz 로 줄여 보내는 등). 예전 송신부는 0 (= 세션 값).
+수신 쪽은 연결 첫 4 바이트가 magic 이면 v2, 아니면 v1 로 보고 그 연결은 끝까지 같은 형식으로 읽는다.
+
+핸드셰이크 (v2, 연결 직후 한 번):
+    송신 → HELLO  : magic b"PAVH", version, channels, block, flags, codecs(비트마스크), 가능한 샘플레이트 4개
+    수신 → ACCEPT : magic b"PAVA", status, version, sample_rate, channels, fmt, block
+수신 쪽이 샘플레이트 / 채널 / 블록 / 코덱을 고르고 (Session), 양쪽 다 그 값으로 버퍼/스트림을 한 번만 잡는다.
+HELLO flags 의 HELLO_DTX 는 송신 쪽이 무음 구간에 comfort noise 설명 (fmt cn) 을 보내고 싶다는 뜻이고,
+수신 쪽이 받을 수 있으면 ACCEPT status 에 ACCEPT_DTX 를 같이 켜서 돌려준다 (Session.dtx). 예전 수신부는 안 켜므로 그대로 오디오.
+송신 쪽이 블록 크기를 못 바꾸면 수신 쪽이 자기 블록 크기로 다시 잘라서 준다 (exact_block).
+HELLO 없이 바로 프레임이 오면 (핸드셰이크 안 하는 송신부 / v1) 수신 쪽 설정을 그대로 쓴다.
+"""
+
+import socket
+import struct
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from common.codec import FORMAT_CN, FORMAT_NAMES, FORMAT_PCM16, make_codec
+from common.netio import PacketWriter, RecvBuffer
+
+MAGIC = b"PAV2"
+VERSION = 2
+FLAG_META = 0x01
+
+HEADER = struct.Struct("!4sBBHIQBBH")
+META = struct.Struct("!BBHf")
+# META rate 코드 → 샘플레이트 (0 = 표시 안 함 → 세션 / 수신 쪽 설정)
+RATES = (0, 8000, 16000, 24000, 32000, 44100, 48000)
+# payload 바이트 수 필드(H) 최대값
+MAX_PAYLOAD = 0xFFFF
+# META prob: 송신 쪽이 이 블록에 RNNoise 를 안 돌려서 확률이 없음 (음수 → 수신 쪽은 RMS 로 판단)
+NO_PROB = -1.0
+
+HELLO_MAGIC = b"PAVH"
+ACCEPT_MAGIC = b"PAVA"
+HELLO = struct.Struct("!4sBBHBB4I")
+ACCEPT = struct.Struct("!4sBBIBBH")
+# HELLO flags: 송신 쪽이 수신 쪽이 원하는 블록 크기로 바꿔서 캡처할 수 있음
+HELLO_FLEX_BLOCK = 0x01
+# HELLO flags: 송신 쪽이 무음 구간에 comfort noise 설명을 보낼 수 있음 (DTX)
+HELLO_DTX = 0x02
+ACCEPT_OK = 0
+ACCEPT_REJECT = 1
+# ACCEPT status 에 같이 켜는 비트: 수신 쪽이 comfort noise 설명을 받음
+ACCEPT_DTX = 0x80
+# HELLO 에 넣을 수 있는 샘플레이트 수
+_MAX_RATES = 4
+# 송신 쪽이 ACCEPT 를 기다리는 시간 (초)
+_HANDSHAKE_TIMEOUT = 5.0
+
+_SEQ_MOD = 1 << 32
+# 버퍼에 한 번에 받아둘 수 있는 프레임 수
+_BUFFER_FRAMES = 8
+# 도착 간격 지터 평활 계수 (RFC 3550 의 1/16)
+_JITTER_GAIN = 1.0 / 16.0
+
+# version : 1 / 2
+# seq     : v1 은 받은 순서로 붙인 번호
+# ts_us   : 송신 쪽 캡처 시각 (v1 은 None)
+# mode / rms / prob : 메타 (없으면 None)
+# pcm     : int16 view (다음 read() 전까지만 유효)
+# rate    : pcm 샘플레이트 (META 에 표시된 값, 없으면 세션 값, 둘 다 모르면 None)
+Frame = namedtuple("Frame", "version seq ts_us mode rms prob pcm rate", defaults=(None,))
+
+# 핸드셰이크 결과 (양쪽이 이 값으로 캡처 / 재생 / 버퍼를 잡음)
+# sample_rate : 스트림 샘플레이트 (수신 쪽 설정과 다르면 수신 쪽이 변환하거나 그 레이트로 재생)
+# block       : 송신 쪽이 보내는 프레임당 샘플 수
+# dtx         : 무음 구간에 오디오 대신 comfort noise 설명 (fmt cn) 을 보냄
+Session = namedtuple("Session", "version sample_rate channels block fmt dtx", defaults=(False,))
+
+
+def rate_code(sample_rate) -> int:
+    # META 에 넣을 샘플레이트 코드 (RATES 에 없으면 0)
+    return RATES.index(sample_rate) if sample_rate in RATES else 0
+
+
+def _describe(session) -> str:
+    return (
+        f"v{session.version}, {f'{session.sample_rate} Hz' if session.sample_rate else 'rate unknown'}, {session.channels} ch, "
+        f"{session.block} samples/frame, {FORMAT_NAMES.get(session.fmt, session.fmt)}{', dtx' if session.dtx else ''}"
+    )
+
+
+def _choose(hello, sample_rates, channels, block, resample, codecs, dtx):
+    # HELLO 필드와 수신 쪽 설정으로 Session 을 고름. 맞출 수 없으면 (None, 이유)
+    _, version, tx_channels, tx_block, flags, tx_codecs, *tx_rates = hello
+    tx_rates = [r for r in tx_rates if r]
+    if not tx_rates or not tx_channels or not tx_block:
+        return None, "empty offer"
+
+    fmt = next((c for c in codecs if tx_codecs & (1 << c)), None)
+    if fmt is None:
+        return None, f"no common codec (sender mask {tx_codecs:#x})"
+
+    # 샘플레이트: 수신 쪽 선호 순서대로 송신 쪽이 되는 것, 없으면 송신 쪽 기본값 (resample 일 때만)
+    if sample_rates:
+        rate = next((r for r in sample_rates if r in tx_rates), None)
+        if rate is None:
+            if not resample:
+                return None, f"sample rate {tx_rates} not in {list(sample_rates)}"
+            rate = tx_rates[0]
+    else:
+        rate = tx_rates[0]
+
+    # 블록: 송신 쪽이 바꿀 수 있으면 수신 쪽 블록 (같은 시간 길이로 환산), 아니면 송신 쪽 그대로
+    if block and flags & HELLO_FLEX_BLOCK:
+        ref = sample_rates[0] if sample_rates else rate
+        tx_block = max(1, round(block * rate / ref))
+    if 2 * tx_block > MAX_PAYLOAD:
+        return None, f"block {tx_block} too long for v2"
+
+    ch = min(tx_channels, channels) if channels else tx_channels
+    return Session(min(version, VERSION), rate, ch, tx_block, fmt, bool(dtx and flags & HELLO_DTX)), None
+
+
+class StreamWriter:
+    """
+        writer = StreamWriter(sock, tag="Pi_A")                        # v2 (헤더 + 메타)
+        writer.send(frames, ts=capture_ts, mode=MODE, prob=denoiser.prob)
+
+        writer = StreamWriter(sock, version=1)                         # v1: 헤더 없는 PCM
+        writer = StreamWriter(sock, version=1, legacy_header="!II")    # v1: rx_test 형식 (mode, rms)
+
+        session = writer.negotiate((48000, 16000), 1, 480, flexible_block=True, codecs=ALL_FORMATS)
+        capture = CallbackCapture(session.sample_rate, blocksize=session.block)
+
+        writer.send(frames, prob=prob, silence=not gate.update(prob, len(frames)))   # DTX (common.dtx)
+
+    codecs 는 인코딩할 수 있는 코덱 (common.codec). 수신 쪽이 그중 하나를 고르면 send() 가 그 코덱으로 압축한다.
+    negotiate(dtx=True) 이고 수신 쪽도 받으면 (session.dtx) silence=True 블록은 오디오 대신 comfort noise 설명
+    (대역별 잡음 세기 7 B, 안 바뀌었으면 헤더만) 으로 보낸다. 아니면 silence 는 무시하고 그대로 오디오.
+
+    ts 는 캡처 시각 (time.monotonic 초). None 이면 보내는 시각.
+    헤더 + PCM 은 PacketWriter 로 한 번에 보낸다 (이어붙여서 sendall, 아주 큰 프레임은 sendmsg).
+    """
+
+    def __init__(self, sock, version: int = VERSION, meta: bool = True, legacy_header: str = None, tag: str = "Net"):
+        if version not in (1, VERSION):
+            raise ValueError(f"version must be 1 or {VERSION} (got {version})")
+        self.version = version
+        self.meta = meta
+        self.legacy_header = legacy_header
+        if version == 1:
+            header = legacy_header
+        else:
+            header = HEADER.format + META.format[1:] if meta else HEADER.format
+        self._writer = PacketWriter(sock, header=header, tag=tag)
+        self._flags = FLAG_META if meta else 0
+        self.seq = 0
+        self.tag = tag
+        self.session = None
+        self._codec = None  # pcm16 이면 None (PCM 을 그대로 보냄)
+        self._rate = 0  # META rate 코드 (세션 샘플레이트)
+        self._cn = None  # DTX 세션이면 ComfortNoise 인코더
+        self.silent = 0  # comfort noise 로 보낸 프레임 수
+
+    @property
+    def packets(self) -> int:
+        return self._writer.packets
+
+    @property
+    def bytes(self) -> int:
+        # 헤더 포함 보낸 바이트 수 (코덱을 쓰면 압축된 크기)
+        return self._writer.bytes
+
+    def negotiate(
+        self,
+        sample_rates,
+        channels: int,
+        block: int,
+        flexible_block: bool = False,
+        codecs=(FORMAT_PCM16,),
+        timeout: float = _HANDSHAKE_TIMEOUT,
+        dtx: bool = False,
+    ):
+        """
+        HELLO 를 보내고 수신 쪽 ACCEPT 를 기다려 Session 을 돌려준다 (첫 send 전에 한 번).
+        sample_rates : 캡처할 수 있는 샘플레이트 (첫 번째가 기본)
+        flexible_block : 수신 쪽이 원하는 블록 크기로 캡처할 수 있으면 True
+        dtx : 무음 구간에 comfort noise 설명을 보내고 싶으면 True (수신 쪽도 받아야 session.dtx)
+        v1 이면 핸드셰이크 없이 주어진 기본값 그대로.
+        수신 쪽이 거절하면 ValueError, timeout 안에 답이 없으면 TimeoutError (예전 수신부 → WIRE_VERSION = 1).
+        """
+        if self.version == 1:
+            self.session = Session(1, sample_rates[0], channels, block, FORMAT_PCM16)
+            return self.session
+
+        rates = (list(sample_rates) + [0] * _MAX_RATES)[:_MAX_RATES]
+        mask = 0
+        for c in codecs:
+            mask |= 1 << c
+        flags = (HELLO_FLEX_BLOCK if flexible_block else 0) | (HELLO_DTX if dtx else 0)
+        sock = self._writer.sock
+        sock.sendall(HELLO.pack(HELLO_MAGIC, VERSION, channels, block, flags, mask, *rates))
+
+        reply = bytearray(ACCEPT.size)
+        mv = memoryview(reply)
+        got = 0
+        old_timeout = sock.gettimeout()
+        sock.settimeout(timeout)
+        try:
+            while got < ACCEPT.size:
+                n = sock.recv_into(mv[got:])
+                if n == 0:
+                    raise ConnectionResetError(f"[{self.tag}] connection closed during handshake")
+                got += n
+        except socket.timeout:
+            raise TimeoutError(
+                f"[{self.tag}] no handshake reply in {timeout} s (old receiver? set WIRE_VERSION = 1)"
+            ) from None
+        finally:
+            sock.settimeout(old_timeout)
+
+        magic, status, version, rate, ch, fmt, n = ACCEPT.unpack(reply)
+        if magic != ACCEPT_MAGIC:
+            raise ValueError(f"[{self.tag}] bad handshake reply {bytes(magic)!r}")
+        if status & ~ACCEPT_DTX != ACCEPT_OK:
+            raise ValueError(
+                f"[{self.tag}] receiver rejected offer ({list(sample_rates)} Hz, {channels} ch, {block} samples)"
+            )
+        self.session = Session(version, rate, ch, n, fmt, bool(status & ACCEPT_DTX))
+        self._rate = rate_code(rate)
+        if self.session.dtx:
+            self._cn = make_codec(FORMAT_CN, n * ch)
+        if fmt != FORMAT_PCM16:
+            self._codec = make_codec(fmt, n * ch)
+        print(f"[{self.tag}] negotiated {_describe(self.session)}", flush=True)
+        return self.session
+
+    def send(self, pcm, ts: float = None, mode: int = 0, rms: int = 0, prob: float = 0.0, silence: bool = False):
+        if self.version == 1:
+            if self.legacy_header:
+                self._writer.send(pcm, mode, rms)
+            else:
+                self._writer.send(pcm)
+            self.seq += 1
+            return
+
+        n = pcm.shape[0]
+        if silence and self._cn is not None:
+            body = self._cn.encode(pcm)
+            fmt, nbytes = FORMAT_CN, body.shape[0]
+            self.silent += 1
+        elif self._codec is None:
+            body, fmt, nbytes = pcm, FORMAT_PCM16, 2 * n
+        else:
+            body = self._codec.encode(pcm)
+            fmt, nbytes = self._codec.fmt, body.shape[0]
+        if nbytes > MAX_PAYLOAD:
+            raise ValueError(f"frame too long for v2 ({n} samples, {nbytes} B > {MAX_PAYLOAD} B)")
+        ts_us = int((time.monotonic() if ts is None else ts) * 1e6)
+        fields = (MAGIC, VERSION, self._flags, n, self.seq, ts_us, fmt, 1, nbytes)
+        if self.meta:
+            fields += (mode, self._rate, min(int(rms), 0xFFFF), prob)
+        self._writer.send(body, *fields)
+        self.seq = (self.seq + 1) % _SEQ_MOD
+
+    def format_stats(self) -> str:
+        codec = f", {self._codec.name}" if self._codec is not None else ""
+        if self._cn is not None:
+            codec += f", dtx {self.silent}/{self.packets} frames as comfort noise"
+        return f"{self._writer.format_stats()}, wire v{self.version}{codec}"
+
+
+class StreamReader:
+    """
+        reader = StreamReader(conn, BYTES_PER_CHUNK, tag="Pi_B")                     # v1 = 헤더 없는 PCM
+        reader = StreamReader(conn, PAYLOAD_SIZE, legacy_header="!II", tag="RX")      # v1 = (mode, rms) 헤더
+        session = reader.accept(sample_rates=(48000,), channels=1, block=480)   # 핸드셰이크 (선택)
+        session = reader.accept(..., codecs=(FORMAT_ULAW, FORMAT_PCM16))       # 송신 쪽이 되면 μ-law 로 받음
+        for frame in reader:
+            player.write(frame.pcm)
+
+    legacy_payload_bytes / legacy_header 는 상대가 v1 일 때만 쓰인다.
+    expect_samples 를 주면 v2 프레임 길이가 다를 때 조용히 깨지는 대신 ValueError.
+    accept() 를 안 부르면 첫 read() 때 송신 쪽 제안을 그대로 받아들인다.
+    압축된 프레임 (fmt != pcm16) 은 read() 가 풀어서 int16 으로 돌려준다 (코덱별 디코더는 처음 볼 때 한 번 잡음).
+
+    통계:
+        frames    : 받은 프레임 수
+        lost      : v2 seq 가 건너뛴 프레임 수 (송신 쪽에서 버린 것 포함)
+        jitter_ms : 도착 간격 지터 (RFC 3550, 캡처 타임스탬프 기준)
+    """
+
+    def __init__(
+        self,
+        sock,
+        legacy_payload_bytes: int,
+        legacy_header: str = None,
+        expect_samples: int = None,
+        buffer_frames: int = _BUFFER_FRAMES,
+        tag: str = "Net",
+    ):
+        if legacy_payload_bytes < 2 or legacy_payload_bytes % 2:
+            raise ValueError(f"legacy_payload_bytes must be a positive multiple of 2 (got {legacy_payload_bytes})")
+        self.tag = tag
+        self.expect_samples = expect_samples
+        self._legacy = struct.Struct(legacy_header) if legacy_header else None
+        self._legacy_bytes = (self._legacy.size if legacy_header else 0) + legacy_payload_bytes
+        self._legacy_count = legacy_payload_bytes // 2
+
+        max_frame = max(self._legacy_bytes, HEADER.size + META.size + MAX_PAYLOAD)
+        self.rx = RecvBuffer(sock, max(2, buffer_frames) * max_frame)
+
+        self.version = None  # 첫 프레임에서 정해짐
+        self.session = None
+        self._hello = False
+        # exact_block 인데 송신 블록이 다를 때 다시 자르는 carry 버퍼
+        self._carry = None
+        self._out = None
+        self._fill = 0
+        self._carry_ts = None
+        self._last = None
+        self._out_seq = 0
+        self.frames = 0
+        self.lost = 0
+        self.jitter_ms = 0.0
+        self._next_seq = None
+        self._transit = None
+        self._decoders = {}
+
+    def _detect(self) -> bool:
+        start = self.rx.peek(len(MAGIC))
+        if start < 0:
+            return False
+        magic = self.rx.buf[start:start + len(MAGIC)]
+        self._hello = magic == HELLO_MAGIC
+        self.version = VERSION if magic == MAGIC or self._hello else 1
+        return True
+
+    def accept(
+        self,
+        sample_rates=None,
+        channels: int = None,
+        block: int = None,
+        exact_block: bool = False,
+        resample: bool = True,
+        codecs=(FORMAT_PCM16,),
+        dtx: bool = False,
+    ):
+        """
+        송신 쪽과 스트림 설정을 맞추고 Session 을 돌려준다 (연결이 끊기면 None). 두 번째부터는 같은 값.
+        sample_rates : 처리할 수 있는 샘플레이트 (첫 번째가 기본). None 이면 송신 쪽 기본값
+        block        : 원하는 프레임당 샘플 수. 송신 쪽이 바꿀 수 있으면 그 크기로 캡처해서 보냄
+        exact_block  : True 면 송신 쪽이 못 바꿔도 read() 가 block 샘플씩 다시 잘라서 돌려줌 (RNNoise 등)
+        resample     : 공통 샘플레이트가 없을 때 True 면 송신 쪽 기본값을 받음 (수신 쪽이 변환 / 그 레이트로 재생),
+                       False 면 거절하고 ValueError
+        codecs       : 받을 코덱 선호 순서 (송신 쪽이 되는 것 중 첫 번째, common.codec)
+        dtx          : True 면 송신 쪽이 원할 때 무음 구간을 comfort noise 설명으로 받음 (read() 가 잡음을 만들어 돌려줌)
+        HELLO 없이 시작한 송신부 (v1 포함) 는 수신 쪽 설정 (v2 는 첫 헤더의 블록 크기) 을 그대로 쓴다.
+        """
+        if self.session is not None:
+            return self.session
+        if self.version is None and not self._detect():
+            return None
+        rate = sample_rates[0] if sample_rates else None
+
+        if self._hello:
+            start = self.rx.take(HELLO.size)
+            if start < 0:
+                return None
+            hello = HELLO.unpack_from(self.rx.buf, start)
+            session, reason = _choose(hello, sample_rates, channels, block, resample, codecs, dtx)
+            sock = self.rx.sock
+            if session is None:
+                sock.sendall(ACCEPT.pack(ACCEPT_MAGIC, ACCEPT_REJECT, VERSION, 0, 0, 0, 0))
+                raise ValueError(f"[{self.tag}] handshake rejected: {reason}")
+            status = ACCEPT_OK | (ACCEPT_DTX if session.dtx else 0)
+            sock.sendall(ACCEPT.pack(
+                ACCEPT_MAGIC, status, session.version, session.sample_rate, session.channels, session.fmt, session.block
+            ))
+            # 송신 쪽이 약속한 길이와 다른 프레임이 오면 에러
+            self.expect_samples = session.block
+            how = "negotiated"
+        elif self.version == VERSION:
+            start = self.rx.peek(HEADER.size)
+            if start < 0:
+                return None
+            _, _, _, n, _, _, fmt, ch, _ = HEADER.unpack_from(self.rx.buf, start)
+            session = Session(VERSION, rate, ch, n, fmt)
+            how = "no handshake"
+        else:
+            ch = channels or 1
+            session = Session(1, rate, ch, self._legacy_count // ch, FORMAT_PCM16)
+            how = "legacy"
+
+        if exact_block and block and session.block != block:
+            # 송신 블록 + 남은 조각이 들어갈 carry 버퍼를 한 번만 잡음
+            self._carry = np.empty(block + session.block, dtype=np.int16)
+            self._out = np.empty(block, dtype=np.int16)
+            how += f", re-chunked to {block}"
+        self.session = session
+        print(f"[{self.tag}] stream {_describe(session)} ({how})", flush=True)
+        return session
+
+    def _read_v1(self):
+        start = self.rx.take(self._legacy_bytes)
+        if start < 0:
+            return None
+        mode = rms = None
+        if self._legacy is not None:
+            fields = self._legacy.unpack_from(self.rx.buf, start)
+            if len(fields) >= 2:
+                mode, rms = fields[0], fields[1]
+            start += self._legacy.size
+        seq = self.frames
+        self.frames += 1
+        return Frame(1, seq, None, mode, rms, None, self.rx.int16(start, self._legacy_count), self.session.sample_rate)
+
+    def _read_v2(self):
+        rx = self.rx
+        start = rx.peek(HEADER.size)
+        if start < 0:
+            return None
+        magic, version, flags, n, seq, ts_us, fmt, channels, nbytes = HEADER.unpack_from(rx.buf, start)
+        if magic != MAGIC:
+            raise ValueError(f"[{self.tag}] v2 frame sync lost after seq {self._next_seq}")
+        if version != VERSION or fmt not in FORMAT_NAMES or (fmt == FORMAT_PCM16 and nbytes != 2 * n * channels):
+            raise ValueError(f"[{self.tag}] unsupported v2 frame (version {version}, fmt {fmt}, {nbytes} B)")
+        if self.expect_samples is not None and n != self.expect_samples:
+            raise ValueError(f"[{self.tag}] sender frame {n} samples != expected {self.expect_samples}")
+
+        meta_bytes = META.size if flags & FLAG_META else 0
+        start = rx.take(HEADER.size + meta_bytes + nbytes)
+        if start < 0:
+            return None
+        mode = rms = prob = None
+        rate = self.session.sample_rate
+        if meta_bytes:
+            mode, code, rms, prob = META.unpack_from(rx.buf, start + HEADER.size)
+            if 0 < code < len(RATES):
+                rate = RATES[code]
+
+        # 손실: 기대한 seq 와의 차이 (뒤로 간 seq 는 세지 않음)
+        if self._next_seq is not None:
+            gap = (seq - self._next_seq) % _SEQ_MOD
+            if gap < _SEQ_MOD // 2:
+                self.lost += gap
+        self._next_seq = (seq + 1) % _SEQ_MOD
+
+        # 지터: (도착 시각 - 캡처 시각) 의 변화량을 1/16 로 평활 (두 시계의 차이는 상쇄됨)
+        transit = time.monotonic() * 1000.0 - ts_us / 1000.0
+        if self._transit is not None:
+            self.jitter_ms += (abs(transit - self._transit) - self.jitter_ms) * _JITTER_GAIN
+        self._transit = transit
+
+        self.frames += 1
+        if fmt == FORMAT_PCM16:
+            pcm = rx.int16(start + HEADER.size + meta_bytes, n * channels)
+        else:
+            dec = self._decoders.get(fmt)
+            if dec is None:
+                dec = self._decoders[fmt] = make_codec(fmt, n * channels)
+            pcm = dec.decode(rx.uint8(start + HEADER.size + meta_bytes, nbytes), n * channels)
+        return Frame(VERSION, seq, ts_us, mode, rms, prob, pcm, rate)
+
+    def _read_frame(self):
+        if self.version == 1:
+            return self._read_v1()
+        return self._read_v2()
+
+    def _read_rechunk(self):
+        # 송신 프레임을 carry 에 이어붙여 block 샘플씩 꺼냄 (메타는 마지막으로 받은 프레임 것)
+        block = self._out.shape[0]
+        while self._fill < block:
+            frame = self._read_frame()
+            if frame is None:
+                return None
+            n = frame.pcm.shape[0]
+            if self._fill + n > self._carry.shape[0]:
+                raise ValueError(f"[{self.tag}] sender frame {n} samples > negotiated {self.session.block}")
+            if self._fill == 0:
+                self._carry_ts = frame.ts_us
+            self._carry[self._fill:self._fill + n] = frame.pcm
+            self._fill += n
+            self._last = frame
+
+        self._out[:] = self._carry[:block]
+        self._fill -= block
+        self._carry[:self._fill] = self._carry[block:block + self._fill]
+        ts_us = self._carry_ts
+        rate = self._last.rate
+        if ts_us is not None and rate:
+            self._carry_ts = ts_us + int(block * 1e6 / rate)
+        seq = self._out_seq
+        self._out_seq += 1
+        last = self._last
+        return Frame(last.version, seq, ts_us, last.mode, last.rms, last.prob, self._out, last.rate)
+
+    def read(self):
+        # 다음 프레임 (Frame). 연결이 끊기면 None
+        if self.session is None and self.accept() is None:
+            return None
+        if self._out is not None:
+            return self._read_rechunk()
+        return self._read_frame()
+
+    def __iter__(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def format_stats(self) -> str:
+        return (
+            f"[{self.tag}] stream v{self.version}: {self.frames} frames, lost {self.lost}, "
+            f"jitter {self.jitter_ms:.2f} ms, {self.rx.recv_calls} recv_into"
+        )
@@ -0,0 +1,241 @@
+"""
+블록 단위 샘플레이트 변환 (블록 경계를 넘어 위상이 이어지는 스트리밍)
+
+  LinearResampler : 비율이 1 에 아주 가까운 미세 조정용 (클럭 드리프트 보정, ±수백 ppm).
+                    선형 보간이라 싸고, 비율을 블록마다 바꿔도 끊기지 않는다.
+  PolyphaseResampler : 고정된 유리수 비율 (48k ↔ 16k, 44.1k → 48k 등) 변환용.
+                    장치가 지원하는 레이트와 세션 레이트가 다를 때 (Kaiser 창 sinc 폴리페이즈 FIR).
+  RateConverter   : 수신 쪽에서 프레임마다 표시된 샘플레이트 (Frame.rate) 를 장치 레이트로 (PolyphaseResampler).
+
+    rs = LinearResampler(max_frames=CHUNK)
+    out = rs.process(frames, ratio)      # ratio = 입력 샘플 / 출력 샘플 (1.0001 이면 0.01 % 적게 나옴)
+
+    rs = PolyphaseResampler(44100, 48000, max_frames=441)
+    out = rs.process(frames)             # 블록마다 출력 길이가 ±1 샘플 달라질 수 있음 (누적은 정확)
+
+    converter = RateConverter(48000, max_frames=CHUNK)
+    out = converter.process(frame.pcm, frame.rate)   # 같은 레이트 / 모르는 레이트 (None) 면 그대로
+
+출력은 내부 버퍼 view (다음 process() 에서 다시 씀) 이므로 바로 링버퍼 등에 복사할 것.
+"""
+
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# L 이 이 값 이하면 위상별 matmul 경로 (위상 수만큼 파이썬 루프), 넘으면 take 로 모으는 경로
+_MAX_LOOP_PHASES = 4
+
+
+class LinearResampler:
+    """
+    입력 앞에 직전 블록 마지막 샘플을 붙인 v = [prev, x0, x1, ...] 위에서
+    위치 phase, phase + ratio, phase + 2 * ratio, ... (< len(x)) 를 선형 보간한다.
+    남은 소수 위치는 다음 블록으로 넘김 → 블록 길이 / 비율이 바뀌어도 이어짐.
+    버퍼는 max_frames 기준으로 미리 잡고, 더 큰 블록이 오면 그때만 다시 잡는다.
+    """
+
+    def __init__(self, max_frames: int, max_ratio_dev: float = 0.01):
+        self.max_ratio_dev = max_ratio_dev
+        self._prev = 0.0
+        self._phase = 0.0
+        self._alloc(max_frames)
+
+    def _alloc(self, n: int):
+        m = int(n * (1.0 + self.max_ratio_dev)) + 2
+        self._v = np.zeros(n + 1, dtype=np.float32)
+        self._k = np.arange(m, dtype=np.float64)
+        self._pos = np.zeros(m, dtype=np.float64)
+        self._i = np.zeros(m, dtype=np.int64)
+        self._a = np.zeros(m, dtype=np.float32)
+        self._b = np.zeros(m, dtype=np.float32)
+        self._out = np.zeros(m, dtype=np.int16)
+
+    def reset(self):
+        self._prev = 0.0
+        self._phase = 0.0
+
+    def process(self, x: np.ndarray, ratio: float) -> np.ndarray:
+        n = x.shape[0]
+        if abs(ratio - 1.0) > self.max_ratio_dev:
+            raise ValueError(f"ratio {ratio} is outside 1 ± {self.max_ratio_dev}")
+        if n + 1 > self._v.shape[0]:
+            self._alloc(n)
+        if n == 0:
+            return self._out[:0]
+
+        v = self._v[:n + 1]
+        v[0] = self._prev
+        v[1:] = x
+        # phase + k * ratio < n 인 k 개수
+        m = max(0, int(math.ceil((n - self._phase) / ratio)))
+
+        pos = self._pos[:m]
+        np.multiply(self._k[:m], ratio, out=pos)
+        pos += self._phase
+        i = self._i[:m]
+        np.floor(pos, out=pos)
+        np.copyto(i, pos, casting="unsafe")
+        # pos = 소수 부분
+        np.multiply(self._k[:m], ratio, out=pos)
+        pos += self._phase
+        pos -= i
+
+        a, b = self._a[:m], self._b[:m]
+        np.take(v, i, out=a)
+        i += 1
+        np.take(v, i, out=b)
+        b -= a
+        b *= pos
+        a += b
+        out = self._out[:m]
+        np.rint(a, out=a)
+        np.copyto(out, a, casting="unsafe")
+
+        self._phase += m * ratio - n
+        self._prev = float(x[-1])
+        return out
+
+
+class PolyphaseResampler:
+    """
+    out_rate / in_rate = L / M (기약분수). 개념상 L 배로 0 을 끼워 넣고 저역 통과 FIR 을 건 뒤 M 개마다 하나씩 고르는데,
+    실제로는 출력 샘플에 필요한 계수 (L 개 위상 중 하나, 위상당 K 탭) 만 곱한다.
+      - 필터: Kaiser 창 sinc, 차단 = rolloff * min(in, out) / 2, 길이 = 양쪽 zeros 개 영점 (축소면 M / L 배 길어짐)
+      - 출력 j 의 업샘플 시각 t_j = t + j * M → 입력 위치 n = t_j // L, 위상 p = t_j % L
+      - 블록마다 [직전 K - 1 샘플 | 이번 블록] 위 창 (m, K) 과 위상 계수 (m, K) 를 take 로 모아 한 번에 곱하고 합함
+        L 이 작으면 (48k ↔ 16k 처럼 정수배) 같은 위상 출력은 창이 M 간격이라 위상마다 strided view @ 계수 한 번 (모으기 없음)
+      - 남은 t 와 마지막 K - 1 샘플은 다음 블록으로 → 블록을 어떻게 자르든 한 번에 돌린 것과 같은 출력
+    버퍼는 max_frames 기준으로 미리 잡고, 더 큰 블록이 오면 그때만 다시 잡는다.
+    지연은 필터 절반 길이 (delay_ms, 기본값으로 48k ↔ 16k 1 ms, 44.1k → 48k 0.4 ms 정도).
+    """
+
+    def __init__(
+        self,
+        in_rate: int,
+        out_rate: int,
+        max_frames: int,
+        zeros: int = 16,
+        rolloff: float = 0.9,
+        beta: float = 8.0,
+    ):
+        g = math.gcd(int(in_rate), int(out_rate))
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.up = L = self.out_rate // g
+        self.down = M = self.in_rate // g
+
+        # 프로토타입 필터 (업샘플 레이트 기준): 영점 간격 max(L, M) 샘플, 위상 L 개로 나눠서 위상당 K 탭
+        K = self.taps = 2 * zeros * max(L, M) // L + 1
+        n = np.arange(K * L, dtype=np.float64) - (K * L - 1) / 2.0
+        fc = rolloff / max(L, M)  # 업샘플 나이퀴스트 대비 차단 주파수
+        h = fc * np.sinc(fc * n) * np.kaiser(K * L, beta)
+        h *= L / h.sum()  # 위상마다 DC 이득 1 (0 을 끼운 만큼 L 배)
+        # 위상 p 의 계수를 창 순서 (오래된 → 최근) 로 뒤집어 둠: Hr[p, i] = h[p + (K - 1 - i) * L]
+        self._h = np.ascontiguousarray(h.reshape(K, L).T[:, ::-1], dtype=np.float32)
+        self.delay_ms = 1000.0 * (K * L - 1) / 2.0 / (L * self.in_rate)
+
+        self._t = 0  # 다음 출력의 업샘플 시각 (이번 블록 시작 기준)
+        self._alloc(max_frames)
+
+    def _alloc(self, n: int):
+        K = self.taps
+        m = (n * self.up) // self.down + 2
+        self._max_frames = n
+        self._hist = np.zeros(K - 1 + n, dtype=np.float32)
+        self._windows = sliding_window_view(self._hist, K)  # _windows[i] = hist[i:i + K] (view, 한 번만 만듦)
+        self._k = np.arange(m, dtype=np.int64) * self.down
+        self._tj = np.zeros(m, dtype=np.int64)
+        self._n = np.zeros(m, dtype=np.int64)
+        self._p = np.zeros(m, dtype=np.int64)
+        big = m if self.up > _MAX_LOOP_PHASES else 0
+        self._win = np.zeros((big, K), dtype=np.float32)
+        self._coef = np.zeros((big, K), dtype=np.float32)
+        self._y = np.zeros(m, dtype=np.float32)
+        self._out = np.zeros(m, dtype=np.int16)
+
+    def reset(self):
+        self._t = 0
+        self._hist[:self.taps - 1] = 0.0
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        n = x.shape[0]
+        K = self.taps
+        if n > self._max_frames:
+            keep = self._hist[:K - 1].copy()
+            self._alloc(n)
+            self._hist[:K - 1] = keep
+        if n == 0:
+            return self._out[:0]
+
+        hist = self._hist[:K - 1 + n]
+        hist[K - 1:] = x
+        # t + j * M < n * L 인 j 개수
+        L, M = self.up, self.down
+        m = max(0, -(-(n * L - self._t) // M))
+
+        y = self._y[:m]
+        if L <= _MAX_LOOP_PHASES:
+            # 출력 r, r + L, r + 2L, ... 는 위상이 같고 입력 위치가 M 씩 늘어남
+            for r in range(min(L, m)):
+                i, p = divmod(self._t + r * M, L)
+                cnt = (m - r + L - 1) // L
+                np.matmul(self._windows[i:i + (cnt - 1) * M + 1:M], self._h[p], out=y[r::L])
+        else:
+            tj = self._tj[:m]
+            np.add(self._k[:m], self._t, out=tj)
+            idx, ph = self._n[:m], self._p[:m]
+            np.floor_divide(tj, L, out=idx)
+            np.remainder(tj, L, out=ph)
+
+            win, coef = self._win[:m], self._coef[:m]
+            np.take(self._windows, idx, axis=0, out=win)
+            np.take(self._h, ph, axis=0, out=coef)
+            win *= coef
+            np.sum(win, axis=1, out=y)
+        np.rint(y, out=y)
+        np.clip(y, -32768.0, 32767.0, out=y)
+        out = self._out[:m]
+        np.copyto(out, y, casting="unsafe")
+
+        self._t += m * M - n * L
+        hist[:K - 1] = hist[n:]
+        return out
+
+
+class RateConverter:
+    """
+    레이트가 섞여 올 수 있는 스트림 (송신부 음성 대역 모드 = 16 kHz, 44.1 kHz 마이크 등) 을 장치 레이트 하나로 맞춘다.
+    레이트가 out_rate 와 같거나 모르면 (None / 0) 입력을 그대로 돌려주고 (복사 없음), 다르면 PolyphaseResampler.
+    송신부가 도중에 레이트를 바꾸면 새 변환기를 잡는다 (바뀌는 곳에서 필터 지연만큼 이어짐이 끊김).
+    delay_ms 는 지금 거는 변환 필터 지연 (그대로 보내면 0).
+    """
+
+    def __init__(self, out_rate: int, max_frames: int, tag: str = "Rate"):
+        self.out_rate = out_rate
+        self.max_frames = max_frames
+        self.tag = tag
+        self.in_rate = None
+        self._rs = None
+
+    @property
+    def delay_ms(self) -> float:
+        return self._rs.delay_ms if self._rs is not None else 0.0
+
+    def process(self, x: np.ndarray, rate) -> np.ndarray:
+        rate = rate or self.out_rate
+        if rate != self.in_rate:
+            self.in_rate = rate
+            self._rs = None
+            if rate != self.out_rate:
+                self._rs = PolyphaseResampler(rate, self.out_rate, max_frames=self.max_frames)
+            print(self.format_stats(), flush=True)
+        if self._rs is None:
+            return x
+        return self._rs.process(x)
+
+    def format_stats(self) -> str:
+        if self._rs is None:
+            return f"[{self.tag}] stream {self.in_rate or self.out_rate} Hz (no resampling)"
+        return f"[{self.tag}] resampling {self.in_rate} -> {self.out_rate} Hz (+{self.delay_ms:.2f} ms)"
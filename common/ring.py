@@ -0,0 +1,291 @@
+"""
+int16 링버퍼 (단일 생산자 / 단일 소비자, Lock 없음)
+
+  Int16Ring : 샘플 단위. 네트워크 스레드가 write() 로 넣고, 재생 콜백이 read_into() 로 꺼낸다.
+  BlockRing : 고정 길이 블록 + 타임스탬프. 캡처 콜백이 push() 로 넣고, 송신 루프가 pop_into() 로 꺼낸다.
+  FrameRing : 고정 길이 블록 딜레이 라인 (예전 delay_buffer = deque() 대신). 슬롯 view 를 빌려주고 돌려받는다.
+버퍼는 처음에 한 번만 잡고, 쓰기/읽기는 전부 미리 잡은 배열로 복사만 한다
+(오디오 콜백 안에서 새 배열을 만들지 않기 위해).
+
+생산자만 _tail 을, 소비자만 _head 를 바꾼다 (누적 샘플 수, 인덱스는 % capacity).
+CPython 에서 정수 대입은 원자적이라 두 스레드 사이에 Lock 이 필요 없다.
+"""
+
+import time
+
+import numpy as np
+
+# FrameRing.claim / peek 에 timeout 을 줬을 때 다시 확인하는 간격 (초)
+_POLL_SEC = 0.0005
+
+
+class Int16Ring:
+    """
+        ring = Int16Ring(SAMPLE_RATE)      # 1초 분량
+        ring.write(frames)                 # 생산자: 넣은 샘플 수 리턴 (꽉 차면 뒤쪽은 버림)
+        n = ring.read_into(out)            # 소비자: out 앞쪽 n 샘플을 채움
+
+    통계:
+        overflows : 꽉 차서 일부/전부 버린 write 호출 수
+        dropped   : 그때 버린 샘플 수
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"capacity must be >= 1 (got {capacity})")
+        self.capacity = capacity
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self._head = 0  # 소비자가 읽은 누적 샘플 수
+        self._tail = 0  # 생산자가 쓴 누적 샘플 수
+
+        self.overflows = 0
+        self.dropped = 0
+
+    @property
+    def available(self) -> int:
+        # 읽을 수 있는 샘플 수
+        return self._tail - self._head
+
+    @property
+    def free(self) -> int:
+        return self.capacity - (self._tail - self._head)
+
+    def write(self, x: np.ndarray) -> int:
+        want = x.shape[0]
+        tail = self._tail
+        n = min(want, self.capacity - (tail - self._head))
+        if n < want:
+            self.overflows += 1
+            self.dropped += want - n
+        if n <= 0:
+            return 0
+
+        i = tail % self.capacity
+        first = min(n, self.capacity - i)
+        self._buf[i:i + first] = x[:first]
+        if n > first:
+            self._buf[:n - first] = x[first:n]
+        self._tail = tail + n  # 데이터를 다 쓴 다음에 공개
+        return n
+
+    def read_into(self, out: np.ndarray) -> int:
+        head = self._head
+        n = min(out.shape[0], self._tail - head)
+        if n <= 0:
+            return 0
+
+        i = head % self.capacity
+        first = min(n, self.capacity - i)
+        out[:first] = self._buf[i:i + first]
+        if n > first:
+            out[first:n] = self._buf[:n - first]
+        self._head = head + n  # 다 읽은 다음에 자리 반납
+        return n
+
+    def skip(self, n: int) -> int:
+        # 소비자 쪽에서 가장 오래된 샘플 n 개를 읽지 않고 버림
+        n = max(0, min(n, self._tail - self._head))
+        self._head += n
+        return n
+
+
+class BlockRing:
+    """
+    고정 길이 int16 블록 + 타임스탬프 링버퍼 (단일 생산자 / 단일 소비자, Lock 없음)
+
+        ring = BlockRing(n_blocks=50, block_size=CHUNK)
+        ring.push(block, ts)          # 생산자(오디오 콜백): 꽉 차면 버리고 False
+        ts = ring.pop_into(out)       # 소비자: out 에 복사하고 타임스탬프 리턴, 비었으면 None
+
+    drops : 꽉 차서 버린 블록 수
+    """
+
+    def __init__(self, n_blocks: int, block_size: int):
+        if n_blocks < 1 or block_size < 1:
+            raise ValueError(f"n_blocks / block_size must be >= 1 (got {n_blocks}, {block_size})")
+        self.n_blocks = n_blocks
+        self.block_size = block_size
+        self._blocks = np.zeros((n_blocks, block_size), dtype=np.int16)
+        self._ts = np.zeros(n_blocks, dtype=np.float64)
+        self._head = 0  # 소비자가 꺼낸 누적 블록 수
+        self._tail = 0  # 생산자가 넣은 누적 블록 수
+
+        self.drops = 0
+
+    @property
+    def available(self) -> int:
+        return self._tail - self._head
+
+    def push(self, block: np.ndarray, ts: float) -> bool:
+        tail = self._tail
+        if tail - self._head >= self.n_blocks:
+            self.drops += 1
+            return False
+        i = tail % self.n_blocks
+        self._blocks[i] = block
+        self._ts[i] = ts
+        self._tail = tail + 1  # 데이터를 다 쓴 다음에 공개
+        return True
+
+    def pop_into(self, out: np.ndarray):
+        head = self._head
+        if self._tail == head:
+            return None
+        i = head % self.n_blocks
+        out[:] = self._blocks[i]
+        ts = float(self._ts[i])
+        self._head = head + 1  # 다 읽은 다음에 자리 반납
+        return ts
+
+
+class FrameRing:
+    """
+    고정 길이 int16 블록 딜레이 라인 (단일 생산자 / 단일 소비자, Lock 없음)
+
+    예전 수신부는 블록마다 delay_buffer.append(frames.copy()) / popleft() 를 해서
+    초당 100 번씩 새 배열을 만들고 버렸다. FrameRing 은 (n_slots, block_size) 배열을 한 번만 잡고
+    슬롯 view 를 빌려준다.
+
+        ring = FrameRing(n_slots=64, block_size=CHUNK, delay=DELAY_FRAMES)
+        slot = ring.claim()            # 생산자: 다음에 쓸 슬롯 view (꽉 차면 None)
+        np.copyto(slot, filtered)
+        ring.commit()
+        buf = ring.peek()              # 소비자: 재생할 블록 view (아직 없으면 None)
+        stream.write(buf)
+        ring.release()                 # 다 쓴 슬롯 반납
+        ring.delay = 10                # 재생 중에도 바꿀 수 있음 (재할당 없음)
+
+    delay : 재생 시작 전에 쌓아둘 블록 수. 시작한 뒤에 바꾸면 소비자가 다음 peek() 에서 반영한다.
+            늘리면 늘린 블록 수만큼 무음 블록 view 를 내주고 (그동안 쌓여서 지연이 늘어남),
+            줄이면 가장 오래된 블록을 그만큼 건너뛴다. 최대 n_slots - 1.
+    claim / peek 에 timeout(초) 을 주면 그동안 기다린다 (기본 0 = 바로 리턴, 오디오 콜백에서도 쓸 수 있음).
+
+    통계:
+        depth / max_depth   : 지금 / 최대 쌓인 블록 수
+        put_wait / get_wait : claim / peek 에서 기다린 시간 합계 (초)
+        drops    : push() 에서 꽉 차서 버린 블록 수
+        inserted : delay 를 늘려서 끼워 넣은 무음 블록 수
+        skipped  : delay 를 줄여서 건너뛴 블록 수
+    """
+
+    def __init__(self, n_slots: int, block_size: int, delay: int = 0, name: str = "delay"):
+        if n_slots < 2 or block_size < 1:
+            raise ValueError(f"n_slots must be >= 2 and block_size >= 1 (got {n_slots}, {block_size})")
+        self.n_slots = n_slots
+        self.block_size = block_size
+        self.name = name
+        self._blocks = np.zeros((n_slots, block_size), dtype=np.int16)
+        self._silence = np.zeros(block_size, dtype=np.int16)
+        self._head = 0  # 소비자가 반납한 누적 블록 수
+        self._tail = 0  # 생산자가 넣은 누적 블록 수
+
+        self._delay = 0
+        self.delay = delay
+        self._applied = self._delay  # 소비자가 반영한 delay
+        self._grow = 0  # 아직 내줄 무음 블록 수
+        self._lent = False  # peek() 가 빌려준 게 실제 슬롯인지 (무음 view 면 False)
+        self.started = self._delay == 0
+
+        self.max_depth = 0
+        self.put_wait = 0.0
+        self.get_wait = 0.0
+        self.drops = 0
+        self.inserted = 0
+        self.skipped = 0
+
+    @property
+    def depth(self) -> int:
+        return self._tail - self._head
+
+    @property
+    def delay(self) -> int:
+        return self._delay
+
+    @delay.setter
+    def delay(self, n: int):
+        # 아무 스레드에서나 바꿔도 됨 (소비자가 다음 peek() 에서 반영)
+        self._delay = max(0, min(int(n), self.n_slots - 1))
+
+    # ----- 생산자 -----
+    def claim(self, timeout: float = 0.0):
+        # 다음에 쓸 슬롯 view. 꽉 차 있으면 timeout 까지 기다리고, 그래도 꽉 차 있으면 None
+        if self._tail - self._head >= self.n_slots:
+            t0 = time.perf_counter()
+            try:
+                while self._tail - self._head >= self.n_slots:
+                    if time.perf_counter() - t0 >= timeout:
+                        return None
+                    time.sleep(_POLL_SEC)
+            finally:
+                self.put_wait += time.perf_counter() - t0
+        return self._blocks[self._tail % self.n_slots]
+
+    def commit(self):
+        # claim() 으로 받은 슬롯을 다 썼음: 소비자에게 공개
+        tail = self._tail + 1
+        self._tail = tail
+        depth = tail - self._head
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def push(self, block: np.ndarray) -> bool:
+        # claim + 복사 + commit. 꽉 차면 버리고 False
+        slot = self.claim()
+        if slot is None:
+            self.drops += 1
+            return False
+        slot[:] = block
+        self.commit()
+        return True
+
+    # ----- 소비자 -----
+    def _peek(self):
+        if not self.started:
+            if self._tail - self._head < self._delay:
+                return None
+            self.started = True
+            self._applied = self._delay
+
+        target = self._delay
+        if target != self._applied:
+            if target > self._applied:
+                self._grow += target - self._applied
+            else:
+                # 줄였음: 끼워 넣을 무음이 남아 있으면 그것부터 취소하고, 나머지는 오래된 블록을 건너뜀
+                cut = self._applied - target
+                undo = min(cut, self._grow)
+                self._grow -= undo
+                n = min(cut - undo, self._tail - self._head)
+                self._head += n
+                self.skipped += n
+            self._applied = target
+
+        if self._grow:
+            self._grow -= 1
+            self.inserted += 1
+            self._lent = False
+            return self._silence
+        if self._tail == self._head:
+            return None
+        self._lent = True
+        return self._blocks[self._head % self.n_slots]
+
+    def peek(self, timeout: float = 0.0):
+        # 재생할 블록 view (release() 전까지 유효). 없으면 timeout 까지 기다리고, 그래도 없으면 None
+        buf = self._peek()
+        if buf is not None or timeout <= 0.0:
+            return buf
+        t0 = time.perf_counter()
+        try:
+            while buf is None and time.perf_counter() - t0 < timeout:
+                time.sleep(_POLL_SEC)
+                buf = self._peek()
+        finally:
+            self.get_wait += time.perf_counter() - t0
+        return buf
+
+    def release(self):
+        # peek() 로 받은 블록을 다 썼음: 슬롯 반납 (무음 블록이었으면 아무것도 안 함)
+        if self._lent:
+            self._lent = False
+            self._head += 1  # 다 읽은 다음에 자리 반납
@@ -0,0 +1,165 @@
+"""
+RNNoise 백엔드 선택 (ctypes / pyrnnoise / rnnoise_wrapper)
+
+같은 RNNoise 를 스크립트마다 다른 방법으로 불러 쓰고 있었다.
+  - ctypes          : 시스템 librnnoise 를 ctypes 로 직접 호출 (RNNoiseBatch)
+  - pyrnnoise       : pyrnnoise 패키지에 들어있는 librnnoise 빌드를 RNNoiseBatch 로 호출
+  - rnnoise_wrapper : 우리 래퍼의 process_int16() 을 480샘플 프레임마다 호출
+
+백엔드는 모두 같은 모양이다.
+    be(src, dst)   # float32 src (480 배수 길이) → float32 dst
+    be.prob        # 가장 최근 프레임의 음성 확률 (확률을 주지 않는 백엔드는 0.0)
+    be.peak_prob   # 마지막 호출에서 처리한 프레임 중 가장 큰 음성 확률 (DTX 판단용)
+    be.has_prob    # 음성 확률을 주는 백엔드인지 (rnnoise_wrapper 는 False)
+    be.reset() / be.close()
+
+select_backend() 는 설치된 백엔드를 전부 열어서 짧게 돌려보고(마이크로 벤치마크)
+프레임당 시간이 가장 짧은 것을 고른다.
+backend="ctypes" 처럼 이름을 주거나 환경변수 RNNOISE_BACKEND 로 강제할 수 있다.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from common.rnnoise_driver import FRAME_SIZE, RNNoiseBatch, load_rnnoise
+
+BACKENDS = ("ctypes", "pyrnnoise", "rnnoise_wrapper")
+BACKEND_ENV = "RNNOISE_BACKEND"
+
+# 마이크로 벤치마크: 워밍업 후 _BENCH_FRAMES 프레임을 _BENCH_REPEAT 번 돌려 최소값 사용
+_BENCH_FRAMES = 24
+_BENCH_REPEAT = 3
+
+
+def pyrnnoise_lib(tag: str = "RNNoise"):
+    """pyrnnoise 패키지에 포함된 librnnoise 를 우리 시그니처로 로드"""
+    from pyrnnoise.rnnoise import LIBRNNOISE
+
+    return load_rnnoise(tag, path=LIBRNNOISE)
+
+
+class _BatchBackend:
+    # librnnoise 를 RNNoiseBatch (고정 버퍼 + ctypes) 로 호출
+
+    has_prob = True
+
+    def __init__(self, name: str, lib, max_frames: int, tag: str):
+        self.name = name
+        self.lib = lib
+        self.tag = tag
+        self.prob = 0.0
+        self.peak_prob = 0.0
+        self._batch = RNNoiseBatch(max_frames=max_frames, lib=lib, tag=tag)
+
+    def __call__(self, src: np.ndarray, dst: np.ndarray):
+        batch = self._batch
+        step = batch.max_frames * FRAME_SIZE
+        peak = 0.0
+        for s in range(0, src.shape[0], step):
+            out, probs = batch.process(src[s:s + step])
+            np.copyto(dst[s:s + step], out)
+            self.prob = float(probs[-1])
+            peak = max(peak, float(probs.max()))
+        self.peak_prob = peak
+
+    def reset(self):
+        # 라이브러리는 그대로 두고 DenoiseState 만 새로 만든다
+        max_frames = self._batch.max_frames
+        self._batch.close()
+        self._batch = RNNoiseBatch(max_frames=max_frames, lib=self.lib, tag=self.tag)
+        self.prob = 0.0
+        self.peak_prob = 0.0
+
+    def close(self):
+        self._batch.close()
+
+
+class _WrapperBackend:
+    # rnnoise_wrapper.RNNoise().process_int16(480샘플 int16) → int16 (음성 확률 없음)
+
+    has_prob = False
+
+    def __init__(self):
+        from rnnoise_wrapper import RNNoise
+
+        self.name = "rnnoise_wrapper"
+        self.prob = 0.0
+        self.peak_prob = 0.0
+        self._cls = RNNoise
+        self._rnn = RNNoise()
+        self._frame = np.zeros(FRAME_SIZE, dtype=np.int16)
+
+    def __call__(self, src: np.ndarray, dst: np.ndarray):
+        frame = self._frame
+        for i in range(0, src.shape[0], FRAME_SIZE):
+            np.copyto(frame, src[i:i + FRAME_SIZE], casting="unsafe")
+            dst[i:i + FRAME_SIZE] = self._rnn.process_int16(frame)
+
+    def reset(self):
+        self._rnn = self._cls()
+
+    def close(self):
+        self._rnn = None
+
+
+def open_backend(name: str, max_frames: int = 1, tag: str = "RNNoise"):
+    """이름으로 백엔드 하나를 연다 (설치 안 돼 있으면 ImportError / OSError)"""
+    if name == "ctypes":
+        return _BatchBackend(name, load_rnnoise(tag), max_frames, tag)
+    if name == "pyrnnoise":
+        return _BatchBackend(name, pyrnnoise_lib(tag), max_frames, tag)
+    if name == "rnnoise_wrapper":
+        return _WrapperBackend()
+    raise ValueError(f"unknown RNNoise backend: {name!r} (choose from {', '.join(BACKENDS)})")
+
+
+def _bench(backend, max_frames: int) -> float:
+    # 프레임당 처리 시간(us). 실제 호출과 같은 max_frames 단위로 돌린다
+    n = max(1, max_frames) * FRAME_SIZE
+    rng = np.random.default_rng(0)
+    src = rng.uniform(-3000.0, 3000.0, n).astype(np.float32)
+    dst = np.empty_like(src)
+    calls = max(1, _BENCH_FRAMES // max(1, max_frames))
+
+    backend(src, dst)  # 워밍업
+    best = float("inf")
+    for _ in range(_BENCH_REPEAT):
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            backend(src, dst)
+        best = min(best, time.perf_counter() - t0)
+    return best / (calls * n / FRAME_SIZE) * 1e6
+
+
+def select_backend(max_frames: int = 1, tag: str = "RNNoise", backend: str = None):
+    """
+    backend : None/"auto" 면 자동 선택, 이름을 주면 그 백엔드만 연다.
+              None 일 때는 환경변수 RNNOISE_BACKEND 를 먼저 본다.
+    """
+    name = backend or os.environ.get(BACKEND_ENV) or "auto"
+    if name != "auto":
+        be = open_backend(name, max_frames, tag)
+        print(f"[{tag}] RNNoise backend: {be.name} (forced)")
+        return be
+
+    candidates = []
+    for name in BACKENDS:
+        try:
+            candidates.append(open_backend(name, max_frames, tag))
+        except (ImportError, OSError, RuntimeError) as e:
+            print(f"[{tag}] RNNoise backend {name}: unavailable ({e})")
+    if not candidates:
+        raise OSError(f"no RNNoise backend available (tried {', '.join(BACKENDS)})")
+
+    timings = [(_bench(be, max_frames), be) for be in candidates]
+    _, best = min(timings, key=lambda t: t[0])
+    for _, be in timings:
+        if be is not best:
+            be.close()
+    best.reset()  # 벤치마크로 바뀐 상태는 버리고 새로 시작
+
+    summary = ", ".join(f"{be.name} {us:.1f} us/frame" for us, be in timings)
+    print(f"[{tag}] RNNoise backend: {best.name} ({summary})")
+    return best
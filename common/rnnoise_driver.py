@@ -0,0 +1,115 @@
+"""
+librnnoise (ctypes) 배치 드라이버
+
+RNNoise 는 480 샘플(10ms @ 48kHz) 프레임만 처리한다.
+예전 코드는 CHUNK 를 480 개씩 잘라 리스트에 모은 뒤 np.concatenate 하거나,
+호출마다 ctypes.POINTER 캐스팅과 출력 배열을 새로 만들었다.
+
+RNNoiseBatch 는 max_frames * 480 크기의 float32 입력/출력 버퍼를 한 번만 잡고,
+프레임별 시작 주소(포인터 오프셋)를 미리 계산해 둔다.
+여러 프레임짜리 청크 하나를 넣으면 프레임마다 C 함수만 바로 호출하고,
+프레임별 음성 확률(speech probability)을 배열로 돌려준다.
+"""
+
+import atexit
+import ctypes
+
+import numpy as np
+
+FRAME_SIZE = 480  # RNNoise 고정 프레임 길이
+_FLOAT_BYTES = 4
+
+_LIBNAMES = ["librnnoise.so.0", "librnnoise.so", "librnnoise.dylib", "rnnoise.dll"]
+
+
+def load_rnnoise(tag: str = "RNNoise", path: str = None):
+    """librnnoise 로드 + C 시그니처 설정 (path 를 주면 그 파일만 시도)"""
+    lib = None
+    last_err = None
+    for name in [path] if path else _LIBNAMES:
+        try:
+            lib = ctypes.CDLL(name)
+            print(f"[{tag}] RNNoise loaded: {name}")
+            break
+        except OSError as e:
+            last_err = e
+    if lib is None:
+        raise OSError(f"RNNoise load failed: {last_err}")
+
+    # DenoiseState *rnnoise_create(RNNModel *model);
+    lib.rnnoise_create.argtypes = [ctypes.c_void_p]
+    lib.rnnoise_create.restype = ctypes.c_void_p
+
+    # float rnnoise_process_frame(DenoiseState *st, float *out, const float *in);
+    # 버퍼는 정수 주소(c_void_p)로 넘겨서 호출마다 POINTER 캐스팅을 하지 않는다
+    lib.rnnoise_process_frame.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
+    lib.rnnoise_process_frame.restype = ctypes.c_float
+
+    # void rnnoise_destroy(DenoiseState *st);
+    lib.rnnoise_destroy.argtypes = [ctypes.c_void_p]
+    lib.rnnoise_destroy.restype = None
+    return lib
+
+
+class RNNoiseBatch:
+    """
+    여러 프레임(480 * n) 청크를 한 번에 처리하는 RNNoise 드라이버.
+
+        rnn = RNNoiseBatch(max_frames=CHUNK // FRAME_SIZE)
+        out, probs = rnn.process(chunk)   # out: float32 view, probs: 프레임별 음성 확률
+
+    FilterPipeline 의 denoise(src, dst) 규약도 그대로 지원한다 (rnn(src, dst)).
+    반환되는 out / probs 는 내부 버퍼 view 라서 다음 호출 때 덮어써진다.
+    """
+
+    def __init__(self, max_frames: int = 1, lib=None, tag: str = "RNNoise"):
+        self.lib = lib if lib is not None else load_rnnoise(tag)
+        self.max_frames = max_frames
+
+        self._state = self.lib.rnnoise_create(None)
+        if not self._state:
+            raise RuntimeError("rnnoise_create(NULL) failed")
+        atexit.register(self.close)
+
+        self._in = np.zeros(max_frames * FRAME_SIZE, dtype=np.float32)
+        self._out = np.zeros(max_frames * FRAME_SIZE, dtype=np.float32)
+        self._probs = np.zeros(max_frames, dtype=np.float32)
+        self.probs = self._probs[:0]  # 마지막 호출의 프레임별 음성 확률
+
+        # 프레임 i 의 입력/출력 시작 주소 (버퍼는 재할당하지 않으므로 고정)
+        step = FRAME_SIZE * _FLOAT_BYTES
+        in_base = self._in.ctypes.data
+        out_base = self._out.ctypes.data
+        self._frame_ptrs = [(out_base + i * step, in_base + i * step) for i in range(max_frames)]
+
+    def process(self, chunk: np.ndarray):
+        n = chunk.shape[0]
+        n_frames = n // FRAME_SIZE
+        if n_frames * FRAME_SIZE != n or n_frames > self.max_frames:
+            raise ValueError(
+                f"chunk length must be a multiple of {FRAME_SIZE} "
+                f"up to {self.max_frames * FRAME_SIZE} (got {n})"
+            )
+
+        np.copyto(self._in[:n], chunk, casting="same_kind")
+
+        process_frame = self.lib.rnnoise_process_frame
+        state = self._state
+        probs = self._probs
+        for i in range(n_frames):
+            out_ptr, in_ptr = self._frame_ptrs[i]
+            probs[i] = process_frame(state, out_ptr, in_ptr)
+
+        self.probs = probs[:n_frames]
+        return self._out[:n], self.probs
+
+    def __call__(self, src: np.ndarray, dst: np.ndarray):
+        out, _ = self.process(src)
+        np.copyto(dst, out)
+
+    def close(self):
+        # 닫은 배치의 atexit 훅은 뺀다 (reset() 마다 새 배치를 만들어도 훅 / 배치가 종료 때까지 쌓이지 않게)
+        atexit.unregister(self.close)
+        if self._state:
+            self.lib.rnnoise_destroy(self._state)
+            self._state = None
@@ -0,0 +1,78 @@
+"""
+스트림용 RNNoise 래퍼 (pyrnnoise 대체)
+
+pyrnnoise.RNNoise.denoise_chunk() 는 호출할 때마다 제너레이터와 audiolab 변환 그래프를 거치고,
+첫 프레임만 쓰고 break 하면 남은 샘플이 라이브러리 안에 쌓인 채로 남을 수 있다.
+
+RNNoiseStream 은 스트림 하나당 한 번만 만들고,
+  - 임의 길이 int16 버퍼를 받아 (FrameAdapter 로 480샘플 프레임 정렬)
+  - 같은 길이의 denoise 출력(int16, 고정 latency)과 음성 확률을 돌려준다.
+실제 RNNoise 호출은 common.rnnoise_backend 가 고른 백엔드가 한다
+(ctypes / pyrnnoise / rnnoise_wrapper 중 시작할 때 가장 빠른 것, 또는 backend= 로 강제).
+"""
+
+import numpy as np
+
+from common.framing import FrameAdapter, max_frames_for_block
+from common.rnnoise_backend import select_backend
+from common.rnnoise_driver import FRAME_SIZE
+
+# 가변 블록일 때 백엔드 한 번에 넘길 최대 프레임 수
+_DEFAULT_MAX_FRAMES = 8
+
+
+class RNNoiseStream:
+    """
+        denoiser = RNNoiseStream(block_size=CHUNK, tag="PC")
+        out, prob = denoiser.process(frames_int16)   # out: int16 view (다음 호출 때 덮어씀)
+
+    block_size=None 이면 매번 길이가 달라도 된다 (대신 latency = 479 샘플).
+    backend=None 이면 자동 선택, "ctypes" / "pyrnnoise" / "rnnoise_wrapper" 로 강제.
+    FilterPipeline 의 denoise(src, dst) 규약도 지원 (latency 속성 포함).
+    """
+
+    def __init__(self, block_size: int = None, backend: str = None, tag: str = "RNNoise"):
+        max_frames = max_frames_for_block(block_size) if block_size else _DEFAULT_MAX_FRAMES
+        self.backend = select_backend(max_frames=max_frames, tag=tag, backend=backend)
+        self._adapter = FrameAdapter(self.backend, block_size=block_size)
+        self.latency = self._adapter.latency
+
+        self._out = np.zeros(block_size or FRAME_SIZE, dtype=np.int16)
+
+    @property
+    def prob(self) -> float:
+        # 가장 최근에 처리된 프레임의 음성 확률
+        return self.backend.prob
+
+    @property
+    def peak_prob(self) -> float:
+        # 마지막 process() 에서 처리된 프레임 중 가장 큰 음성 확률 (블록 단위 DTX 판단용)
+        return self.backend.peak_prob
+
+    @property
+    def has_prob(self) -> bool:
+        # 백엔드가 음성 확률을 주는지 (rnnoise_wrapper 는 항상 0.0)
+        return self.backend.has_prob
+
+    def latency_ms(self, sample_rate: float) -> float:
+        return self._adapter.latency_ms(sample_rate)
+
+    def __call__(self, src: np.ndarray, dst: np.ndarray):
+        np.copyto(dst, self._adapter.process(src))
+
+    def process(self, block: np.ndarray):
+        n = block.shape[0]
+        if self._out.shape[0] < n:
+            self._out = np.zeros(n, dtype=np.int16)
+        y = self._adapter.process(block)
+        out = self._out[:n]
+        np.clip(y, -32768, 32767, out=y)
+        np.copyto(out, y, casting="unsafe")
+        return out, self.backend.prob
+
+    def reset(self):
+        # 프레임 carry-over / 출력 FIFO 와 백엔드의 DenoiseState 를 처음 상태로
+        self._adapter.reset()
+
+    def close(self):
+        self.backend.close()
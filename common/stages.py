@@ -0,0 +1,423 @@
+"""
+3단 파이프라인 송신기 / 수신기
+
+예전 송신 루프는 한 스레드에서 stream.read → apply_filter → sock.sendall 을 차례로 돌려서
+전송이나 RNNoise 가 한 번 늦어지면 그동안 마이크를 못 읽어 input overflow 가 났다.
+수신 쪽도 recv → apply_filter → stream.write 를 한 루프에서 돌려서
+RNNoise 가 한 번 늦으면 소켓 읽기와 오디오 출력이 같이 밀렸다.
+
+세 단계를 각각 스레드로 돌리고 단계 사이를 SpscQueue(크기 고정)로 잇는다.
+  StagedSender   : capture → [q_dsp] → dsp → [q_out] → net
+  StagedReceiver : recv    → [q_dsp] → dsp → [q_out] → play
+  - 입력 단계(capture / recv)는 절대 기다리지 않는다. q_dsp 가 꽉 차면 블록을 버리고 stall 로 센다.
+  - dsp 는 process() 결과를 고정 출력 버퍼 풀에 복사해서 넘긴다.
+  - StagedSender(timestamps=True) 면 캡처 시각이 블록과 같이 두 큐를 지나 send 까지 간다
+    (q_dsp 에서 블록을 버려도 시각이 다른 블록에 붙지 않음).
+  - play 는 재생할 블록이 제때 없으면 무음을 내보내고 stall(underrun)로 센다.
+    StagedReceiver 의 dsp → play 는 SpscQueue 대신 FrameRing 딜레이 라인 (delay 를 재생 중에 바꿀 수 있음).
+NumPy / ctypes(RNNoise) / socket / sounddevice 호출은 GIL 을 놓기 때문에
+Pi 4 의 여러 코어에서 실제로 겹쳐 돈다.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from common.ring import FrameRing
+
+# 큐가 비었거나 꽉 찼을 때 다시 확인하는 간격 (초)
+_POLL_SEC = 0.0005
+# 종료 플래그 확인 간격 (초)
+_STOP_POLL_SEC = 0.05
+
+
+class SpscQueue:
+    """
+    단일 생산자 / 단일 소비자 bounded ring buffer (Lock 없음).
+
+    생산자만 _tail 을, 소비자만 _head 를 바꾼다.
+    CPython 에서 리스트 원소/정수 대입은 원자적이라 두 스레드 사이에 Lock 이 필요 없다.
+    기다릴 때는 _POLL_SEC 간격으로 다시 확인한다.
+
+    통계 (읽기 전용으로 보기만 할 것):
+        depth / max_depth : 지금 / 최대 들어있는 개수
+        put_wait / get_wait : 꽉 차서 / 비어서 기다린 시간 합계 (초)
+        drops : put_nowait 에서 꽉 차서 버린 개수
+    """
+
+    def __init__(self, capacity: int, name: str = "queue"):
+        if capacity < 1:
+            raise ValueError(f"capacity must be >= 1 (got {capacity})")
+        self.capacity = capacity
+        self.name = name
+        self._slots = [None] * capacity
+        self._head = 0  # 소비자가 다음에 꺼낼 위치 (누적)
+        self._tail = 0  # 생산자가 다음에 넣을 위치 (누적)
+
+        self.max_depth = 0
+        self.put_wait = 0.0
+        self.get_wait = 0.0
+        self.drops = 0
+
+    @property
+    def depth(self) -> int:
+        return self._tail - self._head
+
+    def put_nowait(self, item) -> bool:
+        tail = self._tail
+        if tail - self._head >= self.capacity:
+            self.drops += 1
+            return False
+        self._slots[tail % self.capacity] = item
+        self._tail = tail + 1  # 슬롯을 채운 다음에 공개
+        depth = tail + 1 - self._head
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return True
+
+    def put(self, item, timeout: float = None) -> bool:
+        # 꽉 차 있으면 timeout 까지 기다림. 넣었으면 True
+        if self._tail - self._head < self.capacity:
+            return self.put_nowait(item)
+        t0 = time.perf_counter()
+        try:
+            while self._tail - self._head >= self.capacity:
+                if timeout is not None and time.perf_counter() - t0 >= timeout:
+                    return False
+                time.sleep(_POLL_SEC)
+        finally:
+            self.put_wait += time.perf_counter() - t0
+        return self.put_nowait(item)
+
+    def get(self, timeout: float = None):
+        # 비어 있으면 timeout 까지 기다림. 시간 초과면 None
+        head = self._head
+        if self._tail == head:
+            t0 = time.perf_counter()
+            try:
+                while self._tail == head:
+                    if timeout is not None and time.perf_counter() - t0 >= timeout:
+                        return None
+                    time.sleep(_POLL_SEC)
+            finally:
+                self.get_wait += time.perf_counter() - t0
+        i = head % self.capacity
+        item = self._slots[i]
+        self._slots[i] = None
+        self._head = head + 1  # 슬롯을 비운 다음에 공개
+        return item
+
+
+class _ThreeStage:
+    """
+    StagedSender / StagedReceiver 공통 부분 (dsp 단계, 출력 버퍼 풀, 스레드 제어, 통계)
+
+    stages = (입력 단계, "dsp", 출력 단계) 이름. 하위 클래스가 _input_loop / _emit / _output_loop 를 구현.
+    단계별 통계:
+        items  : 처리한 블록 수
+        busy   : 단계 함수 안에서 보낸 시간 합계 (초)
+        stalls : 다음 단계가 밀려서(또는 재생할 블록이 없어서) 제때 넘기지 못한 횟수
+    """
+
+    stages = ("input", "dsp", "output")
+
+    def __init__(self, process, chunk: int, depth: int, out_depth: int, tag: str):
+        self.process = process
+        self.chunk = chunk
+        self.tag = tag
+
+        self.q_dsp = SpscQueue(depth, name=f"{self.stages[0]}→dsp")
+
+        self._make_output(out_depth)
+
+        self.items = {name: 0 for name in self.stages}
+        self.busy = {name: 0.0 for name in self.stages}
+        self.stalls = {name: 0 for name in self.stages}
+
+        self.error = None
+        self._stopped = threading.Event()
+        self._threads = []
+        # 입력이 끝나면(연결 종료 등) 남은 블록을 dsp / 출력 단계가 다 비운 뒤 멈춘다
+        self._input_done = False
+        self._dsp_done = False
+
+    def _make_output(self, out_depth: int):
+        self.q_out = SpscQueue(out_depth, name=f"dsp→{self.stages[2]}")
+        # q_out 에 최대 out_depth 개 + 출력 단계가 쓰는 중 1개 + dsp 가 쓰는 중 1개
+        self._pool = np.zeros((out_depth + 2, self.chunk), dtype=np.int16)
+        self._pool_idx = 0
+
+    # ----- 단계별 루프 -----
+    def _push_input(self, name: str, frames):
+        # 입력 단계 → q_dsp. 꽉 차면 기다리지 않고 버림
+        self.items[name] += 1
+        if not self.q_dsp.put_nowait(frames):
+            self.stalls[name] += 1
+
+    def _dsp_loop(self):
+        q_in = self.q_dsp
+        while not self._stopped.is_set():
+            frames = q_in.get(timeout=_STOP_POLL_SEC)
+            if frames is None:
+                if self._input_done and q_in.depth == 0:
+                    self._dsp_done = True
+                    return
+                continue
+            if not self._emit(frames):
+                return
+
+    def _emit(self, frames) -> bool:
+        # process() 결과를 출력 단계로 넘김. 멈추라는 신호가 오면 False
+        raise NotImplementedError
+
+    def _input_loop(self):
+        raise NotImplementedError
+
+    def _output_loop(self):
+        raise NotImplementedError
+
+    def _run(self, name: str, loop):
+        src, _, dst = self.stages
+        try:
+            loop()
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+            print(f"[{self.tag}] {name} stage error: {e!r}", flush=True)
+            self._stopped.set()
+        else:
+            if name == src:
+                self._input_done = True
+            elif name == dst:
+                self._stopped.set()
+
+    # ----- 제어 -----
+    def start(self):
+        src, dsp, dst = self.stages
+        for name, loop in ((dst, self._output_loop), (dsp, self._dsp_loop), (src, self._input_loop)):
+            t = threading.Thread(target=self._run, args=(name, loop), name=f"{self.tag}-{name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def wait(self, timeout: float) -> bool:
+        # timeout 동안 기다림. 아직 돌고 있으면 True, 멈췄으면 False
+        return not self._stopped.wait(timeout)
+
+    def stop(self, timeout: float = 1.0):
+        self._stopped.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    # ----- 통계 -----
+    def stats(self) -> dict:
+        queues = {}
+        for q in (self.q_dsp, self.q_out):
+            queues[q.name] = {
+                "depth": q.depth,
+                "max_depth": q.max_depth,
+                "put_wait_ms": q.put_wait * 1e3,
+                "get_wait_ms": q.get_wait * 1e3,
+                "drops": q.drops,
+            }
+        stages = {
+            name: {"items": self.items[name], "busy_ms": self.busy[name] * 1e3, "stalls": self.stalls[name]}
+            for name in self.stages
+        }
+        return {"queues": queues, "stages": stages}
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        lines = [f"[{self.tag}] pipeline stats"]
+        for name, st in s["stages"].items():
+            avg = st["busy_ms"] / st["items"] if st["items"] else 0.0
+            lines.append(f"  {name:<8}: {st['items']:6d} blocks, {avg:6.2f} ms/block, stalls {st['stalls']}")
+        for name, q in s["queues"].items():
+            lines.append(
+                f"  {name:<12}: depth {q['depth']}/{q['max_depth']} (now/max), "
+                f"wait put {q['put_wait_ms']:.1f} ms / get {q['get_wait_ms']:.1f} ms, drops {q['drops']}"
+            )
+        return "\n".join(lines)
+
+
+class StagedSender(_ThreeStage):
+    """
+    capture() : int16 1차원 블록(길이 chunk)을 돌려줌. 보낼 게 없으면 None (예: 사람 없음)
+    process(frames) : int16 블록 → int16 블록 (FilterPipeline 처럼 내부 버퍼 view 여도 됨)
+    send(buf) : 블록 전송 (예: sock.sendall)
+    timestamps=True 면 capture() 가 (블록, 캡처 시각) 을 돌려주고 send(buf, ts) 로 그 시각을 받는다
+    (예: CallbackCapture.read() → StreamWriter.send(buf, ts=ts)).
+
+        sender = StagedSender(capture, apply_filter, sock.sendall, chunk=CHUNK)
+        sender.start()
+        while sender.wait(5.0):
+            print(sender.format_stats())
+        sender.stop()
+
+    process() 결과는 (depth + 2)개짜리 출력 버퍼 풀에 복사해서 넘기므로 청크당 새 배열을 만들지 않는다.
+    어느 단계에서든 예외가 나면 error 에 저장하고 전체를 멈춘다.
+    """
+
+    stages = ("capture", "dsp", "net")
+
+    def __init__(
+        self, capture, process, send, chunk: int, depth: int = 4, timestamps: bool = False, tag: str = "Sender"
+    ):
+        super().__init__(process, chunk, depth, depth, tag)
+        self.capture = capture
+        self.send = send
+        self.timestamps = timestamps
+
+    def _input_loop(self):
+        # capture 시간에는 stream.read 가 블록을 기다리는 시간도 포함
+        # 큐에는 (블록, 캡처 시각) 으로 넣음 (timestamps=False 면 시각 None)
+        while not self._stopped.is_set():
+            t0 = time.perf_counter()
+            got = self.capture()
+            self.busy["capture"] += time.perf_counter() - t0
+            if got is not None:
+                self._push_input("capture", got if self.timestamps else (got, None))
+
+    def _emit(self, item) -> bool:
+        # process() 결과를 출력 버퍼 풀에 복사해서 캡처 시각과 같이 q_out 으로
+        frames, ts = item
+        q_out = self.q_out
+        t0 = time.perf_counter()
+        out = self._pool[self._pool_idx]
+        self._pool_idx = (self._pool_idx + 1) % self._pool.shape[0]
+        np.copyto(out, self.process(frames))
+        self.busy["dsp"] += time.perf_counter() - t0
+        self.items["dsp"] += 1
+        if q_out.depth >= q_out.capacity:
+            self.stalls["dsp"] += 1  # 출력 단계가 밀려 있음 → 자리 날 때까지 대기
+        while not q_out.put((out, ts), timeout=_STOP_POLL_SEC):
+            if self._stopped.is_set():
+                return False
+        return True
+
+    def _output_loop(self):
+        q = self.q_out
+        while not self._stopped.is_set():
+            item = q.get(timeout=_STOP_POLL_SEC)
+            if item is None:
+                if self._dsp_done and q.depth == 0:
+                    return
+                continue
+            buf, ts = item
+            t0 = time.perf_counter()
+            if self.timestamps:
+                self.send(buf, ts)
+            else:
+                self.send(buf)
+            self.busy["net"] += time.perf_counter() - t0
+            self.items["net"] += 1
+
+
+class StagedReceiver(_ThreeStage):
+    """
+    source : int16 블록(길이 chunk)을 차례로 내주는 iterable (예: 소켓에서 읽는 제너레이터).
+             끝나면(연결 종료) eof = True 로 표시하고, 남은 블록을 다 재생한 뒤 멈춘다.
+    process(frames) : int16 블록 → int16 블록
+    play(buf) : 블록 재생 (예: stream.write)
+
+        rx = StagedReceiver(recv_blocks(conn), apply_filter, stream.write,
+                            chunk=CHUNK, sample_rate=SAMPLE_RATE, prefill=DELAY_FRAMES)
+        rx.delay = 20            # 재생 중에 딜레이 변경 (블록 수)
+
+    prefill : 재생 시작 전에 q_out 에 쌓아둘 블록 수 (예전 delay_buffer 와 같은 인위적 딜레이)
+              q_out 은 FrameRing 이라 dsp 가 슬롯에 바로 쓰고 play 는 그 view 를 재생한 뒤 반납한다.
+    max_delay : 재생 중에 늘릴 수 있는 최대 딜레이 (블록 수, 기본 prefill). 링 크기 = max_delay + depth
+    play 단계는 블록 하나 길이(chunk / sample_rate)만큼 기다려도 새 블록이 없으면
+    무음 블록을 대신 재생하고 stalls["play"] 를 올린다 (오디오 장치를 멈추지 않음).
+    pad_silence=False 면 (play 가 CallbackPlayer.write 처럼 알아서 채우는 경우) 무음 없이 계속 기다린다.
+    """
+
+    stages = ("recv", "dsp", "play")
+
+    def __init__(
+        self,
+        source,
+        process,
+        play,
+        chunk: int,
+        sample_rate: float,
+        depth: int = 4,
+        prefill: int = 0,
+        max_delay: int = None,
+        pad_silence: bool = True,
+        tag: str = "Receiver",
+    ):
+        self.prefill = prefill
+        max_delay = prefill if max_delay is None else max(max_delay, prefill)
+        super().__init__(process, chunk, depth, max_delay + depth, tag)
+        self.source = source
+        self.play = play
+        self.pad_silence = pad_silence
+        self.block_sec = chunk / sample_rate
+        self.eof = False
+        self._silence = np.zeros(chunk, dtype=np.int16)
+
+    def _input_loop(self):
+        # recv 시간에는 소켓에서 데이터를 기다리는 시간도 포함
+        it = iter(self.source)
+        while not self._stopped.is_set():
+            t0 = time.perf_counter()
+            frames = next(it, None)
+            self.busy["recv"] += time.perf_counter() - t0
+            if frames is None:
+                self.eof = True
+                return
+            self._push_input("recv", frames)
+
+    def _make_output(self, out_depth: int):
+        # 딜레이 라인: out_depth 블록 + 재생 중 1개 + dsp 가 쓰는 중 1개
+        self.q_out = FrameRing(out_depth + 2, self.chunk, delay=self.prefill, name="dsp→play")
+
+    @property
+    def delay(self) -> int:
+        return self.q_out.delay
+
+    @delay.setter
+    def delay(self, n: int):
+        # 재생 중에 바꿔도 됨: 늘리면 그만큼 무음을 끼워 넣고, 줄이면 오래된 블록을 건너뜀
+        self.q_out.delay = n
+
+    def _emit(self, frames) -> bool:
+        # process() 결과를 딜레이 라인 슬롯에 바로 복사 (출력 버퍼 풀 / 청크별 배열 없음)
+        q_out = self.q_out
+        t0 = time.perf_counter()
+        out = self.process(frames)
+        self.busy["dsp"] += time.perf_counter() - t0
+        self.items["dsp"] += 1
+        slot = q_out.claim()
+        if slot is None:
+            self.stalls["dsp"] += 1  # 재생 단계가 밀려 있음 → 자리 날 때까지 대기
+            while slot is None:
+                if self._stopped.is_set():
+                    return False
+                slot = q_out.claim(timeout=_STOP_POLL_SEC)
+        np.copyto(slot, out)
+        q_out.commit()
+        return True
+
+    def _output_loop(self):
+        q = self.q_out
+        while not self._stopped.is_set():
+            buf = q.peek(timeout=self.block_sec)
+            if buf is None:
+                if self._dsp_done and q.depth == 0:
+                    return  # 연결 종료 후 남은 블록까지 다 재생함
+                if not q.started:
+                    # 재생 시작 전 prefill 만큼 쌓일 때까지 대기 (연결이 끝났으면 남은 것부터 재생)
+                    q.started = self._dsp_done
+                    continue
+                if not self.pad_silence:
+                    continue
+                self.stalls["play"] += 1
+                buf = self._silence
+            t0 = time.perf_counter()
+            self.play(buf)
+            q.release()
+            self.busy["play"] += time.perf_counter() - t0
+            self.items["play"] += 1
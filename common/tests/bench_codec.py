@@ -0,0 +1,155 @@
+"""
+코덱 벤치마크 (common.codec): 인코딩 / 디코딩 속도, 비트레이트, 음질
+
+    python common/tests/bench_codec.py
+
+48 kHz mono, 10 ms (480 샘플) 프레임 기준. 신호 세 가지
+  - voice : 모음 비슷한 배음 (f0 가 천천히 바뀜) + 약한 잡음, 음절마다 켜졌다 꺼짐
+  - room  : 조용한 방 잡음 (RMS 50 정도)
+  - noise : 큰 백색 잡음 (압축이 가장 안 되는 경우)
+코덱마다 프레임당 인코딩 / 디코딩 시간과 실시간 대비 CPU, v2 헤더 (32 B) 포함 kbit/s, SNR (무손실은 일치 여부).
+마지막에 정상 상태 encode / decode 에서 새 메모리를 안 잡는지 (zlib 는 압축 결과 bytes 가 매번 새로 생겨서 제외),
+빈 프레임 (0 샘플) 이 왕복되는지, zlib 가 헤더 샘플 수보다 크게 풀리는 payload 를 거부하는지.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+import zlib
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+import common.codec as codec_module  # noqa: E402
+from common.codec import ALL_FORMATS, FORMAT_NAMES, FORMAT_ZLIB, make_codec  # noqa: E402
+from common.protocol import HEADER, META  # noqa: E402
+
+SAMPLE_RATE = 48000
+CHUNK = 480
+N_FRAMES = 500
+FRAME_SEC = CHUNK / SAMPLE_RATE
+# 무손실이 아닌 코덱의 최소 SNR (voice 기준)
+MIN_SNR = {"ulaw": 30.0, "adpcm": 20.0}
+
+
+def signals():
+    rng = np.random.default_rng(0)
+    n = CHUNK * N_FRAMES
+    t = np.arange(n) / SAMPLE_RATE
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    voice *= 6000 * (np.sin(2 * np.pi * 3 * t) > -0.3)
+    voice += rng.normal(0, 60, n)
+    return {
+        "voice": np.clip(voice, -32768, 32767).astype(np.int16),
+        "room": rng.normal(0, 50, n).astype(np.int16),
+        "noise": rng.normal(0, 8000, n).clip(-32768, 32767).astype(np.int16),
+    }
+
+
+def snr_db(ref: np.ndarray, got: np.ndarray) -> float:
+    ref = ref.astype(np.float64)
+    err = got.astype(np.float64) - ref
+    return 10 * np.log10(np.dot(ref, ref) / max(np.dot(err, err), 1e-9))
+
+
+def run(fmt, x):
+    frames = x.reshape(N_FRAMES, CHUNK)
+    enc, dec = make_codec(fmt, CHUNK), make_codec(fmt, CHUNK)
+    t0 = time.perf_counter()
+    payloads = [enc.encode(f).copy() for f in frames]
+    t_enc = (time.perf_counter() - t0) / N_FRAMES
+    t0 = time.perf_counter()
+    out = [dec.decode(p, CHUNK).copy() for p in payloads]
+    t_dec = (time.perf_counter() - t0) / N_FRAMES
+    nbytes = sum(p.shape[0] for p in payloads) + N_FRAMES * (HEADER.size + META.size)
+    kbps = 8 * nbytes / (N_FRAMES * FRAME_SEC) / 1000
+    return t_enc, t_dec, kbps, np.concatenate(out)
+
+
+def check_alloc(fmt) -> bool:
+    x = signals()["voice"].reshape(N_FRAMES, CHUNK)
+    enc, dec = make_codec(fmt, CHUNK), make_codec(fmt, CHUNK)
+
+    def loop(k0, k1):
+        for k in range(k0, k1):
+            dec.decode(enc.encode(x[k % N_FRAMES]), CHUNK)
+
+    loop(0, 100)
+    tracemalloc.start()
+    snap0 = tracemalloc.take_snapshot()
+    loop(100, 2100)
+    snap1 = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # codec.py 가 잡고 안 놓은 메모리만 셈 (tracemalloc 스냅샷 자체 / numpy 내부 캐시가 수백 B 씩 흔들려서)
+    only = (tracemalloc.Filter(True, codec_module.__file__),)
+    growth = sum(s.size_diff for s in snap1.filter_traces(only).compare_to(snap0.filter_traces(only), "lineno"))
+    passed = growth < 1024
+    print(f"alloc {FORMAT_NAMES[fmt]:5s}: {growth} B over 2000 frames  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_empty(fmt) -> bool:
+    enc, dec = make_codec(fmt, CHUNK), make_codec(fmt, CHUNK)
+    try:
+        y = dec.decode(enc.encode(np.zeros(0, dtype=np.int16)).copy(), 0)
+        passed = y.shape[0] == 0
+    except (IndexError, ValueError) as e:
+        passed, y = False, e
+    print(f"empty {FORMAT_NAMES[fmt]:5s}: 0 samples -> {y.shape[0] if passed else y}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_inflate_limit() -> bool:
+    # 헤더는 CHUNK 샘플인데 256 MB 로 풀리는 payload / 한 샘플 모자라게 풀리는 payload
+    dec = make_codec(FORMAT_ZLIB, CHUNK)
+    passed = True
+    for raw in (bytes(1 << 28), bytes(2 * CHUNK - 2)):
+        payload = np.frombuffer(zlib.compress(raw), dtype=np.uint8)
+        t0 = time.perf_counter()
+        try:
+            dec.decode(payload, CHUNK)
+            ok = False
+        except ValueError:
+            ok = True
+        passed &= ok
+        print(
+            f"inflate zlib: {len(raw)} B for {CHUNK} samples rejected in {(time.perf_counter() - t0) * 1e3:.2f} ms  "
+            f"{'OK' if ok else 'FAIL'}"
+        )
+    return passed
+
+
+def main():
+    ok = True
+    sigs = signals()
+    for name, x in sigs.items():
+        print(f"--- {name} (RMS {np.sqrt(np.mean(x.astype(np.float64) ** 2)):.0f})")
+        for fmt in ALL_FORMATS:
+            codec = FORMAT_NAMES[fmt]
+            t_enc, t_dec, kbps, y = run(fmt, x)
+            cpu = 100.0 * (t_enc + t_dec) / FRAME_SEC
+            if np.array_equal(y, x):
+                quality, passed = "lossless", True
+            else:
+                snr = snr_db(x, y)
+                quality = f"SNR {snr:5.1f} dB"
+                passed = fmt != FORMAT_ZLIB and (name != "voice" or snr >= MIN_SNR.get(codec, 0.0))
+            ok &= passed
+            print(
+                f"  {codec:5s}  enc {t_enc * 1e6:7.1f} us  dec {t_dec * 1e6:7.1f} us  ({cpu:5.2f} % CPU)  "
+                f"{kbps:6.1f} kbit/s  {quality}  {'OK' if passed else 'FAIL'}"
+            )
+    for fmt in ALL_FORMATS:
+        if fmt != FORMAT_ZLIB:
+            ok &= check_alloc(fmt)
+    for fmt in ALL_FORMATS:
+        ok &= check_empty(fmt)
+    ok &= check_inflate_limit()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+HPF 벤치마크: 기존 샘플 루프 HPF vs common.hpf 블록 HPF / Butterworth SOS
+
+    python common/tests/bench_hpf.py
+
+CHUNK=480 / 3840 에서 청크당 처리 시간과, 두 구현의 출력 차이를 출력한다.
+마지막에 fc = fs/4 (홀수 차수면 1차 섹션 극점이 0) 에서 Butterworth 가 샘플 루프 SOS 와 같은지도 확인.
+"""
+
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.hpf import ButterworthHPF, HighPassFilter, _OnePole  # noqa: E402
+
+SAMPLE_RATE = 48000
+HPF_FC = 150.0
+HPF_ORDER = 2
+N_CHUNKS = 50
+
+
+class LoopHighPassFilter:
+    # 송신/수신 스크립트에 복사돼 있던 기존 구현 (비교 기준)
+    def __init__(self, fs: float, fc: float):
+        dt = 1.0 / fs
+        rc = 1.0 / (2.0 * math.pi * fc)
+        self.alpha = rc / (rc + dt)
+        self.prev_x = 0.0
+        self.prev_y = 0.0
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        y = np.empty_like(x, dtype=np.float32)
+        prev_x = self.prev_x
+        prev_y = self.prev_y
+        a = self.alpha
+
+        for i, sample in enumerate(x):
+            v = a * (prev_y + sample - prev_x)
+            y[i] = v
+            prev_y = v
+            prev_x = sample
+
+        self.prev_x = prev_x
+        self.prev_y = prev_y
+        return y
+
+
+def run_chain(hpf_list, chunks):
+    outs = []
+    t0 = time.perf_counter()
+    for c in chunks:
+        xf = c.astype(np.float32)
+        for hpf in hpf_list:
+            xf = hpf.process(xf)
+        outs.append(xf)
+    dt = time.perf_counter() - t0
+    return np.concatenate(outs), dt / len(chunks)
+
+
+def loop_sos(sos: np.ndarray, x: np.ndarray) -> np.ndarray:
+    # 섹션마다 차분 방정식을 샘플 단위로 (비교 기준)
+    y = x.astype(np.float64)
+    for b0, b1, b2, _, a1, a2 in sos:
+        out = np.empty_like(y)
+        x1 = x2 = y1 = y2 = 0.0
+        for i, v in enumerate(y.tolist()):
+            o = b0 * v + b1 * x1 + b2 * x2 - a1 * y1 - a2 * y2
+            out[i] = o
+            x2, x1, y2, y1 = x1, v, y1, o
+        y = out
+    return y
+
+
+def check_quarter_band(rng) -> bool:
+    ok = True
+    x = np.clip(rng.normal(0, 8000, 4000), -32768, 32767).astype(np.int16)
+    chunks = [x[i:i + 480] for i in range(0, len(x), 480)]
+    for order in (1, 3, 5):
+        hpf = ButterworthHPF(SAMPLE_RATE, SAMPLE_RATE / 4, order)
+        out, _ = run_chain([hpf], chunks)
+        ref = loop_sos(hpf.sos, x)
+        err = np.max(np.abs(ref - out))
+        passed = err <= 1e-5 * np.max(np.abs(ref))
+        ok &= passed
+        print(f"fc=fs/4      butterworth order={order}  max|diff|={err:.2e} ({'OK' if passed else 'MISMATCH'})")
+
+    # libm 에 따라 tan(pi/4) 가 정확히 1 이면 극점이 정확히 0.0
+    pole = _OnePole(0.0)
+    v = np.arange(5, dtype=np.float64)
+    passed = np.array_equal(pole.run(v.copy()), v) and pole.w == 4.0
+    ok &= passed
+    print(f"pole=0       w[n] = v[n]  ({'OK' if passed else 'MISMATCH'})")
+    return ok
+
+
+def main():
+    rng = np.random.default_rng(0)
+    ok = True
+    for chunk in (480, 3840):
+        t = np.arange(chunk * N_CHUNKS) / SAMPLE_RATE
+        sig = 8000 * np.sin(2 * np.pi * 50 * t) + 3000 * np.sin(2 * np.pi * 1000 * t)
+        sig += rng.normal(0, 1000, sig.shape)
+        pcm = np.clip(sig, -32768, 32767).astype(np.int16)
+        chunks = [pcm[i:i + chunk] for i in range(0, len(pcm), chunk)]
+
+        ref, t_loop = run_chain([LoopHighPassFilter(SAMPLE_RATE, HPF_FC) for _ in range(HPF_ORDER)], chunks)
+        out, t_vec = run_chain([HighPassFilter(SAMPLE_RATE, HPF_FC) for _ in range(HPF_ORDER)], chunks)
+
+        err = np.max(np.abs(ref.astype(np.float64) - out))
+        tol = 1e-5 * np.max(np.abs(ref))
+        ok &= bool(err <= tol)
+        print(
+            f"CHUNK={chunk:5d}  loop {t_loop * 1e3:8.3f} ms/chunk   "
+            f"block {t_vec * 1e3:8.3f} ms/chunk   x{t_loop / t_vec:6.1f}   "
+            f"max|diff|={err:.2e} ({'OK' if err <= tol else 'MISMATCH'})"
+        )
+
+        # Butterworth SOS: 차수를 올려도 한 번의 호출로 처리
+        for order in (2, 4, 8):
+            _, t_sos = run_chain([ButterworthHPF(SAMPLE_RATE, HPF_FC, order)], chunks)
+            print(f"             butterworth order={order}  {t_sos * 1e3:8.3f} ms/chunk")
+
+    ok &= check_quarter_band(rng)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
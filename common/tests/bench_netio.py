@@ -0,0 +1,118 @@
+"""
+수신 프레이밍 벤치마크: 기존 `buffer += recv(4096)` vs common.netio.FrameReader (recv_into)
+
+    python common/tests/bench_netio.py
+
+로컬 socketpair 로 송신 스레드가 패킷을 최대한 빨리 보내고, 수신 쪽은 프레임을 꺼내서 합계만 낸다.
+  - raw   : 헤더 없이 CHUNK(480) int16 = 960 바이트 (pc_receiver_final / pi_B_receiver_final)
+  - rx    : '!II' 헤더 8 + 3840 int16 = 7688 바이트 (rx_test / rx_no_oled)
+처리량(MB/s), 패킷당 시간, recv 호출 수를 출력하고, 두 방식이 받은 내용이 같은지 확인한다.
+"""
+
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.netio import FrameReader  # noqa: E402
+
+N_PACKETS = 20000
+HEADER = "!II"
+
+
+def make_stream(n_packets: int, samples: int, header: bool) -> bytes:
+    rng = np.random.default_rng(0)
+    hdr = struct.Struct(HEADER)
+    parts = []
+    for i in range(n_packets):
+        if header:
+            parts.append(hdr.pack(i % 4, i))
+        parts.append(rng.integers(-3000, 3000, samples, dtype=np.int16).tobytes())
+    return b"".join(parts)
+
+
+def start_sender(sock, stream: bytes):
+    def run():
+        # 송신은 적당한 크기로 잘라서 (실제 TCP 처럼 경계가 프레임과 안 맞게)
+        mv = memoryview(stream)
+        for i in range(0, len(mv), 5000):
+            sock.sendall(mv[i:i + 5000])
+        sock.shutdown(socket.SHUT_WR)
+
+    t = threading.Thread(target=run)
+    t.start()
+    return t
+
+
+def recv_legacy(conn, payload_bytes: int, header: bool):
+    # 수신 스크립트에 있던 기존 방식
+    header_size = struct.calcsize(HEADER) if header else 0
+    frame_bytes = header_size + payload_bytes
+    buffer = b""
+    total, n, calls = 0, 0, 0
+    while True:
+        data = conn.recv(4096)
+        calls += 1
+        if not data:
+            break
+        buffer += data
+        while len(buffer) >= frame_bytes:
+            if header:
+                struct.unpack(HEADER, buffer[:header_size])
+            audio_bytes = buffer[header_size:frame_bytes]
+            buffer = buffer[frame_bytes:]
+            total += int(np.frombuffer(audio_bytes, dtype=np.int16).sum(dtype=np.int64))
+            n += 1
+    return total, n, calls
+
+
+def recv_reader(conn, payload_bytes: int, header: bool):
+    reader = FrameReader(conn, payload_bytes, header=HEADER if header else None)
+    total = 0
+    while True:
+        got = reader.read_packet()
+        if got is None:
+            break
+        _, frames = got
+        total += int(frames.sum(dtype=np.int64))
+    return total, reader.frames, reader.recv_calls + 1  # + 마지막 EOF recv
+
+
+def run(name: str, recv_fn, stream: bytes, payload_bytes: int, header: bool):
+    a, b = socket.socketpair()
+    t = start_sender(a, stream)
+    t0 = time.perf_counter()
+    total, n, calls = recv_fn(b, payload_bytes, header)
+    elapsed = time.perf_counter() - t0
+    t.join()
+    a.close()
+    b.close()
+    mb_s = len(stream) / elapsed / 1e6
+    print(f"  {name:<12}: {mb_s:8.1f} MB/s, {elapsed / n * 1e6:6.2f} us/packet, {calls} recv calls")
+    return total, n
+
+
+def bench(label: str, samples: int, header: bool):
+    payload_bytes = samples * 2
+    n_packets = N_PACKETS if samples <= 480 else N_PACKETS // 4
+    stream = make_stream(n_packets, samples, header)
+    print(f"{label} ({n_packets} packets x {len(stream) // n_packets} B)")
+    ref = run("legacy", recv_legacy, stream, payload_bytes, header)
+    got = run("FrameReader", recv_reader, stream, payload_bytes, header)
+    print(f"  same data: {ref == got}")
+    return ref == got
+
+
+def main():
+    ok = bench("raw", 480, header=False)
+    ok &= bench("rx", 3840, header=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
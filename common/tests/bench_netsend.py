@@ -0,0 +1,195 @@
+"""
+송신 벤치마크: 기존 `sendall(header + body.tobytes())` vs common.netio.PacketWriter (이어붙이기 + sendall / sendmsg)
+
+    python common/tests/bench_netsend.py
+
+loopback TCP 로 보내고, 받는 스레드는 recv_into 로 다 받아서 보낸 내용과 같은지 확인한다.
+  - rx  : '!II' 헤더 + 3840 int16 (pc_sender_hpf / pc_sender_RAW / pc_fake)
+          기존: tobytes (7680 B) + 헤더 이어붙이기 (7688 B) 복사
+  - raw : 헤더 없이 480 int16 (pi_a_sender_filtered_gpio 계열)
+          기존: astype(np.int16) (960 B) + tobytes (960 B) 복사
+  - big : '!II' 헤더 + 32768 int16 (PacketWriter 가 sendmsg 로 넘어가는 크기, netio._SENDMSG_MIN 이상)
+처리량, 송신 스레드 CPU 시간/패킷, "사용자 공간에서 복사한 바이트/초" 를 출력한다.
+헤더가 있으면 PacketWriter (작은 패킷은 기존과 같은 이어붙이기 + sendall, 큰 패킷은 sendmsg) 와
+sendmsg 로만 보낸 것을 같이 재서 _SENDMSG_MIN 경계가 맞는지 본다 (작은 패킷은 앞쪽이, 큰 패킷은 sendmsg 가 빨라야 함).
+partial : sendmsg 가 일부만 보낸 경우(한 번에 최대 N 바이트)에도 이어서 보낸 내용이 맞는지 확인.
+"""
+
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.netio import PacketWriter  # noqa: E402
+
+HEADER = "!II"
+N_PACKETS = 20000
+# 방식마다 번갈아 몇 번 돌려서 중앙값 (한 번만 재면 스케줄링 / 받는 스레드와의 GIL 경합으로 1 us 넘게 흔들림)
+REPEATS = 3
+
+
+def make_blocks(n: int, samples: int):
+    rng = np.random.default_rng(0)
+    return [rng.integers(-3000, 3000, samples, dtype=np.int16) for _ in range(n)]
+
+
+def expected_stream(blocks, header: bool) -> bytes:
+    hdr = struct.Struct(HEADER)
+    parts = []
+    for i, b in enumerate(blocks):
+        if header:
+            parts.append(hdr.pack(i % 4, i))
+        parts.append(b.tobytes())
+    return b"".join(parts)
+
+
+def start_receiver(sock, size: int, slow: bool = False):
+    buf = bytearray(size)
+    mv = memoryview(buf)
+    got = [0]
+
+    def run():
+        while got[0] < size:
+            n = sock.recv_into(mv[got[0]:got[0] + 1000] if slow else mv[got[0]:])
+            if n == 0:
+                break
+            got[0] += n
+            if slow:
+                time.sleep(0.0002)
+
+    t = threading.Thread(target=run)
+    t.start()
+    return t, buf
+
+
+def send_legacy(sock, blocks, header: bool):
+    for i, b in enumerate(blocks):
+        if header:
+            sock.sendall(struct.pack(HEADER, i % 4, i) + b.tobytes())
+        else:
+            sock.sendall(b.astype(np.int16).tobytes())
+
+
+def send_writer(sock, blocks, header: bool, sendmsg_min: int = None):
+    writer = PacketWriter(sock, header=HEADER if header else None)
+    if sendmsg_min is not None:
+        writer.sendmsg_min = sendmsg_min
+    for i, b in enumerate(blocks):
+        if header:
+            writer.send(b, i % 4, i)
+        else:
+            writer.send(b)
+    return writer
+
+
+def tcp_pair():
+    # 실제 송신과 같은 TCP (loopback)
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(1)
+    a = socket.create_connection(srv.getsockname())
+    a.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    b, _ = srv.accept()
+    srv.close()
+    return a, b
+
+
+def run_once(send_fn, blocks, header: bool, expect: bytes):
+    a, b = tcp_pair()
+    t, buf = start_receiver(b, len(expect))
+    t0 = time.perf_counter()
+    c0 = time.thread_time()
+    send_fn(a, blocks, header)
+    cpu = time.thread_time() - c0
+    t.join()
+    elapsed = time.perf_counter() - t0
+    a.close()
+    b.close()
+    return elapsed, cpu, bytes(buf) == expect
+
+
+def run(variants, blocks, header: bool):
+    # variants: (이름, 송신 함수, 패킷당 복사 바이트). 번갈아 REPEATS 번 돌리고 방식별 중앙값
+    expect = expected_stream(blocks, header)
+    results = {name: [] for name, _, _ in variants}
+    for _ in range(REPEATS):
+        for name, send_fn, _ in variants:
+            results[name].append(run_once(send_fn, blocks, header, expect))
+    ok = True
+    for name, _, copied_per_packet in variants:
+        elapsed = float(np.median([r[0] for r in results[name]]))
+        cpu = float(np.median([r[1] for r in results[name]]))
+        same = all(r[2] for r in results[name])
+        ok &= same
+        pps = len(blocks) / elapsed
+        print(
+            f"  {name:<12}: {len(expect) / elapsed / 1e6:8.1f} MB/s sent, sender CPU {cpu / len(blocks) * 1e6:5.2f} us/packet, "
+            f"copied {pps * copied_per_packet / 1e6:7.1f} MB/s  {'OK' if same else 'FAIL'}"
+        )
+    return ok
+
+
+def send_sendmsg(sock, blocks, header: bool):
+    # PacketWriter 의 sendmsg 경로만 (패킷 크기와 상관없이)
+    return send_writer(sock, blocks, header, sendmsg_min=0)
+
+
+def bench(label: str, samples: int, header: bool, legacy_copy: int):
+    blocks = make_blocks(max(200, N_PACKETS * 480 // samples), samples)
+    size = samples * 2 + (8 if header else 0)
+    print(f"{label} ({len(blocks)} packets x {size} B, median of {REPEATS})")
+    # 헤더가 있는 작은 패킷은 기존과 같이 tobytes + 이어붙이기 (복사 2 번), sendmsg / 헤더 없음은 복사 없음
+    copied = legacy_copy if header and size < PacketWriter.sendmsg_min else 0
+    variants = [("legacy", send_legacy, legacy_copy), ("PacketWriter", send_writer, copied)]
+    if header:
+        variants.append(("sendmsg", send_sendmsg, 0))
+    return run(variants, blocks, header)
+
+
+class _TrickleSock:
+    # sendmsg 가 한 번에 최대 limit 바이트만 보내는 소켓 (커널 송신 버퍼가 거의 찬 상황)
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.data = bytearray()
+
+    def sendmsg(self, bufs):
+        left = self.limit
+        for b in bufs:
+            b = memoryview(b).cast("B")
+            n = min(left, len(b))
+            self.data += b[:n]
+            left -= n
+            if left == 0:
+                break
+        return self.limit - left
+
+
+def check_partial(n: int = 50) -> bool:
+    blocks = make_blocks(n, 3840)
+    expect = expected_stream(blocks, True)
+    ok = True
+    # 헤더 중간 / 헤더 경계 / body 중간에서 잘리는 경우를 모두 지나가게
+    for limit in (3, 8, 1000, 7687):
+        sock = _TrickleSock(limit)
+        writer = send_writer(sock, blocks, True, sendmsg_min=0)
+        passed = bytes(sock.data) == expect and writer.partial_sends > 0
+        print(f"partial  : sendmsg <= {limit:>4} B, {writer.format_stats()}  {'OK' if passed else 'FAIL'}")
+        ok &= passed
+    return ok
+
+
+def main():
+    ok = bench("rx", 3840, True, legacy_copy=2 * 3840 * 2 + 8)
+    ok &= bench("raw", 480, False, legacy_copy=2 * 480 * 2)
+    ok &= bench("big", 32768, True, legacy_copy=2 * 32768 * 2 + 8)
+    ok &= check_partial()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+샘플레이트 변환 벤치마크: common.resample.PolyphaseResampler vs 직접 구현 (0 끼우기 + 전체 FIR + 솎아내기)
+
+    python common/tests/bench_resample.py
+
+48k → 16k, 16k → 48k, 44.1k → 48k (+ 48k → 44.1k) 각각
+- 10 ms 블록당 처리 시간과 실시간 대비 CPU 비율
+- 1 kHz 사인 SNR (필터 지연만큼 맞춰서 이론 파형과 비교), 줄이는 쪽은 새 나이퀴스트 1.1 배 사인이 얼마나 줄어드는지 (접힘)
+- 블록 길이를 아무렇게나 잘라 넣어도 한 번에 돌린 것과 출력이 같은지 (블록 사이 상태 유지)
+- 직접 구현과 출력 차이 (±1 LSB 이내) 와 속도 차이
+- 정상 상태 process() 에서 새 메모리를 안 잡는지
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.resample import PolyphaseResampler  # noqa: E402
+
+CASES = ((48000, 16000), (16000, 48000), (44100, 48000), (48000, 44100))
+BLOCK_MS = 10
+N_BLOCKS = 1000
+N_DIRECT = 3  # 직접 구현은 느려서 몇 블록만
+
+
+class DirectResampler:
+    # 비교 기준: 블록을 L 배로 0 을 끼워 늘리고 프로토타입 필터 전체를 컨볼루션한 뒤 M 개마다 고름
+    def __init__(self, rs: PolyphaseResampler):
+        self.L, self.M = rs.up, rs.down
+        # Hr[p, i] = h[p + (K - 1 - i) * L] 를 되돌림
+        self.h = rs._h.T[::-1].ravel().astype(np.float64)
+        self.state = np.zeros(self.h.shape[0] - 1)
+        self.t = 0
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        n = x.shape[0]
+        u = np.zeros(n * self.L)
+        u[::self.L] = x
+        v = np.concatenate([self.state, u])
+        full = np.convolve(v, self.h, "valid")  # full[t] = 이번 블록 업샘플 시각 t 의 출력
+        y = full[self.t::self.M]
+        self.t = (self.t - n * self.L) % self.M
+        self.state = v[v.shape[0] - self.state.shape[0]:]
+        return np.clip(np.rint(y), -32768, 32767).astype(np.int16)
+
+
+def tone(rate: int, freq: float, n: int) -> np.ndarray:
+    t = np.arange(n) / rate
+    return (10000 * np.sin(2 * np.pi * freq * t)).astype(np.int16)
+
+
+def sine_snr(y: np.ndarray, rate: int, freq: float, delay_ms: float) -> float:
+    t = np.arange(y.shape[0]) / rate - delay_ms / 1000.0
+    ref = 10000 * np.sin(2 * np.pi * freq * t)
+    skip = rate // 100  # 앞쪽 필터 채워지는 구간 제외
+    e = y[skip:] - ref[skip:]
+    return 10 * np.log10(np.dot(ref[skip:], ref[skip:]) / np.dot(e, e))
+
+
+def check_alloc(in_rate: int, out_rate: int) -> bool:
+    block = in_rate * BLOCK_MS // 1000
+    rs = PolyphaseResampler(in_rate, out_rate, max_frames=block)
+    blocks = tone(in_rate, 1000.0, block * 50).reshape(50, block)
+
+    def run(n):
+        for k in range(n):
+            rs.process(blocks[k % 50])
+
+    run(100)
+    tracemalloc.start()
+    snap0 = tracemalloc.take_snapshot()
+    run(2000)
+    snap1 = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    growth = sum(s.size_diff for s in snap1.compare_to(snap0, "lineno"))
+    passed = growth < 1024
+    print(f"alloc {in_rate:5d} -> {out_rate:5d}: {growth} B over 2000 blocks  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def main():
+    ok = True
+    rng = np.random.default_rng(0)
+    for in_rate, out_rate in CASES:
+        block = in_rate * BLOCK_MS // 1000
+        rs = PolyphaseResampler(in_rate, out_rate, max_frames=block)
+        x = tone(in_rate, 1000.0, block * N_BLOCKS)
+        blocks = x.reshape(N_BLOCKS, block)
+
+        t0 = time.perf_counter()
+        y = np.concatenate([rs.process(b).copy() for b in blocks])
+        t_poly = (time.perf_counter() - t0) / N_BLOCKS
+        cpu = 100.0 * t_poly / (BLOCK_MS / 1000.0)
+        snr = sine_snr(y.astype(np.float64), out_rate, 1000.0, rs.delay_ms)
+
+        # 블록을 1 ~ 2 * block 길이로 아무렇게나 잘라도 같은 출력인지
+        ragged = PolyphaseResampler(in_rate, out_rate, max_frames=block)
+        cuts = np.cumsum(rng.integers(1, 2 * block, N_BLOCKS))
+        cuts = cuts[cuts < x.shape[0]]
+        y2 = np.concatenate([ragged.process(c).copy() for c in np.split(x, cuts)])
+        same = np.array_equal(y, y2) and abs(y.shape[0] - x.shape[0] * out_rate / in_rate) <= 1
+
+        direct = DirectResampler(PolyphaseResampler(in_rate, out_rate, max_frames=block))
+        t0 = time.perf_counter()
+        yd = np.concatenate([direct.process(b) for b in blocks[:N_DIRECT]])
+        t_direct = (time.perf_counter() - t0) / N_DIRECT
+        diff = int(np.abs(yd.astype(np.int32) - y[:yd.shape[0]]).max())
+
+        passed = snr > 70.0 and same and diff <= 1
+        ok &= passed
+        print(
+            f"{in_rate:5d} -> {out_rate:5d}  L/M {rs.up}/{rs.down}, {rs.taps} taps/phase, delay {rs.delay_ms:.2f} ms\n"
+            f"               polyphase {t_poly * 1e6:7.1f} us/block ({cpu:.2f} % CPU)   "
+            f"direct {t_direct * 1e3:8.2f} ms/block   x{t_direct / t_poly:7.1f}\n"
+            f"               1 kHz SNR {snr:5.1f} dB, ragged blocks {'same' if same else 'DIFFERENT'}, "
+            f"max|diff| vs direct {diff} LSB  {'OK' if passed else 'FAIL'}"
+        )
+        if out_rate < in_rate:
+            # 새 나이퀴스트 위 신호가 접혀 들어오지 않는지 (새 나이퀴스트 0.9 ~ 1.1 배는 전이 대역)
+            hi = min(1.1 * out_rate / 2, 0.99 * in_rate / 2)
+            alias = PolyphaseResampler(in_rate, out_rate, max_frames=block)
+            ya = np.concatenate([alias.process(b).copy() for b in tone(in_rate, hi, block * 100).reshape(100, block)])
+            rej = 20 * np.log10(10000 / (np.sqrt(2) * max(ya[out_rate // 100:].astype(np.float64).std(), 1e-3)))
+            passed = rej > 70.0
+            ok &= passed
+            print(f"               {hi / 1000:.1f} kHz (above new Nyquist) rejected {rej:5.1f} dB  {'OK' if passed else 'FAIL'}")
+    for in_rate, out_rate in CASES[:3]:
+        ok &= check_alloc(in_rate, out_rate)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
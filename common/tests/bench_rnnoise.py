@@ -0,0 +1,113 @@
+"""
+RNNoise 호출 방식 벤치마크 (librnnoise 필요)
+
+    python common/tests/bench_rnnoise.py
+
+- per-frame : 기존 방식. 480개씩 잘라서 프레임마다 POINTER 캐스팅 + 출력 배열 생성 후 np.concatenate
+- batch     : common.rnnoise_driver.RNNoiseBatch (고정 버퍼 + 미리 계산한 포인터 오프셋)
+
+pyrnnoise 가 설치돼 있으면 PC 수신부 방식도 비교한다 (CHUNK=480):
+- denoise_chunk : 기존 방식. 청크마다 denoise_chunk() 제너레이터를 만들고 첫 프레임만 받고 break
+- stream        : common.rnnoise_stream.RNNoiseStream (스트림당 한 번 생성)
+
+마지막으로 common.rnnoise_backend.select_backend() 의 백엔드별 측정 결과를 출력한다.
+"""
+
+import ctypes
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.rnnoise_driver import FRAME_SIZE, RNNoiseBatch, load_rnnoise  # noqa: E402
+from common.rnnoise_backend import select_backend  # noqa: E402
+from common.rnnoise_stream import RNNoiseStream  # noqa: E402
+
+CHUNK = 3840
+N_CHUNKS = 100
+
+
+def per_frame(lib, state, chunk):
+    parts = []
+    probs = []
+    for i in range(0, len(chunk), FRAME_SIZE):
+        x = chunk[i:i + FRAME_SIZE].astype(np.float32)
+        out = np.empty_like(x)
+        in_buf = x.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
+        out_buf = out.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
+        probs.append(lib.rnnoise_process_frame(state, out_buf, in_buf))
+        parts.append(out)
+    return np.concatenate(parts), np.array(probs, dtype=np.float32)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    chunks = [rng.integers(-8000, 8000, CHUNK).astype(np.int16) for _ in range(N_CHUNKS)]
+
+    lib = load_rnnoise()
+    state = lib.rnnoise_create(None)
+    t0 = time.perf_counter()
+    ref = [per_frame(lib, state, c) for c in chunks]
+    t_frame = (time.perf_counter() - t0) / N_CHUNKS
+    lib.rnnoise_destroy(state)
+
+    batch = RNNoiseBatch(max_frames=CHUNK // FRAME_SIZE, lib=lib)
+    err = 0.0
+    t_batch = 0.0
+    for c, (ref_out, ref_probs) in zip(chunks, ref):
+        t0 = time.perf_counter()
+        out, probs = batch.process(c)
+        t_batch += time.perf_counter() - t0
+        err = max(err, float(np.max(np.abs(out - ref_out))), float(np.max(np.abs(probs - ref_probs))))
+    t_batch /= N_CHUNKS
+
+    print(f"CHUNK={CHUNK} ({CHUNK // FRAME_SIZE} frames)")
+    print(f"  per-frame : {t_frame * 1e3:7.3f} ms/chunk")
+    print(f"  batch     : {t_batch * 1e3:7.3f} ms/chunk   (max|diff| = {err:.2e})")
+    print(f"  overhead saved: {(t_frame - t_batch) * 1e6:.1f} us/chunk")
+
+    bench_pyrnnoise(chunks)
+
+    # 설치된 백엔드별 프레임당 시간 (스크립트 시작 시 자동 선택과 같은 측정)
+    print("backend auto-select")
+    select_backend(max_frames=CHUNK // FRAME_SIZE, tag="bench").close()
+
+
+def bench_pyrnnoise(chunks):
+    try:
+        from pyrnnoise import RNNoise
+    except ImportError:
+        print("pyrnnoise not installed → denoise_chunk 비교 생략")
+        return
+
+    frames = [c[i:i + FRAME_SIZE] for c in chunks[:20] for i in range(0, len(c), FRAME_SIZE)]
+
+    denoiser = RNNoise(sample_rate=48000)
+    ref = []
+    t0 = time.perf_counter()
+    for x in frames:
+        y = x
+        for _, denoised in denoiser.denoise_chunk(x.reshape(1, -1)):
+            y = denoised[0].astype(np.int16)
+            break
+        ref.append(y)
+    t_gen = (time.perf_counter() - t0) / len(frames)
+
+    stream = RNNoiseStream(block_size=FRAME_SIZE, backend="pyrnnoise")
+    out = []
+    t0 = time.perf_counter()
+    for x in frames:
+        y, _ = stream.process(x)
+        out.append(y.copy())
+    t_stream = (time.perf_counter() - t0) / len(frames)
+
+    err = int(np.max(np.abs(np.concatenate(ref).astype(np.int32) - np.concatenate(out))))
+    print(f"CHUNK={FRAME_SIZE} (pyrnnoise)")
+    print(f"  denoise_chunk : {t_gen * 1e3:7.3f} ms/chunk")
+    print(f"  stream        : {t_stream * 1e3:7.3f} ms/chunk   (max|diff| = {err} LSB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+BlockRing / CallbackCapture 동작 확인 (오디오 장치 없이 콜백을 직접 호출)
+
+    python common/tests/check_capture.py
+
+- order   : 콜백 스레드가 넣은 블록이 순서/누락 없이, 타임스탬프와 함께 read() 로 나오는지
+- slow tx : 송신 루프가 막힌 동안에도 콜백은 바로 리턴하고, 넘친 블록은 ring drops 로 세는지
+- timeout : 블록이 없으면 read(timeout) 이 None 을 돌려주는지
+- alloc   : 콜백에서 새 메모리를 잡지 않는지 (tracemalloc)
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.capture import CallbackCapture  # noqa: E402
+
+SAMPLE_RATE = 48000
+CHUNK = 480
+CHANNELS = 2
+
+
+class _Status:
+    # sounddevice.CallbackFlags 대신
+    input_overflow = False
+
+
+def make_block(i: int) -> np.ndarray:
+    # (CHUNK, CHANNELS) 입력, 첫 채널에 블록 번호
+    block = np.zeros((CHUNK, CHANNELS), dtype=np.int16)
+    block[:, 0] = i
+    block[:, 1] = -1
+    return block
+
+
+def check_order(n_blocks: int = 2000) -> bool:
+    cap = CallbackCapture(SAMPLE_RATE, channels=CHANNELS, blocksize=CHUNK, buffer_sec=0.1, warn=False)
+    blocks = [make_block(i % 30000) for i in range(n_blocks)]
+    status = _Status()
+
+    def device():
+        for b in blocks:
+            # 링버퍼(10블록)가 넘치지 않을 정도로만 앞서감
+            while cap.ring.available >= cap.ring.n_blocks - 1:
+                time.sleep(0.0001)
+            cap._callback(b, CHUNK, None, status)
+
+    t = threading.Thread(target=device)
+    t.start()
+    got, stamps = [], []
+    for _ in range(n_blocks):
+        frames, ts = cap.read(timeout=1.0)
+        got.append(int(frames[0]) if (frames == frames[0]).all() else -1)
+        stamps.append(ts)
+    t.join()
+    passed = (
+        got == [i % 30000 for i in range(n_blocks)]
+        and all(b >= a for a, b in zip(stamps, stamps[1:]))
+        and cap.ring.drops == 0
+    )
+    print(f"order    : {n_blocks} blocks through {cap.ring.n_blocks}-block ring  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_slow_tx(n_blocks: int = 60) -> bool:
+    cap = CallbackCapture(SAMPLE_RATE, channels=CHANNELS, blocksize=CHUNK, buffer_sec=0.2, warn=False)
+    status = _Status()
+    # 송신이 멈춘 상태에서 콜백만 n_blocks 번 (20블록 넘게는 못 쌓음)
+    worst = 0.0
+    for i in range(n_blocks):
+        t0 = time.perf_counter()
+        cap._callback(make_block(i + 1), CHUNK, None, status)
+        worst = max(worst, time.perf_counter() - t0)
+    # 다시 읽기 시작하면 가장 오래된 블록부터 나와야 함 (넘친 새 블록이 버려짐)
+    got = []
+    while True:
+        r = cap.read(timeout=0)
+        if r is None:
+            break
+        got.append(int(r[0][0]))
+    n = cap.ring.n_blocks
+    passed = (
+        got == list(range(1, n + 1))
+        and cap.ring.drops == n_blocks - n
+        and cap.lost == n_blocks - n
+        and worst < 0.005
+    )
+    print(
+        f"slow tx  : kept {len(got)}, dropped {cap.ring.drops}, "
+        f"worst callback {worst * 1e6:.0f} us  {'OK' if passed else 'FAIL'}"
+    )
+    print(cap.format_stats())
+    return passed
+
+
+def check_timeout() -> bool:
+    cap = CallbackCapture(SAMPLE_RATE, channels=CHANNELS, blocksize=CHUNK, warn=False)
+    t0 = time.perf_counter()
+    r = cap.read(timeout=0.05)
+    elapsed = time.perf_counter() - t0
+    passed = r is None and 0.04 < elapsed < 0.5
+    print(f"timeout  : read(0.05) → None after {elapsed * 1e3:.0f} ms  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_alloc() -> bool:
+    cap = CallbackCapture(SAMPLE_RATE, channels=CHANNELS, blocksize=CHUNK, warn=False)
+    block = make_block(7)
+    status = _Status()
+
+    def round_():
+        for _ in range(200):
+            cap._callback(block, CHUNK, None, status)
+            cap.read(timeout=0)
+
+    round_()
+    tracemalloc.start()
+    # 첫 바퀴는 캐시 등 일회성 할당이 섞일 수 있어서 두 번째 바퀴 값을 사용
+    for _ in range(2):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        round_()
+        cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    growth, peak = cur - base, peak - base
+    # 블록 하나(960 B)보다 작으면 콜백/read 안에서 배열을 만들지 않는 것
+    passed = growth < 256 and peak < CHUNK * 2
+    print(f"alloc    : growth {growth} B, peak {peak} B  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def main():
+    ok = check_order()
+    ok &= check_slow_tx()
+    ok &= check_timeout()
+    ok &= check_alloc()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+CatchUp (지연 따라잡기) + CallbackPlayer 시뮬레이션 (오디오 장치 / 네트워크 없이)
+
+    python common/tests/check_catchup.py
+
+10 ms 블록을 보내다가 3 초에 Wi-Fi 가 1 초 멈추고, 밀린 100 블록이 TCP 로 한꺼번에 도착한다.
+재생 콜백은 10 ms 마다 블록 하나를 꺼낸다. 목표 지연은 prefill 100 ms.
+- none     : catch-up 없이는 1 초 넘게 늘어난 지연이 끝까지 남는지 (비교용)
+- pauses   : 말 사이에 쉬는 구간이 있으면 method="silence" 가 무음 블록만 버려서 목표로 돌아오는지
+- talk     : 쉬지 않고 말하면 method="silence" 는 patience 뒤에 그냥 버리고 (forced),
+- wsola    : method="wsola" 는 버리지 않고 블록을 짧게 만들어서 돌아오는지
+- splice   : WSOLA 로 줄인 블록에 이음매 튐(샘플 간 차이)이 원래 파형보다 크게 생기지 않는지
+- prob     : 송신부 확률이 낮으면 무음, NO_PROB (RNNoise 안 돌림) 이면 RMS 로 판단하는지
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.catchup import CatchUp  # noqa: E402
+from common.playback import CallbackPlayer  # noqa: E402
+from common.protocol import NO_PROB  # noqa: E402
+
+SAMPLE_RATE = 48000
+CHUNK = 480
+BLOCK_SEC = CHUNK / SAMPLE_RATE
+SECONDS = 10
+PREFILL = 10 * CHUNK  # 100 ms
+STALL_AT, STALL_SEC = 3.0, 1.0
+
+
+def voiced(n_blocks: int, f0: float = 150.0) -> np.ndarray:
+    t = np.arange(n_blocks * CHUNK) / SAMPLE_RATE
+    x = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+    return (5000 * x).astype(np.int16).reshape(n_blocks, CHUNK)
+
+
+def with_pauses(n_blocks: int) -> np.ndarray:
+    # 300 ms 말 / 200 ms 쉼 반복 (쉬는 구간은 작은 잡음)
+    x = voiced(n_blocks)
+    rng = np.random.default_rng(0)
+    for k in range(n_blocks):
+        if k % 50 >= 30:
+            x[k] = rng.integers(-30, 30, CHUNK)
+    return x
+
+
+def simulate(blocks: np.ndarray, catchup=None):
+    n = blocks.shape[0]
+    player = CallbackPlayer(SAMPLE_RATE, blocksize=CHUNK, prefill=PREFILL, catchup=catchup)
+    send = np.arange(n) * BLOCK_SEC + 0.001
+    arrive = send.copy()
+    stalled = (send >= STALL_AT) & (send < STALL_AT + STALL_SEC)
+    arrive[stalled] = STALL_AT + STALL_SEC  # 멈춘 동안 보낸 블록은 풀릴 때 한꺼번에 도착
+    mono = np.zeros(CHUNK, dtype=np.int16)
+
+    i = 0
+    latency = []
+    for k in range(n):
+        t_cb = k * BLOCK_SEC
+        while i < n and arrive[i] <= t_cb:
+            player.write(blocks[i])
+            i += 1
+        player._fill(mono)
+        latency.append(1000.0 * player.ring.available / SAMPLE_RATE)
+    latency = np.array(latency)
+    t = np.arange(n) * BLOCK_SEC
+    peak = float(latency.max())
+    end = float(latency[t >= SECONDS - 1].mean())
+    # 풀린 뒤 목표 + 블록 두 개 안쪽으로 돌아온 시각
+    back = t[(t > STALL_AT + STALL_SEC) & (latency <= 1000.0 * PREFILL / SAMPLE_RATE + 20.0)]
+    recover = float(back[0] - STALL_AT - STALL_SEC) if back.size else float("inf")
+    return player, peak, end, recover
+
+
+def report(label, blocks, catchup):
+    player, peak, end, recover = simulate(blocks, catchup)
+    extra = f", {catchup.format_stats()}" if catchup is not None else ""
+    print(f"{label:<9}: peak {peak:6.0f} ms, last second {end:6.1f} ms, back in {recover:.2f} s{extra}")
+    return player, end, recover
+
+
+def check_none() -> bool:
+    _, end, _ = report("none", with_pauses(SECONDS * 100), None)
+    passed = end > 900.0
+    print(f"           latency stays high without catch-up  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_pauses() -> bool:
+    catchup = CatchUp(SAMPLE_RATE, CHUNK, method="silence")
+    _, end, recover = report("pauses", with_pauses(SECONDS * 100), catchup)
+    passed = end < 120.0 and recover < 4.0 and catchup.forced_drops == 0 and catchup.reclaimed_ms >= 800.0
+    print(f"           {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_talk() -> bool:
+    catchup = CatchUp(SAMPLE_RATE, CHUNK, method="silence")
+    _, end, _ = report("talk", voiced(SECONDS * 100), catchup)
+    passed = end < 120.0 and catchup.forced_drops > 0 and catchup.silent_drops == 0
+    print(f"           {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_wsola() -> bool:
+    catchup = CatchUp(SAMPLE_RATE, CHUNK, method="wsola")
+    _, end, recover = report("wsola", voiced(SECONDS * 100), catchup)
+    passed = end < 120.0 and recover < 3.0 and catchup.compressed > 0 and catchup.forced_drops == 0
+    print(f"           {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_splice() -> bool:
+    catchup = CatchUp(SAMPLE_RATE, CHUNK, method="wsola")
+    worst = 0.0
+    for f0 in (90.0, 150.0, 230.0):
+        x = voiced(3, f0)
+        base = np.abs(np.diff(x.ravel().astype(np.int32))).max()
+        out = catchup.apply(x[1], level=100 * CHUNK, target=0).copy()
+        # 앞뒤 블록과 이어서 이음매까지 포함해 가장 큰 샘플 간 차이
+        joined = np.concatenate([x[0], out, x[2]]).astype(np.int32)
+        worst = max(worst, np.abs(np.diff(joined)).max() / base)
+    passed = worst < 1.3 and catchup.compressed == 3
+    print(f"splice   : max sample step {worst:.2f}x of the original  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_prob() -> bool:
+    catchup = CatchUp(SAMPLE_RATE, CHUNK, method="silence")
+    loud = voiced(1)[0]
+    quiet = np.zeros(CHUNK, dtype=np.int16)
+
+    def dropped(frames, prob):
+        return catchup.apply(frames, level=100 * CHUNK, target=0, prob=prob) is None
+
+    passed = (dropped(loud, 0.05) and not dropped(loud, 0.9)
+              and not dropped(loud, NO_PROB) and dropped(quiet, NO_PROB) and not dropped(loud, None))
+    print(f"prob     : low prob → silent, NO_PROB / None → RMS  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def main():
+    ok = check_none()
+    ok &= check_pauses()
+    ok &= check_talk()
+    ok &= check_wsola()
+    ok &= check_splice()
+    ok &= check_prob()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
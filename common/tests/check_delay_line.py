@@ -0,0 +1,128 @@
+"""
+FrameRing (딜레이 라인) 동작 확인
+
+    python common/tests/check_delay_line.py
+
+- delay  : delay 블록만큼 쌓이기 전에는 None, 그 뒤로는 넣은 순서대로 나오는지 (예전 deque 와 같은 지연)
+- view   : peek() 가 링 안 슬롯 view 를 돌려주고, 링 배열은 처음 잡은 그대로인지
+- grow   : 재생 중에 delay 를 늘리면 그만큼 무음 블록이 끼고 지연(depth)이 늘어나는지
+- shrink : 재생 중에 delay 를 줄이면 오래된 블록을 건너뛰고 지연이 줄어드는지
+- alloc  : 정상 상태 claim / commit / peek / release 에서 새 메모리를 안 잡는지
+"""
+
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.ring import FrameRing  # noqa: E402
+
+CHUNK = 480
+DELAY = 5
+
+
+def step(ring, value):
+    # 한 블록 넣고 한 블록 재생 (예전 delay_buffer.append → popleft 한 번)
+    slot = ring.claim()
+    slot.fill(value)
+    ring.commit()
+    buf = ring.peek()
+    out = None if buf is None else int(buf[0])
+    if buf is not None:
+        ring.release()
+    return out
+
+
+def check_delay() -> bool:
+    ring = FrameRing(16, CHUNK, delay=DELAY)
+    played = [step(ring, i + 1) for i in range(30)]
+    # delay 블록이 쌓인 다음부터 재생, 그 뒤로 depth 는 delay - 1 (방금 꺼낸 블록 반납 후)
+    passed = (
+        played[:DELAY - 1] == [None] * (DELAY - 1)
+        and played[DELAY - 1:] == list(range(1, 30 - DELAY + 2))
+        and ring.depth == DELAY - 1
+    )
+    print(f"delay    : first block after {DELAY} pushes, depth {ring.depth}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_view() -> bool:
+    ring = FrameRing(8, CHUNK)
+    blocks = ring._blocks
+    ring.push(np.full(CHUNK, 7, dtype=np.int16))
+    buf = ring.peek()
+    passed = np.shares_memory(buf, blocks) and int(buf[0]) == 7 and ring._blocks is blocks
+    ring.release()
+    print(f"view     : peek() shares ring memory  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_grow() -> bool:
+    ring = FrameRing(32, CHUNK, delay=DELAY)
+    blocks = ring._blocks
+    played = [step(ring, i + 1) for i in range(20)]
+    ring.delay = DELAY + 4
+    played += [step(ring, i + 21) for i in range(20)]
+    audio = [v for v in played if v]
+    passed = (
+        ring.inserted == 4
+        and played.count(0) == 4
+        and audio == list(range(1, audio[-1] + 1))
+        and ring.depth == DELAY + 4 - 1
+        and ring._blocks is blocks
+    )
+    print(f"grow     : delay {DELAY} -> {ring.delay}, inserted {ring.inserted}, depth {ring.depth}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_shrink() -> bool:
+    ring = FrameRing(32, CHUNK, delay=20)
+    played = [step(ring, i + 1) for i in range(40)]
+    ring.delay = 4
+    played += [step(ring, i + 41) for i in range(20)]
+    audio = [v for v in played if v]
+    gaps = [b - a for a, b in zip(audio, audio[1:]) if b - a != 1]
+    passed = ring.skipped == 16 and gaps == [17] and ring.depth == 4 - 1
+    print(f"shrink   : delay 20 -> 4, skipped {ring.skipped}, depth {ring.depth}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_alloc() -> bool:
+    ring = FrameRing(64, CHUNK, delay=DELAY)
+    block = np.ones(CHUNK, dtype=np.int16)
+    out = np.zeros(CHUNK, dtype=np.int16)
+
+    def run(n):
+        for _ in range(n):
+            np.copyto(ring.claim(), block)
+            ring.commit()
+            buf = ring.peek()
+            if buf is not None:
+                np.copyto(out, buf)
+                ring.release()
+
+    run(1000)
+    tracemalloc.start()
+    snap0 = tracemalloc.take_snapshot()
+    run(3000)
+    snap1 = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    growth = sum(s.size_diff for s in snap1.compare_to(snap0, "lineno"))
+    passed = growth < 1024
+    print(f"alloc    : {growth} B over 3000 blocks  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def main():
+    ok = check_delay()
+    ok &= check_view()
+    ok &= check_grow()
+    ok &= check_shrink()
+    ok &= check_alloc()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+DriftEstimator + LinearResampler (클럭 드리프트 보정) 시뮬레이션 (가상 시계, 오디오 장치 없이)
+
+    python common/tests/check_drift.py
+
+재생 콜백은 10 ms 마다 (수신 DAC 클럭), 송신 블록은 10 ms / (1 + ppm) 마다 (송신 마이크 클럭) 온다.
+도착 시각은 ±2 ms 흔들림. 목표 깊이는 prefill 100 ms, 10 분 동안 돌린다.
+- none  : 보정 없이 +ppm 이면 깊이가 계속 늘고 (200 ppm 이면 10 분에 120 ms), -ppm 이면 결국 underrun
+- drift : 보정하면 마지막 1 분 평균 깊이가 목표 ± 블록 하나 안쪽, underrun 없음, 추정 ppm 이 실제에 가까운지
+- tone  : 보정 중에도 출력 사인파에 튀는 곳(샘플 간 차이 증가)이 없는지
+- alloc : 정상 상태 write(리샘플) 에서 새 메모리를 안 잡는지
+"""
+
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.drift import DriftEstimator  # noqa: E402
+from common.playback import CallbackPlayer  # noqa: E402
+
+SAMPLE_RATE = 48000
+CHUNK = 480
+BLOCK_SEC = CHUNK / SAMPLE_RATE
+PREFILL = 10 * CHUNK
+MINUTES = 10
+
+
+class _Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def tone_blocks(n: int) -> np.ndarray:
+    t = np.arange(n * CHUNK) / SAMPLE_RATE
+    return (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16).reshape(n, CHUNK)
+
+
+def simulate(ppm: float, compensate: bool, seed: int = 0):
+    n_cb = MINUTES * 60 * 100
+    n_tx = int(n_cb * (1 + ppm * 1e-6)) + 10
+    rng = np.random.default_rng(seed)
+    arrive = np.arange(n_tx) * BLOCK_SEC / (1 + ppm * 1e-6) + 0.002 + rng.uniform(-0.002, 0.002, n_tx)
+    arrive = np.maximum.accumulate(arrive)
+    blocks = tone_blocks(100)
+
+    clock = _Clock()
+    drift = DriftEstimator(SAMPLE_RATE, CHUNK, clock=clock) if compensate else None
+    player = CallbackPlayer(SAMPLE_RATE, blocksize=CHUNK, prefill=PREFILL, buffer_sec=2.0, drift=drift)
+    mono = np.zeros(CHUNK, dtype=np.int16)
+    level = np.zeros(n_cb)
+    tail = []
+    i = 0
+    for k in range(n_cb):
+        t_cb = k * BLOCK_SEC
+        while i < n_tx and arrive[i] <= t_cb:
+            clock.t = arrive[i]
+            player.write(blocks[i % 100])
+            i += 1
+        clock.t = t_cb
+        player._fill(mono)
+        level[k] = player.ring.available
+        if k >= n_cb - 100:
+            tail.append(mono.copy())
+    last_min = 1000.0 * level[-6000:].mean() / SAMPLE_RATE
+    return player, drift, last_min, np.concatenate(tail)
+
+
+def check(ppm: float) -> bool:
+    p0, _, none_ms, _ = simulate(ppm, False)
+    p1, drift, comp_ms, tail = simulate(ppm, True)
+    target_ms = 1000.0 * PREFILL / SAMPLE_RATE
+    block_ms = 1000.0 * CHUNK / SAMPLE_RATE
+    base_step = np.abs(np.diff(tone_blocks(2).ravel().astype(np.int32))).max()
+    step = np.abs(np.diff(tail.astype(np.int32))).max() / base_step
+    print(
+        f"{ppm:+5.0f} ppm: none  last minute {none_ms:6.1f} ms, underruns {p0.underruns}\n"
+        f"           drift last minute {comp_ms:6.1f} ms, underruns {p1.underruns}, "
+        f"estimate {drift.ppm:+.1f} ppm, tone max step {step:.2f}x"
+    )
+    print(f"           {drift.format_stats()}")
+    # 보정이 없으면 10 분 동안 ppm 만큼 깊이가 새는지 (+ 는 적어도 그 절반만큼 늘었는지, - 는 underrun)
+    drifted = none_ms - target_ms > 0.5 * ppm * 1e-6 * MINUTES * 60 * 1000 if ppm > 0 else p0.underruns > 0
+    passed = (
+        drifted
+        and abs(comp_ms - target_ms) < block_ms
+        and p1.underruns == 0
+        and abs(drift.ppm - ppm) < 0.1 * abs(ppm)
+        and step < 1.05
+    )
+    print(f"           {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_alloc() -> bool:
+    drift = DriftEstimator(SAMPLE_RATE, CHUNK)
+    player = CallbackPlayer(SAMPLE_RATE, blocksize=CHUNK, prefill=PREFILL, drift=drift)
+    blocks = tone_blocks(100)
+    mono = np.zeros(CHUNK, dtype=np.int16)
+
+    def run(k0, k1):
+        for k in range(k0, k1):
+            player.write(blocks[k % 100])
+            player._fill(mono)
+
+    run(0, 1000)
+    tracemalloc.start()
+    snap0 = tracemalloc.take_snapshot()
+    run(1000, 4000)
+    snap1 = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    growth = sum(s.size_diff for s in snap1.compare_to(snap0, "lineno"))
+    passed = growth < 1024
+    print(f"alloc    : {growth} B over 3000 resampled writes  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def main():
+    ok = check(+200.0)
+    ok &= check(-200.0)
+    ok &= check(+40.0)
+    ok &= check_alloc()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+DTX (말소리 확률 + hangover) 와 comfort noise (fmt cn) 확인
+
+    python common/tests/check_dtx.py
+
+RNNoise 없이 말소리 확률을 흉내 낸 대화 (말 1 ~ 3 초 / 쉼 0.5 ~ 4 초, 말 중간에 짧게 확률이 떨어지는 곳 포함) 를
+80 ms 블록 (pi_a_sender_filtered_gpio_v3 의 CHUNK) 으로 돌린다.
+- gate  : 말소리 블록은 하나도 안 빠지고, 단어 사이 짧은 쉼 (< hangover) 에서 끊기지 않는지, 보낸 블록 비율
+- cn    : 방 잡음 (저역이 센 색 잡음) 을 설명 → 합성했을 때 RMS / 대역 세기가 맞는지, 블록 경계에서 안 튀는지,
+          잡음이 그대로면 대부분 헤더만 (keep-alive) 가는지
+- tcp   : 핸드셰이크로 DTX 를 맞추고 (예전 수신부면 꺼짐) 말소리 블록은 그대로, 무음 블록은 잡음으로 오는지,
+          보낸 바이트 / 보낸 오디오 프레임 비율, 수신 쪽 프레임당 처리 시간 (오디오 zlib 풀기 vs 잡음 합성)
+- udp   : silence 블록이 데이터그램 하나 (쪼개지 않음) 로 가서 같은 길이의 잡음으로 오는지
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.codec import FORMAT_CN, FORMAT_ZLIB, make_codec  # noqa: E402
+from common.dtx import DtxGate  # noqa: E402
+from common.protocol import StreamReader, StreamWriter  # noqa: E402
+from common.udp import DatagramReader, DatagramWriter  # noqa: E402
+
+SAMPLE_RATE = 48000
+CHUNK = 3840
+BLOCK_SEC = CHUNK / SAMPLE_RATE
+MINUTES = 2
+THRESHOLD = 0.5
+HANGOVER_MS = 240.0
+ROOM_RMS = 60.0
+
+
+def room_noise(n: int, rng) -> np.ndarray:
+    # 저역이 센 방 잡음 (백색 잡음을 1 차 저역 통과) + 약한 고역
+    w = rng.normal(0, 1, n)
+    y = np.empty(n)
+    acc = 0.0
+    a = 0.97
+    for i, v in enumerate(w.tolist()):
+        acc = a * acc + (1 - a) * v
+        y[i] = acc
+    y = y / y.std() * ROOM_RMS + rng.normal(0, ROOM_RMS * 0.2, n)
+    return y
+
+
+def session(seed: int = 0):
+    # (블록 PCM, 말소리 확률, 실제 말소리 여부) 목록
+    rng = np.random.default_rng(seed)
+    n_blocks = int(MINUTES * 60 / BLOCK_SEC)
+    talk = np.zeros(n_blocks, dtype=bool)
+    i = 0
+    while i < n_blocks:
+        i += int(rng.uniform(0.5, 4.0) / BLOCK_SEC)
+        k = int(rng.uniform(1.0, 3.0) / BLOCK_SEC)
+        talk[i:i + k] = True
+        i += k
+    prob = np.where(talk, rng.uniform(0.7, 1.0, n_blocks), rng.uniform(0.0, 0.2, n_blocks))
+    # 말하는 중 단어 사이 짧은 쉼 (블록 1 ~ 2 개, 80 ~ 160 ms) 은 확률만 떨어짐 (말 시작 블록은 제외)
+    inside = np.zeros(n_blocks, dtype=bool)
+    inside[1:] = talk[1:] & talk[:-1]
+    for d in np.flatnonzero(inside & (rng.uniform(size=n_blocks) < 0.1)):
+        if prob[d - 1] >= THRESHOLD:  # 쉼끼리 이어져 hangover 보다 길어지지 않게
+            prob[d:d + int(rng.integers(1, 3))] = 0.1
+
+    t = np.arange(n_blocks * CHUNK) / SAMPLE_RATE
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8)) * 5000
+    pcm = room_noise(n_blocks * CHUNK, rng) + voice * np.repeat(talk, CHUNK)
+    pcm = np.clip(pcm, -32768, 32767).astype(np.int16).reshape(n_blocks, CHUNK)
+    return pcm, prob, talk
+
+
+def check_gate() -> bool:
+    _, prob, talk = session()
+    gate = DtxGate(SAMPLE_RATE, threshold=THRESHOLD, hangover_ms=HANGOVER_MS, tag="check")
+    sent = np.array([gate.update(p, CHUNK) for p in prob])
+    missed = int(np.sum(talk & ~sent))
+    # 말 시작 ~ 끝 사이 (단어 사이 쉼 포함) 는 끊기지 않았는지
+    cuts = int(np.sum(talk[1:] & talk[:-1] & ~sent[1:]))
+    passed = missed == 0 and cuts == 0 and gate.tx_ratio < 0.75
+    print(
+        f"gate     : speech {100.0 * talk.mean():.1f} % of blocks, sent {100.0 * gate.tx_ratio:.1f} %, "
+        f"missed speech {missed}, cuts inside talk spurts {cuts}  {'OK' if passed else 'FAIL'}"
+    )
+    print(gate.format_stats())
+    return passed
+
+
+def band_db(x: np.ndarray) -> np.ndarray:
+    # 긴 신호의 대역별 세기 (ComfortNoise 와 같은 대역) dB
+    enc = make_codec(FORMAT_CN, CHUNK)
+    blocks = x[:x.shape[0] // CHUNK * CHUNK].reshape(-1, CHUNK)
+    return np.mean([enc.levels(b).astype(np.float64) / 2.0 for b in blocks], axis=0)
+
+
+def check_cn() -> bool:
+    rng = np.random.default_rng(1)
+    x = np.clip(room_noise(CHUNK * 100, rng), -32768, 32767).astype(np.int16)
+    enc, dec = make_codec(FORMAT_CN, CHUNK), make_codec(FORMAT_CN, CHUNK)
+    out, sizes = [], []
+    for b in x.reshape(-1, CHUNK):
+        payload = enc.encode(b).copy()
+        sizes.append(payload.shape[0])
+        out.append(dec.decode(payload, CHUNK).copy())
+    y = np.concatenate(out)
+
+    rms_x = x.astype(np.float64).std()
+    rms_y = y.astype(np.float64).std()
+    rms_db = 20 * np.log10(rms_y / rms_x)
+    bands = np.abs(band_db(y) - band_db(x)).max()
+    # 블록 경계의 샘플 간 차이가 블록 안쪽과 비슷한지 (경계에서 튀지 않음)
+    d = np.abs(np.diff(y.astype(np.float64)))
+    edge = d[CHUNK - 1::CHUNK].mean()
+    inner = d.mean()
+    headers_only = sizes.count(0) / len(sizes)
+    passed = abs(rms_db) < 1.0 and bands < 2.0 and edge < 1.5 * inner and headers_only > 0.5
+    print(
+        f"cn       : RMS {rms_x:.1f} -> {rms_y:.1f} ({rms_db:+.2f} dB), band level max |diff| {bands:.2f} dB, "
+        f"boundary step {edge / inner:.2f}x, {100.0 * headers_only:.0f} % header-only  {'OK' if passed else 'FAIL'}"
+    )
+    return passed
+
+
+def run_tcp(pcm, speech, dtx_tx: bool, dtx_rx: bool):
+    a, b = socket.socketpair()
+    info = {}
+
+    def send():
+        try:
+            w = StreamWriter(a, tag="check")
+            w.negotiate((SAMPLE_RATE,), 1, CHUNK, codecs=(FORMAT_ZLIB,), dtx=dtx_tx)
+            for blk, sp in zip(pcm, speech):
+                w.send(blk, mode=2, prob=0.9 if sp else 0.1, silence=not sp)
+            info["bytes"], info["silent"], info["packets"] = w.bytes, w.silent, w.packets
+            info["stats"] = w.format_stats()
+        finally:
+            a.close()
+
+    t = threading.Thread(target=send, daemon=True)
+    t.start()
+    reader = StreamReader(b, CHUNK * 2, tag="check")
+    s = reader.accept(sample_rates=(SAMPLE_RATE,), channels=1, block=CHUNK, codecs=(FORMAT_ZLIB,), dtx=dtx_rx)
+    frames, cost = [], []
+    while True:
+        t0 = time.perf_counter()
+        frame = reader.read()
+        dt = time.perf_counter() - t0
+        if frame is None:
+            break
+        frames.append(frame.pcm.copy())
+        cost.append(dt)
+    t.join()
+    b.close()
+    return s, frames, np.array(cost), info
+
+
+def check_tcp() -> bool:
+    pcm, prob, _ = session(2)
+    gate = DtxGate(SAMPLE_RATE, threshold=THRESHOLD, hangover_ms=HANGOVER_MS, tag="check")
+    speech = np.array([gate.update(p, CHUNK) for p in prob])
+
+    s_full, full, cost_full, info_full = run_tcp(pcm, speech, dtx_tx=False, dtx_rx=True)
+    s_old, old, _, _ = run_tcp(pcm, speech, dtx_tx=True, dtx_rx=False)
+    s_dtx, dtx, cost_dtx, info_dtx = run_tcp(pcm, speech, dtx_tx=True, dtx_rx=True)
+
+    exact_speech = all(np.array_equal(dtx[i], pcm[i]) for i in np.flatnonzero(speech))
+    silent_idx = np.flatnonzero(~speech)
+    ref_rms = np.mean([pcm[i].astype(np.float64).std() for i in silent_idx])
+    cn_rms = np.mean([dtx[i].astype(np.float64).std() for i in silent_idx])
+    ratio = 1.0 - info_dtx["silent"] / info_dtx["packets"]
+    passed = (
+        not s_full.dtx and not s_old.dtx and s_dtx.dtx
+        and len(full) == len(old) == len(dtx) == pcm.shape[0]
+        and all(np.array_equal(f, p) for f, p in zip(old, pcm))
+        and exact_speech
+        and abs(20 * np.log10(cn_rms / ref_rms)) < 1.0
+        and info_dtx["bytes"] < 0.8 * info_full["bytes"]
+    )
+    # 수신 쪽 프레임당 read() 시간 (파싱 + 풀기): 말소리 블록 / 무음 블록 평균
+    t_audio = 1e6 * np.median(cost_full[~speech])
+    t_cn = 1e6 * np.median(cost_dtx[~speech])
+    print(
+        f"tcp      : audio frames sent {100.0 * ratio:.1f} % ({info_dtx['silent']} of {info_dtx['packets']} as comfort noise), "
+        f"bytes {info_full['bytes']} -> {info_dtx['bytes']} ({100.0 * info_dtx['bytes'] / info_full['bytes']:.1f} %)\n"
+        f"           silence RMS {ref_rms:.1f} -> comfort noise {cn_rms:.1f}, speech blocks bit-exact {exact_speech}, "
+        f"old receiver -> dtx {s_old.dtx}\n"
+        f"           receiver read() per silent block: zlib audio {t_audio:.0f} us, comfort noise {t_cn:.0f} us  "
+        f"{'OK' if passed else 'FAIL'}"
+    )
+    print(info_dtx["stats"])
+    return passed
+
+
+def check_udp() -> bool:
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(("127.0.0.1", 0))
+    rx.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    tx.connect(rx.getsockname())
+    writer = DatagramWriter(tx, SAMPLE_RATE, tag="check")
+    pcm, _, _ = session(3)
+    speech = [i % 4 == 0 for i in range(40)]
+
+    def send():
+        for blk, sp in zip(pcm[:40], speech):
+            writer.send(blk, silence=not sp)
+            time.sleep(0.001)
+
+    t = threading.Thread(target=send, daemon=True)
+    t.start()
+    reader = DatagramReader(rx, idle_timeout=0.3, tag="check")
+    sizes = [frame.pcm.shape[0] for frame in reader]
+    t.join()
+    tx.close()
+    rx.close()
+    expect = []
+    for sp in speech:
+        expect += [480] * (CHUNK // 480) if sp else [CHUNK]
+    passed = sizes == expect and reader.lost == 0 and reader.bad == 0 and writer.silent == 30
+    print(
+        f"udp      : {writer.packets} datagrams ({writer.silent} comfort noise), frames {len(sizes)}, "
+        f"lost {reader.lost}  {'OK' if passed else 'FAIL'}"
+    )
+    print(writer.format_stats())
+    return passed
+
+
+def main():
+    ok = check_gate()
+    ok &= check_cn()
+    ok &= check_tcp()
+    ok &= check_udp()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+FrameAdapter 동작 확인
+
+    python common/tests/check_framing.py
+
+여러 블록 크기(sounddevice blocksize)로 넣었을 때
+  - 처리 함수가 항상 480 배수 길이만 받는지
+  - 출력이 입력을 정확히 latency 샘플 늦춘 것과 같은지
+를 확인하고, 블록 크기별 지연(ms)을 출력한다.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.framing import FrameAdapter  # noqa: E402
+from common.rnnoise_driver import FRAME_SIZE  # noqa: E402
+
+SAMPLE_RATE = 48000
+
+
+def main():
+    ok = True
+    rng = np.random.default_rng(0)
+    x = rng.integers(-20000, 20000, SAMPLE_RATE * 2).astype(np.int16)
+
+    for block in (128, 256, 441, 480, 512, 1024, 2048, 3840, None):
+        seen = []
+
+        def frames_only(src, dst):
+            seen.append(src.shape[0])
+            np.copyto(dst, src)  # 항등 처리 → 출력은 순수 지연만 남음
+
+        adapter = FrameAdapter(frames_only, block_size=block)
+        if block:
+            sizes = [block] * (len(x) // block)
+        else:
+            sizes = rng.integers(1, 2000, 200)
+            sizes = sizes[np.cumsum(sizes) <= len(x)]
+        outs = []
+        pos = 0
+        for n in sizes:
+            outs.append(adapter.process(x[pos:pos + n]).copy())
+            pos += n
+        y = np.concatenate(outs)
+
+        d = adapter.latency
+        expect = np.concatenate([np.zeros(d), x[:pos - d]])
+        passed = np.array_equal(y, expect) and all(s % FRAME_SIZE == 0 for s in seen)
+        ok &= passed
+        name = "variable" if block is None else str(block)
+        print(
+            f"block={name:>8s}  latency={d:3d} samples ({adapter.latency_ms(SAMPLE_RATE):5.2f} ms)  "
+            f"{'OK' if passed else 'FAIL'}"
+        )
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
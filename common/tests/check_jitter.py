@@ -0,0 +1,167 @@
+"""
+AdaptiveJitter + CallbackPlayer 시뮬레이션 (가상 시계, 오디오 장치 / 네트워크 없이)
+
+    python common/tests/check_jitter.py
+
+송신은 10 ms 마다 블록 하나, 도착 시각은 네트워크 모델대로 늦추고 (TCP 처럼 앞 블록보다 먼저 오지는 않음)
+재생 콜백은 10 ms 마다 블록 하나를 꺼낸다. 60 초 동안 돌려서
+  - 평균 재생 지연 (콜백 시점 버퍼 깊이)
+  - underrun 비율 (콜백 중 모자랐던 비율)
+  - 마지막 목표 깊이와 조정 횟수
+를 예전 고정 DELAY_SEC = 0.5 s (prefill) 와 비교한다.
+
+- lan   : ±0.3 ms 정도만 흔들림 → 목표가 min_ms 근처까지 내려가는지
+- wifi  : 3% 블록이 20~80 ms 늦음 (뒤 블록도 같이 밀림) → underrun 이 목표 비율 근처인지
+- burst : 20 초 동안 lan, 다음 20 초 wifi, 다시 lan → 늘었다가 다시 줄어드는지 (history)
+- alloc : 정상 상태 write / 콜백에서 새 메모리를 거의 안 잡는지
+"""
+
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.jitter import AdaptiveJitter  # noqa: E402
+from common.playback import CallbackPlayer  # noqa: E402
+
+SAMPLE_RATE = 48000
+CHUNK = 480
+BLOCK_SEC = CHUNK / SAMPLE_RATE
+SECONDS = 60
+UNDERRUN_TARGET = 0.005
+
+
+class _Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def lan(rng, n):
+    return np.abs(rng.normal(0.0, 0.0003, n))
+
+
+def wifi(rng, n):
+    d = np.abs(rng.normal(0.0, 0.0005, n))
+    late = rng.random(n) < 0.03
+    d[late] += rng.uniform(0.020, 0.080, late.sum())
+    return d
+
+
+def burst(rng, n):
+    d = lan(rng, n)
+    third = n // 3
+    d[third:2 * third] = wifi(rng, third)
+    return d
+
+
+def simulate(delays, jitter=None, prefill=0):
+    clock = _Clock()
+    if jitter is not None:
+        jitter.clock = clock
+    player = CallbackPlayer(SAMPLE_RATE, blocksize=CHUNK, prefill=prefill, jitter=jitter)
+    n = delays.shape[0]
+    send = np.arange(n) * BLOCK_SEC + 0.005
+    arrive = np.maximum.accumulate(send + delays)  # TCP: 앞 블록보다 먼저 오지 않음
+    block = np.ones(CHUNK, dtype=np.int16)
+    mono = np.zeros(CHUNK, dtype=np.int16)
+
+    i = 0
+    levels = []
+    callbacks = 0
+    for k in range(n):
+        t_cb = k * BLOCK_SEC
+        while i < n and arrive[i] <= t_cb:
+            clock.t = arrive[i]
+            player.write(block)
+            i += 1
+        clock.t = t_cb
+        player._fill(mono)
+        if player.started:
+            callbacks += 1
+            levels.append(player.ring.available)
+    latency_ms = 1000.0 * float(np.mean(levels)) / SAMPLE_RATE if levels else 0.0
+    return player, latency_ms, player.underruns / max(callbacks, 1)
+
+
+def report(label, delays):
+    rng_fixed = simulate(delays, prefill=int(0.5 * SAMPLE_RATE))
+    jitter = AdaptiveJitter(SAMPLE_RATE, CHUNK, min_ms=20, max_ms=500, underrun_target=UNDERRUN_TARGET)
+    player, latency, underrun = simulate(delays, jitter=jitter)
+    _, f_latency, f_underrun = rng_fixed
+    print(f"{label}")
+    print(f"  fixed 0.5 s : latency {f_latency:6.1f} ms, underrun {100 * f_underrun:.2f}%")
+    print(
+        f"  adaptive    : latency {latency:6.1f} ms, underrun {100 * underrun:.2f}%, "
+        f"target {jitter.target_ms:.0f} ms, {len(jitter.history)} adjustments, "
+        f"stretched {player.stretched} / shrunk {player.shrunk}"
+    )
+    return jitter, latency, underrun
+
+
+def check_lan() -> bool:
+    rng = np.random.default_rng(0)
+    jitter, latency, underrun = report("lan", lan(rng, SECONDS * 100))
+    passed = jitter.target_ms <= 25 and latency < 40 and underrun <= UNDERRUN_TARGET
+    print(f"  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_wifi() -> bool:
+    rng = np.random.default_rng(1)
+    jitter, latency, underrun = report("wifi", wifi(rng, SECONDS * 100))
+    passed = latency < 200 and underrun <= 4 * UNDERRUN_TARGET
+    print(f"  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_burst() -> bool:
+    rng = np.random.default_rng(2)
+    jitter, _, _ = report("burst", burst(rng, SECONDS * 100))
+    peak = max(new for _, _, new, _ in jitter.history)
+    passed = peak >= 60 and jitter.target_ms <= 40
+    print(f"  history: peak {peak:.0f} ms, {[h for h in jitter.history if h[3] != 'jitter down'][:4]} ...")
+    print(f"  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_alloc() -> bool:
+    clock = _Clock()
+    jitter = AdaptiveJitter(SAMPLE_RATE, CHUNK, clock=clock)
+    player = CallbackPlayer(SAMPLE_RATE, blocksize=CHUNK, jitter=jitter)
+    block = np.ones(CHUNK, dtype=np.int16)
+    mono = np.zeros(CHUNK, dtype=np.int16)
+
+    def run(k0, k1):
+        for k in range(k0, k1):
+            clock.t = k * BLOCK_SEC
+            player.write(block)
+            player._fill(mono)
+
+    run(0, 3000)
+    tracemalloc.start()
+    snap0 = tracemalloc.take_snapshot()
+    run(3000, 6000)
+    snap1 = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    growth = sum(s.size_diff for s in snap1.compare_to(snap0, "lineno"))
+    # history 는 deque(maxlen) 라 조정이 있을 때만 작은 튜플이 생김
+    passed = growth < 4096
+    print(f"alloc    : {growth} B over 3000 write + callback  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def main():
+    ok = check_lan()
+    ok &= check_wifi()
+    ok &= check_burst()
+    ok &= check_alloc()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
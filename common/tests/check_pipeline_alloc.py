@@ -0,0 +1,77 @@
+"""
+FilterPipeline 청크당 메모리 할당 확인 (tracemalloc)
+
+    python common/tests/check_pipeline_alloc.py
+
+워밍업 이후 N 청크를 처리하는 동안 tracemalloc 으로 잡힌 메모리 peak 가
+청크 버퍼 하나(int16 CHUNK)보다 작고, 누적 증가량도 없으면 OK.
+numpy 배열 데이터 할당도 tracemalloc 에 잡히므로, 청크 크기 배열을 하나라도 만들면 바로 드러난다.
+(peak 에 남는 1~2 KB 는 슬라이스 view / numpy 스칼라 같은 작은 파이썬 객체라서
+청크 크기와 무관하다. 그래서 이 값보다 int16 청크가 확실히 큰 CHUNK 로 확인한다.)
+"""
+
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.hpf import ButterworthHPF, HighPassFilter  # noqa: E402
+from common.pipeline import FilterPipeline  # noqa: E402
+
+SAMPLE_RATE = 48000
+N_CHUNKS = 200
+
+
+def inplace_gain(src: np.ndarray, dst: np.ndarray):
+    # RNNoise 자리에 넣는 제자리 처리 예시 (denoise(src, dst) 규약 확인용)
+    np.multiply(src, 0.5, out=dst)
+
+
+def measure(pipeline: FilterPipeline, chunks, **kwargs):
+    tracemalloc.start()
+    # 워밍업: 작업 버퍼, numpy / 인터프리터 내부 캐시 준비
+    for i in range(20):
+        pipeline.process(chunks[i % len(chunks)], **kwargs)
+
+    # 두 번 재서 두 번째 값을 사용 (첫 측정에는 한 번만 생기는 내부 캐시가 섞일 수 있음)
+    for _ in range(2):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        for i in range(N_CHUNKS):
+            pipeline.process(chunks[i % len(chunks)], **kwargs)
+        cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cur - base, peak - base
+
+
+def main():
+    ok = True
+    rng = np.random.default_rng(0)
+    for chunk in (3840, 19200):
+        chunks = [rng.integers(-20000, 20000, chunk).astype(np.int16) for _ in range(8)]
+        limit = chunk * 2  # int16 청크 하나
+
+        cases = {
+            "HPF(1st) only": (FilterPipeline(chunk, hpf=HighPassFilter(SAMPLE_RATE, 100.0)), dict(use_rnn=False)),
+            "Butter4 + denoise mix 0.7": (
+                FilterPipeline(chunk, hpf=ButterworthHPF(SAMPLE_RATE, 150.0, 4), denoise=inplace_gain),
+                dict(mix=0.7),
+            ),
+            "denoise only": (FilterPipeline(chunk, denoise=inplace_gain), dict(use_hpf=False)),
+        }
+        for name, (pipe, kw) in cases.items():
+            grow, peak = measure(pipe, chunks, **kw)
+            passed = grow < 256 and peak < limit
+            ok &= passed
+            print(
+                f"CHUNK={chunk:5d}  {name:28s} growth={grow:6d} B  peak={peak:6d} B  "
+                f"(limit {limit} B)  {'OK' if passed else 'FAIL'}"
+            )
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
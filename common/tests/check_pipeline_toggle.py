@@ -0,0 +1,59 @@
+"""
+FilterPipeline 에서 RNNoise 를 껐다 켤 때 (GPIO 모드 전환) 꺼지기 전 소리가 다시 나오지 않는지 확인
+
+    python common/tests/check_pipeline_toggle.py
+
+denoise 자리에 FrameAdapter(그대로 통과) 를 넣어 latency 가 있는 경우 (dry 지연선 + wet 출력 FIFO) 를 만든다.
+  1) RNNoise 켜고 큰 신호
+  2) 끄고 (모드 0) 무음
+  3) 다시 켜고 무음 → 첫 청크부터 완전히 무음이어야 함 (예전에는 1) 의 끝 latency 샘플이 섞여 나옴)
+마지막에 다시 켠 뒤에도 입력이 latency 만큼 늦게 그대로 나오는지 (dry / wet 위상) 도 본다.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.framing import FrameAdapter  # noqa: E402
+from common.pipeline import FilterPipeline  # noqa: E402
+
+CHUNK = 1000  # 480 의 배수가 아니라서 latency = 480 - gcd(1000, 480) = 440 샘플
+
+
+def passthrough(src: np.ndarray, dst: np.ndarray):
+    np.copyto(dst, src)
+
+
+def main():
+    ok = True
+    rng = np.random.default_rng(0)
+    adapter = FrameAdapter(passthrough, block_size=CHUNK)
+    pipe = FilterPipeline(CHUNK, denoise=adapter)
+    loud = [rng.integers(-20000, 20000, CHUNK).astype(np.int16) for _ in range(4)]
+    silence = np.zeros(CHUNK, dtype=np.int16)
+
+    for x in loud:
+        pipe.process(x, use_hpf=False, mix=0.7)
+    for _ in range(3):
+        pipe.process(silence, use_hpf=False, use_rnn=False)
+    y = pipe.process(silence, use_hpf=False, mix=0.7).copy()
+    stale = int(np.count_nonzero(y))
+    passed = stale == 0
+    ok &= passed
+    print(f"toggle   : off -> on, {stale} stale samples in first chunk (latency {adapter.latency})  {'OK' if passed else 'FAIL'}")
+
+    # 다시 켠 뒤: 입력이 latency 만큼 늦게 그대로 (wet = dry 이므로 mix 와 무관)
+    x = np.concatenate(loud)
+    y = np.concatenate([pipe.process(b, use_hpf=False, mix=0.7).copy() for b in loud])
+    d = adapter.latency
+    passed = np.array_equal(y[:d], np.zeros(d, dtype=np.int16)) and np.array_equal(y[d:], x[:-d])
+    ok &= passed
+    print(f"aligned  : output = input delayed {d} samples after re-enable  {'OK' if passed else 'FAIL'}")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
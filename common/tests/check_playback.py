@@ -0,0 +1,127 @@
+"""
+Int16Ring / CallbackPlayer 동작 확인 (오디오 장치 없이 콜백을 직접 호출)
+
+    python common/tests/check_playback.py
+
+- ring     : 두 스레드 사이로 임의 길이 블록을 흘려서 샘플이 순서/누락 없이 전달되는지
+- prefill  : prefill 만큼 쌓이기 전에는 무음, 그 뒤로는 입력이 그대로(스테레오 복사) 나오는지
+- underrun : 네트워크가 끊긴 동안 콜백은 무음으로 채우고 underrun 을 세는지
+- alloc    : 정상 상태 콜백에서 새 메모리를 잡지 않는지 (tracemalloc)
+"""
+
+import os
+import sys
+import threading
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.playback import CallbackPlayer  # noqa: E402
+from common.ring import Int16Ring  # noqa: E402
+
+SAMPLE_RATE = 48000
+CHUNK = 480
+
+
+class _Status:
+    # sounddevice.CallbackFlags 대신
+    output_underflow = False
+
+
+def check_ring(n: int = 200000) -> bool:
+    ring = Int16Ring(1000)
+    x = (np.arange(n) % 30000).astype(np.int16)
+    got = np.zeros(n, dtype=np.int16)
+    rng = np.random.default_rng(0)
+
+    def consumer():
+        pos = 0
+        buf = np.zeros(700, dtype=np.int16)
+        while pos < n:
+            k = ring.read_into(buf[:rng.integers(1, 700)])
+            got[pos:pos + k] = buf[:k]
+            pos += k
+
+    t = threading.Thread(target=consumer)
+    t.start()
+    pos = 0
+    while pos < n:
+        pos += ring.write(x[pos:pos + rng.integers(1, 900)])
+    t.join()
+    passed = np.array_equal(got, x)
+    print(f"ring     : {n} samples through capacity {ring.capacity}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def run_callbacks(player, n_blocks: int, channels: int):
+    out = np.zeros((CHUNK, channels), dtype=np.int16)
+    res = []
+    for _ in range(n_blocks):
+        player._callback(out, CHUNK, None, _Status())
+        res.append(out.copy())
+    return np.concatenate(res)
+
+
+def check_prefill_and_underrun() -> bool:
+    prefill = 5 * CHUNK
+    player = CallbackPlayer(SAMPLE_RATE, channels=2, blocksize=CHUNK, prefill=prefill)
+    x = np.arange(1, 20 * CHUNK + 1, dtype=np.int16)
+
+    # prefill 전: 4블록 넣고 콜백 2번 → 무음, underrun 아님
+    player.write(x[:4 * CHUNK])
+    y0 = run_callbacks(player, 2, 2)
+    # 나머지를 넣고 20블록 재생 → 앞 20블록은 x 그대로, 뒤 2블록은 무음 + underrun
+    player.write(x[4 * CHUNK:])
+    y1 = run_callbacks(player, 22, 2)
+
+    passed = (
+        not y0.any()
+        and np.array_equal(y1[:20 * CHUNK, 0], x)
+        and np.array_equal(y1[:, 0], y1[:, 1])
+        and not y1[20 * CHUNK:].any()
+        and player.underruns == 2
+        and player.underrun_samples == 2 * CHUNK
+    )
+    print(f"prefill  : silence until {prefill} samples, then input as-is  {'OK' if passed else 'FAIL'}")
+    print(f"underrun : {player.format_stats()}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_alloc() -> bool:
+    player = CallbackPlayer(SAMPLE_RATE, channels=2, blocksize=CHUNK, conceal="repeat")
+    out = np.zeros((CHUNK, 2), dtype=np.int16)
+    block = np.ones(CHUNK, dtype=np.int16)
+    status = _Status()
+
+    def round_():
+        for i in range(200):
+            if i % 7:  # 가끔 블록을 빼먹어서 underrun(repeat) 경로도 지나가게
+                player.write(block)
+            player._callback(out, CHUNK, None, status)
+
+    round_()
+    tracemalloc.start()
+    # 첫 바퀴는 캐시 등 일회성 할당이 섞일 수 있어서 두 번째 바퀴 값을 사용
+    for _ in range(2):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        round_()
+        cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    growth, peak = cur - base, peak - base
+    # 블록 하나(960 B)보다 작으면 콜백 안에서 배열을 만들지 않는 것
+    passed = growth < 256 and peak < CHUNK * 2
+    print(f"alloc    : growth {growth} B, peak {peak} B  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def main():
+    ok = check_ring()
+    ok &= check_prefill_and_underrun()
+    ok &= check_alloc()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
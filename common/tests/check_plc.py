@@ -0,0 +1,131 @@
+"""
+CallbackPlayer(conceal="plc") 패킷 손실 은닉 확인 (오디오 장치 없이 콜백을 직접 부름)
+
+    python common/tests/check_plc.py
+
+모음 비슷한 신호 (f0 + 배음) 를 10 ms 블록으로 넣다가 일부 블록을 빼서 (늦거나 빠진 패킷)
+그 콜백이 underrun 나게 하고, 재생된 출력을 원래 신호와 비교한다.
+- gap    : 블록 하나씩 빠질 때 채운 구간 SNR 이 무음 / 반복(repeat) 보다 좋은지,
+           손실 구간 앞뒤 이음매에서 샘플 간 차이가 원래 파형보다 크게 튀지 않는지 (클릭 없음)
+- long   : 100 ms 연속 손실이면 hold + fade 뒤 0 으로 줄었다가, 돌아올 때도 튀지 않는지
+- count  : plc.concealed / recoveries 가 빠진 블록 / 손실 구간 수와 같은지
+- alloc  : 정상 경로 콜백에서 새 메모리를 안 잡는지
+"""
+
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.playback import CallbackPlayer  # noqa: E402
+
+SAMPLE_RATE = 48000
+CHUNK = 480
+
+
+def voiced(n_blocks: int, f0: float) -> np.ndarray:
+    t = np.arange(n_blocks * CHUNK) / SAMPLE_RATE
+    x = sum(np.sin(2 * np.pi * f0 * k * t + k) / k for k in range(1, 6))
+    return (5000 * x).astype(np.int16).reshape(n_blocks, CHUNK)
+
+
+def play(blocks: np.ndarray, lost: set, conceal):
+    player = CallbackPlayer(SAMPLE_RATE, blocksize=CHUNK, conceal=conceal)
+    out = np.zeros_like(blocks)
+    for k in range(blocks.shape[0]):
+        if k not in lost:
+            player.write(blocks[k])
+        player._fill(out[k])
+        np.copyto(player._last[:CHUNK], out[k])  # _callback 이 하는 일 (repeat 용)
+    return player, out
+
+
+def snr_db(ref: np.ndarray, got: np.ndarray) -> float:
+    ref = ref.astype(np.float64)
+    err = got.astype(np.float64) - ref
+    return 10 * np.log10(np.dot(ref, ref) / max(np.dot(err, err), 1.0))
+
+
+def max_step(x: np.ndarray) -> float:
+    return float(np.abs(np.diff(x.ravel().astype(np.int32))).max())
+
+
+def check_gap() -> bool:
+    ok = True
+    for f0 in (110.0, 150.0, 230.0):
+        blocks = voiced(60, f0)
+        lost = set(range(10, 60, 10))
+        base = max_step(blocks)
+        res = {}
+        for conceal in (None, "repeat", "plc"):
+            _, out = play(blocks, lost, conceal)
+            snr = np.mean([snr_db(blocks[k], out[k]) for k in lost])
+            step = max(max_step(out[k - 1:k + 2]) for k in lost) / base
+            res[conceal] = (snr, step)
+        plc_snr, plc_step = res["plc"]
+        passed = plc_snr > max(res[None][0], res["repeat"][0]) + 3.0 and plc_step < 1.5
+        ok &= passed
+        print(
+            f"gap      : f0 {f0:3.0f} Hz  SNR silence {res[None][0]:5.1f} / repeat {res['repeat'][0]:5.1f} / "
+            f"plc {plc_snr:5.1f} dB, max step silence {res[None][1]:.1f}x / repeat {res['repeat'][1]:.1f}x / "
+            f"plc {plc_step:.2f}x  {'OK' if passed else 'FAIL'}"
+        )
+    return ok
+
+
+def check_long() -> bool:
+    blocks = voiced(40, 150.0)
+    lost = set(range(10, 20))
+    player, out = play(blocks, lost, "plc")
+    fade_end = (player.plc.hold + player.plc.fade) // CHUNK
+    tail = np.abs(out[10 + fade_end + 1:20]).max()
+    step = max_step(out[9:22]) / max_step(blocks)
+    passed = tail == 0 and step < 1.5
+    print(f"long     : silent after {fade_end * 10 + 10} ms of loss, max step {step:.2f}x  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_count() -> bool:
+    blocks = voiced(100, 150.0)
+    lost = {10, 11, 12, 40, 70, 71}
+    player, _ = play(blocks, lost, "plc")
+    passed = player.plc.concealed == len(lost) and player.plc.recoveries == 3 and player.underruns == len(lost)
+    print(f"count    : concealed {player.plc.concealed}, recoveries {player.plc.recoveries}  {'OK' if passed else 'FAIL'}")
+    print(player.format_stats())
+    return passed
+
+
+def check_alloc() -> bool:
+    blocks = voiced(50, 150.0)
+    player = CallbackPlayer(SAMPLE_RATE, blocksize=CHUNK, conceal="plc")
+    mono = np.zeros(CHUNK, dtype=np.int16)
+
+    def run(n):
+        for k in range(n):
+            player.write(blocks[k % 50])
+            player._fill(mono)
+
+    run(100)
+    tracemalloc.start()
+    snap0 = tracemalloc.take_snapshot()
+    run(2000)
+    snap1 = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    growth = sum(s.size_diff for s in snap1.compare_to(snap0, "lineno"))
+    passed = growth < 1024
+    print(f"alloc    : {growth} B over 2000 normal-path callbacks  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def main():
+    ok = check_gap()
+    ok &= check_long()
+    ok &= check_count()
+    ok &= check_alloc()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+StreamWriter / StreamReader (프로토콜 v2 + v1 호환) 동작 확인
+
+    python common/tests/check_protocol.py
+
+- v2       : 길이가 제각각인 프레임 + 메타(mode/rms/prob)가 seq/ts 와 함께 그대로 오는지
+- lost     : 송신 쪽에서 seq 를 건너뛰면 lost 로 세는지
+- v1 raw   : 헤더 없는 PCM (예전 Pi_A) 을 v1 로 알아보고 그대로 받는지
+- v1 !II   : (mode, rms) 헤더 + PCM (예전 PC 송신부) 을 v1 로 알아보고 받는지
+- mismatch : expect_samples 와 다른 길이의 v2 프레임이면 ValueError
+- hello    : 핸드셰이크로 수신 쪽 샘플레이트 / 블록에 맞춰 보내는지 (블록을 바꿀 수 있는 송신부)
+- rechunk  : 블록을 못 바꾸는 송신부 (3840) → exact_block 수신부가 480 씩 다시 잘라 받는지
+- reject   : 공통 샘플레이트가 없고 resample=False 면 양쪽 다 ValueError
+- codec    : 수신 쪽 선호 순서대로 코덱을 고르고 (ulaw / adpcm / zlib), 받은 PCM 이 인코딩 → 디코딩 결과와 같은지
+- cost     : 프레임 길이가 달라도 파싱 비용(프레임당)이 거의 같은지
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.codec import ALL_FORMATS, FORMAT_ADPCM, FORMAT_NAMES, FORMAT_PCM16, FORMAT_ULAW, FORMAT_ZLIB  # noqa: E402
+from common.codec import make_codec  # noqa: E402
+from common.protocol import StreamReader, StreamWriter  # noqa: E402
+
+CHUNK = 480
+
+
+def stream_pair(send_fn, **reader_kw):
+    # send_fn(writer_sock) 을 다른 스레드에서 돌리고 StreamReader 를 돌려줌
+    a, b = socket.socketpair()
+
+    def run():
+        try:
+            send_fn(a)
+        finally:
+            a.close()
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return StreamReader(b, **reader_kw), t
+
+
+def check_v2() -> bool:
+    rng = np.random.default_rng(0)
+    sizes = [480, 160, 3840, 1, 960] * 40
+    blocks = [rng.integers(-30000, 30000, n, dtype=np.int16) for n in sizes]
+
+    def send(sock):
+        w = StreamWriter(sock)
+        for i, b in enumerate(blocks):
+            w.send(b, ts=100.0 + i * 0.01, mode=i % 4, rms=i * 10, prob=0.5)
+
+    reader, t = stream_pair(send, legacy_payload_bytes=CHUNK * 2)
+    got = list((f.seq, f.ts_us, f.mode, f.rms, f.prob, f.pcm.copy()) for f in reader)
+    t.join()
+    passed = (
+        reader.version == 2
+        and len(got) == len(blocks)
+        and all(
+            seq == i and ts == int((100.0 + i * 0.01) * 1e6) and mode == i % 4 and rms == i * 10 and prob == 0.5
+            and np.array_equal(pcm, blocks[i])
+            for i, (seq, ts, mode, rms, prob, pcm) in enumerate(got)
+        )
+        and reader.lost == 0
+    )
+    print(f"v2       : {len(got)} frames, sizes {sorted(set(sizes))}  {'OK' if passed else 'FAIL'}")
+    print(reader.format_stats())
+    return passed
+
+
+def check_lost() -> bool:
+    block = np.zeros(CHUNK, dtype=np.int16)
+
+    def send(sock):
+        w = StreamWriter(sock, meta=False)
+        for i in range(20):
+            if i in (5, 12):
+                w.seq += 3  # 송신 쪽에서 3 프레임씩 두 번 버린 상황
+            w.send(block)
+
+    reader, t = stream_pair(send, legacy_payload_bytes=CHUNK * 2)
+    frames = [f.mode for f in reader]
+    t.join()
+    passed = len(frames) == 20 and reader.lost == 6 and frames[0] is None
+    print(f"lost     : {reader.lost} (expected 6)  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_v1(legacy_header) -> bool:
+    rng = np.random.default_rng(1)
+    blocks = [rng.integers(-30000, 30000, CHUNK, dtype=np.int16) for _ in range(50)]
+
+    def send(sock):
+        w = StreamWriter(sock, version=1, legacy_header=legacy_header)
+        for i, b in enumerate(blocks):
+            w.send(b, mode=i % 4, rms=i)
+
+    reader, t = stream_pair(send, legacy_payload_bytes=CHUNK * 2, legacy_header=legacy_header)
+    got = [(f.version, f.mode, f.rms, f.pcm.copy()) for f in reader]
+    t.join()
+    passed = len(got) == len(blocks) and all(
+        v == 1 and np.array_equal(pcm, blocks[i])
+        and ((mode, rms) == (i % 4, i) if legacy_header else mode is None)
+        for i, (v, mode, rms, pcm) in enumerate(got)
+    )
+    label = "v1 !II " if legacy_header else "v1 raw "
+    print(f"{label}  : {len(got)} frames as v{reader.version}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_mismatch() -> bool:
+    def send(sock):
+        StreamWriter(sock).send(np.zeros(512, dtype=np.int16))
+
+    reader, t = stream_pair(send, legacy_payload_bytes=CHUNK * 2, expect_samples=CHUNK)
+    try:
+        reader.read()
+        passed = False
+        msg = "no error"
+    except ValueError as e:
+        passed = True
+        msg = str(e)
+    t.join()
+    print(f"mismatch : {msg}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_hello() -> bool:
+    sent = []
+
+    def send(sock):
+        w = StreamWriter(sock)
+        session = w.negotiate((48000, 16000), 1, 480, flexible_block=True)
+        sent.append(session)
+        for i in range(20):
+            w.send(np.full(session.block, i, dtype=np.int16))
+
+    reader, t = stream_pair(send, legacy_payload_bytes=CHUNK * 2)
+    session = reader.accept(sample_rates=(16000,), channels=1, block=160)
+    got = [f.pcm.copy() for f in reader]
+    t.join()
+    passed = (
+        session == sent[0]
+        and (session.sample_rate, session.block) == (16000, 160)
+        and len(got) == 20
+        and all(p.shape[0] == 160 and (p == i).all() for i, p in enumerate(got))
+    )
+    print(f"hello    : {session}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_rechunk() -> bool:
+    rng = np.random.default_rng(2)
+    blocks = [rng.integers(-30000, 30000, 3840, dtype=np.int16) for _ in range(10)]
+
+    def send(sock):
+        w = StreamWriter(sock)
+        w.negotiate((48000,), 1, 3840)
+        for i, b in enumerate(blocks):
+            w.send(b, ts=10.0 + i * 0.08)
+
+    reader, t = stream_pair(send, legacy_payload_bytes=CHUNK * 2)
+    session = reader.accept(sample_rates=(48000,), channels=1, block=CHUNK, exact_block=True)
+    got = [(f.ts_us, f.pcm.copy()) for f in reader]
+    t.join()
+    ts = [g[0] for g in got]
+    passed = (
+        session.block == 3840
+        and len(got) == 80
+        and all(p.shape[0] == CHUNK for _, p in got)
+        and np.array_equal(np.concatenate([p for _, p in got]), np.concatenate(blocks))
+        and all(b - a == 10000 for a, b in zip(ts, ts[1:]))
+    )
+    print(f"rechunk  : 3840 -> {len(got)} x {CHUNK}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_reject() -> bool:
+    errors = []
+
+    def send(sock):
+        try:
+            StreamWriter(sock).negotiate((44100,), 1, 441)
+        except ValueError as e:
+            errors.append(e)
+
+    reader, t = stream_pair(send, legacy_payload_bytes=CHUNK * 2)
+    try:
+        reader.accept(sample_rates=(48000,), block=CHUNK, resample=False)
+        msg = "accepted"
+    except ValueError as e:
+        msg = str(e)
+    t.join()
+    passed = bool(errors) and msg != "accepted"
+    print(f"reject   : {msg} / sender: {errors[0] if errors else 'no error'}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_codec() -> bool:
+    rng = np.random.default_rng(3)
+    t = np.arange(CHUNK * 50) / 48000
+    x = (6000 * np.sin(2 * np.pi * 220 * t) + rng.normal(0, 300, t.shape)).astype(np.int16).reshape(50, CHUNK)
+    ok = True
+    for prefs, tx_codecs in (
+        ((FORMAT_ULAW, FORMAT_PCM16), ALL_FORMATS),
+        ((FORMAT_ADPCM, FORMAT_ZLIB), ALL_FORMATS),
+        ((FORMAT_ZLIB,), ALL_FORMATS),
+        ((FORMAT_ADPCM, FORMAT_PCM16), (FORMAT_PCM16,)),  # 송신 쪽이 pcm16 만 되면 pcm16
+    ):
+        stats = []
+
+        def send(sock):
+            w = StreamWriter(sock)
+            w.negotiate((48000,), 1, CHUNK, codecs=tx_codecs)
+            for b in x:
+                w.send(b)
+            stats.append(w.bytes)
+
+        reader, th = stream_pair(send, legacy_payload_bytes=CHUNK * 2)
+        session = reader.accept(sample_rates=(48000,), channels=1, block=CHUNK, codecs=prefs)
+        got = np.concatenate([f.pcm.copy() for f in reader])
+        th.join()
+        fmt = next(c for c in prefs if c in tx_codecs)
+        enc, dec = make_codec(fmt, CHUNK), make_codec(fmt, CHUNK)
+        expect = np.concatenate([dec.decode(enc.encode(b).copy(), CHUNK).copy() for b in x])
+        passed = session.fmt == fmt and np.array_equal(got, expect)
+        if fmt in (FORMAT_PCM16, FORMAT_ZLIB):
+            passed &= np.array_equal(got, x.ravel())
+        ok &= passed
+        print(
+            f"codec    : {FORMAT_NAMES[session.fmt]:5s} {stats[0] / x.size:.2f} B/sample on the wire  "
+            f"{'OK' if passed else 'FAIL'}"
+        )
+    return ok
+
+
+def parse_cost(n_samples: int, n_frames: int = 3000) -> float:
+    block = np.zeros(n_samples, dtype=np.int16)
+
+    def send(sock):
+        w = StreamWriter(sock)
+        for _ in range(n_frames):
+            w.send(block)
+
+    reader, t = stream_pair(send, legacy_payload_bytes=CHUNK * 2)
+    # 송신이 다 끝나서 소켓에 쌓인 뒤가 아니라 동시에 돌기 때문에 수신 스레드 CPU 시간으로 잰다
+    c0 = time.thread_time()
+    for _ in reader:
+        pass
+    cpu = time.thread_time() - c0
+    t.join()
+    return cpu / n_frames * 1e6
+
+
+def check_cost() -> bool:
+    costs = {n: parse_cost(n) for n in (160, 480, 3840)}
+    print("cost     : " + ", ".join(f"{n} samples {c:.2f} us/frame" for n, c in costs.items()))
+    # recv_into 복사는 길이에 비례하지만 헤더 파싱은 고정 → 24배 길이에도 몇 배 이내
+    passed = costs[3840] < 6 * costs[160]
+    print(f"           3840 / 160 = {costs[3840] / costs[160]:.1f}x  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def main():
+    ok = check_v2()
+    ok &= check_lost()
+    ok &= check_v1(None)
+    ok &= check_v1("!II")
+    ok &= check_mismatch()
+    ok &= check_hello()
+    ok &= check_rechunk()
+    ok &= check_reject()
+    ok &= check_codec()
+    ok &= check_cost()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
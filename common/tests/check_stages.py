@@ -0,0 +1,165 @@
+"""
+StagedSender / StagedReceiver / SpscQueue 동작 확인
+
+    python common/tests/check_stages.py
+
+- spsc    : 두 스레드 사이로 정수를 많이 흘려서 순서/누락 없이 전달되는지
+- overlap : capture / dsp / net 이 각각 10ms 걸릴 때 순차 실행(30ms/블록)보다 빨라지는지,
+            보낸 블록 내용과 순서가 맞는지
+- slow net: 전송이 캡처보다 느릴 때 캡처는 기다리지 않고 큐에서 버리는지 (drops)
+- stamps  : timestamps=True 면 블록을 버리는 중에도 캡처 시각이 제 블록과 같이 send 까지 가는지
+- receiver: dsp 가 한 번 크게 늦어져도 recv 는 계속 읽고, play 는 무음으로 메우며 stall 을 세는지
+"""
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.stages import SpscQueue, StagedReceiver, StagedSender  # noqa: E402
+
+CHUNK = 480
+STEP_SEC = 0.01
+
+
+def check_spsc(n: int = 20000) -> bool:
+    q = SpscQueue(8)
+    got = []
+
+    def consumer():
+        for _ in range(n):
+            got.append(q.get())
+
+    t = threading.Thread(target=consumer)
+    t.start()
+    for i in range(n):
+        q.put(i)
+    t.join()
+    passed = got == list(range(n))
+    print(f"spsc     : {n} items, max depth {q.max_depth}/{q.capacity}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def run_sender(n_blocks: int, send_sec: float, depth: int, timestamps: bool = False):
+    counter = iter(range(n_blocks))
+    sent = []
+    stamps = []
+    done = threading.Event()
+
+    def capture():
+        time.sleep(STEP_SEC)  # stream.read 대신
+        i = next(counter, None)
+        if i is None:
+            done.set()
+            return None
+        frames = np.full(CHUNK, i, dtype=np.int16)
+        # 캡처 시각 대신 블록 번호를 시각으로
+        return (frames, i * STEP_SEC) if timestamps else frames
+
+    def process(frames):
+        time.sleep(STEP_SEC)  # RNNoise 대신
+        return frames + 1
+
+    def send(buf, ts=None):
+        time.sleep(send_sec)  # sendall 대신
+        sent.append(int(buf[0]))
+        stamps.append(ts)
+
+    sender = StagedSender(capture, process, send, chunk=CHUNK, depth=depth, timestamps=timestamps, tag="check")
+    t0 = time.perf_counter()
+    sender.start()
+    done.wait()
+    # 큐에 남은 블록까지 다 보낼 때까지 대기
+    while sender.q_dsp.depth or sender.q_out.depth or sender.items["net"] < sender.items["dsp"]:
+        time.sleep(STEP_SEC)
+    elapsed = time.perf_counter() - t0
+    sender.stop()
+    return sender, sent, stamps, elapsed
+
+
+def check_overlap(n_blocks: int = 40) -> bool:
+    sender, sent, _, elapsed = run_sender(n_blocks, STEP_SEC, depth=4)
+    sequential = n_blocks * 3 * STEP_SEC
+    passed = sent == [i + 1 for i in range(n_blocks)] and elapsed < 0.6 * sequential
+    print(f"overlap  : {elapsed * 1e3:.0f} ms (sequential ≈ {sequential * 1e3:.0f} ms)  {'OK' if passed else 'FAIL'}")
+    print(sender.format_stats())
+    return passed
+
+
+def check_slow_net(n_blocks: int = 40) -> bool:
+    sender, sent, _, _ = run_sender(n_blocks, 3 * STEP_SEC, depth=2)
+    drops = sender.q_dsp.drops
+    # 버린 블록만큼 빠지고, 보낸 블록은 순서가 유지돼야 함
+    passed = drops > 0 and len(sent) + drops == n_blocks and sent == sorted(sent)
+    print(f"slow net : sent {len(sent)}, dropped {drops}  {'OK' if passed else 'FAIL'}")
+    print(sender.format_stats())
+    return passed
+
+
+def check_stamps(n_blocks: int = 40) -> bool:
+    sender, sent, stamps, _ = run_sender(n_blocks, 3 * STEP_SEC, depth=2, timestamps=True)
+    drops = sender.q_dsp.drops
+    # process() 가 +1 하므로 블록 값 v 의 캡처 시각은 (v - 1) * STEP_SEC
+    passed = drops > 0 and len(stamps) == len(sent) and all(ts == (v - 1) * STEP_SEC for v, ts in zip(sent, stamps))
+    print(f"stamps   : sent {len(sent)}, dropped {drops}, timestamps follow their blocks  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_receiver(n_blocks: int = 40, prefill: int = 3, hiccup_at: int = 10) -> bool:
+    played = []
+    recv_times = []
+
+    def source():
+        for i in range(n_blocks):
+            time.sleep(STEP_SEC)  # 소켓에서 한 블록 받는 시간
+            recv_times.append(time.perf_counter())
+            yield np.full(CHUNK, i + 1, dtype=np.int16)
+
+    def process(frames):
+        # hiccup_at 번째 블록에서 RNNoise 가 8블록 길이만큼 멈춘 상황
+        time.sleep(8 * STEP_SEC if frames[0] == hiccup_at else STEP_SEC / 2)
+        return frames
+
+    def play(buf):
+        time.sleep(STEP_SEC)  # stream.write 가 장치 속도에 맞춰 막히는 시간
+        played.append(int(buf[0]))
+
+    rx = StagedReceiver(
+        source(), process, play, chunk=CHUNK, sample_rate=CHUNK / STEP_SEC, depth=16, prefill=prefill, tag="check"
+    )
+    rx.start()
+    while rx.wait(STEP_SEC):
+        pass
+    rx.stop()
+
+    # recv 는 dsp 가 멈춘 동안에도 일정한 간격으로 계속 읽어야 함
+    max_gap = max(np.diff(recv_times))
+    audio = [v for v in played if v]
+    passed = (
+        audio == list(range(1, n_blocks + 1))
+        and rx.stalls["play"] > 0
+        and rx.stalls["play"] == played.count(0)
+        and max_gap < 3 * STEP_SEC
+    )
+    print(
+        f"receiver : played {len(audio)} blocks + {played.count(0)} silence, "
+        f"max recv gap {max_gap * 1e3:.1f} ms  {'OK' if passed else 'FAIL'}"
+    )
+    print(rx.format_stats())
+    return passed
+
+
+def main():
+    ok = check_spsc()
+    ok &= check_overlap()
+    ok &= check_slow_net()
+    ok &= check_stamps()
+    ok &= check_receiver()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+DatagramWriter / DatagramReader (UDP 전송 + seq 순서 맞추기) 동작 확인
+
+    python common/tests/check_udp.py
+
+DatagramWriter 가 만든 데이터그램을 모아뒀다가 순서를 바꾸거나 빼서 loopback UDP 로 다시 보낸다.
+- order   : 그대로 보내면 전부 순서대로
+- reorder : 이웃끼리 순서를 바꿔도 lost 없이 순서대로, reordered 로 셈
+- loss    : 5 개를 빼면 lost 5, 나머지는 순서대로, 빠진 자리마다 reorder_ms 정도만 기다림
+- late    : lost 로 건너뛴 뒤에 온 데이터그램은 late 로 버림
+- split   : 3840 샘플 블록 → 480 샘플 데이터그램 8 개, ts 는 10 ms 씩 뒤
+- sendto  : sendmsg 가 없는 소켓이어도 같은 데이터그램
+- codec   : fmt 로 압축한 데이터그램을 빼고 순서를 바꿔 보내도, 받은 프레임마다 그 조각만 풀어서 나오는지
+- stray   : 샘플 수가 expect_samples 와 다른 데이터그램이 끼어도 bad 로 버리고 나머지는 그대로 받는지
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.codec import FORMAT_ADPCM, FORMAT_NAMES, FORMAT_ULAW, FORMAT_ZLIB, make_codec  # noqa: E402
+from common.udp import DatagramReader, DatagramWriter  # noqa: E402
+
+RATE = 48000
+CHUNK = 480
+REORDER_MS = 20.0
+
+
+class _Collect:
+    # 보낸 데이터그램을 모으는 소켓
+    def __init__(self):
+        self.datagrams = []
+
+    def sendmsg(self, bufs):
+        data = b"".join(memoryview(b).cast("B").tobytes() for b in bufs)
+        self.datagrams.append(data)
+        return len(data)
+
+
+class _CollectNoSendmsg:
+    def __init__(self):
+        self.datagrams = []
+
+    def send(self, data):
+        self.datagrams.append(bytes(data))
+        return len(data)
+
+
+def make_datagrams(n: int, samples: int = CHUNK, sock=None):
+    sock = sock or _Collect()
+    writer = DatagramWriter(sock, RATE)
+    blocks = [np.full(samples, i, dtype=np.int16) for i in range(n)]
+    for i, b in enumerate(blocks):
+        writer.send(b, ts=1.0 + i * samples / RATE, mode=i % 4, rms=i)
+    return sock.datagrams
+
+
+def replay(datagrams, order, **reader_kw):
+    # order 순서로 보내고 DatagramReader 로 다 받은 frame 들 (seq, 첫 값, ts, pcm) 과 reader
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(("127.0.0.1", 0))
+    rx.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    tx.connect(rx.getsockname())
+
+    def run():
+        for i in order:
+            if i is None:
+                time.sleep(0.05)
+            else:
+                tx.send(datagrams[i])
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    reader = DatagramReader(rx, reorder_ms=REORDER_MS, idle_timeout=0.3, **reader_kw)
+    t0 = time.monotonic()
+    got = [(f.seq, int(f.pcm[0]), f.ts_us, f.pcm.copy()) for f in reader]
+    elapsed = time.monotonic() - t0
+    t.join()
+    tx.close()
+    rx.close()
+    return got, reader, elapsed
+
+
+def check_order() -> bool:
+    dg = make_datagrams(200)
+    got, reader, _ = replay(dg, range(200))
+    passed = [g[0] for g in got] == list(range(200)) and reader.lost == reader.late == reader.reordered == 0
+    print(f"order    : {len(got)} frames  {'OK' if passed else 'FAIL'}")
+    print(reader.format_stats())
+    return passed
+
+
+def check_reorder() -> bool:
+    dg = make_datagrams(200)
+    order = []
+    for i in range(0, 200, 2):
+        order += [i + 1, i]
+    got, reader, _ = replay(dg, order)
+    passed = [g[1] for g in got] == list(range(200)) and reader.lost == 0 and reader.reordered == 100
+    print(f"reorder  : {len(got)} frames, reordered {reader.reordered}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_loss() -> bool:
+    dg = make_datagrams(200)
+    dropped = {10, 50, 51, 120, 199 - 5}
+    got, reader, elapsed = replay(dg, [i for i in range(200) if i not in dropped])
+    expect = [i for i in range(200) if i not in dropped]
+    # 빠진 자리 4 곳 (50, 51 은 한 번에 건너뜀) × reorder_ms + idle_timeout
+    passed = [g[1] for g in got] == expect and reader.lost == 5 and elapsed < 0.3 + 4 * REORDER_MS / 1000 + 0.2
+    print(f"loss     : lost {reader.lost} (expected 5), {elapsed * 1000:.0f} ms  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_late() -> bool:
+    dg = make_datagrams(20)
+    # 5 를 빼고 보내다가 (lost 로 건너뛸 시간만큼 쉬고) 나중에 5 를 보냄
+    order = [i for i in range(20) if i != 5] + [None, 5]
+    got, reader, _ = replay(dg, order)
+    passed = 5 not in [g[1] for g in got] and reader.lost == 1 and reader.late == 1
+    print(f"late     : lost {reader.lost}, late {reader.late}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_split() -> bool:
+    dg = make_datagrams(10, samples=3840)
+    got, reader, _ = replay(dg, range(len(dg)))
+    ts = [g[2] for g in got]
+    passed = (
+        len(dg) == 80
+        and max(len(d) for d in dg) <= 1500
+        and [g[1] for g in got] == [i // 8 for i in range(80)]
+        and all(b - a == 10000 for a, b in zip(ts, ts[1:]))
+    )
+    print(f"split    : 10 x 3840 -> {len(dg)} datagrams of {len(dg[0])} B  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_sendto() -> bool:
+    passed = make_datagrams(20, samples=1000, sock=_CollectNoSendmsg()) == make_datagrams(20, samples=1000)
+    print(f"sendto   : same datagrams without sendmsg  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def check_codec() -> bool:
+    t = np.arange(CHUNK * 100) / RATE
+    blocks = (6000 * np.sin(2 * np.pi * 330 * t)).astype(np.int16).reshape(100, CHUNK)
+    dropped = {7, 30, 31}
+    order = []
+    for i in range(0, 100, 2):
+        order += [i + 1, i]
+    order = [i for i in order if i not in dropped]
+    ok = True
+    for fmt in (FORMAT_ULAW, FORMAT_ADPCM, FORMAT_ZLIB):
+        sock = _Collect()
+        writer = DatagramWriter(sock, RATE, fmt=fmt)
+        for i, b in enumerate(blocks):
+            writer.send(b, ts=1.0 + i * CHUNK / RATE)
+        got, reader, _ = replay(sock.datagrams, order)
+        # 기대값: 같은 순서로 인코딩 (ADPCM 상태는 빠진 조각도 거쳐서 이어짐) 한 뒤 조각마다 따로 디코딩
+        enc = make_codec(fmt, CHUNK)
+        expect = [make_codec(fmt, CHUNK).decode(enc.encode(b).copy(), CHUNK).copy() for b in blocks]
+        passed = (
+            [g[0] for g in got] == [i for i in range(100) if i not in dropped]
+            and all(np.array_equal(g[3], expect[g[0]]) for g in got)
+            and reader.lost == len(dropped)
+            and reader.bad == 0
+        )
+        ok &= passed
+        size = sum(len(d) for d in sock.datagrams) / len(sock.datagrams)
+        print(
+            f"codec    : {FORMAT_NAMES[fmt]:5s} {len(got)} frames, lost {reader.lost}, {size:.0f} B/datagram  "
+            f"{'OK' if passed else 'FAIL'}"
+        )
+    return ok
+
+
+def check_stray() -> bool:
+    dg = make_datagrams(100) + make_datagrams(1, samples=CHUNK // 2)
+    order = list(range(50)) + [100] + list(range(50, 100))
+    try:
+        got, reader, _ = replay(dg, order, expect_samples=CHUNK)
+    except ValueError as e:
+        print(f"stray    : {e}  FAIL")
+        return False
+    passed = [g[1] for g in got] == list(range(100)) and reader.bad == 1 and reader.lost == 0
+    print(f"stray    : {len(got)} frames, bad {reader.bad}  {'OK' if passed else 'FAIL'}")
+    return passed
+
+
+def main():
+    ok = check_order()
+    ok &= check_reorder()
+    ok &= check_loss()
+    ok &= check_late()
+    ok &= check_split()
+    ok &= check_sendto()
+    ok &= check_codec()
+    ok &= check_stray()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+음성 대역 송신 (48 kHz → 16 kHz 로 줄여 보내고 수신 쪽에서 48 kHz 로 되돌림) 확인
+
+    python common/tests/check_voiceband.py
+
+pi_a_sender_filtered_gpio_v3 의 TX_RATE = 16000 과 같은 경로 (PolyphaseResampler → StreamWriter / DatagramWriter
+→ StreamReader / DatagramReader → RateConverter) 를 socketpair / 루프백 UDP 로 돌린다.
+- delay : 왕복 지연을 실제로 재서 (기준 파형을 1 샘플씩 밀어 오차가 가장 작은 곳) 두 필터 delay_ms 합과 맞는지
+- band  : 말소리 대역 (150 Hz ~ 6 kHz) 은 그대로 (SNR), 8 kHz 위는 걸러지는지 (접혀 들어오지 않음)
+- tcp   : 핸드셰이크로 16 kHz 세션이 잡히고 frame.rate 가 16000, 바이트 수가 48 kHz 그대로 보낼 때의 1/3 인지
+- udp   : 데이터그램 META 의 rate 로 수신 쪽이 레이트를 알아서 되돌리는지, 바이트 수 1/3
+- mixed : 도중에 레이트가 바뀌어도 (48k → 16k) RateConverter 가 따라가는지
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common.protocol import StreamReader, StreamWriter  # noqa: E402
+from common.resample import PolyphaseResampler, RateConverter  # noqa: E402
+from common.udp import DatagramReader, DatagramWriter  # noqa: E402
+
+SAMPLE_RATE = 48000
+TX_RATE = 16000
+CHUNK = 3840  # 송신부 블록 (80 ms)
+N_BLOCKS = 50
+MIN_SNR = 40.0
+MIN_REJECT = 60.0
+
+
+def voice(n: int) -> np.ndarray:
+    # 말소리 대역 배음 몇 개 (150 Hz ~ 6 kHz)
+    t = np.arange(n) / SAMPLE_RATE
+    x = sum(np.sin(2 * np.pi * f * t + f) for f in (150, 410, 1130, 2370, 3900, 6000))
+    return (4000 * x).astype(np.int16)
+
+
+def roundtrip(x: np.ndarray):
+    # 송신부 (CHUNK 블록마다 줄임) → 수신부 (프레임마다 되돌림), 네트워크 없이
+    band = PolyphaseResampler(SAMPLE_RATE, TX_RATE, max_frames=CHUNK)
+    conv = RateConverter(SAMPLE_RATE, max_frames=CHUNK, tag="check")
+    out = [conv.process(band.process(b), TX_RATE).copy() for b in x.reshape(-1, CHUNK)]
+    return np.concatenate(out), band.delay_ms + conv.delay_ms
+
+
+def best_delay(x: np.ndarray, y: np.ndarray, max_shift: int = 400):
+    # y[d:] 가 x 와 가장 가까운 d 와 그때 SNR (앞쪽 필터 채워지는 구간 / 끝 제외)
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    ref = x[CHUNK:-CHUNK]
+    best = None
+    for d in range(max_shift):
+        e = y[CHUNK + d:CHUNK + d + ref.shape[0]] - ref
+        err = np.dot(e, e)
+        if best is None or err < best[1]:
+            best = (d, err)
+    d, err = best
+    return d, 10 * np.log10(np.dot(ref, ref) / max(err, 1e-9))
+
+
+def check_delay_band() -> bool:
+    x = voice(CHUNK * N_BLOCKS)
+    y, delay_ms = roundtrip(x)
+    d, snr = best_delay(x, y)
+    measured_ms = 1000.0 * d / SAMPLE_RATE
+    passed = abs(measured_ms - delay_ms) <= 1000.0 / SAMPLE_RATE and snr >= MIN_SNR
+    print(
+        f"delay    : measured {measured_ms:.2f} ms ({d} samples), filters {delay_ms:.2f} ms  "
+        f"voice band SNR {snr:.1f} dB  {'OK' if passed else 'FAIL'}"
+    )
+
+    t = np.arange(CHUNK * N_BLOCKS) / SAMPLE_RATE
+    ok = passed
+    for f in (9000.0, 12000.0, 20000.0):
+        hi = (10000 * np.sin(2 * np.pi * f * t)).astype(np.int16)
+        yh, _ = roundtrip(hi)
+        rms = yh[CHUNK:-CHUNK].astype(np.float64).std()
+        rej = 20 * np.log10(10000 / (np.sqrt(2) * max(rms, 1e-3)))
+        passed = rej >= MIN_REJECT
+        ok &= passed
+        print(f"band     : {f / 1000:4.1f} kHz rejected {rej:5.1f} dB  {'OK' if passed else 'FAIL'}")
+    return ok
+
+
+def run_tcp(tx_rate: int, x: np.ndarray):
+    a, b = socket.socketpair()
+    sent = {}
+
+    def send():
+        try:
+            w = StreamWriter(a, tag="check")
+            w.negotiate((tx_rate,), 1, CHUNK * tx_rate // SAMPLE_RATE)
+            band = PolyphaseResampler(SAMPLE_RATE, tx_rate, max_frames=CHUNK) if tx_rate != SAMPLE_RATE else None
+            for blk in x.reshape(-1, CHUNK):
+                w.send(blk if band is None else band.process(blk), mode=2, prob=0.25)
+            sent["bytes"] = w.bytes
+        finally:
+            a.close()
+
+    t = threading.Thread(target=send, daemon=True)
+    t.start()
+    reader = StreamReader(b, CHUNK * 2, tag="check")
+    session = reader.accept(sample_rates=(SAMPLE_RATE,), channels=1, block=CHUNK)
+    conv = RateConverter(SAMPLE_RATE, max_frames=session.block, tag="check")
+    rates, out = set(), []
+    for frame in reader:
+        rates.add(frame.rate)
+        out.append(conv.process(frame.pcm, frame.rate).copy())
+    t.join()
+    b.close()
+    return session, rates, np.concatenate(out), sent["bytes"]
+
+
+def check_tcp() -> bool:
+    x = voice(CHUNK * N_BLOCKS)
+    s48, r48, y48, bytes48 = run_tcp(SAMPLE_RATE, x)
+    s16, r16, y16, bytes16 = run_tcp(TX_RATE, x)
+    d, snr = best_delay(x, y16)
+    passed = (
+        s48.sample_rate == SAMPLE_RATE and r48 == {SAMPLE_RATE} and np.array_equal(y48, x)
+        and s16.sample_rate == TX_RATE and s16.block == CHUNK // 3 and r16 == {TX_RATE}
+        and bytes48 / bytes16 > 2.9 and snr >= MIN_SNR
+    )
+    print(
+        f"tcp      : 48k {bytes48} B, 16k {bytes16} B (x{bytes48 / bytes16:.2f} less), "
+        f"frame.rate {sorted(r16)}, SNR {snr:.1f} dB @ {d} samples  {'OK' if passed else 'FAIL'}"
+    )
+    return passed
+
+
+def run_udp(tx_rate: int, x: np.ndarray):
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(("127.0.0.1", 0))
+    rx.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    tx.connect(rx.getsockname())
+    writer = DatagramWriter(tx, tx_rate, tag="check")
+    band = PolyphaseResampler(SAMPLE_RATE, tx_rate, max_frames=CHUNK) if tx_rate != SAMPLE_RATE else None
+
+    def send():
+        for blk in x.reshape(-1, CHUNK):
+            writer.send(blk if band is None else band.process(blk))
+            time.sleep(0.002)
+
+    t = threading.Thread(target=send, daemon=True)
+    t.start()
+    reader = DatagramReader(rx, idle_timeout=0.3, tag="check")
+    conv = RateConverter(SAMPLE_RATE, max_frames=CHUNK, tag="check")
+    rates, out = set(), []
+    for frame in reader:
+        rates.add(frame.rate)
+        out.append(conv.process(frame.pcm, frame.rate).copy())
+    t.join()
+    tx.close()
+    rx.close()
+    return rates, np.concatenate(out), writer.bytes, reader.lost
+
+
+def check_udp() -> bool:
+    x = voice(CHUNK * N_BLOCKS)
+    r48, y48, bytes48, lost48 = run_udp(SAMPLE_RATE, x)
+    r16, y16, bytes16, lost16 = run_udp(TX_RATE, x)
+    d, snr = best_delay(x, y16)
+    passed = (
+        r48 == {SAMPLE_RATE} and np.array_equal(y48, x) and r16 == {TX_RATE}
+        and lost48 == lost16 == 0 and bytes48 / bytes16 > 2.9 and snr >= MIN_SNR
+    )
+    print(
+        f"udp      : 48k {bytes48} B, 16k {bytes16} B (x{bytes48 / bytes16:.2f} less), "
+        f"frame.rate {sorted(r16)}, SNR {snr:.1f} dB @ {d} samples  {'OK' if passed else 'FAIL'}"
+    )
+    return passed
+
+
+def check_mixed() -> bool:
+    # 앞 절반은 48 kHz 그대로, 뒤 절반은 16 kHz 로 (송신부가 도중에 음성 대역 모드를 켠 경우)
+    x = voice(CHUNK * N_BLOCKS).reshape(-1, CHUNK)
+    half = N_BLOCKS // 2
+    band = PolyphaseResampler(SAMPLE_RATE, TX_RATE, max_frames=CHUNK)
+    conv = RateConverter(SAMPLE_RATE, max_frames=CHUNK, tag="check")
+    first = np.concatenate([conv.process(b, SAMPLE_RATE).copy() for b in x[:half]])
+    rest = np.concatenate([conv.process(band.process(b), TX_RATE).copy() for b in x[half:]])
+    d, snr = best_delay(x[half:].ravel(), rest)
+    passed = (
+        np.array_equal(first, x[:half].ravel()) and conv.in_rate == TX_RATE
+        and abs(rest.shape[0] - (N_BLOCKS - half) * CHUNK) <= 1 and snr >= MIN_SNR
+    )
+    print(f"mixed    : 48k passthrough then 16k, SNR {snr:.1f} dB @ {d} samples  {'OK' if passed else 'FAIL'}")
+    print(conv.format_stats())
+    return passed
+
+
+def main():
+    ok = check_delay_band()
+    ok &= check_tcp()
+    ok &= check_udp()
+    ok &= check_mixed()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
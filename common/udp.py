@@ -0,0 +1,362 @@
+"""
+UDP 전송 (데이터그램 하나 = v2 프레임 하나) + seq 순서 맞추는 수신 버퍼
+
+TCP 는 패킷 하나가 늦거나 재전송되면 뒤에 온 블록까지 전부 붙잡고 있는다 (head-of-line blocking).
+Wi-Fi 에서 가끔 생기는 수십~수백 ms 지연이 그대로 재생 끊김이 된다.
+UDP 로 보내면 늦은 블록 하나만 빠지고 나머지는 바로 재생할 수 있다.
+
+데이터그램은 protocol.py 의 v2 프레임 (HEADER + META + payload) 을 그대로 쓴다.
+payload 는 int16 PCM 또는 DatagramWriter(fmt=...) 로 고른 코덱 (common.codec). 데이터그램마다 따로 풀린다.
+META 의 rate 에 송신 샘플레이트를 표시한다 (핸드셰이크가 없어서 수신 쪽은 이걸 보고 장치 레이트로 변환).
+send(silence=True) 블록은 쪼개지 않고 comfort noise 설명 (fmt cn, 7 B 또는 헤더만) 데이터그램 하나로 보낸다 (DTX).
+  - DatagramWriter : 블록을 max_samples 씩 잘라서 (IP 단편화 안 되게, 기본 480 = 1 KB 미만) seq / ts 를 붙여 보냄
+  - DatagramReader : seq % depth 슬롯에 받아두고 seq 순서대로 꺼냄
+                     빠진 seq 는 reorder_ms 까지만 기다리고 lost 로 넘어감, 이미 지나간 seq 는 late 로 버림
+핸드셰이크는 없다 (양쪽 설정을 맞춰서 쓰고, expect_samples 와 샘플 수가 다른 데이터그램은 bad 로 버림).
+
+TCP / UDP 는 스크립트의 TRANSPORT 나 환경변수 AUDIO_TRANSPORT 로 고른다.
+"""
+
+import os
+import socket
+import struct
+import time
+
+import numpy as np
+
+from common.codec import FORMAT_CN, FORMAT_NAMES, FORMAT_PCM16, make_codec, max_payload_bytes
+from common.protocol import FLAG_META, Frame, HEADER, MAGIC, META, RATES, VERSION, rate_code
+
+TRANSPORTS = ("tcp", "udp")
+TRANSPORT_ENV = "AUDIO_TRANSPORT"
+
+# 데이터그램당 최대 샘플 수 (960 + 32 바이트 → 이더넷 / Wi-Fi MTU 1500 안에 들어감)
+_MAX_SAMPLES = 480
+# 순서 맞추기 버퍼 슬롯 수 (블록 수)
+_DEPTH = 64
+# 빠진 seq 를 기다리는 최대 시간
+_REORDER_MS = 20.0
+# 이만큼 아무것도 안 오면 송신이 끝난 것으로 봄 (첫 데이터그램 전에는 계속 기다림)
+_IDLE_TIMEOUT = 2.0
+
+_SEQ_MOD = 1 << 32
+_JITTER_GAIN = 1.0 / 16.0
+
+
+def select_transport(name: str = None, tag: str = "Net") -> str:
+    # name 이 None 이면 환경변수 AUDIO_TRANSPORT, 그것도 없으면 tcp
+    name = (name or os.environ.get(TRANSPORT_ENV) or "tcp").lower()
+    if name not in TRANSPORTS:
+        raise ValueError(f"transport must be one of {TRANSPORTS} (got {name!r})")
+    print(f"[{tag}] transport: {name}")
+    return name
+
+
+class DatagramWriter:
+    """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.connect((RECEIVER_IP, RECEIVER_PORT))
+        writer = DatagramWriter(sock, SAMPLE_RATE, tag="Pi_A")
+        writer.send(block, ts=capture_ts, mode=MODE, prob=denoiser.prob)
+
+    block 이 max_samples 보다 길면 잘라서 여러 데이터그램으로 (조각마다 seq +1, ts 는 조각 위치만큼 뒤).
+    fmt 를 주면 조각마다 그 코덱으로 압축 (핸드셰이크가 없어서 송신 쪽이 정함, 수신 쪽은 헤더의 fmt 로 풂).
+    silence=True 면 (DTX 무음 구간) 블록 전체를 comfort noise 설명 하나로. 수신부가 fmt cn 을 아는 버전이어야 함.
+    헤더 버퍼는 미리 잡아두고 pack_into, PCM 은 sendmsg 로 복사 없이 같이 보낸다.
+    sendmsg 가 없는 소켓(Windows)은 미리 잡은 버퍼에 PCM 을 복사해서 send.
+    수신부가 아직 안 떠서 생기는 ConnectionRefusedError 는 세기만 하고 계속 보낸다.
+    """
+
+    def __init__(
+        self,
+        sock,
+        sample_rate: int,
+        max_samples: int = _MAX_SAMPLES,
+        meta: bool = True,
+        fmt: int = FORMAT_PCM16,
+        tag: str = "UDP",
+    ):
+        self.sock = sock
+        self.sample_rate = sample_rate
+        self.max_samples = max_samples
+        self.meta = meta
+        self.tag = tag
+        self.header = struct.Struct(HEADER.format + META.format[1:] if meta else HEADER.format)
+        self._flags = FLAG_META if meta else 0
+        self._codec = make_codec(fmt, max_samples) if fmt != FORMAT_PCM16 else None
+        self.fmt = fmt
+        self._rate = rate_code(sample_rate)
+        self._cn = None
+        self._buf = bytearray(self.header.size + max_payload_bytes(max_samples))
+        self._mv = memoryview(self._buf)
+        self._hdr = self._mv[:self.header.size]
+        self._body = np.frombuffer(self._buf, dtype=np.uint8, offset=self.header.size)
+        self._sendmsg = getattr(sock, "sendmsg", None)
+        self.seq = 0
+
+        self.packets = 0
+        self.bytes = 0
+        self.refused = 0
+        self.silent = 0
+
+    def send(self, pcm, ts: float = None, mode: int = 0, rms: int = 0, prob: float = 0.0, silence: bool = False):
+        pcm = np.ascontiguousarray(pcm, dtype=np.int16)
+        ts_us = int((time.monotonic() if ts is None else ts) * 1e6)
+        rms = min(int(rms), 0xFFFF)
+        step = self.max_samples
+        if silence:
+            if self._cn is None:
+                self._cn = make_codec(FORMAT_CN, pcm.shape[0])
+            step = max(1, pcm.shape[0])
+        for i in range(0, pcm.shape[0], step):
+            piece = pcm[i:i + step]
+            n = piece.shape[0]
+            if silence:
+                body, fmt = self._cn.encode(piece), FORMAT_CN
+                self.silent += 1
+            else:
+                body = piece.view(np.uint8) if self._codec is None else self._codec.encode(piece)
+                fmt = self.fmt
+            nbytes = body.shape[0]
+            fields = (MAGIC, VERSION, self._flags, n, self.seq, ts_us + i * 1000000 // self.sample_rate,
+                      fmt, 1, nbytes)
+            if self.meta:
+                fields += (mode, self._rate, rms, prob)
+            self.header.pack_into(self._buf, 0, *fields)
+            size = self.header.size + nbytes
+            try:
+                if self._sendmsg is not None:
+                    self._sendmsg([self._hdr, body])
+                else:
+                    self._body[:nbytes] = body
+                    self.sock.send(self._mv[:size])
+            except ConnectionRefusedError:
+                # 연결된 UDP 소켓: 상대 포트가 닫혀 있으면 ICMP 가 다음 send 에서 에러로 올라옴
+                self.refused += 1
+            self.seq = (self.seq + 1) % _SEQ_MOD
+            self.packets += 1
+            self.bytes += size
+
+    def format_stats(self) -> str:
+        return (
+            f"[{self.tag}] udp send: {self.packets} datagrams, {self.bytes} bytes ({FORMAT_NAMES[self.fmt]}), "
+            f"comfort noise {self.silent}, refused {self.refused}"
+        )
+
+
+class DatagramReader:
+    """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((LISTEN_IP, LISTEN_PORT))
+        reader = DatagramReader(sock, tag="Pi_B")
+        for frame in reader:                 # seq 순서대로, idle_timeout 동안 아무것도 안 오면 끝
+            player.write(frame.pcm)
+
+    데이터그램은 미리 잡은 버퍼 풀에 recv_into 하고, 슬롯에는 버퍼 번호만 넣었다 뺀다 (복사 없음).
+    압축된 데이터그램은 read() 에서 내보낼 때 풂 (순서가 정해진 뒤, 버려지는 것은 풀지 않음).
+    돌려준 frame.pcm 은 다음 read() 전까지만 유효하다.
+
+    빠진 seq 가 있으면 (뒤 seq 는 이미 와 있음)
+      - reorder_ms 안에 오면 순서대로 내보냄 (reordered 로 셈)
+      - reorder_ms 가 지나거나 버퍼가 절반 넘게 차면 와 있는 다음 seq 까지 lost 로 건너뜀
+      - 건너뛴 뒤에 오면 late 로 버림
+
+    통계: frames / lost / late / reordered / duplicates / bad (형식이나 expect_samples 가 다른 데이터그램) / jitter_ms
+    """
+
+    def __init__(
+        self,
+        sock,
+        max_samples: int = _MAX_SAMPLES,
+        depth: int = _DEPTH,
+        reorder_ms: float = _REORDER_MS,
+        idle_timeout: float = _IDLE_TIMEOUT,
+        expect_samples: int = None,
+        tag: str = "UDP",
+    ):
+        self.sock = sock
+        self.depth = depth
+        self.reorder = reorder_ms / 1000.0
+        self.idle_timeout = idle_timeout
+        self.expect_samples = expect_samples
+        self.tag = tag
+
+        size = HEADER.size + META.size + max_payload_bytes(max_samples)
+        # 슬롯 depth 개 + 받는 중 1 + 내보낸 것 1
+        self._bufs = [bytearray(size) for _ in range(depth + 2)]
+        self._i16 = [np.frombuffer(b, dtype=np.int16) for b in self._bufs]
+        self._u8 = [np.frombuffer(b, dtype=np.uint8) for b in self._bufs]
+        self._decoders = {}
+        self._free = list(range(depth + 2))
+        self._out = None
+        # 슬롯: (버퍼 번호, seq, ts_us, mode, rms, prob, 샘플 수, fmt, payload 바이트 수, 샘플레이트) 또는 None
+        self._slots = [None] * depth
+        self._pending = 0
+        self._next = None
+        self._max_seq = None
+        self._gap_since = None
+        # 첫 데이터그램 뒤 reorder_ms 동안은 내보내지 않음 (첫 몇 개의 순서가 바뀌어 와도 맞추려고)
+        self._start_at = None
+
+        self.frames = 0
+        self.lost = 0
+        self.late = 0
+        self.reordered = 0
+        self.duplicates = 0
+        self.bad = 0
+        self.jitter_ms = 0.0
+        self._transit = None
+
+    def _recv(self, timeout) -> bool:
+        # 데이터그램 하나를 받아 슬롯에 넣음. timeout 이 지나면 False
+        idx = self._free.pop()
+        buf = self._bufs[idx]
+        self.sock.settimeout(timeout)
+        try:
+            nbytes = self.sock.recv_into(buf)
+        except socket.timeout:
+            self._free.append(idx)
+            return False
+        arrival = time.monotonic()
+
+        stored = False
+        try:
+            stored = self._store(idx, buf, nbytes, arrival)
+        finally:
+            if not stored:
+                self._free.append(idx)
+        return True
+
+    def _store(self, idx, buf, nbytes, arrival) -> bool:
+        if nbytes < HEADER.size:
+            self.bad += 1
+            return False
+        magic, version, flags, n, seq, ts_us, fmt, channels, payload = HEADER.unpack_from(buf, 0)
+        meta_bytes = META.size if flags & FLAG_META else 0
+        if (magic != MAGIC or version != VERSION or fmt not in FORMAT_NAMES
+                or (fmt == FORMAT_PCM16 and payload != 2 * n * channels)
+                or nbytes != HEADER.size + meta_bytes + payload):
+            self.bad += 1
+            return False
+        if self.expect_samples is not None and n != self.expect_samples:
+            # 설정이 다른 송신부 / 엉뚱한 패킷 하나 때문에 받는 스레드가 죽지 않게 버리기만 함
+            self.bad += 1
+            return False
+        mode = rms = prob = rate = None
+        if meta_bytes:
+            mode, code, rms, prob = META.unpack_from(buf, HEADER.size)
+            if 0 < code < len(RATES):
+                rate = RATES[code]
+
+        transit = arrival * 1000.0 - ts_us / 1000.0
+        if self._transit is not None:
+            self.jitter_ms += (abs(transit - self._transit) - self.jitter_ms) * _JITTER_GAIN
+        self._transit = transit
+
+        if self._next is None:
+            self._next = seq
+            self._start_at = arrival + self.reorder
+        elif self.frames == 0 and (self._next - seq) % _SEQ_MOD <= (self._max_seq - seq) % _SEQ_MOD < self.depth:
+            # 아직 아무것도 안 내보냈으면 더 앞선 seq 부터 시작
+            self._next = seq
+        if self._max_seq is not None and (seq - self._max_seq) % _SEQ_MOD >= _SEQ_MOD // 2:
+            self.reordered += 1
+        else:
+            self._max_seq = seq
+
+        diff = (seq - self._next) % _SEQ_MOD
+        if diff >= _SEQ_MOD // 2:
+            # 이미 내보냈거나 lost 로 건너뛴 seq
+            self.late += 1
+            return False
+        if diff >= self.depth:
+            # 슬롯보다 멀리 앞섬 (긴 끊김 / 송신 재시작): 받아둔 것까지 버리고 여기서 다시 시작
+            self.lost += diff
+            self._drop_all()
+            self._next = seq
+        slot = seq % self.depth
+        if self._slots[slot] is not None:
+            self.duplicates += 1
+            return False
+        self._slots[slot] = (idx, seq, ts_us, mode, rms, prob, n * channels, fmt, payload, rate)
+        self._pending += 1
+        return True
+
+    def _decode(self, fmt, payload, count):
+        dec = self._decoders.get(fmt)
+        if dec is None:
+            dec = self._decoders[fmt] = make_codec(fmt, count)
+        return dec.decode(payload, count)
+
+    def _drop_all(self):
+        for i, entry in enumerate(self._slots):
+            if entry is not None:
+                self._free.append(entry[0])
+                self._slots[i] = None
+        self._pending = 0
+        self._gap_since = None
+
+    def _skip_gap(self):
+        # 와 있는 것 중 가장 가까운 seq 까지 lost 로 건너뜀
+        nearest = min((entry[1] - self._next) % _SEQ_MOD for entry in self._slots if entry is not None)
+        self.lost += nearest
+        self._next = (self._next + nearest) % _SEQ_MOD
+        self._gap_since = None
+
+    def read(self):
+        # seq 순서의 다음 Frame. idle_timeout 동안 아무것도 안 오면 None
+        if self._out is not None:
+            self._free.append(self._out)
+            self._out = None
+
+        while True:
+            now = time.monotonic()
+            if self.frames == 0 and self._start_at is not None and now < self._start_at \
+                    and self._pending <= self.depth // 2:
+                self._recv(self._start_at - now)
+                continue
+            if self._next is not None:
+                slot = self._next % self.depth
+                entry = self._slots[slot]
+                if entry is not None and entry[1] == self._next:
+                    idx, seq, ts_us, mode, rms, prob, count, fmt, payload, rate = entry
+                    self._slots[slot] = None
+                    self._pending -= 1
+                    self._out = idx
+                    self._next = (seq + 1) % _SEQ_MOD
+                    self._gap_since = None
+                    self.frames += 1
+                    offset = HEADER.size + (META.size if mode is not None else 0)
+                    if fmt == FORMAT_PCM16:
+                        pcm = self._i16[idx][offset // 2:offset // 2 + count]
+                    else:
+                        pcm = self._decode(fmt, self._u8[idx][offset:offset + payload], count)
+                    return Frame(VERSION, seq, ts_us, mode, rms, prob, pcm, rate)
+
+            if self._pending:
+                # 빠진 seq 를 기다리는 중
+                if self._gap_since is None:
+                    self._gap_since = now
+                waited = now - self._gap_since
+                if waited >= self.reorder or self._pending > self.depth // 2:
+                    self._skip_gap()
+                    continue
+                timeout = self.reorder - waited
+            else:
+                timeout = self.idle_timeout if self._next is not None else None
+
+            if not self._recv(timeout) and not self._pending:
+                return None
+
+    def __iter__(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def format_stats(self) -> str:
+        return (
+            f"[{self.tag}] udp recv: {self.frames} frames, lost {self.lost}, late {self.late}, "
+            f"reordered {self.reordered}, dup {self.duplicates}, bad {self.bad}, jitter {self.jitter_ms:.2f} ms"
+        )
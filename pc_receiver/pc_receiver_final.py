@@ -1,10 +1,17 @@
 # pi_b_receiver.py
 
 import socket
-import sounddevice as sd
-import numpy as np
-from collections import deque
-import math
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.codec import FORMAT_PCM16, FORMAT_ZLIB
+from common.protocol import StreamReader
+from common.catchup import CatchUp
+from common.drift import DriftEstimator
+from common.jitter import AdaptiveJitter
+from common.playback import CallbackPlayer
+from common.resample import RateConverter
 
 # ===== 네트워크 설정 (서버 역할) =====
 LISTEN_IP = "0.0.0.0"   # 모든 인터페이스에서 받기
@@ -17,14 +24,31 @@ CHANNELS = 1
 CHUNK = 480          # 10ms @ 48kHz
 DTYPE = "int16"
 BYTES_PER_CHUNK = CHUNK * CHANNELS * 2
+# 송신부에 요청할 코덱 (앞쪽 우선, 송신부가 못 하면 다음 것). zlib = 무손실 (말소리면 3/4 정도),
+# Wi-Fi 가 붐비면 FORMAT_ULAW (1/2, 37 dB) / FORMAT_ADPCM (1/4, 30 dB) 를 앞에
+WIRE_CODECS = (FORMAT_ZLIB, FORMAT_PCM16)
 # =======================
 
-# ===== 인위적 딜레이 설정 =====
-DELAY_SEC = 0.5
-DELAY_FRAMES = int(math.ceil(DELAY_SEC * SAMPLE_RATE / CHUNK))
-print(f"[Pi_B] delay: {DELAY_SEC}s ≒ {DELAY_FRAMES} frames")
+# ===== 지터 버퍼 (예전 고정 DELAY_SEC = 0.5 s 대신) =====
+# 도착 간격이 흔들리는 정도를 재서, 늦은 블록 때문에 끊기는 비율이 UNDERRUN_TARGET 이하인
+# 가장 작은 깊이만큼만 쌓아두고 재생 (직결 LAN 이면 JITTER_MIN_MS 근처까지 내려감)
+JITTER_MIN_MS = 20.0
+JITTER_MAX_MS = 500.0
+UNDERRUN_TARGET = 0.005
+# 밀린 블록이 한꺼번에 오면 (Wi-Fi 멈춤 뒤 TCP 버스트) 목표 지연으로 다시 줄이는 방법
+# "silence": 무음 블록만 버림 (말이 안 끊기면 결국 그냥 버림) / "wsola": 말하는 중에도 블록을 살짝 짧게 / None: 끔
+CATCHUP_METHOD = "wsola"
+# 송신 마이크 / 재생 장치 클럭 차이(ppm)를 버퍼 깊이로 추정해서 리샘플로 보정 (몇 시간 돌아도 지연 유지)
+DRIFT_COMP = True
 # ===========================
 
+# ===== 재생 설정 =====
+# 콜백 재생: 수신 루프는 링버퍼에 넣기만 하고, 오디오 콜백이 꺼내서 재생
+# 제때 데이터가 없으면 None → 무음, "repeat" → 직전 블록 반복(점점 작게) 으로 채우고 underrun 으로 셈
+# "plc" → 피치 주기를 이어서 반복하다 서서히 줄이고, 데이터가 다시 오면 crossfade (클릭 없음)
+PLAYBACK_CONCEAL = "plc"
+# =====================
+
 
 def main():
     # 소켓 서버 열기
@@ -36,42 +60,64 @@ def main():
     conn, addr = sock.accept()
     print(f"[Pi_B] Pi_A connected: {addr}")
 
-    buffer = b""
-    delay_buffer = deque()
-
-    # 스피커 출력 스트림
-    with sd.OutputStream(
-        samplerate=SAMPLE_RATE,
+    # recv(4096) + bytes 이어붙이기 대신 미리 잡은 버퍼에 recv_into (프레임은 복사 없는 view)
+    # 상대가 v2 면 헤더의 길이대로, 예전(v1) 송신부면 BYTES_PER_CHUNK 단위로 받음
+    reader = StreamReader(conn, BYTES_PER_CHUNK, tag="Pi_B")
+    # 송신부와 샘플레이트 / 블록을 맞추고, 재생 스트림 / 딜레이 버퍼를 그 값으로 한 번만 잡음
+    # (송신부가 SAMPLE_RATE 를 못 내면 송신부 샘플레이트로 받아서 여기서 SAMPLE_RATE 로 변환)
+    # 송신부가 DTX 면 무음 구간은 comfort noise 설명만 받고 read() 가 같은 세기의 잡음을 만들어 돌려줌
+    session = reader.accept(
+        sample_rates=(SAMPLE_RATE,), channels=CHANNELS, block=CHUNK, codecs=WIRE_CODECS, dtx=True
+    )
+    if session is None:
+        print("[Pi_B] recv end")
+        conn.close()
+        sock.close()
+        return
+    # 재생 장치는 항상 SAMPLE_RATE. 프레임 레이트 (세션 / 송신부 음성 대역 16 kHz 등) 가 다르면 폴리페이즈 변환
+    # (10 ms 블록 0.6 % CPU 정도, 변환 필터 지연은 처음 바뀔 때 출력)
+    converter = RateConverter(SAMPLE_RATE, max_frames=session.block, tag="Pi_B")
+    block = round(session.block * SAMPLE_RATE / session.sample_rate)
+    # 지터 버퍼: 도착 간격을 재서 재생 전에 쌓아둘 깊이를 정함 (예전 delay_buffer 0.5 s 대신)
+    jitter = AdaptiveJitter(
+        SAMPLE_RATE, block,
+        min_ms=JITTER_MIN_MS, max_ms=JITTER_MAX_MS, underrun_target=UNDERRUN_TARGET, tag="Pi_B",
+    )
+
+    # 목표보다 많이 쌓이면 무음 블록을 버리거나 WSOLA 로 줄여서 지연을 되돌림
+    catchup = CatchUp(SAMPLE_RATE, block, method=CATCHUP_METHOD, tag="Pi_B") if CATCHUP_METHOD else None
+    drift = DriftEstimator(SAMPLE_RATE, block, tag="Pi_B") if DRIFT_COMP else None
+
+    # 스피커 출력: 콜백 재생 (링버퍼에 지터 버퍼 목표 깊이만큼 쌓이면 재생 시작)
+    player = CallbackPlayer(
+        SAMPLE_RATE,
         channels=CHANNELS,
-        dtype=DTYPE,
-        blocksize=CHUNK,
-    ) as stream:
+        blocksize=block,
+        jitter=jitter,
+        catchup=catchup,
+        drift=drift,
+        conceal=PLAYBACK_CONCEAL,
+        tag="Pi_B",
+    )
+    with player:
         try:
             while True:
-                data = conn.recv(4096)
-                if not data:
+                frame = reader.read()
+                if frame is None:
                     print("[Pi_B] recv end")
                     break
 
-                buffer += data
-
-                while len(buffer) >= BYTES_PER_CHUNK:
-                    frame_bytes = buffer[:BYTES_PER_CHUNK]
-                    buffer = buffer[BYTES_PER_CHUNK:]
-
-                    frames = np.frombuffer(frame_bytes, dtype=np.int16)
-                    delay_buffer.append(frames.copy())
-
-                    if len(delay_buffer) < DELAY_FRAMES:
-                        # 딜레이 채우는 중
-                        continue
-
-                    delayed_frames = delay_buffer.popleft()
-                    stream.write(delayed_frames)
+                # 링버퍼에 넣고 바로 리턴 (재생은 오디오 콜백이 알아서 꺼내감)
+                # 송신부가 RNNoise 를 돌렸으면 말소리 확률로 무음 판단, 아니면 (META 없음 / NO_PROB) RMS 로
+                pcm = converter.process(frame.pcm, frame.rate)
+                player.write(pcm, prob=frame.prob)
 
         except KeyboardInterrupt:
             print("\n[Pi_B] interrupted")
         finally:
+            print(reader.format_stats())
+            print(converter.format_stats())
+            print(player.format_stats())
             conn.close()
             sock.close()
             print("[Pi_B] socket closed")
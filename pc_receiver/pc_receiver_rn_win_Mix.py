@@ -1,10 +1,19 @@
 import socket
-import sounddevice as sd
 import numpy as np
-from collections import deque
-import math
 import threading
-from pyrnnoise import RNNoise  # 윈도우용 RNNoise 래퍼
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.hpf import HighPassFilter
+from common.catchup import CatchUp
+from common.drift import DriftEstimator
+from common.jitter import AdaptiveJitter
+from common.playback import CallbackPlayer
+from common.codec import FORMAT_PCM16, FORMAT_ZLIB
+from common.protocol import StreamReader
+from common.pipeline import FilterPipeline
+from common.rnnoise_stream import RNNoiseStream
 
 # ===== 네트워크 설정 =====
 LISTEN_IP = "0.0.0.0"   # 모든 인터페이스에서 받기
@@ -17,12 +26,22 @@ CHANNELS = 1
 CHUNK = 480          # 10ms @ 48kHz
 DTYPE = "int16"
 BYTES_PER_CHUNK = CHUNK * CHANNELS * 2
+# 송신부에 요청할 코덱 (앞쪽 우선, 송신부가 못 하면 다음 것). zlib = 무손실 (말소리면 3/4 정도),
+# Wi-Fi 가 붐비면 FORMAT_ULAW (1/2, 37 dB) / FORMAT_ADPCM (1/4, 30 dB) 를 앞에
+WIRE_CODECS = (FORMAT_ZLIB, FORMAT_PCM16)
 # =======================
 
-# ===== 인위적 딜레이 설정 =====
-DELAY_SEC = 0.5
-DELAY_FRAMES = int(np.ceil(DELAY_SEC * SAMPLE_RATE / CHUNK))
-print(f"[PC] delay: {DELAY_SEC}s ≒ {DELAY_FRAMES} frames")
+# ===== 지터 버퍼 (예전 고정 DELAY_SEC = 0.5 s 대신) =====
+# 도착 간격이 흔들리는 정도를 재서, 늦은 블록 때문에 끊기는 비율이 UNDERRUN_TARGET 이하인
+# 가장 작은 깊이만큼만 쌓아두고 재생 (직결 LAN 이면 JITTER_MIN_MS 근처까지 내려감)
+JITTER_MIN_MS = 20.0
+JITTER_MAX_MS = 500.0
+UNDERRUN_TARGET = 0.005
+# 밀린 블록이 한꺼번에 오면 (Wi-Fi 멈춤 뒤 TCP 버스트) 목표 지연으로 다시 줄이는 방법
+# "silence": 무음 블록만 버림 (말이 안 끊기면 결국 그냥 버림) / "wsola": 말하는 중에도 블록을 살짝 짧게 / None: 끔
+CATCHUP_METHOD = "wsola"
+# 송신 마이크 / 재생 장치 클럭 차이(ppm)를 버퍼 깊이로 추정해서 리샘플로 보정 (몇 시간 돌아도 지연 유지)
+DRIFT_COMP = True
 # ===========================
 
 # 0: raw, 1: HPF, 2: RNN, 3: HPF+RNN
@@ -37,43 +56,15 @@ RNN_MIX = 0.7
 # =====================================
 
 
-class HighPassFilter:
-    def __init__(self, fs: float, fc: float):
-        self.fs = fs
-        self.fc = fc
-        self.prev_x = 0.0
-        self.prev_y = 0.0
-        self._update_alpha()
-
-    def _update_alpha(self):
-        dt = 1.0 / self.fs
-        rc = 1.0 / (2.0 * math.pi * self.fc)
-        self.alpha = rc / (rc + dt)
-
-    def process(self, x: np.ndarray) -> np.ndarray:
-        # x: float32 1D
-        y = np.empty_like(x, dtype=np.float32)
-        prev_x = self.prev_x
-        prev_y = self.prev_y
-        a = self.alpha
-
-        for i, sample in enumerate(x):
-            v = a * (prev_y + sample - prev_x)
-            y[i] = v
-            prev_y = v
-            prev_x = sample
-
-        self.prev_x = prev_x
-        self.prev_y = prev_y
-        return y
-
-
 # HPF 설정 (100Hz)
 hpf = HighPassFilter(fs=SAMPLE_RATE, fc=100.0)
 
-# RNNoise 인스턴스 (48kHz 기준)
-# ⚠ channels 인자 쓰지 말 것. sample_rate 만 넘김.
-denoiser = RNNoise(sample_rate=SAMPLE_RATE)
+# RNNoise 스트림 (48kHz, 480샘플 프레임, 스트림당 한 번 생성)
+# RNNoise 백엔드: None 이면 시작할 때 설치된 것 중 가장 빠른 것을 자동 선택
+# ("ctypes" / "pyrnnoise" / "rnnoise_wrapper" 로 강제 가능, 환경변수 RNNOISE_BACKEND 도 가능)
+RNN_BACKEND = None
+denoiser = RNNoiseStream(block_size=CHUNK, backend=RNN_BACKEND, tag="PC")
+pipeline = FilterPipeline(CHUNK, hpf=hpf, denoise=denoiser)
 
 
 def mode_input_thread():
@@ -121,57 +112,11 @@ def apply_filter(frames: np.ndarray) -> np.ndarray:
     """
     frames: int16, 길이 CHUNK(480)
     RNNoise 프레임 사이즈도 480이라, 호출당 1프레임 처리.
+    MODE=3에서는 HPF 결과를 dry로 사용 (HPF-only vs HPF+RNN 믹스).
+    반환값은 pipeline 내부 버퍼(view) → 보관하려면 복사할 것.
     """
-    assert frames.shape[0] == CHUNK
-
-    # 항상 int16 기준으로 처리
-    x = frames.astype(np.int16)
-
-    # RAW 기준 신호(dry) 보관
-    dry = x.copy()
-
-    # RAW
-    if MODE == 0:
-        return x
-
-    # HPF
-    if MODE in (1, 3):
-        xf = hpf.process(x.astype(np.float32))  # HPF는 float32에서
-        x = np.clip(xf, -32768, 32767).astype(np.int16)
-
-        # MODE=3에서는 HPF 결과를 dry로 사용 (HPF-only vs HPF+RNN 믹스)
-        if MODE == 3:
-            dry = x.copy()
-
-    # RNNoise
-    if MODE in (2, 3):
-        # pyrnnoise 권장 방식: [num_channels, num_samples]로 chunk 처리
-        mono = x.reshape(1, -1)  # (1, 480)
-
-        denoised_int16 = x  # fallback
-        # denoise_chunk는 frame마다 (speech_prob, denoised_audio) yield
-        for _, denoised in denoiser.denoise_chunk(mono):
-            # mono 1채널이니까 [0]만 사용
-            denoised_int16 = denoised[0].astype(np.int16)
-            break  # 이번 프레임(480 샘플)만 쓰면 되니까 바로 탈출
-
-        # === RNNoise 강도 믹스 ===
-        mix = max(0.0, min(1.0, RNN_MIX))  # 혹시 실수로 범위 벗어나도 클램프
-
-        if mix >= 1.0:
-            # RNNoise 100%
-            x = denoised_int16
-        elif mix <= 0.0:
-            # RNNoise 0% (dry만 사용)
-            x = dry
-        else:
-            dry_f = dry.astype(np.float32)
-            wet_f = denoised_int16.astype(np.float32)
-            mixed_f = (1.0 - mix) * dry_f + mix * wet_f
-            x = np.clip(mixed_f, -32768, 32767).astype(np.int16)
-        # ========================
-
-    return x
+    mix = max(0.0, min(1.0, RNN_MIX))  # 혹시 실수로 범위 벗어나도 클램프
+    return pipeline.process(frames, use_hpf=MODE in (1, 3), use_rnn=MODE in (2, 3), mix=mix)
 
 
 def main():
@@ -188,43 +133,43 @@ def main():
     conn, addr = sock.accept()
     print(f"[PC] Pi connected: {addr}")
 
-    buffer = b""
-    delay_buffer = deque()
-
-    # 스피커 출력 스트림
-    with sd.OutputStream(
-        samplerate=SAMPLE_RATE,
-        channels=CHANNELS,
-        dtype=DTYPE,
-        blocksize=CHUNK,
-    ) as stream:
+    # recv(4096) + bytes 이어붙이기 대신 미리 잡은 버퍼에 recv_into (프레임은 복사 없는 view)
+    reader = StreamReader(conn, BYTES_PER_CHUNK)
+    # 송신부와 샘플레이트 / 블록을 맞춤. RNNoise 는 SAMPLE_RATE + CHUNK 단위로만 처리하므로
+    # 샘플레이트가 안 맞으면 거절 (ValueError), 블록을 못 맞추는 송신부면 CHUNK 씩 다시 잘라서 받음
+    reader.accept(
+        sample_rates=(SAMPLE_RATE,), channels=CHANNELS, block=CHUNK, exact_block=True, resample=False,
+        codecs=WIRE_CODECS,
+    )
+    # 스피커 출력: 콜백 재생 + 적응형 지터 버퍼 (예전 delay_buffer 0.5 s 대신)
+    jitter = AdaptiveJitter(
+        SAMPLE_RATE, CHUNK, min_ms=JITTER_MIN_MS, max_ms=JITTER_MAX_MS, underrun_target=UNDERRUN_TARGET, tag="PC"
+    )
+    # 목표보다 많이 쌓이면 무음 블록을 버리거나 WSOLA 로 줄여서 지연을 되돌림
+    catchup = CatchUp(SAMPLE_RATE, CHUNK, method=CATCHUP_METHOD, tag="PC") if CATCHUP_METHOD else None
+    drift = DriftEstimator(SAMPLE_RATE, CHUNK, tag="PC") if DRIFT_COMP else None
+    # 늦거나 빠진 블록 자리는 직전 파형으로 이어서 채움 (conceal="plc")
+    player = CallbackPlayer(
+        SAMPLE_RATE, channels=CHANNELS, blocksize=CHUNK, jitter=jitter, catchup=catchup, drift=drift, conceal="plc",
+        tag="PC"
+    )
+    with player:
         try:
             while True:
-                data = conn.recv(4096)
-                if not data:
+                frame = reader.read()
+                if frame is None:
                     print("[PC] recv end")
                     break
 
-                buffer += data
-
-                while len(buffer) >= BYTES_PER_CHUNK:
-                    frame_bytes = buffer[:BYTES_PER_CHUNK]
-                    buffer = buffer[BYTES_PER_CHUNK:]
-
-                    frames = np.frombuffer(frame_bytes, dtype=np.int16)
-                    filtered = apply_filter(frames)
-
-                    delay_buffer.append(filtered)
-
-                    if len(delay_buffer) < DELAY_FRAMES:
-                        continue
+                filtered = apply_filter(frame.pcm)
 
-                    delayed_frames = delay_buffer.popleft()
-                    stream.write(delayed_frames)
+                # 링버퍼에 복사해 넣고 바로 리턴 (pipeline 출력 버퍼는 다음 청크에서 다시 써도 됨)
+                player.write(filtered)
 
         except KeyboardInterrupt:
             print("\n[PC] interrupted")
         finally:
+            print(player.format_stats())
             conn.close()
             sock.close()
             print("[PC] socket closed")
@@ -1,11 +1,19 @@
 import socket
-import sounddevice as sd
 import numpy as np
-from collections import deque
-import ctypes
-import atexit
-import math
 import threading
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.hpf import HighPassFilter
+from common.catchup import CatchUp
+from common.drift import DriftEstimator
+from common.jitter import AdaptiveJitter
+from common.playback import CallbackPlayer
+from common.codec import FORMAT_PCM16, FORMAT_ZLIB
+from common.protocol import StreamReader
+from common.pipeline import FilterPipeline
+from common.rnnoise_stream import RNNoiseStream
 
 # ===== 네트워크 설정 =====
 LISTEN_IP = "0.0.0.0"   # 모든 인터페이스에서 받기
@@ -18,12 +26,22 @@ CHANNELS = 1
 CHUNK = 480
 DTYPE = "int16"
 BYTES_PER_CHUNK = CHUNK * CHANNELS * 2
+# 송신부에 요청할 코덱 (앞쪽 우선, 송신부가 못 하면 다음 것). zlib = 무손실 (말소리면 3/4 정도),
+# Wi-Fi 가 붐비면 FORMAT_ULAW (1/2, 37 dB) / FORMAT_ADPCM (1/4, 30 dB) 를 앞에
+WIRE_CODECS = (FORMAT_ZLIB, FORMAT_PCM16)
 # =======================
 
-# ===== 인위적 딜레이 설정 =====
-DELAY_SEC = 0.5
-DELAY_FRAMES = int(np.ceil(DELAY_SEC * SAMPLE_RATE / CHUNK))
-print(f"[PC] delay: {DELAY_SEC}s ≒ {DELAY_FRAMES} frames")
+# ===== 지터 버퍼 (예전 고정 DELAY_SEC = 0.5 s 대신) =====
+# 도착 간격이 흔들리는 정도를 재서, 늦은 블록 때문에 끊기는 비율이 UNDERRUN_TARGET 이하인
+# 가장 작은 깊이만큼만 쌓아두고 재생 (직결 LAN 이면 JITTER_MIN_MS 근처까지 내려감)
+JITTER_MIN_MS = 20.0
+JITTER_MAX_MS = 500.0
+UNDERRUN_TARGET = 0.005
+# 밀린 블록이 한꺼번에 오면 (Wi-Fi 멈춤 뒤 TCP 버스트) 목표 지연으로 다시 줄이는 방법
+# "silence": 무음 블록만 버림 (말이 안 끊기면 결국 그냥 버림) / "wsola": 말하는 중에도 블록을 살짝 짧게 / None: 끔
+CATCHUP_METHOD = "wsola"
+# 송신 마이크 / 재생 장치 클럭 차이(ppm)를 버퍼 깊이로 추정해서 리샘플로 보정 (몇 시간 돌아도 지연 유지)
+DRIFT_COMP = True
 # ===========================
 
 # 0: raw, 1: HPF, 2: RNN, 3: HPF+RNN
@@ -31,82 +49,17 @@ MODE = 0
 MODE_NAME = {0: "RAW", 1: "HPF", 2: "RNN", 3: "BOTH"}
 
 
-def load_rnnoise():
-    libnames = ["librnnoise.so.0", "librnnoise.so"]
-    last_err = None
-    for name in libnames:
-        try:
-            lib = ctypes.CDLL(name)
-            print(f"[PC] RNNoise loaded: {name}")
-            return lib
-        except OSError as e:
-            last_err = e
-    raise OSError(f"RNNoise load failed: {last_err}")
-
-
-rn = load_rnnoise()
-
-rn.rnnoise_create.argtypes = [ctypes.c_void_p]
-rn.rnnoise_create.restype = ctypes.c_void_p
-
-rn.rnnoise_process_frame.argtypes = [
-    ctypes.c_void_p,
-    ctypes.POINTER(ctypes.c_float),
-    ctypes.POINTER(ctypes.c_float),
-]
-rn.rnnoise_process_frame.restype = ctypes.c_float
-
-rn.rnnoise_destroy.argtypes = [ctypes.c_void_p]
-rn.rnnoise_destroy.restype = None
-
-_rn_state = rn.rnnoise_create(None)
-if not _rn_state:
-    raise RuntimeError("rnnoise_create(NULL) failed")
-
-
-def _cleanup_rnnoise():
-    global _rn_state
-    if _rn_state:
-        rn.rnnoise_destroy(_rn_state)
-        _rn_state = None
-
-
-atexit.register(_cleanup_rnnoise)
-
-
-class HighPassFilter:
-    def __init__(self, fs: float, fc: float):
-        self.fs = fs
-        self.fc = fc
-        self.prev_x = 0.0
-        self.prev_y = 0.0
-        self._update_alpha()
-
-    def _update_alpha(self):
-        dt = 1.0 / self.fs
-        rc = 1.0 / (2.0 * math.pi * self.fc)
-        self.alpha = rc / (rc + dt)
-
-    def process(self, x: np.ndarray) -> np.ndarray:
-        y = np.empty_like(x, dtype=np.float32)
-        prev_x = self.prev_x
-        prev_y = self.prev_y
-        a = self.alpha
-
-        for i, sample in enumerate(x):
-            v = a * (prev_y + sample - prev_x)
-            y[i] = v
-            prev_y = v
-            prev_x = sample
-
-        self.prev_x = prev_x
-        self.prev_y = prev_y
-        return y
-
-
 # HPF 설정 (100Hz)
 hpf = HighPassFilter(fs=SAMPLE_RATE, fc=100.0)
 
+# RNNoise 백엔드: None 이면 시작할 때 설치된 것 중 가장 빠른 것을 자동 선택
+# ("ctypes" / "pyrnnoise" / "rnnoise_wrapper" 로 강제 가능, 환경변수 RNNOISE_BACKEND 도 가능)
+RNN_BACKEND = None
+rnn = RNNoiseStream(block_size=CHUNK, backend=RNN_BACKEND, tag="PC")
+
+# apply_filter 작업 버퍼를 미리 잡아두는 파이프라인
+pipeline = FilterPipeline(CHUNK, hpf=hpf, denoise=rnn)
+
 
 def mode_input_thread():
     global MODE
@@ -127,25 +80,8 @@ def mode_input_thread():
 
 
 def apply_filter(frames: np.ndarray) -> np.ndarray:
-    assert frames.shape[0] == CHUNK
-
-    if MODE == 0:
-        return frames
-
-    x = frames.astype(np.float32)
-
-    if MODE in (1, 3):
-        x = hpf.process(x)
-
-    if MODE in (2, 3):
-        in_buf = x.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
-        out = np.empty_like(x, dtype=np.float32)
-        out_buf = out.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
-        rn.rnnoise_process_frame(_rn_state, out_buf, in_buf)
-        x = out
-
-    y = np.clip(x, -32768.0, 32767.0).astype(np.int16)
-    return y
+    # 반환값은 pipeline 내부 버퍼 (MODE 0 이면 frames 그대로)
+    return pipeline.process(frames, use_hpf=MODE in (1, 3), use_rnn=MODE in (2, 3))
 
 
 def main():
@@ -162,43 +98,43 @@ def main():
     conn, addr = sock.accept()
     print(f"[PC] Pi connected: {addr}")
 
-    buffer = b""
-    delay_buffer = deque()
-
-    # 스피커 출력 스트림
-    with sd.OutputStream(
-        samplerate=SAMPLE_RATE,
-        channels=CHANNELS,
-        dtype=DTYPE,
-        blocksize=CHUNK,
-    ) as stream:
+    # recv(4096) + bytes 이어붙이기 대신 미리 잡은 버퍼에 recv_into (프레임은 복사 없는 view)
+    reader = StreamReader(conn, BYTES_PER_CHUNK)
+    # 송신부와 샘플레이트 / 블록을 맞춤. RNNoise 는 SAMPLE_RATE + CHUNK 단위로만 처리하므로
+    # 샘플레이트가 안 맞으면 거절 (ValueError), 블록을 못 맞추는 송신부면 CHUNK 씩 다시 잘라서 받음
+    reader.accept(
+        sample_rates=(SAMPLE_RATE,), channels=CHANNELS, block=CHUNK, exact_block=True, resample=False,
+        codecs=WIRE_CODECS,
+    )
+    # 스피커 출력: 콜백 재생 + 적응형 지터 버퍼 (예전 delay_buffer 0.5 s 대신)
+    jitter = AdaptiveJitter(
+        SAMPLE_RATE, CHUNK, min_ms=JITTER_MIN_MS, max_ms=JITTER_MAX_MS, underrun_target=UNDERRUN_TARGET, tag="PC"
+    )
+    # 목표보다 많이 쌓이면 무음 블록을 버리거나 WSOLA 로 줄여서 지연을 되돌림
+    catchup = CatchUp(SAMPLE_RATE, CHUNK, method=CATCHUP_METHOD, tag="PC") if CATCHUP_METHOD else None
+    drift = DriftEstimator(SAMPLE_RATE, CHUNK, tag="PC") if DRIFT_COMP else None
+    # 늦거나 빠진 블록 자리는 직전 파형으로 이어서 채움 (conceal="plc")
+    player = CallbackPlayer(
+        SAMPLE_RATE, channels=CHANNELS, blocksize=CHUNK, jitter=jitter, catchup=catchup, drift=drift, conceal="plc",
+        tag="PC"
+    )
+    with player:
         try:
             while True:
-                data = conn.recv(4096)
-                if not data:
+                frame = reader.read()
+                if frame is None:
                     print("[PC] recv end")
                     break
 
-                buffer += data
-
-                while len(buffer) >= BYTES_PER_CHUNK:
-                    frame_bytes = buffer[:BYTES_PER_CHUNK]
-                    buffer = buffer[BYTES_PER_CHUNK:]
-
-                    frames = np.frombuffer(frame_bytes, dtype=np.int16)
-                    filtered = apply_filter(frames)
-
-                    delay_buffer.append(filtered)
-
-                    if len(delay_buffer) < DELAY_FRAMES:
-                        continue
+                filtered = apply_filter(frame.pcm)
 
-                    delayed_frames = delay_buffer.popleft()
-                    stream.write(delayed_frames)
+                # 링버퍼에 복사해 넣고 바로 리턴 (pipeline 출력 버퍼는 다음 청크에서 다시 써도 됨)
+                player.write(filtered)
 
         except KeyboardInterrupt:
             print("\n[PC] interrupted")
         finally:
+            print(player.format_stats())
             conn.close()
             sock.close()
             print("[PC] socket closed")
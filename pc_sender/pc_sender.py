@@ -1,40 +1,62 @@
 import socket
-import sounddevice as sd
-import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.capture import CallbackCapture
+from common.codec import ALL_FORMATS
+from common.protocol import StreamWriter
+from common.resample import PolyphaseResampler
 
 PI_IP = "172.21.107.25"  # ←라즈베리파이 IP or 공유기 공인 IP
 PI_PORT = 54321
 
 SAMPLE_RATE = 48000
+# 수신부가 원하면 바꿔서 캡처할 수 있는 샘플레이트 (필터가 없어서 아무 값이나 가능, 첫 번째가 기본)
+SAMPLE_RATES = (SAMPLE_RATE, 44100, 32000, 16000)
+# 마이크를 여는 샘플레이트. None 이면 협상한 레이트로 바로 캡처,
+# 마이크가 그 레이트를 못 내면 (44.1 kHz 전용 등) 지정해서 이 레이트로 캡처 → 협상한 레이트로 변환
+CAPTURE_RATE = None
 CHANNELS = 1
 CHUNK = 480
 DTYPE = "int16"
+# 송신 형식: 2 = v2 (seq / 캡처 타임스탬프 / 길이 헤더), 1 = 예전 형식 (구버전 수신부와 붙일 때)
+WIRE_VERSION = 2
 
 def main():
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     print(f"Pi_B {PI_IP}:{PI_PORT} 에 연결 시도...")
     sock.connect((PI_IP, PI_PORT))
     print("연결 성공. 마이크 스트리밍 시작.")
+    writer = StreamWriter(sock, version=WIRE_VERSION, tag="PC")
+    # 수신부와 샘플레이트 / 블록 / 코덱을 맞추고 그 값으로 캡처 (수신부가 따로 변환 / 다시 자를 필요 없음)
+    session = writer.negotiate(SAMPLE_RATES, CHANNELS, CHUNK, flexible_block=True, codecs=ALL_FORMATS)
 
-    
-    with sd.InputStream(
-        samplerate=SAMPLE_RATE,
-        channels=CHANNELS,
-        dtype=DTYPE,
-        blocksize=CHUNK,
-    ) as stream:
+    # 마이크는 오디오 콜백이 링버퍼에 계속 쌓고, 아래 루프는 자기 속도로 꺼내감
+    # (sendall 이 잠깐 막혀도 입력 버퍼가 넘치지 않음)
+    capture_rate = CAPTURE_RATE or session.sample_rate
+    capture_block = max(1, round(session.block * capture_rate / session.sample_rate))
+    converter = None
+    if capture_rate != session.sample_rate:
+        converter = PolyphaseResampler(capture_rate, session.sample_rate, max_frames=capture_block)
+        print(f"[PC] capture {capture_rate} Hz -> {session.sample_rate} Hz (+{converter.delay_ms:.1f} ms)")
+    capture = CallbackCapture(capture_rate, channels=CHANNELS, blocksize=capture_block, tag="PC")
+    with capture:
         try:
             while True:
-                frames, overflowed = stream.read(CHUNK)
-                if overflowed:
-                    print("Warning: input overflow", flush=True)
+                frames, ts = capture.read()
+                if converter is not None:
+                    # 블록 길이가 ±1 샘플 달라질 수 있음 (v2 는 헤더에 길이, v1 은 스트림이라 그대로 보냄)
+                    frames = converter.process(frames)
 
-                data = frames.astype(np.int16).tobytes()
-                sock.sendall(data)
+                # v2 헤더(seq / 캡처 시각) + int16 버퍼를 그대로 전송 (bytes 변환 없이)
+                writer.send(frames, ts=ts)
 
         except KeyboardInterrupt:
             print("\n Ctrl+C로 종료.")
         finally:
+            print(capture.format_stats())
+            print(writer.format_stats())
             sock.close()
             print(" 소켓 닫힘.")
 
@@ -1,9 +1,12 @@
 import socket
-import struct
 import sounddevice as sd
 import numpy as np
 import threading
 import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from common.protocol import StreamWriter
 
 # ==========================================
 # 1. 설정 (Configuration)
@@ -16,6 +19,8 @@ SAMPLE_RATE = 48000
 CHANNELS = 1
 CHUNK = 3840         # 480 * 8 (수신부와 동일하게)
 DTYPE = "int16"
+# 송신 형식: 2 = v2 (seq / 캡처 타임스탬프 / 길이 헤더), 1 = 예전 형식 (구버전 수신부와 붙일 때)
+WIRE_VERSION = 2
 
 # 상태 변수
 CURRENT_MODE = 0     # 0:RAW, 1:HPF, 2:RNN, 3:BOTH
@@ -62,6 +67,10 @@ def main():
         sock.connect((RECEIVER_IP, RECEIVER_PORT))
         sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         print("[PC] Connected! Streaming Started (Fake DSP Mode).")
+        # v2: seq / 캡처 시각 / mode / rms 헤더 + PCM, v1: 예전 ('!II' mode, rms) + PCM. 둘 다 sendall 한 번에 (PacketWriter)
+        writer = StreamWriter(sock, version=WIRE_VERSION, legacy_header='!II', tag="PC")
+        # 수신부와 샘플레이트 / 블록 / 코덱을 맞춤 (거절되면 아래 except 로)
+        writer.negotiate((SAMPLE_RATE,), CHANNELS, CHUNK)
     except Exception as e:
         print(f"[Error] Connection Failed: {e}")
         return
@@ -85,10 +94,7 @@ def main():
                 # 4. 패킷 전송 [Header(Mode, RMS) + Body]
                 # ★ 핵심: 실제 처리는 안 했지만, 키보드로 선택한 'CURRENT_MODE' 값을 헤더에 담아 보냅니다.
                 # 수신부(Pi B)는 이 헤더를 보고 OLED를 바꿀 것입니다.
-                header = struct.pack('!II', CURRENT_MODE, rms)
-                body = processed_audio.tobytes()
-                
-                sock.sendall(header + body)
+                writer.send(processed_audio, mode=CURRENT_MODE, rms=rms)
 
     except KeyboardInterrupt:
         print("\n[PC] Stopped.")
@@ -1,8 +1,12 @@
 import socket
-import struct
 import sounddevice as sd
 import numpy as np
 import time
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from common.protocol import StreamWriter
 
 # ==========================================
 # 1. 설정 (Configuration)
@@ -18,6 +22,8 @@ CHANNELS = 1         # 마이크는 1채널(Mono)
 # (수신부가 3840이면 3840, 1024면 1024)
 CHUNK = 3840         
 DTYPE = "int16"
+# 송신 형식: 2 = v2 (seq / 캡처 타임스탬프 / 길이 헤더), 1 = 예전 형식 (구버전 수신부와 붙일 때)
+WIRE_VERSION = 2
 
 # 테스트용 가상 모드 (PC에는 키패드가 없으므로)
 CURRENT_MODE = 0 # 0:RAW 로 고정해서 보냄
@@ -34,6 +40,10 @@ def main():
         sock.connect((RECEIVER_IP, RECEIVER_PORT))
         sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # 지연 최소화
         print("[PC] Connected! Start Streaming...")
+        # v2: seq / 캡처 시각 / mode / rms 헤더 + PCM, v1: 예전 ('!II' mode, rms) + PCM. 둘 다 sendall 한 번에 (PacketWriter)
+        writer = StreamWriter(sock, version=WIRE_VERSION, legacy_header='!II', tag="PC")
+        # 수신부와 샘플레이트 / 블록 / 코덱을 맞춤 (거절되면 아래 except 로)
+        writer.negotiate((SAMPLE_RATE,), CHANNELS, CHUNK)
     except Exception as e:
         print(f"[Error] Connection Failed: {e}")
         return
@@ -67,13 +77,10 @@ def main():
             # PC가 계산해서 보내주면 라즈베리파이가 편함
             rms = int(np.sqrt(np.mean(audio_data.astype(np.float32)**2)))
 
-            # 3. 패킷 생성 (프로토콜 준수!)
+            # 3. 패킷 전송 (프로토콜 준수!)
             # [Header: Mode(4byte) + RMS(4byte)] + [Body: Audio]
-            header = struct.pack('!II', CURRENT_MODE, rms)
-            body = audio_data.tobytes()
-
-            # 4. 전송
-            sock.sendall(header + body)
+            # 헤더 + audio_data 를 이어붙여 sendall 한 번 (PacketWriter)
+            writer.send(audio_data, mode=CURRENT_MODE, rms=rms)
             
             # (선택) 터미널에 상태 출력
             # print(f"Sent: RMS {rms}")
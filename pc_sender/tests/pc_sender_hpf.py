@@ -1,18 +1,15 @@
 import socket
-import struct
 import sounddevice as sd
 import numpy as np
 import threading
-import math
 import sys
+import os
 
-# 라이브러리 체크
-try:
-    from rnnoise_wrapper import RNNoise
-except ImportError:
-    print("❌ Error: 'rnnoise-wrapper' not found.")
-    print("Run: pip install rnnoise-wrapper")
-    sys.exit(1)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from common.hpf import HighPassFilter
+from common.protocol import StreamWriter
+from common.pipeline import FilterPipeline
+from common.rnnoise_stream import RNNoiseStream
 
 # ==========================================
 # 1. 설정 (Configuration)
@@ -25,6 +22,8 @@ SAMPLE_RATE = 48000
 CHANNELS = 1
 CHUNK = 3840         # 480 * 8 (전송 효율 + AI 처리 최적화)
 DTYPE = "int16"
+# 송신 형식: 2 = v2 (seq / 캡처 타임스탬프 / 길이 헤더), 1 = 예전 형식 (구버전 수신부와 붙일 때)
+WIRE_VERSION = 2
 
 # 상태 변수
 CURRENT_MODE = 0     # 0:RAW, 1:HPF, 2:RNN, 3:BOTH
@@ -42,36 +41,23 @@ MODE_MAP = {
 # 2. DSP 클래스 & 객체 초기화
 # ==========================================
 
-# --- HPF 클래스 (직접 구현) ---
-class HighPassFilter:
-    def __init__(self, fs, fc):
-        dt = 1.0 / fs
-        rc = 1.0 / (2.0 * math.pi * fc)
-        self.alpha = rc / (rc + dt)
-        self.prev_x = 0.0
-        self.prev_y = 0.0
-
-    def process(self, chunk):
-        # float32로 변환하여 연산 정밀도 확보
-        x = chunk.astype(np.float32)
-        y = np.zeros_like(x)
-        
-        # 첫 샘플 처리 (이전 상태 연결)
-        y[0] = self.alpha * (self.prev_y + x[0] - self.prev_x)
-        
-        # 나머지 샘플 처리 (벡터 연산 대신 순차 처리)
-        for i in range(1, len(x)):
-            y[i] = self.alpha * (y[i-1] + x[i] - x[i-1])
-            
-        # 상태 저장
-        self.prev_x = x[-1]
-        self.prev_y = y[-1]
-        
-        return y # float32 반환
-
+# --- HPF (common/hpf.py 블록 연산 버전 사용) ---
 # 필터 객체 생성
 hpf = HighPassFilter(SAMPLE_RATE, 100) # 100Hz 컷오프
-denoiser = RNNoise() # AI 노이즈 제거기
+
+# AI 노이즈 제거기: 3840개 = 480 * 8 프레임을 고정 버퍼 하나로 한 번에 처리
+# RNNoise 백엔드: None 이면 시작할 때 설치된 것 중 가장 빠른 것을 자동 선택
+# ("ctypes" / "pyrnnoise" / "rnnoise_wrapper" 로 강제 가능, 환경변수 RNNOISE_BACKEND 도 가능)
+RNN_BACKEND = None
+try:
+    denoiser = RNNoiseStream(block_size=CHUNK, backend=RNN_BACKEND, tag="PC")
+except (ImportError, OSError) as e:
+    print(f"❌ Error: {e}")
+    print("RNNoise 설치 필요 (librnnoise, pyrnnoise, rnnoise_wrapper 중 하나)")
+    sys.exit(1)
+
+# HPF / RNNoise / 믹스 작업 버퍼를 미리 잡아두는 파이프라인
+pipeline = FilterPipeline(CHUNK, hpf=hpf, denoise=denoiser)
 
 # ==========================================
 # 3. 필터링 로직 (핵심)
@@ -79,50 +65,16 @@ denoiser = RNNoise() # AI 노이즈 제거기
 def process_audio(audio_chunk):
     """
     3840개 데이터를 받아서 필터링 후 반환
-    RNNoise는 480개씩만 처리 가능하므로 쪼개서 처리함
+    RNNoise 는 480개 프레임 8개를 RNNoiseStream 이 한 번에 처리함
+    (반환값은 pipeline 내부 버퍼 → 다음 호출 전에 전송까지 끝낼 것)
     """
-    global CURRENT_MODE
-    
-    # 1. RAW 모드면 바로 리턴 (부하 최소화)
-    if CURRENT_MODE == 0:
-        return audio_chunk
-
-    # 2. HPF 적용 (Mode 1 or 3)
-    processed = audio_chunk.astype(np.float32)
-    if CURRENT_MODE in [1, 3]:
-        processed = hpf.process(audio_chunk) # Float32 반환
-    
-    # 3. RNNoise 적용 (Mode 2 or 3)
-    if CURRENT_MODE in [2, 3]:
-        # int16으로 변환해서 넣어야 함
-        pcm_int16 = np.clip(processed, -32768, 32767).astype(np.int16)
-        
-        # 3840개를 480개씩 8번 쪼개서 처리
-        denoised_parts = []
-        FRAME_SIZE = 480
-        
-        for i in range(0, len(pcm_int16), FRAME_SIZE):
-            frame = pcm_int16[i : i + FRAME_SIZE]
-            if len(frame) < FRAME_SIZE: break # 자투리 방지
-            
-            # AI 필터링 (True/False는 음성 감지 여부)
-            filtered_frame = denoiser.filter(frame, sample_rate=SAMPLE_RATE)
-            denoised_parts.append(filtered_frame)
-            
-        # 다시 하나로 합치기
-        processed_rnn = np.concatenate(denoised_parts)
-        
-        # 믹싱 (강도 조절)
-        # processed(HPF된거)와 processed_rnn(AI된거)을 섞음
-        dry = processed
-        wet = processed_rnn.astype(np.float32)
-        
-        # Mix 적용
-        final_float = (dry * (1.0 - RNN_MIX)) + (wet * RNN_MIX)
-        processed = final_float
-
-    # 4. 최종 변환 (int16)
-    return np.clip(processed, -32768, 32767).astype(np.int16)
+    # RAW 모드면 pipeline 이 입력을 그대로 리턴 (부하 최소화)
+    return pipeline.process(
+        audio_chunk,
+        use_hpf=CURRENT_MODE in (1, 3),
+        use_rnn=CURRENT_MODE in (2, 3),
+        mix=RNN_MIX,
+    )
 
 # ==========================================
 # 4. 키보드 입력 스레드
@@ -164,6 +116,10 @@ def main():
         sock.connect((RECEIVER_IP, RECEIVER_PORT))
         sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         print("[PC] Connected! Streaming with DSP...")
+        # v2: seq / 캡처 시각 / mode / rms 헤더 + PCM, v1: 예전 ('!II' mode, rms) + PCM. 둘 다 sendall 한 번에 (PacketWriter)
+        writer = StreamWriter(sock, version=WIRE_VERSION, legacy_header='!II', tag="PC")
+        # 수신부와 샘플레이트 / 블록 / 코덱을 맞춤 (거절되면 아래 except 로)
+        writer.negotiate((SAMPLE_RATE,), CHANNELS, CHUNK)
     except Exception as e:
         print(f"[Error] Connection Failed: {e}")
         return
@@ -183,11 +139,8 @@ def main():
                 # 3. RMS 계산
                 rms = int(np.sqrt(np.mean(processed_audio.astype(np.float32)**2)))
 
-                # 4. 패킷 전송 [Header + Body]
-                header = struct.pack('!II', CURRENT_MODE, rms)
-                body = processed_audio.tobytes()
-                
-                sock.sendall(header + body)
+                # 4. 패킷 전송 [Header + Body] (sendall 한 번, PacketWriter)
+                writer.send(processed_audio, mode=CURRENT_MODE, rms=rms)
 
     except KeyboardInterrupt:
         print("\n[PC] Stopped.")